@@ -4,6 +4,7 @@ import argparse
 import json
 import logging
 import os
+import sys
 from datetime import datetime
 
 import numpy as np
@@ -14,6 +15,10 @@ from dotenv import load_dotenv
 
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+
+# The pipeline's profiler (scripts/profiling.py); scripts/ is not on sys.path when run from Analysis/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+from profiling import start_profiling, stop_profiling  # noqa: E402
 import seaborn as sns
 
 # Set style for better looking plots
@@ -154,6 +159,11 @@ def parse_args():
         default=None,
         help="Additional SQL WHERE clause (without 'WHERE').",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Sample Python stacks and write a flamegraph .folded file next to the log.",
+    )
     return parser.parse_args()
 
 
@@ -444,6 +454,8 @@ def main():
     base_dir = get_base_dir()
     script_name = os.path.splitext(os.path.basename(__file__))[0]
     log_file = setup_logging(base_dir, script_name)
+    if args.profile:
+        start_profiling(log_file)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_dir = os.path.join(base_dir, "Analysis", "outputs", f"{script_name}_{timestamp}")
@@ -890,6 +902,9 @@ def main():
             "weighted_percentiles_by_group_csvs": weighted_percentiles_csvs,
         },
     }
+    profile_summary = stop_profiling()
+    if profile_summary:
+        meta["profile"] = profile_summary
     with open(os.path.join(output_dir, "run_metadata.json"), "w", encoding="utf-8") as f:
         json.dump(meta, f, indent=2)
 
@@ -3,17 +3,25 @@
 import sys
 import os
 import time
+import argparse
 import logging
 import gc
 import psutil
 from datetime import datetime
 from dotenv import load_dotenv
 
-from scripts.utils import setup_logging
+from scripts.utils import setup_logging, update_run_report, write_run_report
 from scripts.write_tags_to_pbf_2 import write_tags_to_pbf as write_tags_to_pbf_2
-from scripts.download_osm_pbf import download_osm_pbf
-from scripts.import_into_postgres import import_into_postgres
-from scripts.add_custom_tags import add_custom_tags
+from scripts.download_osm_pbf import (
+    download_osm_pbf, stream_download_prefilter, DOWNLOAD_STREAM_PREFILTER, DOWNLOAD_STREAM_KEEP_RAW
+)
+from scripts.import_into_postgres import import_into_postgres, IMPORT_PREFILTER_PBF, IMPORT_FILTERED_PBF_PATH
+from scripts.prefilter_pbf import default_filtered_path
+from scripts.add_custom_tags import add_custom_tags, raster_import_jobs
+from scripts.raster_imports import start_raster_imports
+from scripts.apply_osm_changes import apply_osm_changes, clear_incremental_changes
+from scripts.resource_accounting import ResourceTracker
+from scripts.profiling import start_profiling, stop_profiling
 
 # ============================================================================
 # PATH RESOLUTION
@@ -54,6 +62,9 @@ PIPELINE_SECTIONS = {
     'import_to_postgres': False,     # Imports PBF into PostgreSQL using osm2pgsql
                                      # Script: import_into_postgres.py
                                      # Lua: Lua3_RouteProcessing_with_curvature.lua
+    'apply_osm_changes': False,      # Applies .osc.gz files from OSM_CHANGES_DIR (osm2pgsql --append)
+                                     # and recomputes only the affected roads in add_custom_tags
+                                     # Script: apply_osm_changes.py
     'add_custom_tags': True,          # Full custom tags pipeline
                                      # Script: add_custom_tags.py
                                      # Includes: road classification, curvature v2, scenery, rsbikeaccess, 
@@ -79,6 +90,12 @@ NEW_PBF_PATH = resolve_path(os.getenv("NEW_PBF_PATH", "./osm_pbf_inputs/osm_pbf_
 OUTPUT_PBF_PATH = resolve_path(os.getenv("OUTPUT_PBF_PATH", "./osm_pbf_augmented_output/india-latest-augmented.osm.pbf"), BASE_DIR)
 STYLE_LUA_SCRIPT = resolve_path("./scripts/Lua3_RouteProcessing_with_curvature.lua", BASE_DIR)
 
+# Skip Section 2 when Section 1 found the PBF unchanged (the database already holds it)
+IMPORT_SKIP_UNCHANGED_PBF = os.getenv("IMPORT_SKIP_UNCHANGED_PBF", "false").strip().lower() in ("1", "true", "yes", "y", "on")
+# Streaming download (DOWNLOAD_STREAM_PREFILTER): Section 1 writes the pre-filtered PBF itself
+FILTERED_PBF_PATH = resolve_path(IMPORT_FILTERED_PBF_PATH, BASE_DIR) if IMPORT_FILTERED_PBF_PATH else default_filtered_path(NEW_PBF_PATH)
+STREAM_PREFILTER = DOWNLOAD_STREAM_PREFILTER and IMPORT_PREFILTER_PBF
+
 # Validate required environment variables
 required_vars = ["DB_NAME", "DB_USER", "DB_PASSWORD"]
 missing_vars = [var for var in required_vars if not os.getenv(var)]
@@ -125,19 +142,38 @@ def run_pipeline():
         "new_pbf_path": NEW_PBF_PATH
     }
     
+    # Per-stage WAL / temp / buffer I/O / CPU accounting (written to the run report)
+    tracker = ResourceTracker(db_config)
+    
+    # Raster imports do not depend on OSM data: run them in the background while the
+    # PBF is downloaded / imported; add_custom_tags waits for the tables it reads
+    if PIPELINE_SECTIONS['add_custom_tags']:
+        start_raster_imports(raster_import_jobs(), db_config)
+    
     # Section 1: Download OSM PBF
     if PIPELINE_SECTIONS['download_osm']:
         logger.info("=" * 80)
         logger.info("Section 1: Downloading OSM PBF")
         logger.info("=" * 80)
         step_start = time.time()
+        tracker.start_stage("Section 1: Download OSM PBF")
         
         url = "https://download.geofabrik.de/asia/india-latest.osm.pbf"
-        download_osm_pbf(url, NEW_PBF_PATH)
+        if STREAM_PREFILTER:
+            # Download piped into the pre-filter: filtering overlaps the transfer
+            downloaded = stream_download_prefilter(url, NEW_PBF_PATH, FILTERED_PBF_PATH)
+        else:
+            downloaded = download_osm_pbf(url, NEW_PBF_PATH)
+        
+        tracker.end_stage("Section 1: Download OSM PBF")
         
         elapsed = time.time() - step_start
         logger.info(f"Section 1 completed in {elapsed:.2f} seconds")
         perform_pipeline_cleanup("Section 1: Download OSM PBF")
+
+        if not downloaded and IMPORT_SKIP_UNCHANGED_PBF and PIPELINE_SECTIONS['import_to_postgres']:
+            logger.info("PBF unchanged since the last download, skipping Section 2 (IMPORT_SKIP_UNCHANGED_PBF)")
+            PIPELINE_SECTIONS['import_to_postgres'] = False
     
     # Section 2: Import to PostgreSQL
     if PIPELINE_SECTIONS['import_to_postgres']:
@@ -145,17 +181,46 @@ def run_pipeline():
         logger.info("Section 2: Importing OSM PBF into PostgreSQL")
         logger.info("=" * 80)
         step_start = time.time()
+        tracker.start_stage("Section 2: Import to PostgreSQL")
         
+        # Without the raw PBF (DOWNLOAD_STREAM_KEEP_RAW=false) the streamed filtered PBF is imported as is
+        import_filtered_only = STREAM_PREFILTER and not DOWNLOAD_STREAM_KEEP_RAW
         import_into_postgres(
-            pbf_file=NEW_PBF_PATH,
+            pbf_file=FILTERED_PBF_PATH if import_filtered_only else NEW_PBF_PATH,
             db_config=db_config,
-            style_lua_script=STYLE_LUA_SCRIPT
+            style_lua_script=STYLE_LUA_SCRIPT,
+            prefiltered=import_filtered_only
         )
         
+        tracker.end_stage("Section 2: Import to PostgreSQL")
+        
         elapsed = time.time() - step_start
         logger.info(f"Section 2 completed in {elapsed:.2f} seconds")
         perform_pipeline_cleanup("Section 2: Import to PostgreSQL")
     
+    # Section 2b: Apply OSM change files (incremental update)
+    incremental = False
+    if PIPELINE_SECTIONS['apply_osm_changes']:
+        logger.info("=" * 80)
+        logger.info("Section 2b: Applying OSM change files")
+        logger.info("=" * 80)
+        step_start = time.time()
+        tracker.start_stage("Section 2b: Apply OSM changes")
+        
+        affected_roads = apply_osm_changes(db_config, STYLE_LUA_SCRIPT, pbf_file=NEW_PBF_PATH)
+        incremental = True
+        
+        tracker.end_stage("Section 2b: Apply OSM changes")
+        
+        elapsed = time.time() - step_start
+        logger.info(f"Section 2b completed in {elapsed:.2f} seconds")
+        perform_pipeline_cleanup("Section 2b: Apply OSM changes")
+        
+        if affected_roads == 0:
+            logger.info("No OSM changes since the last run; skipping custom tags and PBF write.")
+            PIPELINE_SECTIONS['add_custom_tags'] = False
+            PIPELINE_SECTIONS['write_pbf'] = False
+    
     # Section 3: Add Custom Tags
     if PIPELINE_SECTIONS['add_custom_tags']:
         logger.info("=" * 80)
@@ -163,7 +228,10 @@ def run_pipeline():
         logger.info("=" * 80)
         step_start = time.time()
         
-        add_custom_tags(db_config)
+        # Parts inside add_custom_tags are recorded as individual stages
+        add_custom_tags(db_config, resource_tracker=tracker, incremental=incremental)
+        if incremental:
+            clear_incremental_changes(db_config)
         
         elapsed = time.time() - step_start
         logger.info(f"Section 3 completed in {elapsed:.2f} seconds")
@@ -175,14 +243,21 @@ def run_pipeline():
         logger.info("Section 4: Writing Augmented PBF")
         logger.info("=" * 80)
         step_start = time.time()
+        tracker.start_stage("Section 4: Write PBF")
         
         write_tags_to_pbf_2(db_config, OUTPUT_PBF_PATH)
         
+        tracker.end_stage("Section 4: Write PBF")
+        
         elapsed = time.time() - step_start
         logger.info(f"Section 4 completed in {elapsed:.2f} seconds")
         perform_pipeline_cleanup("Section 4: Write PBF")
     
     total_elapsed = time.time() - start_time
+    tracker.log_ranking()
+    update_run_report("resource_accounting", tracker.summary())
+    tracker.close()
+    
     logger.info("=" * 80)
     logger.info(f"Pipeline completed in {total_elapsed:.2f} seconds")
     logger.info("=" * 80)
@@ -191,7 +266,18 @@ def run_pipeline():
 # MAIN ENTRY POINT
 # ============================================================================
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the OSM processing pipeline.")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Sample Python stacks (flamegraph .folded file next to the log) and trace "
+             "allocations while loading extra tags for the PBF writer.",
+    )
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     overall_start_time = time.time()
     
     logger.info("=" * 80)
@@ -214,12 +300,22 @@ def main():
         logger.info(f"  {section}: {status}")
     logger.info("")
     
-    run_pipeline()
+    if args.profile:
+        start_profiling(log_file)
+    try:
+        run_pipeline()
+    finally:
+        profile_summary = stop_profiling()
+        if profile_summary:
+            update_run_report("profile", profile_summary)
     
     total_time = time.time() - overall_start_time
     logger.info("=" * 80)
     logger.info(f"Total execution time: {total_time:.2f} seconds")
     logger.info(f"Full log saved to: {log_file}")
+    update_run_report("total_execution_s", round(total_time, 2))
+    update_run_report("pipeline_sections", PIPELINE_SECTIONS)
+    write_run_report(log_file)
     logger.info("=" * 80)
 
 if __name__ == "__main__":
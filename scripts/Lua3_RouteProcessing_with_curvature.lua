@@ -1,8 +1,49 @@
 local tables = {}
 
--- Node coordinate cache for curvature v2 processing
--- This stores node_id -> {lon, lat} mappings
-local node_coords_cache = {}
+-- ---------------------------------------------------------------------------
+-- Tag projection
+-- ---------------------------------------------------------------------------
+-- Only whitelisted keys are stored in the tags column (jsonb on osm_all_roads,
+-- hstore on the feature tables); everything downstream reads promoted columns.
+-- Comma-separated key lists from the environment, '*' keeps every tag and an
+-- empty value stores no tags (tags = NULL).
+--   OSM_ROAD_TAG_KEYS     default: oneway,lanes,surface,maxspeed,ref,name
+--   OSM_FEATURE_TAG_KEYS  default: (empty) - no SQL reads the feature tags
+local function tag_key_set(env_name, default)
+    local value = os.getenv(env_name)
+    if value == nil then
+        value = default
+    end
+    if value == '*' then
+        return nil
+    end
+    local keys = {}
+    for key in string.gmatch(value, '[^,]+') do
+        key = key:match('^%s*(.-)%s*$')
+        if key ~= '' then
+            keys[key] = true
+        end
+    end
+    return keys
+end
+
+local road_tag_keys = tag_key_set('OSM_ROAD_TAG_KEYS', 'oneway,lanes,surface,maxspeed,ref,name')
+local feature_tag_keys = tag_key_set('OSM_FEATURE_TAG_KEYS', '')
+
+-- Whitelisted subset of tags (nil if nothing is left, so the column stays NULL)
+local function project_tags(tags, keys)
+    if keys == nil then
+        return tags
+    end
+    local projected = nil
+    for key, value in pairs(tags) do
+        if keys[key] then
+            projected = projected or {}
+            projected[key] = value
+        end
+    end
+    return projected
+end
 
 -- Existing tables (copied from Lua2_RouteProcessing.lua)
 
@@ -143,9 +184,18 @@ tables.osm_all_roads = osm2pgsql.define_way_table('osm_all_roads', {
     { column = 'ref', type = 'text' },
     { column = 'lanes', type = 'text' },
     { column = 'maxspeed', type = 'text' },
-    { column = 'tags', type = 'jsonb' },
+    { column = 'surface', type = 'text' },
+    { column = 'tags', type = 'jsonb' },  -- OSM_ROAD_TAG_KEYS only
     { column = 'junction', type = 'text' },
-    { column = 'geometry', type = 'multilinestring', projection = 4326 }
+    { column = 'geometry', type = 'multilinestring', projection = 4326 },
+    -- Import-time derived columns (previously full-table UPDATE passes after import)
+    { column = 'bikable_road', type = 'boolean' },
+    { column = 'road_type_base', type = 'text' },
+    { column = 'lanes_count', type = 'int' },
+    { column = 'is_oneway', type = 'boolean' },
+    { column = 'fourlane', type = 'text' },
+    { column = 'geom_3857', type = 'linestring', projection = 3857 },
+    { column = 'length_geom_3857', type = 'real', sql_type = 'double precision' }
 })
 
 tables.osm_relation_ways = osm2pgsql.define_relation_table('osm_relation_ways', {
@@ -169,77 +219,73 @@ tables.rs_conflict_nodes = osm2pgsql.define_node_table('rs_conflict_nodes', {
     { column = 'tags', type = 'jsonb' }
 })
 
--- Node coordinates table: store all node coordinates during node processing
--- This persists across passes in slim mode (unlike in-memory cache)
--- Store geometry and extract coordinates in SQL (more reliable than parsing in Lua)
-tables.rs_node_coords = osm2pgsql.define_node_table('rs_node_coords', {
-    { column = 'osm_id', type = 'bigint' },
-    { column = 'geometry', type = 'geometry', projection = 4326 },
-    { column = 'lon', type = 'real' },
-    { column = 'lat', type = 'real' }
-})
-
--- Way-node sequence: one row per way node with ordering + lon/lat.
--- Note: We store lon/lat as numbers, and build point geometries in SQL.
+-- Way-node lists: one row per highway way with its ordered node ids.
+-- Coordinates are NOT stored per node here: osm2pgsql resolves node locations
+-- from its own location store when building osm_all_roads.geometry, and
+-- sql/road_curvature_v2/00_populate_node_coordinates.sql zips node_ids with the
+-- points of that geometry into rs_highway_way_nodes(way_id, node_id, seq, lon, lat).
 -- Note: way_id is automatically added by define_way_table(), so we don't need to define it explicitly.
-tables.rs_highway_way_nodes = osm2pgsql.define_way_table('rs_highway_way_nodes', {
-    { column = 'node_id', type = 'bigint' },
-    { column = 'seq', type = 'int' },
-    { column = 'lon', type = 'real' },
-    { column = 'lat', type = 'real' }
+tables.rs_highway_way_node_lists = osm2pgsql.define_way_table('rs_highway_way_node_lists', {
+    { column = 'node_ids', sql_type = 'int8[]' }
 })
 
--- Helpers
-local function get_lon_lat_from_location(loc)
-    if loc == nil then
-        return nil, nil
-    end
-    if type(loc) ~= 'table' then
-        return nil, nil
-    end
-    -- Common shapes: {lon=..., lat=...} or { [1]=lon, [2]=lat }
-    local lon = loc.lon or loc[1]
-    local lat = loc.lat or loc[2]
-    return lon, lat
+-- Highway types processed by road classification and everything downstream
+-- (keep in sync with sql/road_classification/04_prepare_osm_all_roads_table.sql)
+local bikable_highways = {
+    motorway = true, trunk = true, primary = true, secondary = true, tertiary = true,
+    residential = true, unclassified = true, service = true, track = true, path = true,
+    living_street = true, trunk_link = true, primary_link = true, secondary_link = true,
+    motorway_link = true, tertiary_link = true, road = true
+}
+
+local function ref_has(ref, pattern)
+    return ref ~= nil and string.find(string.upper(ref), pattern, 1, true) ~= nil
 end
 
-function osm2pgsql.process_node(node)
-    -- Curvature v2: Store node coordinates in database table (persists across passes in slim mode)
-    -- Also keep in-memory cache for same-pass lookups
-    
-    -- Try to get point geometry (most reliable in flex mode)
-    local point_geom = node:as_point()
-    local lon, lat = nil, nil
-    
-    -- Try to get coordinates directly (method varies by osm2pgsql version)
-    if node.lon ~= nil and node.lat ~= nil then
-        lon = node.lon
-        lat = node.lat
-    elseif node.location ~= nil then
-        local loc = node.location
-        if type(loc) == 'table' then
-            lon = loc.lon or loc[1]
-            lat = loc.lat or loc[2]
-        end
+-- Base road type from highway + ref only (no grid context).
+-- Same CASE as sql/road_classification/07_assign_final_road_classification.sql;
+-- the HAdj upgrade and road_setting_i1 still need SQL (neighbours / grids).
+local function base_road_type(highway, ref)
+    local nh, sh, mdr = ref_has(ref, 'NH'), ref_has(ref, 'SH'), ref_has(ref, 'MDR')
+    if nh or (not sh and not mdr and (highway == 'trunk' or highway == 'trunk_link'
+            or highway == 'motorway' or highway == 'motorway_link')) then
+        return 'NH'
+    elseif sh or (not mdr and (highway == 'primary' or highway == 'primary_link')) then
+        return 'SH'
+    elseif mdr or highway == 'secondary' or highway == 'secondary_link' then
+        return 'MDR'
+    elseif highway == 'track' then
+        return 'Track'
+    elseif highway == 'path' then
+        return 'Path'
+    elseif highway == 'residential' then
+        return 'Res'
     end
-    
-    -- Store in cache if we have coordinates
-    if lon ~= nil and lat ~= nil then
-        node_coords_cache[node.id] = {lon = lon, lat = lat}
+    return 'WoH'
+end
+
+-- lanes_count is the FIRST integer in the lanes tag, not the maximum and not all
+-- digits concatenated ('2', '2;3', '2-4', '4 lanes' -> 2, 2, 2, 4; the old
+-- per-row REGEXP_REPLACE turned '2;3' into 23). Multi-valued tags are rare and
+-- the first value is the tagged main one; the persona / fourlane thresholds
+-- (>= 2, > 2) then never count a road wider than its first value says.
+-- Same rule as 04_prepare_osm_all_roads_table.sql (tests/test_lanes_parsing.py).
+local function parse_lanes(lanes)
+    if lanes == nil then
+        return nil
     end
-    
-    -- CRITICAL: Store ALL nodes that have a point geometry
-    -- In OSM, nodes used by ways MUST have coordinates, and as_point() should work for them
-    -- If as_point() returns nil, the node doesn't have coordinates (rare, but possible)
-    if point_geom ~= nil then
-        tables.rs_node_coords:insert({
-            osm_id = node.id,
-            geometry = point_geom,
-            lon = lon,  -- May be nil, will be populated from geometry in SQL
-            lat = lat   -- May be nil, will be populated from geometry in SQL
-        })
+    return tonumber(string.match(lanes, '%d+'))
+end
+
+local function parse_oneway(oneway)
+    if oneway == nil then
+        return false
     end
+    local value = string.upper(oneway)
+    return value == 'YES' or value == 'TRUE' or value == '1' or value == '-1'
+end
 
+function osm2pgsql.process_node(node)
     if node.tags.natural == 'peak' then
         tables.rs_hills_nodes:insert({
             osm_id = node.id,
@@ -247,7 +293,7 @@ function osm2pgsql.process_node(node)
             natural = node.tags.natural,
             entity_type = 'node',
             geometry = node:as_point(),
-            tags = node.tags
+            tags = project_tags(node.tags, feature_tag_keys)
         })
     elseif node.tags['mountain pass'] == 'yes' then
         tables.rs_mountain_pass:insert({
@@ -256,7 +302,7 @@ function osm2pgsql.process_node(node)
             mountain_pass = node.tags['mountain pass'],
             entity_type = 'node',
             geometry = node:as_point(),
-            tags = node.tags
+            tags = project_tags(node.tags, feature_tag_keys)
         })
     end
 
@@ -284,7 +330,7 @@ function osm2pgsql.process_node(node)
             railway = node.tags.railway,
             junction = node.tags.junction,
             geometry = node:as_point(),
-            tags = node.tags
+            tags = project_tags(node.tags, feature_tag_keys)
         })
     end
 end
@@ -298,7 +344,7 @@ function osm2pgsql.process_way(way)
             landuse = way.tags.landuse,
             entity_type = 'way',
             geometry = way:as_polygon(),
-            tags = way.tags
+            tags = project_tags(way.tags, feature_tag_keys)
         })
     elseif way.tags.water == 'reservoir' or way.tags.natural == 'water' or way.tags.water == 'lake' then
         tables.rs_lakes:insert({
@@ -308,7 +354,7 @@ function osm2pgsql.process_way(way)
             natural = way.tags.natural,
             entity_type = 'way',
             geometry = way:as_polygon(),
-            tags = way.tags
+            tags = project_tags(way.tags, feature_tag_keys)
         })
     elseif way.tags.natural == 'coastline' then
         tables.rs_coastline:insert({
@@ -317,7 +363,7 @@ function osm2pgsql.process_way(way)
             natural = way.tags.natural,
             entity_type = 'way',
             geometry = way:as_multilinestring(),
-            tags = way.tags
+            tags = project_tags(way.tags, feature_tag_keys)
         })
     elseif way.tags.waterway == 'river' then
         tables.rs_rivers:insert({
@@ -326,7 +372,7 @@ function osm2pgsql.process_way(way)
             waterway = way.tags.waterway,
             entity_type = 'way',
             geometry = way:as_multilinestring(),
-            tags = way.tags
+            tags = project_tags(way.tags, feature_tag_keys)
         })
     elseif way.tags.natural == 'desert' then
         tables.rs_desert:insert({
@@ -335,7 +381,7 @@ function osm2pgsql.process_way(way)
             natural = way.tags.natural,
             entity_type = 'way',
             geometry = way:as_polygon(),
-            tags = way.tags
+            tags = project_tags(way.tags, feature_tag_keys)
         })
     elseif way.tags.landuse == 'farmland' or way.tags.natural == 'field' then
         tables.rs_fields:insert({
@@ -345,7 +391,7 @@ function osm2pgsql.process_way(way)
             natural = way.tags.natural,
             entity_type = 'way',
             geometry = way:as_polygon(),
-            tags = way.tags
+            tags = project_tags(way.tags, feature_tag_keys)
         })
     elseif way.tags.leisure == 'nature_reserve' or way.tags.boundary == 'national_park' then
         tables.rs_reserve_forest:insert({
@@ -354,7 +400,7 @@ function osm2pgsql.process_way(way)
             leisure = way.tags.leisure,
             entity_type = 'way',
             geometry = way:as_polygon(),
-            tags = way.tags
+            tags = project_tags(way.tags, feature_tag_keys)
         })
     elseif way.tags.boundary == 'protected_area' then
         tables.rs_protected:insert({
@@ -363,7 +409,7 @@ function osm2pgsql.process_way(way)
             boundary = way.tags.boundary,
             entity_type = 'way',
             geometry = way:as_polygon(),
-            tags = way.tags
+            tags = project_tags(way.tags, feature_tag_keys)
         })
     elseif way.tags.natural == 'fell' or way.tags.natural == 'grassland' or way.tags.natural == 'shrubbery' or way.tags.natural == 'scrub' or way.tags.natural == 'moor' or way.tags.natural == 'heath' then
         tables.rs_shrub:insert({
@@ -372,44 +418,45 @@ function osm2pgsql.process_way(way)
             natural = way.tags.natural,
             entity_type = 'way',
             geometry = way:as_polygon(),
-            tags = way.tags
+            tags = project_tags(way.tags, feature_tag_keys)
         })
     elseif way.tags.highway then
+        local highway = way.tags.highway
+        local lanes_count = parse_lanes(way.tags.lanes)
+        local is_oneway = parse_oneway(way.tags.oneway)
+        local fourlane = 'no'
+        if is_oneway and lanes_count ~= nil and lanes_count >= 2 then
+            fourlane = 'yes'
+        end
+        local linestring = way:as_linestring()
+
         tables.osm_all_roads:insert({
             osm_id = way.id,
             name = way.tags.name,
-            highway = way.tags.highway,
+            highway = highway,
             ref = way.tags.ref,
             lanes = way.tags.lanes,
             maxspeed = way.tags.maxspeed,
+            surface = way.tags.surface,
             junction = way.tags.junction,
             geometry = way:as_multilinestring(),
-            tags = way.tags
+            tags = project_tags(way.tags, road_tag_keys),
+            bikable_road = bikable_highways[highway] == true,
+            road_type_base = base_road_type(highway, way.tags.ref),
+            lanes_count = lanes_count,
+            is_oneway = is_oneway,
+            fourlane = fourlane,
+            -- Transformed to EPSG:3857 by osm2pgsql (column projection)
+            geom_3857 = linestring,
+            length_geom_3857 = linestring:transform(3857):length()
         })
 
-        -- Curvature v2: store ordered nodes for this highway way.
-        -- In slim mode, cache doesn't persist, so we'll populate coordinates via SQL join after import
-        -- For now, store node_id and seq, coordinates will be populated in post-processing SQL
+        -- Curvature v2: store the ordered node ids for this highway way
+        -- (coordinates come from the way geometry, see rs_highway_way_node_lists above)
         if way.nodes ~= nil and #way.nodes > 0 then
-            for i, node_id in ipairs(way.nodes) do
-                local lon, lat = nil, nil
-                
-                -- Try in-memory cache first (works if nodes and ways processed in same pass)
-                local node_coords = node_coords_cache[node_id]
-                if node_coords ~= nil then
-                    lon = node_coords.lon
-                    lat = node_coords.lat
-                end
-                
-                -- way_id is automatically set by define_way_table() to way.id
-                -- Note: In slim mode, coordinates will be NULL here and populated via SQL join
-                tables.rs_highway_way_nodes:insert({
-                    node_id = node_id,
-                    seq = i,
-                    lon = lon,
-                    lat = lat
-                })
-            end
+            tables.rs_highway_way_node_lists:insert({
+                node_ids = '{' .. table.concat(way.nodes, ',') .. '}'
+            })
         end
     end
 end
@@ -456,7 +503,7 @@ function osm2pgsql.process_relation(relation)
                 type = relation.tags.type,
                 entity_type = 'relation',
                 geometry = geom,
-                tags = relation.tags
+                tags = project_tags(relation.tags, feature_tag_keys)
             })
         end
     elseif relation.tags.natural == 'peak'
@@ -468,7 +515,7 @@ function osm2pgsql.process_relation(relation)
             natural = relation.tags.natural,
             entity_type = 'relation',
             geometry = relation:as_multipolygon(),
-            tags = relation.tags
+            tags = project_tags(relation.tags, feature_tag_keys)
         })
     elseif relation.tags.leisure == 'nature_reserve' or relation.tags.boundary == 'national_park' then
         tables.rs_reserve_forest_relations:insert({
@@ -477,7 +524,7 @@ function osm2pgsql.process_relation(relation)
             leisure = relation.tags.leisure,
             entity_type = 'relation',
             geometry = relation:as_multipolygon(),
-            tags = relation.tags
+            tags = project_tags(relation.tags, feature_tag_keys)
         })
     end
 end
@@ -4,16 +4,31 @@ import json
 import os
 import psycopg
 import time
-import subprocess
 import logging
 from datetime import datetime
 import gc
 import psutil
 
 try:
-    from .utils import setup_logging, resolve_project_path
+    from .utils import setup_logging, resolve_project_path, substitute_sql_params
+    from .vacuum_scheduler import schedule_maintenance, maintain_table
+    from .resource_accounting import ResourceTracker
+    from .raster_imports import start_raster_imports, wait_for_rasters
+    from .curvature_engine import compute_curvature
+    from .curvature_sql_partitions import compute_curvature_sql
+    from .curvature_from_pbf import compute_curvature_from_pbf, load_curvature_file, result_is_current, CURVATURE_PBF_RESULT
+    from .intersection_engine import compute_intersection_degradation
+    from .intersection_tiles import compute_intersection_degradation_tiles
 except ImportError:
-    from utils import setup_logging, resolve_project_path
+    from utils import setup_logging, resolve_project_path, substitute_sql_params
+    from vacuum_scheduler import schedule_maintenance, maintain_table
+    from resource_accounting import ResourceTracker
+    from raster_imports import start_raster_imports, wait_for_rasters
+    from curvature_engine import compute_curvature
+    from curvature_sql_partitions import compute_curvature_sql
+    from curvature_from_pbf import compute_curvature_from_pbf, load_curvature_file, result_is_current, CURVATURE_PBF_RESULT
+    from intersection_engine import compute_intersection_degradation
+    from intersection_tiles import compute_intersection_degradation_tiles
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -37,6 +52,8 @@ UP_CHUNK_SIZE = int(os.getenv("URBAN_PRESSURE_CHUNK_SIZE", 200000))
 UP_PD_SAT = float(os.getenv("URBAN_PRESSURE_PD_SAT", 50000))
 UP_NEIGHBOR_RADIUS = float(os.getenv("URBAN_PRESSURE_NEIGHBOR_RADIUS", 2000))
 UP_RASTER_TILE_SIZE = int(os.getenv("URBAN_PRESSURE_RASTER_TILE_SIZE", 256))
+# The global GHSL rasters are clipped to the bbox plus this margin (degrees) before loading
+UP_RASTER_CLIP_PAD_DEG = float(os.getenv("URBAN_PRESSURE_RASTER_CLIP_PAD_DEG", 0.1))
 
 UP_POP_RASTER_PATH = os.getenv(
     "URBAN_PRESSURE_POP_RASTER_PATH",
@@ -49,6 +66,37 @@ UP_BUILT_RASTER_PATH = os.getenv(
 UP_POP_TABLE = "public.ghs_pop_e2030_r2023a_54009_100"
 UP_BUILT_TABLE = "public.ghs_built_s_e2030_r2023a_54009_100"
 
+# ============================================================================
+# CURVATURE ENGINE
+# ============================================================================
+# "numpy": curvature_engine.py streams the way nodes and writes only rs_curvature_way_summary
+# "sql": steps 01-05 of sql/road_curvature_v2 (materialises the vertex tables), run per hash
+#        partition of the intermediates on CURVATURE_SQL_WORKERS backends (curvature_sql_partitions.py)
+# "pbf": curvature_from_pbf.py computes the summaries from the PBF into CURVATURE_PBF_RESULT
+#        (recomputed when older than the PBF) and the file is COPYed in; incremental runs use "numpy"
+CURVATURE_ENGINE = os.getenv("CURVATURE_ENGINE", "numpy").strip().lower()
+CURVATURE_PBF_INPUT = resolve_project_path(
+    os.getenv("CURVATURE_PBF_INPUT") or os.getenv("NEW_PBF_PATH", "./osm_pbf_inputs/osm_pbf_new/india-latest.osm.pbf")
+)
+
+# ============================================================================
+# INTERSECTION ENGINE
+# ============================================================================
+# "numpy": intersection_engine.py loads rs_junction_index + the way attributes and writes the
+#          degradation columns (CSR junction graph in memory, no TEMP tables)
+# "sql": steps 01-04 of sql/road_intersection_density, run per spatial tile on
+#        INTERSECTION_SQL_WORKERS backends (intersection_tiles.py; INTERSECTION_REGION_BBOX limits the region)
+INTERSECTION_ENGINE = os.getenv("INTERSECTION_ENGINE", "numpy").strip().lower()
+
+# ============================================================================
+# INCREMENTAL RUNS (after apply_osm_changes.py; rings are in rs_incremental_roads)
+# ============================================================================
+# ring 0 = changed roads, 1 = roads touching them, 2 = neighbourhood radius,
+# 3 = roads touching ring 1 (curvature context only)
+INCREMENTAL_AFFECTED_RING = 2
+INCREMENTAL_CURVATURE_WRITE_RING = 1
+INCREMENTAL_CURVATURE_CONTEXT_RING = 3
+
 def log_print(message, level='info'):
     """Print to console and log to file."""
     print(message)
@@ -77,20 +125,50 @@ def execute_sql_file(cursor, filepath, params=None):
     with open(filepath, 'r', encoding='utf-8') as file:
         sql_query = file.read()
 
-    # If parameters are provided, format the SQL query dynamically
-    if params:
-        for key, value in params.items():
-            if key == "csv_path":
-                replacement = f"'{value}'"
-            else:
-                replacement = str(value)
-            sql_query = sql_query.replace(f":{key}", replacement)
+    # Substitute :params (scope placeholders default to "" = all rows)
+    sql_query = substitute_sql_params(sql_query, params)
 
     cursor.execute(sql_query)
 
     elapsed_time = time.time() - start_time
     log_print(f"Executed {os.path.basename(filepath)} in {elapsed_time:.2f} seconds")
 
+def log_ways_without_coordinates(cursor):
+    """
+    Logs the highway ways of rs_highway_way_coords left without coordinates: no
+    geometry, or a geometry with fewer points than nodes (osm2pgsql dropped a
+    repeated point or a node without location). Their curvature is NULL.
+    Returns (no_geometry, lost_points).
+    """
+    cursor.execute("""
+        SELECT
+            COUNT(*) FILTER (WHERE o.geometry IS NULL),
+            COUNT(*) FILTER (WHERE o.geometry IS NOT NULL)
+        FROM rs_highway_way_coords AS c
+        LEFT JOIN osm_all_roads AS o ON o.osm_id = c.way_id
+        WHERE c.lon_e7 IS NULL;
+    """)
+    no_geometry, lost_points = cursor.fetchone()
+    if no_geometry or lost_points:
+        log_print(
+            f"[add_custom_tags] {no_geometry + lost_points:,} ways without coordinates (NULL curvature): "
+            f"{lost_points:,} whose geometry lost points (repeated / unlocated nodes), "
+            f"{no_geometry:,} without geometry",
+            level='warning'
+        )
+    return no_geometry, lost_points
+
+def incremental_scope_params(max_ring):
+    """Scope placeholders limiting stage SQL to rs_incremental_roads rows with ring <= max_ring."""
+    ids = f"(SELECT osm_id FROM rs_incremental_roads WHERE ring <= {max_ring})"
+    return {
+        "osm_id_filter_clause": f"AND osm_id IN {ids}",
+        "osm_id_filter_clause_r": f"AND r.osm_id IN {ids}",
+        "osm_id_filter_clause_o": f"AND o.osm_id IN {ids}",
+        "way_id_filter_clause": f"AND way_id IN {ids}",
+        "way_id_filter_clause_w": f"AND w.way_id IN {ids}",
+    }
+
 def table_exists(db_name, db_user, db_host, db_port, db_password, table_name):
     """Checks if a table exists in the database."""
     conn = psycopg.connect(
@@ -120,96 +198,56 @@ def table_exists_conn(conn, schema, table):
         cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (full_name,))
         return cursor.fetchone()[0]
 
-def import_raster_54009(table_name, raster_path, db_config):
-    """Imports a raster into PostGIS using raster2pgsql (EPSG:54009)."""
-    if not os.path.exists(raster_path):
-        raise FileNotFoundError(f"Raster file not found: {raster_path}")
-
-    cmd = (
-        f'raster2pgsql -s 54009 -I -C -M -t {UP_RASTER_TILE_SIZE}x{UP_RASTER_TILE_SIZE} '
-        f'"{raster_path}" {table_name} | '
-        f'psql -d {db_config["name"]} -U {db_config["user"]} '
-        f'-h {db_config["host"]} -p {db_config["port"]}'
+def raster_import_jobs():
+    """
+    Rasters read by add_custom_tags. They do not depend on OSM data, so main.py starts
+    them in the background before the osm2pgsql import (see raster_imports.py).
+    """
+    clip_bbox = (
+        UP_LON_MIN - UP_RASTER_CLIP_PAD_DEG,
+        UP_LAT_MIN - UP_RASTER_CLIP_PAD_DEG,
+        UP_LON_MAX + UP_RASTER_CLIP_PAD_DEG,
+        UP_LAT_MAX + UP_RASTER_CLIP_PAD_DEG,
     )
-
-    env = os.environ.copy()
-    if db_config.get("password"):
-        env["PGPASSWORD"] = db_config["password"]
-
-    log_print(f"[urban_pressure] Importing raster to {table_name}")
-    subprocess.run(cmd, shell=True, check=True, env=env)
-
-def load_raster_data(db_config):
-    """Loads raster data into PostGIS using raster2pgsql."""
-    log_print("[add_custom_tags] Loading raster data into PostGIS...")
-
-    raster_files = [
+    return [
+        # Urban pressure (EPSG:54009, clipped to the urban pressure bbox)
         {
-            "filepath": resolve_project_path(""),
-            "table": "public.pop_density"
+            "table": UP_POP_TABLE,
+            "path": UP_POP_RASTER_PATH,
+            "srid": 54009,
+            "tile_size": UP_RASTER_TILE_SIZE,
+            "clip_bbox": clip_bbox,
         },
         {
-            "filepath": resolve_project_path("data/GHSL_data/GHS_BUILT_S_E2030_GLOBE_R2023A_54009_100_V1_0.tif"),
-            "table": "public.built_up_area"
-        }
+            "table": UP_BUILT_TABLE,
+            "path": UP_BUILT_RASTER_PATH,
+            "srid": 54009,
+            "tile_size": UP_RASTER_TILE_SIZE,
+            "clip_bbox": clip_bbox,
+        },
+        # Legacy EPSG:4326 layers (optional: a failed import is only logged)
+        {
+            "table": "public.pop_density",
+            "path": resolve_project_path(""),
+            "srid": 4326,
+            "tile_size": 100,
+            "options": ["-F"],
+            "required": False,
+        },
+        {
+            "table": "public.built_up_area",
+            "path": resolve_project_path("data/GHSL_data/GHS_BUILT_S_E2030_GLOBE_R2023A_54009_100_V1_0.tif"),
+            "srid": 4326,
+            "tile_size": 100,
+            "options": ["-F"],
+            "required": False,
+        },
     ]
-    # Establish a database connection here
-    conn = psycopg.connect(
-        dbname=db_config['name'],
-        user=db_config['user'],
-        password=db_config['password'],
-        host=db_config['host'],
-        port=db_config['port']
-    )
-    cursor = conn.cursor()  # Now `cursor` is defined
-
-    for raster in raster_files:
-        raster_path = raster["filepath"]
-        table_name = raster["table"]
 
-        if not os.path.exists(raster_path):
-            log_print(f"[WARNING] Raster file {raster_path} not found. Skipping...", level='warning')
-            continue
-
-        # Check if the raster table already exists
-        cursor.execute("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = %s
-            );
-        """, (table_name.split('.')[-1],))
-        table_exists = cursor.fetchone()[0]
-
-        if table_exists:
-            log_print(f"[INFO] Raster table {table_name} already exists. Skipping import...")
-            continue  # Skip this raster import
-
-        log_print(f"[add_custom_tags] Importing {os.path.basename(raster_path)} into {table_name}...")
-
-        # Construct raster2pgsql command
-        cmd = f'raster2pgsql -s 4326 -I -C -M -F -t 100x100 "{raster_path}" {table_name} | ' \
-              f'psql -d {db_config["name"]} -U {db_config["user"]} -h {db_config["host"]} -p {db_config["port"]}'
-        
-        # Set up the environment to pass the password without prompting
-        env = os.environ.copy()
-        if db_config.get("password"):
-            env["PGPASSWORD"] = db_config["password"]
-
-        # Execute raster2pgsql command
-        start_time = time.time()
-        try:
-            subprocess.run(cmd, shell=True, check=True, env=env)
-            log_time(f"Loading {table_name}", start_time)
-        except subprocess.CalledProcessError as e:
-            log_print(f"[ERROR] Failed to load raster data for {table_name}: {e}", level='error')
-    cursor.close()
-    conn.close()  # Ensure proper closing of the connection
-    
 def perform_storage_cleanup(db_config, step_name="Unknown"):
     """
     Performs storage-specific cleanup:
-    - VACUUM FULL on tables with dead tuples
+    - VACUUM (FULL only if mostly dead) on rs_highway_way_nodes
     - Drops intermediate tables that are no longer needed
     - Logs storage space reclaimed
     """
@@ -232,13 +270,12 @@ def perform_storage_cleanup(db_config, step_name="Unknown"):
         db_size_before = cursor.fetchone()[0]
         log_print(f"[STORAGE_CLEANUP] Database size before cleanup: {db_size_before}")
         
-        # VACUUM FULL on rs_highway_way_nodes (has many dead tuples)
-        log_print("[STORAGE_CLEANUP] Running VACUUM FULL on rs_highway_way_nodes (this may take a while)...")
+        # rs_highway_way_nodes is built with CREATE TABLE AS, so it is normally clean.
+        # Only rewrite it (VACUUM FULL) if most of the heap is actually dead.
         try:
-            cursor.execute("VACUUM FULL rs_highway_way_nodes;")
-            log_print("[STORAGE_CLEANUP] VACUUM FULL completed for rs_highway_way_nodes")
+            maintain_table(cursor, "rs_highway_way_nodes", allow_full_vacuum=True)
         except Exception as e:
-            log_print(f"[STORAGE_CLEANUP] Could not VACUUM FULL rs_highway_way_nodes: {e}", level='warning')
+            log_print(f"[STORAGE_CLEANUP] Could not maintain rs_highway_way_nodes: {e}", level='warning')
         
         # Drop old intermediate tables
         tables_to_drop = [
@@ -246,6 +283,7 @@ def perform_storage_cleanup(db_config, step_name="Unknown"):
             'rs_curvature_vertex_metrics',  # Intermediate curvature v2 table (35 GB)
             'rs_curvature_way_vertices',  # Intermediate curvature v2 table (21 GB)
             'rs_curvature_conflict_points',  # Intermediate curvature v2 table (3.2 GB)
+            'rs_curvature_conflict_candidates',  # Curvature v2 conflict nodes (partitioned SQL runs)
         ]
         
         for table in tables_to_drop:
@@ -282,11 +320,12 @@ def perform_storage_cleanup(db_config, step_name="Unknown"):
     log_print(f"[STORAGE_CLEANUP] Storage cleanup completed in {elapsed:.2f} seconds")
 
 
-def perform_memory_cleanup(db_config, step_name="Unknown"):
+def perform_memory_cleanup(db_config, step_name="Unknown", next_stage=None):
     """
     Performs comprehensive memory cleanup:
     - Closes and reopens database connections
-    - Runs PostgreSQL VACUUM ANALYZE
+    - Runs targeted VACUUM / ANALYZE for the tables next_stage reads
+      (only tables whose dead-tuple / modification counters crossed thresholds)
     - Forces Python garbage collection
     - Logs memory usage
     
@@ -304,7 +343,7 @@ def perform_memory_cleanup(db_config, step_name="Unknown"):
     collected = gc.collect()
     log_print(f"[MEMORY_CLEANUP] Python GC collected {collected} objects")
     
-    # Run PostgreSQL VACUUM ANALYZE to free up memory and update statistics
+    # Run targeted VACUUM / ANALYZE so the next stage plans against fresh statistics
     try:
         conn = psycopg.connect(
             dbname=db_config['name'],
@@ -316,17 +355,9 @@ def perform_memory_cleanup(db_config, step_name="Unknown"):
         conn.autocommit = True
         cursor = conn.cursor()
         
-        log_print("[MEMORY_CLEANUP] Running VACUUM ANALYZE on osm_all_roads...")
-        cursor.execute("VACUUM ANALYZE osm_all_roads;")
-        
-        # Also vacuum other large tables if they exist
-        # (helps QGIS performance + keeps query planning sane after big updates)
-        for table in ['india_grids', 'pop_density', 'built_up_area', 'rs_curvature_way_summary']:
-            try:
-                cursor.execute(f"VACUUM ANALYZE {table};")
-                log_print(f"[MEMORY_CLEANUP] VACUUM ANALYZE completed for {table}")
-            except Exception as e:
-                log_print(f"[MEMORY_CLEANUP] Could not vacuum {table}: {e}", level='warning')
+        # next_stage=None (end of pipeline) checks the QGIS-facing tables instead
+        actions = schedule_maintenance(cursor, next_stage)
+        log_print(f"[MEMORY_CLEANUP] Maintenance actions: {actions if actions else 'none needed'}")
         
         cursor.close()
         conn.close()
@@ -348,13 +379,25 @@ def perform_memory_cleanup(db_config, step_name="Unknown"):
     if "Curvature" in step_name and ("v2" in step_name or ("Part 2" in step_name and "v1" not in step_name and "Legacy" not in step_name)):
         perform_storage_cleanup(db_config, step_name)
 
-def add_custom_tags(db_config):
-    """Executes raster loading first, then SQL scripts in four parts."""
+def add_custom_tags(db_config, resource_tracker=None, incremental=False):
+    """
+    Executes raster loading first, then SQL scripts in six parts.
+    If a ResourceTracker is passed, per-Part (and per-chunk) WAL / temp / buffer I/O /
+    CPU deltas are recorded on it; otherwise a local tracker only logs them.
+
+    incremental=True (after apply_osm_changes) recomputes only the roads in
+    rs_incremental_roads: grid-level urban pressure and the full-table setup
+    steps are skipped, and every stage SQL gets the scope placeholders.
+    """
     message = "[add_custom_tags] Starting custom tag processing..."
+    if incremental:
+        message = "[add_custom_tags] Starting incremental custom tag processing (affected roads only)..."
     log_print(message)
     # log_print(f"Log file location: {log_file}") # log_file not available in scope if imported
 
     overall_start_time = time.time()
+    owns_tracker = resource_tracker is None
+    tracker = resource_tracker or ResourceTracker(db_config)
 
     # Step 1: Connect to PostgreSQL before loading raster data
     conn_start_time = time.time()
@@ -368,117 +411,133 @@ def add_custom_tags(db_config):
     cursor = conn.cursor()
     log_time("Database connection", conn_start_time)
 
-    # Step 2: Load raster data
-    load_raster_data(db_config)
+    # Step 2: Raster imports run in the background (already started by main.py
+    # when the OSM import ran); each stage waits only for the tables it reads
+    start_raster_imports(raster_import_jobs(), db_config)
 
     # **PART 1: Urban Pressure + Road Classification**
     log_print("[add_custom_tags] Part 1: Urban Pressure + Road Classification...")
+    tracker.start_stage("Part 1: Road Classification", conn=conn)
     road_sql_dir = resolve_project_path("sql/road_classification")
+    incremental_sql_dir = resolve_project_path("sql/incremental")
+    affected_params = incremental_scope_params(INCREMENTAL_AFFECTED_RING) if incremental else {}
 
     # Step 1: Ensure india_grids exists (required for urban pressure overlay)
-    if table_exists(db_config['name'], db_config['user'], db_config['host'], db_config['port'], db_config['password'], 'india_grids'):
+    # grid_ids are lattice positions (rs_grid_lattice); grids built before the lattice
+    # are numbered differently and are rebuilt together with their 54009 overlay
+    if table_exists_conn(conn, "public", "india_grids") and table_exists_conn(conn, "public", "rs_grid_lattice"):
         log_print("[INFO] Table 'india_grids' already exists, skipping creation.")
     else:
-        log_print("[INFO] Table 'india_grids' does not exist, generating grids from scratch.")
+        if table_exists_conn(conn, "public", "india_grids"):
+            if incremental:
+                raise RuntimeError(
+                    "india_grids predates rs_grid_lattice (grid_ids are renumbered); run a full build first"
+                )
+            log_print("[INFO] Table 'india_grids' has no rs_grid_lattice, regenerating grids and india_grids_54009.")
+            with conn.cursor() as drop_cursor:
+                drop_cursor.execute("DROP TABLE IF EXISTS public.india_grids_54009;")
+            conn.commit()
+        else:
+            log_print("[INFO] Table 'india_grids' does not exist, generating grids from scratch.")
         execute_sql_file(cursor, os.path.join(road_sql_dir, "01_create_india_grids.sql"))
         conn.commit()
 
     # Step 2: Urban pressure pipeline (mirrors dev-run logic)
-    log_print("[add_custom_tags] Running urban pressure SQL pipeline...")
-    urban_sql_dir = resolve_project_path("sql/urban_pressure")
-
-    # Idempotent raster imports for urban pressure
-    if not table_exists_conn(conn, "public", "ghs_pop_e2030_r2023a_54009_100"):
-        import_raster_54009(UP_POP_TABLE, UP_POP_RASTER_PATH, db_config)
+    # Grid-level inputs do not change with OSM diffs, so incremental runs keep them
+    if incremental:
+        log_print("[add_custom_tags] Incremental run: keeping urban pressure grids")
     else:
-        log_print(f"[urban_pressure] Raster table exists: {UP_POP_TABLE} (skipping import)")
+        log_print("[add_custom_tags] Running urban pressure SQL pipeline...")
+        urban_sql_dir = resolve_project_path("sql/urban_pressure")
+
+        # Readiness barrier for the urban pressure rasters
+        tracker.start_stage("Raster readiness wait")
+        wait_for_rasters([UP_POP_TABLE, UP_BUILT_TABLE])
+        tracker.end_stage("Raster readiness wait")
+
+        # Optional full rebuild of india_grids_54009 overlay
+        if table_exists_conn(conn, "public", "india_grids_54009") and UP_RECREATE_INDIA_GRIDS_54009:
+            log_print("[urban_pressure] Dropping public.india_grids_54009 for rebuild")
+            with conn.cursor() as drop_cursor:
+                drop_cursor.execute("DROP TABLE IF EXISTS public.india_grids_54009;")
+            conn.commit()
 
-    if not table_exists_conn(conn, "public", "ghs_built_s_e2030_r2023a_54009_100"):
-        import_raster_54009(UP_BUILT_TABLE, UP_BUILT_RASTER_PATH, db_config)
-    else:
-        log_print(f"[urban_pressure] Raster table exists: {UP_BUILT_TABLE} (skipping import)")
+        urban_sql_files = [
+            "00_prerequisites.sql",
+            "01_create_india_grids_54009.sql",
+            "02_add_target_columns.sql",
+        ]
 
-    # Optional full rebuild of india_grids_54009 overlay
-    if table_exists_conn(conn, "public", "india_grids_54009") and UP_RECREATE_INDIA_GRIDS_54009:
-        log_print("[urban_pressure] Dropping public.india_grids_54009 for rebuild")
-        with conn.cursor() as drop_cursor:
-            drop_cursor.execute("DROP TABLE IF EXISTS public.india_grids_54009;")
-        conn.commit()
+        for sql_file in urban_sql_files:
+            filepath = os.path.join(urban_sql_dir, sql_file)
+            params = None
+            if sql_file == "01_create_india_grids_54009.sql":
+                params = {
+                    "lat_min": UP_LAT_MIN,
+                    "lat_max": UP_LAT_MAX,
+                    "lon_min": UP_LON_MIN,
+                    "lon_max": UP_LON_MAX,
+                }
+            execute_sql_file(cursor, filepath, params=params)
+            conn.commit()
 
-    urban_sql_files = [
-        "00_prerequisites.sql",
-        "01_create_india_grids_54009.sql",
-        "02_add_target_columns.sql",
-    ]
+        # Chunked processing for heavy steps
+        with conn.cursor() as stats_cursor:
+            stats_cursor.execute(
+                "SELECT COUNT(*), MIN(grid_id), MAX(grid_id) FROM public.india_grids_54009;"
+            )
+            total_grids, min_id, max_id = stats_cursor.fetchone()
 
-    for sql_file in urban_sql_files:
-        filepath = os.path.join(urban_sql_dir, sql_file)
-        params = None
-        if sql_file == "01_create_india_grids_54009.sql":
-            params = {
-                "lat_min": UP_LAT_MIN,
-                "lat_max": UP_LAT_MAX,
-                "lon_min": UP_LON_MIN,
-                "lon_max": UP_LON_MAX,
-            }
-        execute_sql_file(cursor, filepath, params=params)
-        conn.commit()
+        if min_id is None or max_id is None:
+            raise RuntimeError("No rows found in public.india_grids_54009. Aborting urban pressure.")
 
-    # Chunked processing for heavy steps
-    with conn.cursor() as stats_cursor:
-        stats_cursor.execute(
-            "SELECT COUNT(*), MIN(grid_id), MAX(grid_id) FROM public.india_grids_54009;"
+        total_chunks = ((max_id - min_id) // UP_CHUNK_SIZE) + 1
+        log_print(
+            f"[urban_pressure] Grid range: {min_id}..{max_id} | total_grids={total_grids} | "
+            f"chunks={total_chunks} (chunk_size={UP_CHUNK_SIZE})"
         )
-        total_grids, min_id, max_id = stats_cursor.fetchone()
-
-    if min_id is None or max_id is None:
-        raise RuntimeError("No rows found in public.india_grids_54009. Aborting urban pressure.")
 
-    total_chunks = ((max_id - min_id) // UP_CHUNK_SIZE) + 1
-    log_print(
-        f"[urban_pressure] Grid range: {min_id}..{max_id} | total_grids={total_grids} | "
-        f"chunks={total_chunks} (chunk_size={UP_CHUNK_SIZE})"
-    )
-
-    def run_chunked(sql_name, extra_params=None):
-        sql_path = os.path.join(urban_sql_dir, sql_name)
-        chunk_index = 0
-        for start_id in range(min_id, max_id + 1, UP_CHUNK_SIZE):
-            end_id = min(start_id + UP_CHUNK_SIZE - 1, max_id)
-            params = {"grid_id_min": start_id, "grid_id_max": end_id}
-            if extra_params:
-                params.update(extra_params)
-
-            chunk_index += 1
-            progress_pct = (chunk_index / total_chunks) * 100.0
-            log_print(
-                f"[urban_pressure] Chunk {sql_name}: {chunk_index}/{total_chunks} "
-                f"({progress_pct:.1f}%) grid_id {start_id}..{end_id}"
+        def run_chunked(sql_name, extra_params=None):
+            sql_path = os.path.join(urban_sql_dir, sql_name)
+            chunk_index = 0
+            for start_id in range(min_id, max_id + 1, UP_CHUNK_SIZE):
+                end_id = min(start_id + UP_CHUNK_SIZE - 1, max_id)
+                params = {"grid_id_min": start_id, "grid_id_max": end_id}
+                if extra_params:
+                    params.update(extra_params)
+
+                chunk_index += 1
+                progress_pct = (chunk_index / total_chunks) * 100.0
+                log_print(
+                    f"[urban_pressure] Chunk {sql_name}: {chunk_index}/{total_chunks} "
+                    f"({progress_pct:.1f}%) grid_id {start_id}..{end_id}"
+                )
+
+                chunk_name = f"urban_pressure/{sql_name} chunk {chunk_index}/{total_chunks}"
+                with tracker.stage(chunk_name, conn=conn, chunk=True):
+                    with conn.cursor() as chunk_cursor:
+                        execute_sql_file(chunk_cursor, sql_path, params=params)
+                    conn.commit()
+
+        run_chunked("03_zonal_pop_count_chunked.sql")
+        run_chunked("04_zonal_built_up_chunked.sql")
+
+        with conn.cursor() as cursor_up:
+            execute_sql_file(
+                cursor_up,
+                os.path.join(urban_sql_dir, "05_compute_urban_pressure.sql"),
+                params={"pd_sat": UP_PD_SAT},
             )
+        conn.commit()
 
-            with conn.cursor() as chunk_cursor:
-                execute_sql_file(chunk_cursor, sql_path, params=params)
-            conn.commit()
-
-    run_chunked("03_zonal_pop_count_chunked.sql")
-    run_chunked("04_zonal_built_up_chunked.sql")
-
-    with conn.cursor() as cursor_up:
-        execute_sql_file(
-            cursor_up,
-            os.path.join(urban_sql_dir, "05_compute_urban_pressure.sql"),
-            params={"pd_sat": UP_PD_SAT},
+        run_chunked(
+            "06_compute_reinforced_pressure_chunked.sql",
+            extra_params={"neighbor_radius": UP_NEIGHBOR_RADIUS},
         )
-    conn.commit()
-
-    run_chunked(
-        "06_compute_reinforced_pressure_chunked.sql",
-        extra_params={"neighbor_radius": UP_NEIGHBOR_RADIUS},
-    )
 
-    with conn.cursor() as cursor_up:
-        execute_sql_file(cursor_up, os.path.join(urban_sql_dir, "07_classify_urban_class.sql"))
-    conn.commit()
+        with conn.cursor() as cursor_up:
+            execute_sql_file(cursor_up, os.path.join(urban_sql_dir, "07_classify_urban_class.sql"))
+        conn.commit()
 
     # Continue with road classification SQL scripts
     road_classification_sql_files = [
@@ -487,19 +546,56 @@ def add_custom_tags(db_config):
         "07_assign_final_road_classification.sql",
     ]
 
+    # 06 / 07 run in a single chunk over the whole grid / osm_id range
+    with conn.cursor() as stats_cursor:
+        stats_cursor.execute("SELECT MIN(grid_id), MAX(grid_id) FROM india_grids;")
+        grid_id_min, grid_id_max = stats_cursor.fetchone()
+    road_classification_params = {
+        "06_handle_roads_intersecting_multiple_grids.sql": {
+            "grid_id_min": grid_id_min,
+            "grid_id_max": grid_id_max,
+            "lat_min": UP_LAT_MIN,
+            "lat_max": UP_LAT_MAX,
+            "lon_min": UP_LON_MIN,
+            "lon_max": UP_LON_MAX,
+        },
+    }
+
     for sql_file in road_classification_sql_files:
         filepath = os.path.join(road_sql_dir, sql_file)
         if os.path.exists(filepath):
-            execute_sql_file(cursor, filepath)
+            if sql_file == "07_assign_final_road_classification.sql":
+                if incremental:
+                    execute_sql_file(cursor, os.path.join(incremental_sql_dir, "04_reset_affected_classification.sql"))
+                    conn.commit()
+                with conn.cursor() as stats_cursor:
+                    stats_cursor.execute("SELECT MIN(osm_id), MAX(osm_id) FROM osm_all_roads WHERE bikable_road = TRUE;")
+                    osm_id_min, osm_id_max = stats_cursor.fetchone()
+                road_classification_params[sql_file] = {"osm_id_min": osm_id_min, "osm_id_max": osm_id_max}
+            params = dict(road_classification_params.get(sql_file, {}), **affected_params)
+            execute_sql_file(cursor, filepath, params=params)
             conn.commit()
             log_print(f"Finished execution of {sql_file}")
         else:
             log_print(f"[WARNING] File {sql_file} does not exist. Skipping.", level='warning')
 
+    # Junction index shared by curvature (conflict nodes) and intersection degradation;
+    # incremental runs refresh the nodes of the affected and changed ways
+    if incremental and table_exists_conn(conn, "public", "rs_junction_index"):
+        execute_sql_file(
+            cursor, os.path.join(incremental_sql_dir, "06_refresh_junction_index.sql"), params=affected_params
+        )
+        log_print("Finished execution of 06_refresh_junction_index.sql")
+    else:
+        execute_sql_file(cursor, os.path.join(road_sql_dir, "09_build_junction_index.sql"))
+        log_print("Finished execution of 09_build_junction_index.sql")
+    conn.commit()
+
     # Close connection and cleanup after Part 1
+    tracker.end_stage("Part 1: Road Classification")
     cursor.close()
     conn.close()
-    perform_memory_cleanup(db_config, "Part 1: Road Classification")
+    perform_memory_cleanup(db_config, "Part 1: Road Classification", next_stage="curvature")
 
     # **PART 2: Setting Road Curvature Classification**
     log_print("[add_custom_tags] Part 2: Setting Road Curvature Classification...")
@@ -512,14 +608,16 @@ def add_custom_tags(db_config):
         port=db_config['port']
     )
     cursor = conn.cursor()
+    tracker.start_stage("Part 2: Road Curvature Classification", conn=conn)
     
     # Curvature v2 mini-module:
     # - Requires Lua3 import: scripts/Lua3_RouteProcessing_with_curvature.lua
     # - Produces rs_curvature_way_summary and (optionally) copies summary fields onto osm_all_roads
-    # - First populates node coordinates (idempotent, skips if >95% already populated)
+    # - First populates node coordinates (skipped while built from the current import)
     sql_dir = resolve_project_path("sql/road_curvature_v2")
     road_curvature_sql_files = [
-        "00_populate_node_coordinates.sql",  # Populate coordinates in rs_highway_way_nodes (idempotent)
+        "00_populate_node_coordinates.sql",  # Build rs_highway_way_nodes with coordinates (idempotent)
+        "00_populate_way_coords.sql",  # Packed per-way arrays for the NumPy engine + Part 5 (idempotent)
         "00_schema.sql",
         "01_prepare_inputs.sql",
         "02_compute_vertex_angles.sql",
@@ -528,21 +626,82 @@ def add_custom_tags(db_config):
         "05_aggregate_to_way.sql",
         "06_optional_update_osm_all_roads.sql",
     ]
+    curvature_params = {}
+    if incremental:
+        # rs_highway_way_nodes / rs_highway_way_coords were already refreshed by apply_osm_changes,
+        # which restamps their source keys, so the two 00_populate steps only check the key.
+        # Vertices are prepared for ring <= 3 (conflict points see every neighbour), written for ring <= 1.
+        write_params = incremental_scope_params(INCREMENTAL_CURVATURE_WRITE_RING)
+        curvature_params = {
+            "01_prepare_inputs.sql": incremental_scope_params(INCREMENTAL_CURVATURE_CONTEXT_RING),
+            "05_aggregate_to_way.sql": write_params,
+            "06_optional_update_osm_all_roads.sql": write_params,
+        }
 
+    curvature_engine = CURVATURE_ENGINE
+    if curvature_engine == "pbf" and incremental:
+        # The result file covers the whole PBF; scoped runs need the imported way coordinates
+        curvature_engine = "numpy"
+    if curvature_engine in ("numpy", "pbf", "sql"):
+        # Steps 01-05 run in curvature_engine.py / curvature_from_pbf.py (no vertex tables)
+        # or partition by partition in curvature_sql_partitions.py (which creates the partitions);
+        # 00_schema only creates the parent tables
+        numpy_steps = [
+            "01_prepare_inputs.sql",
+            "02_compute_vertex_angles.sql",
+            "03_classify_radius_and_segment_meters.sql",
+            "04_conflict_zone_suppression.sql",
+            "05_aggregate_to_way.sql",
+        ]
+        insert_at = road_curvature_sql_files.index("01_prepare_inputs.sql")
+        road_curvature_sql_files = [f for f in road_curvature_sql_files if f not in numpy_steps]
+        road_curvature_sql_files.insert(insert_at, f"curvature_engine:{curvature_engine}")
 
     for sql_file in road_curvature_sql_files:
+        if sql_file == "curvature_engine:pbf":
+            result_path = resolve_project_path(CURVATURE_PBF_RESULT)
+            # Reused only if made from this PBF with the same Lua script, rules and thresholds
+            if not result_is_current(CURVATURE_PBF_INPUT, result_path):
+                compute_curvature_from_pbf(CURVATURE_PBF_INPUT, result_path)
+            else:
+                log_print(f"[add_custom_tags] Curvature result is up to date, reusing {result_path}")
+            load_curvature_file(db_config, result_path)
+            continue
+        if sql_file == "curvature_engine:sql":
+            compute_curvature_sql(
+                db_config,
+                scope_params=curvature_params.get("01_prepare_inputs.sql"),
+                write_params=curvature_params.get("05_aggregate_to_way.sql"),
+            )
+            continue
+        if sql_file == "curvature_engine:numpy":
+            if incremental:
+                compute_curvature(
+                    db_config,
+                    scope_params=curvature_params["01_prepare_inputs.sql"],
+                    write_params=curvature_params["05_aggregate_to_way.sql"],
+                )
+            else:
+                compute_curvature(db_config)
+            continue
         filepath = os.path.join(sql_dir, sql_file)
         if os.path.exists(filepath):
-            execute_sql_file(cursor, filepath)
+            if sql_file == "01_prepare_inputs.sql":
+                # Plain SQL steps write the partitioned intermediates through their parents
+                cursor.execute("SELECT rs_curvature_create_partitions();")
+            execute_sql_file(cursor, filepath, params=curvature_params.get(sql_file))
             conn.commit()
             log_print(f"Finished execution of {sql_file}")
+            if sql_file == "00_populate_way_coords.sql":
+                log_ways_without_coordinates(cursor)
         else:
             log_print(f"[WARNING] File {sql_file} does not exist. Skipping.", level='warning')
 
     # Close connection and cleanup after Part 2
+    tracker.end_stage("Part 2: Road Curvature Classification")
     cursor.close()
     conn.close()
-    perform_memory_cleanup(db_config, "Part 2: Road Curvature Classification")
+    perform_memory_cleanup(db_config, "Part 2: Road Curvature Classification", next_stage="scenery")
 
     # **PART 3: Setting Road Scenery**
     log_print("[add_custom_tags] Part 3: Setting Road Scenery...")
@@ -555,6 +714,7 @@ def add_custom_tags(db_config):
         port=db_config['port']
     )
     cursor = conn.cursor()
+    tracker.start_stage("Part 3: Road Scenery", conn=conn)
     
     sql_dir = resolve_project_path("sql/road_scenery")
     road_scenery_sql_files = [
@@ -566,22 +726,29 @@ def add_custom_tags(db_config):
         "05_scenery_lake.sql",
         "06_scenery_beach.sql",
         "07_scenery_river.sql",
-        "08_scenery_field.sql",
+        "09_scenery_field.sql",
     ]
+    if incremental:
+        # Scoped reset instead of the full-table one
+        road_scenery_sql_files.remove("00_reset_all_scenery.sql")
 
     for sql_file in road_scenery_sql_files:
         filepath = os.path.join(sql_dir, sql_file)
         if os.path.exists(filepath):
-            execute_sql_file(cursor, filepath)
+            execute_sql_file(cursor, filepath, params=affected_params)
             conn.commit()
+            if incremental and sql_file == "01_scenery_processing_add_columns.sql":
+                execute_sql_file(cursor, os.path.join(incremental_sql_dir, "05_reset_affected_scenery.sql"))
+                conn.commit()
             log_print(f"Finished execution of {sql_file}")
         else:
             log_print(f"[WARNING] File {sql_file} does not exist. Skipping.", level='warning')
 
     # Close connection and cleanup after Part 3
+    tracker.end_stage("Part 3: Road Scenery")
     cursor.close()
     conn.close()
-    perform_memory_cleanup(db_config, "Part 3: Road Scenery")
+    perform_memory_cleanup(db_config, "Part 3: Road Scenery", next_stage="road_access")
 
     # **PART 4: Setting Road Access**
     log_print("[add_custom_tags] Part 4: Setting Road Access...")
@@ -594,6 +761,7 @@ def add_custom_tags(db_config):
         port=db_config['port']
     )
     cursor = conn.cursor()
+    tracker.start_stage("Part 4: Road Access", conn=conn)
     
     sql_dir = resolve_project_path("sql/road_access")
     road_access_sql_files = ["01_rsbikeaccess_update.sql"]
@@ -608,9 +776,10 @@ def add_custom_tags(db_config):
             log_print(f"[WARNING] File {sql_file} does not exist. Skipping.", level='warning')
 
     # Close connection and cleanup after Part 4
+    tracker.end_stage("Part 4: Road Access")
     cursor.close()
     conn.close()
-    perform_memory_cleanup(db_config, "Part 4: Road Access")
+    perform_memory_cleanup(db_config, "Part 4: Road Access", next_stage="intersection_degradation")
 
     # **PART 5: Intersection Speed Degradation (v2)**
     log_print("[add_custom_tags] Part 5: Intersection Speed Degradation (v2)...")
@@ -623,6 +792,7 @@ def add_custom_tags(db_config):
         port=db_config['port']
     )
     cursor = conn.cursor()
+    tracker.start_stage("Part 5: Intersection Speed Degradation (v2)", conn=conn)
     
     sql_dir = resolve_project_path("sql/road_intersection_density")
     intersection_density_sql_files = [
@@ -632,20 +802,34 @@ def add_custom_tags(db_config):
         "03_calculate_base_degradation_v2.sql",
         "04_calculate_final_degradation_v2.sql",
     ]
+    intersection_params = {}
+    if incremental:
+        # 01 categorizes every junction of rs_junction_index (refreshed in Part 1); 02-04 are scoped
+        intersection_params = {sql_file: affected_params for sql_file in intersection_density_sql_files}
+    if INTERSECTION_ENGINE in ("numpy", "sql"):
+        # Steps 00-04 run in intersection_engine.py, or tile by tile in intersection_tiles.py
+        intersection_density_sql_files = [f"intersection_engine:{INTERSECTION_ENGINE}"]
 
     for sql_file in intersection_density_sql_files:
+        if sql_file == "intersection_engine:numpy":
+            compute_intersection_degradation(db_config, scope_params=affected_params)
+            continue
+        if sql_file == "intersection_engine:sql":
+            compute_intersection_degradation_tiles(db_config, scope_params=affected_params)
+            continue
         filepath = os.path.join(sql_dir, sql_file)
         if os.path.exists(filepath):
-            execute_sql_file(cursor, filepath)
+            execute_sql_file(cursor, filepath, params=intersection_params.get(sql_file))
             conn.commit()
             log_print(f"Finished execution of {sql_file}")
         else:
             log_print(f"[WARNING] File {sql_file} does not exist. Skipping.", level='warning')
 
     # Close connection and cleanup after Part 5
+    tracker.end_stage("Part 5: Intersection Speed Degradation (v2)")
     cursor.close()
     conn.close()
-    perform_memory_cleanup(db_config, "Part 5: Intersection Speed Degradation (v2)")
+    perform_memory_cleanup(db_config, "Part 5: Intersection Speed Degradation (v2)", next_stage="persona")
 
     # **PART 6: Road Persona Scoring**
     # Computes 4 persona scores on osm_all_roads for QGIS inspection.
@@ -658,27 +842,35 @@ def add_custom_tags(db_config):
         port=db_config['port']
     )
     cursor = conn.cursor()
+    tracker.start_stage("Part 6: Road Persona Scoring", conn=conn)
 
     sql_dir = resolve_project_path("sql/road_persona")
     road_persona_sql_files = [
-        "00_add_persona_columns.sql",
-        "01_compute_persona_base_scores.sql",
-        "02_compute_persona_corridors_and_final.sql",
+        "00_add_simplified_persona_columns.sql",
+        "01_compute_persona_base_scores_simplified_all_india.sql",
     ]
 
     for sql_file in road_persona_sql_files:
         filepath = os.path.join(sql_dir, sql_file)
         if os.path.exists(filepath):
-            execute_sql_file(cursor, filepath)
+            execute_sql_file(cursor, filepath, params=affected_params)
             conn.commit()
             log_print(f"Finished execution of {sql_file}")
         else:
             log_print(f"[WARNING] File {sql_file} does not exist. Skipping.", level='warning')
 
+    tracker.end_stage("Part 6: Road Persona Scoring")
     cursor.close()
     conn.close()
     perform_memory_cleanup(db_config, "Part 6: Road Persona Scoring")
 
+    # Remaining (optional) raster imports must not outlive the run
+    wait_for_rasters()
+
+    if owns_tracker:
+        tracker.log_ranking()
+        tracker.close()
+
     log_time("SQL script execution", overall_start_time)
     message = "[add_custom_tags] Completed all processing steps."
     log_print(message)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Incremental updates from OSM change files (.osc.gz) instead of a full re-import.
+
+Applies the pending change files from OSM_CHANGES_DIR with osm2pgsql --append
+(the import must have kept its slim middle tables), records the touched node /
+way / relation ids, and builds rs_incremental_roads: the changed roads plus the
+neighbourhood whose tags depend on them. add_custom_tags(incremental=True) then
+recomputes only those roads (see sql/incremental/README.md).
+"""
+
+import os
+import glob
+import time
+import subprocess
+import logging
+
+import osmium
+import psycopg
+
+try:
+    from .utils import setup_logging, resolve_project_path, update_run_report
+    from .import_planner import flat_nodes_path, parse_phase_timing, OSM2PGSQL_CACHE_MB
+except ImportError:
+    from utils import setup_logging, resolve_project_path, update_run_report
+    from import_planner import flat_nodes_path, parse_phase_timing, OSM2PGSQL_CACHE_MB
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION (env overrides allowed)
+# ============================================================================
+# Folder with the .osc.gz files (searched recursively, applied in path order,
+# e.g. a replication tree 000/123/456.osc.gz)
+OSM_CHANGES_DIR = resolve_project_path(os.getenv("OSM_CHANGES_DIR", "./osm_pbf_inputs/osm_changes"))
+# osm2pgsql --cache for --append runs (diffs touch few nodes; default unless OSM2PGSQL_CACHE_MB is set)
+OSM_CHANGES_CACHE_MB = int(OSM2PGSQL_CACHE_MB or os.getenv("OSM_CHANGES_CACHE_MB", 2048))
+# How far a changed road reaches into its neighbourhood (degrees, ~50 m like HAdj)
+INCREMENTAL_ROAD_RADIUS_DEG = float(os.getenv("INCREMENTAL_ROAD_RADIUS_DEG", 0.0005))
+
+INCREMENTAL_SQL_DIR = resolve_project_path("sql/incremental")
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def execute_sql_file(cursor, filepath, params=None):
+    """Reads and executes an SQL file with optional :param substitution."""
+    log_print(f"[apply_osm_changes] Executing {os.path.basename(filepath)}")
+    start_time = time.time()
+    with open(filepath, 'r', encoding='utf-8') as file:
+        sql_query = file.read()
+    for key, value in (params or {}).items():
+        sql_query = sql_query.replace(f":{key}", str(value))
+    cursor.execute(sql_query)
+    log_print(f"[apply_osm_changes] Executed {os.path.basename(filepath)} in {time.time() - start_time:.2f} seconds")
+
+
+def connect(db_config):
+    return psycopg.connect(
+        dbname=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        host=db_config['host'],
+        port=db_config['port']
+    )
+
+
+def find_pending_change_files(cursor, changes_dir=OSM_CHANGES_DIR):
+    """Returns [(relative_name, path)] of .osc.gz files not yet in rs_applied_change_files, in path order."""
+    paths = sorted(glob.glob(os.path.join(changes_dir, "**", "*.osc.gz"), recursive=True))
+    cursor.execute("SELECT file_name FROM rs_applied_change_files;")
+    applied = {row[0] for row in cursor.fetchall()}
+    pending = []
+    for path in paths:
+        name = os.path.relpath(path, changes_dir)
+        if name not in applied:
+            pending.append((name, path))
+    return pending
+
+
+def read_touched_ids(change_file):
+    """Returns {'n': set, 'w': set, 'r': set} of the ids created, modified or deleted by a change file."""
+    touched = {"n": set(), "w": set(), "r": set()}
+    for obj in osmium.FileProcessor(change_file):
+        touched[obj.type_str()].add(obj.id)
+    return touched
+
+
+def run_osm2pgsql_append(change_file, db_config, style_lua_script, pbf_file):
+    """Applies one change file with osm2pgsql --append. Returns the osm2pgsql phase timings."""
+    env = os.environ.copy()
+    if db_config.get("password"):
+        env["PGPASSWORD"] = db_config["password"]
+
+    cmd = [
+        "osm2pgsql",
+        "--append",
+        "-d", db_config["name"],
+        "-U", db_config["user"],
+        "-H", db_config["host"],
+        "-P", str(db_config["port"]),
+        "--slim",
+        "--cache", str(OSM_CHANGES_CACHE_MB),
+        "--output=flex",
+        f"--style={style_lua_script}",
+    ]
+    # The node store must be the one the import wrote
+    flat_nodes_file = flat_nodes_path(pbf_file)
+    if os.path.exists(flat_nodes_file):
+        cmd.append(f"--flat-nodes={flat_nodes_file}")
+    cmd.append(change_file)
+
+    log_print(f"[apply_osm_changes] Running command: {' '.join(cmd)}")
+    phase_timings = {}
+    process = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    for line in process.stdout:
+        line = line.rstrip()
+        if not line:
+            continue
+        log_print(f"[osm2pgsql] {line}")
+        timing = parse_phase_timing(line)
+        if timing:
+            phase, seconds = timing
+            phase_timings[phase] = seconds
+    process.wait()
+    if process.returncode != 0:
+        log_print(f"[apply_osm_changes] osm2pgsql --append failed with return code {process.returncode}", level='error')
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+    return phase_timings
+
+
+def apply_osm_changes(db_config, style_lua_script, pbf_file, changes_dir=OSM_CHANGES_DIR):
+    """
+    Applies pending change files and builds rs_incremental_roads.
+    Returns the number of roads to recompute (0 = nothing changed since the last run).
+    """
+    start_time = time.time()
+    log_print(f"[apply_osm_changes] Looking for change files in {changes_dir}")
+
+    conn = connect(db_config)
+    cursor = conn.cursor()
+    execute_sql_file(cursor, os.path.join(INCREMENTAL_SQL_DIR, "00_schema.sql"))
+    conn.commit()
+
+    # --append needs the slim middle tables of the import
+    cursor.execute("SELECT to_regclass('planet_osm_ways') IS NOT NULL;")
+    if not cursor.fetchone()[0]:
+        raise RuntimeError(
+            "osm2pgsql middle tables not found (planet_osm_ways). Incremental updates need an "
+            "import with --slim and without --drop (OSM2PGSQL_DROP_MIDDLE=false)."
+        )
+    if os.getenv("IMPORT_PREFILTER_PBF", "true").strip().lower() in ("1", "true", "yes", "y", "on"):
+        log_print(
+            "[apply_osm_changes] IMPORT_PREFILTER_PBF is on: untagged nodes dropped by the pre-filter "
+            "are missing from the middle tables, so ways that start using them get incomplete geometry. "
+            "Import with IMPORT_PREFILTER_PBF=false when applying change files.",
+            level='warning'
+        )
+
+    pending = find_pending_change_files(cursor, changes_dir)
+    log_print(f"[apply_osm_changes] {len(pending)} pending change file(s)")
+
+    # Record every touched id first, so the old geometries can be captured before the diff
+    file_counts = {}
+    for name, path in pending:
+        touched = read_touched_ids(path)
+        file_counts[name] = {kind: len(ids) for kind, ids in touched.items()}
+        with cursor.copy("COPY rs_incremental_changes (osm_type, osm_id) FROM STDIN") as copy:
+            for kind, ids in touched.items():
+                for osm_id in ids:
+                    copy.write_row((kind, osm_id))
+        log_print(
+            f"[apply_osm_changes] {name}: {file_counts[name]['n']:,} nodes, "
+            f"{file_counts[name]['w']:,} ways, {file_counts[name]['r']:,} relations"
+        )
+    conn.commit()
+
+    cursor.execute("SELECT COUNT(*) FROM rs_incremental_changes;")
+    pending_ids = cursor.fetchone()[0]
+    if pending_ids == 0:
+        log_print("[apply_osm_changes] No changes to apply or recompute.")
+        cursor.close()
+        conn.close()
+        update_run_report("osm_changes", {"files": [], "affected_roads": 0})
+        return 0
+
+    snapshot_params = {"road_radius_deg": INCREMENTAL_ROAD_RADIUS_DEG}
+    execute_sql_file(cursor, os.path.join(INCREMENTAL_SQL_DIR, "01_snapshot_changed_geometries.sql"), snapshot_params)
+    conn.commit()
+
+    osm2pgsql_timings = {}
+    for name, path in pending:
+        file_start = time.time()
+        phase_timings = run_osm2pgsql_append(path, db_config, style_lua_script, pbf_file)
+        osm2pgsql_timings[name] = dict(phase_timings, elapsed_s=round(time.time() - file_start, 2))
+        counts = file_counts[name]
+        cursor.execute(
+            "INSERT INTO rs_applied_change_files (file_name, node_count, way_count, relation_count) "
+            "VALUES (%s, %s, %s, %s);",
+            (name, counts["n"], counts["w"], counts["r"]),
+        )
+        conn.commit()
+        log_print(f"[apply_osm_changes] Applied {name} in {time.time() - file_start:.2f} seconds")
+
+    # New geometries, refreshed way nodes, then the roads to recompute
+    for sql_file, params in (
+        ("01_snapshot_changed_geometries.sql", snapshot_params),
+        ("02_refresh_way_nodes.sql", None),
+        ("03_build_affected_roads.sql", None),
+    ):
+        execute_sql_file(cursor, os.path.join(INCREMENTAL_SQL_DIR, sql_file), params)
+        conn.commit()
+
+    cursor.execute("SELECT ring, COUNT(*) FROM rs_incremental_roads GROUP BY ring ORDER BY ring;")
+    ring_counts = {ring: count for ring, count in cursor.fetchall()}
+    affected_roads = sum(ring_counts.values())
+    cursor.close()
+    conn.close()
+
+    for ring, count in ring_counts.items():
+        log_print(f"[apply_osm_changes] ring {ring}: {count:,} roads")
+    elapsed = time.time() - start_time
+    log_print(f"[apply_osm_changes] {affected_roads:,} roads to recompute ({elapsed:.2f} seconds)")
+
+    update_run_report("osm_changes", {
+        "files": [name for name, _ in pending],
+        "touched_ids": file_counts,
+        "osm2pgsql_s": osm2pgsql_timings,
+        "affected_roads_by_ring": ring_counts,
+        "affected_roads": affected_roads,
+        "elapsed_s": round(elapsed, 2),
+    })
+    return affected_roads
+
+
+def clear_incremental_changes(db_config):
+    """Forgets the recomputed changes; call after add_custom_tags(incremental=True) succeeded."""
+    conn = connect(db_config)
+    with conn.cursor() as cursor:
+        cursor.execute("TRUNCATE rs_incremental_changes, rs_incremental_geoms;")
+    conn.commit()
+    conn.close()
+    log_print("[apply_osm_changes] Cleared recomputed changes (rs_incremental_roads kept for inspection)")
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    setup_logging("apply_osm_changes")
+    parser = argparse.ArgumentParser(description="Apply OSM change files with osm2pgsql --append.")
+    parser.add_argument("--pbf", default=os.getenv("NEW_PBF_PATH", "./osm_pbf_inputs/osm_pbf_new/india-latest.osm.pbf"),
+                        help="PBF the database was imported from (locates the flat-nodes file).")
+    parser.add_argument("--changes-dir", default=OSM_CHANGES_DIR, help="Folder with .osc.gz files.")
+    args = parser.parse_args()
+    db_config = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "name": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+    }
+    apply_osm_changes(
+        db_config,
+        resolve_project_path("scripts/Lua3_RouteProcessing_with_curvature.lua"),
+        resolve_project_path(args.pbf),
+        changes_dir=resolve_project_path(args.changes_dir),
+    )
@@ -0,0 +1,758 @@
+#!/usr/bin/env python3
+"""
+Curvature v2 computed in NumPy instead of SQL.
+
+The SQL steps 01-05 of sql/road_curvature_v2 materialise every way vertex
+twice (rs_curvature_way_vertices with 4326 + 3857 points, rs_curvature_vertex_metrics
+with the LAG/LEAD window results), which is ~60 GB of intermediates that then
+need a VACUUM FULL / DROP. This engine streams
+
+    (way_id, node_id, lon_e7, lat_e7, is_conflict, write_way)   ordered by way_id, seq
+
+from the packed per-way arrays of rs_highway_way_coords (00_populate_way_coords.sql,
+unnested server-side in primary key order) with binary COPY, computes the same per-vertex values
+vectorised over batches of whole ways (3857 distances, azimuth turn angles,
+Heron circumradius, buckets, 30 m conflict suppression, per-way sums) and COPYs
+only the rows of rs_curvature_way_summary back. The way_id range is split into
+partitions that a process pool works on concurrently, each with its own
+connections.
+
+The only other table written is rs_curvature_conflict_node_ids (tagged conflict
+nodes + the junctions of rs_junction_index), dropped at the end.
+
+Every summary row stores input_hash, a hash of the way's ordered (node_id, lon,
+lat, is_conflict) vertices and the thresholds below. With CURVATURE_REUSE_UNCHANGED
+a run still streams the vertices (the hash needs them) but only computes and
+writes the ways whose hash changed or that are new, and deletes the summaries of
+ways that are gone; after a weekly refresh that is a few percent of the table.
+
+Every summary row also stores a histogram of the way's counted meters by
+(radius bin, turn-angle bin), so other thresholds can be scored without the
+geometry (curvature_thresholds.py, rs_curvature_rebucket in 00_schema.sql).
+
+Thresholds mirror 02_compute_vertex_angles.sql, 04_conflict_zone_suppression.sql
+and 05_aggregate_to_way.sql; keep them in sync.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import psycopg
+
+try:
+    from .utils import setup_logging, substitute_sql_params, update_run_report
+except ImportError:
+    from utils import setup_logging, substitute_sql_params, update_run_report
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# ENGINE CONFIG (env overrides allowed)
+# ============================================================================
+CURVATURE_WORKERS = int(os.getenv("CURVATURE_WORKERS", min(8, os.cpu_count() or 1)))
+# Way vertices per NumPy batch (a batch always holds whole ways)
+CURVATURE_BATCH_ROWS = int(os.getenv("CURVATURE_BATCH_ROWS", 2_000_000))
+# Fewer ways than this per partition are not worth another worker (incremental runs)
+CURVATURE_MIN_WAYS_PER_PARTITION = 50_000
+# Keep summaries whose input_hash still matches (else every summary in scope is rewritten)
+CURVATURE_REUSE_UNCHANGED = os.getenv("CURVATURE_REUSE_UNCHANGED", "true").strip().lower() in ("1", "true", "yes", "y", "on")
+
+# ============================================================================
+# CURVATURE PARAMETERS (mirror of the SQL steps)
+# ============================================================================
+MIN_TURN_ANGLE_RAD = np.radians(5.0)  # below this, treat as straight
+SHARP_RADIUS_M = 150.0
+BROAD_RADIUS_M = 500.0
+CONFLICT_SUPPRESSION_M = 30.0
+CLASS_BROAD_SCORE = 0.03
+CLASS_SHARP_SCORE = 0.08
+
+# EPSG:3857 sphere radius (ST_Transform(..., 3857))
+WEB_MERCATOR_RADIUS_M = 6378137.0
+
+BUCKET_NONE, BUCKET_STRAIGHT, BUCKET_BROAD, BUCKET_SHARP = 0, 1, 2, 3
+
+# Histogram of counted meters per way (histogram_bins / histogram_meters, sparse):
+# bin = radius_bin * ANGLE_BIN_SLOTS + angle_bin with radius bins (0, 25], (25, 50], ...
+# (975, 1000], > 1000 m and turn-angle bins [0°, 1°), ..., [14°, 15°), >= 15°.
+# Mirrored by rs_curvature_histogram_bin / rs_curvature_rebucket (00_schema.sql).
+RADIUS_BIN_M = 25.0
+RADIUS_BINS = 40
+ANGLE_BIN_DEG = 1.0
+ANGLE_BINS = 15
+ANGLE_BIN_SLOTS = ANGLE_BINS + 1  # + the >= 15° bin
+HISTOGRAM_BINS = (RADIUS_BINS + 1) * ANGLE_BIN_SLOTS
+RADIUS_BIN_EDGES_M = RADIUS_BIN_M * np.arange(RADIUS_BINS + 1)
+ANGLE_BIN_EDGES_RAD = np.radians(ANGLE_BIN_DEG * np.arange(ANGLE_BINS + 1))
+# Re-bucketing is exact only for thresholds on bin edges
+assert MIN_TURN_ANGLE_RAD in ANGLE_BIN_EDGES_RAD
+assert SHARP_RADIUS_M in RADIUS_BIN_EDGES_M and BROAD_RADIUS_M in RADIUS_BIN_EDGES_M
+
+# Seed of input_hash: changing a threshold invalidates every stored hash
+PARAMETERS_SEED = np.uint64(int.from_bytes(hashlib.sha256(repr((
+    float(MIN_TURN_ANGLE_RAD), SHARP_RADIUS_M, BROAD_RADIUS_M,
+    CONFLICT_SUPPRESSION_M, CLASS_BROAD_SCORE, CLASS_SHARP_SCORE,
+)).encode()).digest()[:8], "little"))
+
+CONFLICT_NODES_TABLE = "rs_curvature_conflict_node_ids"
+
+# osm2pgsql / PBF fixed-point coordinates (rs_highway_way_coords.lon_e7 / lat_e7)
+COORDINATE_PRECISION = 10_000_000
+INVALID_COORDINATE = 2 ** 31 - 1
+
+# Eligible way vertices (same selection as 01_prepare_inputs.sql), one row per vertex
+ELIGIBLE_VERTICES_FROM = """
+    FROM rs_highway_way_coords AS w
+    JOIN osm_all_roads AS o ON o.osm_id = w.way_id
+    CROSS JOIN LATERAL unnest(w.node_ids, w.lon_e7, w.lat_e7)
+        WITH ORDINALITY AS v(node_id, lon_e7, lat_e7, seq)
+"""
+ELIGIBLE_VERTICES_WHERE = """
+    WHERE o.bikable_road = TRUE
+      :osm_id_filter_clause_o
+"""
+
+# Binary COPY layout of the stream query: int16 field count, then (int32 length, value)
+# per field. Missing coordinates are COALESCEd to INVALID_COORDINATE so that every row
+# has the same width.
+COPY_HEADER_BYTES = 19  # 11-byte signature + int32 flags + int32 header extension length (0)
+ROW_DTYPE = np.dtype([
+    ("fields", ">i2"),
+    ("way_id_len", ">i4"), ("way_id", ">i8"),
+    ("node_id_len", ">i4"), ("node_id", ">i8"),
+    ("lon_len", ">i4"), ("lon_e7", ">i4"),
+    ("lat_len", ">i4"), ("lat_e7", ">i4"),
+    ("conflict_len", ">i4"), ("conflict", "?"),
+    ("write_len", ">i4"), ("write", "?"),
+])
+ROW_FIELDS = 6
+
+SUMMARY_COLUMNS = (
+    "way_id, total_length_m, meters_sharp, meters_broad, meters_straight, twistiness_score, twistiness_class, "
+    "input_hash, histogram_bins, histogram_meters"
+)
+STAGING_TABLE = "tmp_curvature_way_summary"
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def connect(db_config):
+    return psycopg.connect(
+        dbname=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        host=db_config['host'],
+        port=db_config['port']
+    )
+
+
+# ============================================================================
+# NUMPY KERNEL
+# ============================================================================
+
+def fixed_point_degrees(values):
+    """lon_e7 / lat_e7 -> the float4 degrees of rs_highway_way_nodes (NaN = missing)."""
+    degrees = (values.astype(np.float64) / COORDINATE_PRECISION).astype(np.float32)
+    degrees[values == INVALID_COORDINATE] = np.nan
+    return degrees
+
+
+def web_mercator(lon, lat):
+    """lon / lat (degrees, float4 as stored) -> EPSG:3857 x / y in float64."""
+    lam = np.radians(lon.astype(np.float64))
+    phi = np.radians(lat.astype(np.float64))
+    return WEB_MERCATOR_RADIUS_M * lam, WEB_MERCATOR_RADIUS_M * np.log(np.tan(np.pi / 4.0 + phi / 2.0))
+
+
+def azimuth(dx, dy):
+    """ST_Azimuth from coordinate deltas (north = 0, clockwise); NaN for coincident points."""
+    with np.errstate(invalid='ignore'):
+        az = np.fmod(2.5 * np.pi - np.arctan2(dy, dx), 2.0 * np.pi)
+    az[(dx == 0) & (dy == 0)] = np.nan
+    return az
+
+
+def vertex_metrics(way_ids, lon, lat):
+    """
+    Per-vertex values of 02_compute_vertex_angles.sql for vertices ordered by
+    (way_id, seq). NaN stands for SQL NULL. Returns a dict of arrays plus the
+    way start positions.
+    """
+    n = len(way_ids)
+    new_way = np.ones(n, dtype=bool)
+    new_way[1:] = way_ids[1:] != way_ids[:-1]
+    starts = np.flatnonzero(new_way)
+    way_index = np.cumsum(new_way) - 1
+
+    x, y = web_mercator(lon, lat)
+
+    # Deltas to the previous vertex of the same way (NaN at the first vertex)
+    dx_prev = np.full(n, np.nan)
+    dy_prev = np.full(n, np.nan)
+    dx_prev[1:] = x[1:] - x[:-1]
+    dy_prev[1:] = y[1:] - y[:-1]
+    dx_prev[new_way] = np.nan
+    dy_prev[new_way] = np.nan
+    # ... and to the next one (NaN at the last vertex: the following delta starts a new way)
+    dx_next = np.full(n, np.nan)
+    dy_next = np.full(n, np.nan)
+    dx_next[:-1] = dx_prev[1:]
+    dy_next[:-1] = dy_prev[1:]
+    # Chord previous -> next
+    dx_chord = np.full(n, np.nan)
+    dy_chord = np.full(n, np.nan)
+    dx_chord[1:-1] = x[2:] - x[:-2]
+    dy_chord[1:-1] = y[2:] - y[:-2]
+    chord_invalid = np.isnan(dx_prev) | np.isnan(dx_next)
+    dx_chord[chord_invalid] = np.nan
+    dy_chord[chord_invalid] = np.nan
+
+    # sqrt(dx² + dy²) like ST_Distance (np.hypot rounds differently, which flips
+    # near-collinear vertices between a zero and a tiny Heron area)
+    dist_prev = np.sqrt(dx_prev * dx_prev + dy_prev * dy_prev)
+    dist_next = np.sqrt(dx_next * dx_next + dy_next * dy_next)
+    dist_prev_next = np.sqrt(dx_chord * dx_chord + dy_chord * dy_chord)
+
+    # Turn angle between the incoming and outgoing azimuths (NULL unless prev, cur and next exist)
+    az1 = azimuth(dx_prev, dy_prev)
+    az2 = azimuth(dx_next, dy_next)
+    turn = np.abs(az2 - az1)
+    turn = np.where(turn > np.pi, 2.0 * np.pi - turn, turn)
+
+    # Circumradius R = abc / (4A), A from Heron's formula; NULL for zero sides or zero area
+    a, b, c = dist_prev, dist_next, dist_prev_next
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s = (a + b + c) / 2.0
+        heron = np.maximum(s * (s - a) * (s - b) * (s - c), 0.0)
+        denominator = 4.0 * np.sqrt(heron)
+        radius = (a * b * c) / denominator
+    radius[(a == 0) | (b == 0) | (c == 0) | (denominator == 0)] = np.nan
+
+    bucket = np.full(n, BUCKET_NONE, dtype=np.int8)
+    valid = ~np.isnan(turn) & ~np.isnan(radius)
+    bucket[valid] = BUCKET_STRAIGHT
+    bucket[valid & (turn >= MIN_TURN_ANGLE_RAD) & (radius <= BROAD_RADIUS_M)] = BUCKET_BROAD
+    bucket[valid & (turn >= MIN_TURN_ANGLE_RAD) & (radius <= SHARP_RADIUS_M)] = BUCKET_SHARP
+
+    # Endpoints contribute noise; a bucketed vertex always has both neighbours
+    contrib = np.where(bucket != BUCKET_NONE, (a + b) / 2.0, 0.0)
+
+    # Along-the-way distance (running SUM(COALESCE(dist_prev_m, 0)) per way)
+    step = np.nan_to_num(dist_prev, nan=0.0)
+    running = np.cumsum(step)
+    cum = running - (running - step)[starts][way_index]
+
+    return {
+        "starts": starts,
+        "way_index": way_index,
+        "dist_prev": dist_prev,
+        "step": step,
+        "cum": cum,
+        "turn": turn,
+        "radius": radius,
+        "bucket": bucket,
+        "contrib": contrib,
+    }
+
+
+def suppressed_vertices(cum, way_index, conflict):
+    """
+    True for vertices within CONFLICT_SUPPRESSION_M along-the-way of a conflict
+    vertex of the same way (04_conflict_zone_suppression.sql). cum grows along each
+    way, so the nearest conflicts are the last one at / before and the first one at /
+    after the vertex: one forward and one backward sweep over the batch.
+    """
+    n = len(cum)
+    if not conflict.any():
+        return np.zeros(n, dtype=bool)
+
+    positions = np.arange(n)
+    before = np.maximum.accumulate(np.where(conflict, positions, -1))
+    after = np.minimum.accumulate(np.where(conflict, positions, n)[::-1])[::-1]
+
+    suppressed = np.zeros(n, dtype=bool)
+    for nearest in (before, after):
+        found = (nearest >= 0) & (nearest < n)
+        nearest = np.clip(nearest, 0, n - 1)
+        # The sweep crosses way boundaries; a conflict of another way does not count
+        suppressed |= (
+            found
+            & (way_index[nearest] == way_index)
+            & (np.abs(cum - cum[nearest]) <= CONFLICT_SUPPRESSION_M)
+        )
+    return suppressed
+
+
+def histogram_bins(radius, turn):
+    """Histogram bin of bucketed vertices (rs_curvature_histogram_bin)."""
+    # Radius bins are closed on the right (radius <= threshold), angle bins on the left
+    radius_bin = np.minimum(np.searchsorted(RADIUS_BIN_EDGES_M, radius, side="left") - 1, RADIUS_BINS)
+    angle_bin = np.minimum(np.searchsorted(ANGLE_BIN_EDGES_RAD, turn, side="right") - 1, ANGLE_BINS)
+    return (np.maximum(radius_bin, 0) * ANGLE_BIN_SLOTS + angle_bin).astype(np.int16)
+
+
+def way_histograms(way_index, radius, turn, counted, ways):
+    """
+    Sparse per-way histograms of counted meters. Returns (bins, meters, bounds):
+    way i owns bins[bounds[i]:bounds[i + 1]] (ascending) and the matching meters.
+    """
+    kept = counted > 0
+    key = way_index[kept] * HISTOGRAM_BINS + histogram_bins(radius[kept], turn[kept])
+    keys, inverse = np.unique(key, return_inverse=True)
+    meters = np.bincount(inverse.ravel(), weights=counted[kept], minlength=len(keys))
+    bounds = np.searchsorted(keys // HISTOGRAM_BINS, np.arange(ways + 1), side="left")
+    return (keys % HISTOGRAM_BINS).astype(np.int16), meters, bounds
+
+
+def way_summaries(way_ids, lon, lat, conflict):
+    """
+    Per-way rows of rs_curvature_way_summary (05_aggregate_to_way.sql) for a batch
+    of whole ways. Returns a dict of arrays indexed by way.
+    """
+    metrics = vertex_metrics(way_ids, lon, lat)
+    starts = metrics["starts"]
+    suppressed = suppressed_vertices(metrics["cum"], metrics["way_index"], conflict)
+    counted = np.where(suppressed, 0.0, metrics["contrib"])
+    bucket = metrics["bucket"]
+
+    total = np.add.reduceat(metrics["step"], starts)
+    sharp = np.add.reduceat(np.where(bucket == BUCKET_SHARP, counted, 0.0), starts)
+    broad = np.add.reduceat(np.where(bucket == BUCKET_BROAD, counted, 0.0), starts)
+    straight = np.add.reduceat(np.where(bucket == BUCKET_STRAIGHT, counted, 0.0), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = np.where(total > 0, (sharp + 0.5 * broad) / total, np.nan)
+    # counted > 0 only for bucketed vertices, which always have a radius and a turn angle
+    bins, meters, bounds = way_histograms(
+        metrics["way_index"], metrics["radius"], metrics["turn"], counted, len(starts)
+    )
+
+    return {
+        "way_id": way_ids[starts],
+        "total_length_m": total,
+        "meters_sharp": sharp,
+        "meters_broad": broad,
+        "meters_straight": straight,
+        "twistiness_score": score,
+        "histogram_bins": bins,
+        "histogram_meters": meters,
+        "histogram_bounds": bounds,
+    }
+
+
+def splitmix64(values):
+    """SplitMix64 finaliser over a uint64 array (wrapping arithmetic)."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def way_input_hashes(way_ids, node_ids, lon, lat, conflict):
+    """
+    input_hash per way (signed 64 bit, as stored) for vertices ordered by (way_id, seq):
+    every vertex is hashed with its position in the way, the sum over the way is the hash.
+    """
+    n = len(way_ids)
+    new_way = np.ones(n, dtype=bool)
+    new_way[1:] = way_ids[1:] != way_ids[:-1]
+    starts = np.flatnonzero(new_way)
+    position = (np.arange(n) - starts[np.cumsum(new_way) - 1]).astype(np.uint64)
+
+    lon_bits = np.ascontiguousarray(lon, dtype=np.float32).view(np.uint32).astype(np.uint64)
+    lat_bits = np.ascontiguousarray(lat, dtype=np.float32).view(np.uint32).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        h = splitmix64(np.asarray(node_ids, dtype=np.int64).view(np.uint64) ^ PARAMETERS_SEED)
+        h = splitmix64(h ^ ((lon_bits << np.uint64(32)) | lat_bits))
+        h = splitmix64(h ^ ((position << np.uint64(1)) | np.asarray(conflict, dtype=np.uint64)))
+        return np.add.reduceat(h, starts).view(np.int64)
+
+
+def twistiness_class(score):
+    if score != score:  # NaN = NULL
+        return None
+    if score < CLASS_BROAD_SCORE:
+        return "straight"
+    if score < CLASS_SHARP_SCORE:
+        return "broad"
+    return "sharp"
+
+
+# ============================================================================
+# STREAMING (binary COPY in, COPY out)
+# ============================================================================
+
+def stream_query(scope_params, write_params, way_id_min, way_id_max):
+    """COPY query for the eligible vertices of one way_id partition [way_id_min, way_id_max)."""
+    # Ways outside the write scope are context only (incremental runs)
+    write_clause = (write_params or {}).get("way_id_filter_clause_w", "")
+    query = f"""
+        COPY (
+            SELECT
+                w.way_id,
+                v.node_id,
+                COALESCE(v.lon_e7, {INVALID_COORDINATE}),
+                COALESCE(v.lat_e7, {INVALID_COORDINATE}),
+                -- Lookup in the select list keeps the (way_id, seq) order of the unnest
+                v.node_id IN (SELECT node_id FROM {CONFLICT_NODES_TABLE}),
+                (TRUE {write_clause})
+            {ELIGIBLE_VERTICES_FROM}
+            {ELIGIBLE_VERTICES_WHERE}
+              AND w.way_id >= {way_id_min} AND w.way_id < {way_id_max}
+            ORDER BY w.way_id, v.seq
+        ) TO STDOUT (FORMAT BINARY)
+    """
+    return substitute_sql_params(query, scope_params)
+
+
+def parse_copy_rows(buffer):
+    """
+    Parses the complete rows at the start of buffer (binary COPY data after the
+    file header). Returns (rows, consumed_bytes); a partial row or the trailer
+    stays in the buffer.
+    """
+    count = len(buffer) // ROW_DTYPE.itemsize
+    if count == 0:
+        return None, 0
+    consumed = count * ROW_DTYPE.itemsize
+    rows = np.frombuffer(bytes(buffer[:consumed]), dtype=ROW_DTYPE)
+    if (rows["fields"] != ROW_FIELDS).any():
+        raise ValueError("Unexpected row layout in the curvature COPY stream")
+    return rows, consumed
+
+
+def write_summary_rows(copy, summary, input_hash):
+    """COPYs summary rows (dict of arrays from way_summaries). Returns the rows written."""
+    written = 0
+    bins = summary["histogram_bins"].tolist()
+    meters = summary["histogram_meters"].tolist()
+    bounds = summary["histogram_bounds"].tolist()
+    for way_id, total, sharp, broad, straight, score, way_hash in zip(
+        summary["way_id"].tolist(),
+        summary["total_length_m"].tolist(),
+        summary["meters_sharp"].tolist(),
+        summary["meters_broad"].tolist(),
+        summary["meters_straight"].tolist(),
+        summary["twistiness_score"].tolist(),
+        input_hash.tolist(),
+    ):
+        start, end = bounds[written], bounds[written + 1]
+        copy.write_row((
+            way_id, total, sharp, broad, straight,
+            None if score != score else score, twistiness_class(score), way_hash,
+            bins[start:end], meters[start:end],
+        ))
+        written += 1
+    return written
+
+
+def write_summaries(copy, rows, previous=None):
+    """
+    Computes the summaries of a batch of whole ways and COPYs the writable ones whose
+    input_hash is not in previous (sorted way_id / input_hash arrays of the stored rows).
+    Returns (rows written, writable ways reused).
+    """
+    way_ids = rows["way_id"].astype(np.int64)
+    new_way = np.ones(len(way_ids), dtype=bool)
+    new_way[1:] = way_ids[1:] != way_ids[:-1]
+    way_index = np.cumsum(new_way) - 1
+    lon = fixed_point_degrees(rows["lon_e7"])
+    lat = fixed_point_degrees(rows["lat_e7"])
+    input_hash = way_input_hashes(way_ids, rows["node_id"], lon, lat, rows["conflict"])
+    write = rows["write"][new_way]
+
+    reused = 0
+    if previous is not None and len(previous[0]):
+        previous_way_ids, previous_hashes = previous
+        position = np.minimum(np.searchsorted(previous_way_ids, way_ids[new_way]), len(previous_way_ids) - 1)
+        unchanged = (previous_way_ids[position] == way_ids[new_way]) & (previous_hashes[position] == input_hash)
+        reused = int(np.count_nonzero(write & unchanged))
+        write &= ~unchanged
+    if not write.any():
+        return 0, reused
+
+    # Only the vertices of the ways to write go through the kernel
+    vertices = write[way_index]
+    summary = way_summaries(way_ids[vertices], lon[vertices], lat[vertices], rows["conflict"][vertices])
+    return write_summary_rows(copy, summary, input_hash[write]), reused
+
+
+def load_previous_hashes(cursor, way_id_min, way_id_max):
+    """Stored (way_id, input_hash) of a partition as sorted arrays."""
+    cursor.execute(
+        """
+        SELECT way_id, input_hash FROM rs_curvature_way_summary
+        WHERE way_id >= %s AND way_id < %s AND input_hash IS NOT NULL
+          -- Rows written before the histogram columns existed are recomputed
+          AND histogram_bins IS NOT NULL
+        ORDER BY way_id;
+        """,
+        (way_id_min, way_id_max),
+    )
+    rows = cursor.fetchall()
+    return (
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([row[1] for row in rows], dtype=np.int64),
+    )
+
+
+def compute_partition(db_config, scope_params, write_params, way_id_min, way_id_max, reuse=False):
+    """
+    Streams one way_id partition, computes its summaries batch by batch and COPYs
+    them into rs_curvature_way_summary. With reuse, ways whose stored input_hash
+    still matches are skipped and the others replace their rows (via a staging
+    table). Returns the partition's counts.
+    """
+    start_time = time.time()
+    stats = {"way_id_min": way_id_min, "way_id_max": way_id_max, "vertices": 0, "ways": 0, "written": 0, "reused": 0}
+    query = stream_query(scope_params, write_params, way_id_min, way_id_max)
+    batch_bytes = CURVATURE_BATCH_ROWS * ROW_DTYPE.itemsize
+
+    # COPY out and COPY in cannot share a connection
+    with connect(db_config) as read_conn, connect(db_config) as write_conn:
+        with read_conn.cursor() as read_cursor, write_conn.cursor() as write_cursor:
+            previous = None
+            target = "rs_curvature_way_summary"
+            if reuse:
+                previous = load_previous_hashes(write_cursor, way_id_min, way_id_max)
+                write_cursor.execute(
+                    f"CREATE TEMP TABLE {STAGING_TABLE} (LIKE rs_curvature_way_summary) ON COMMIT DROP;"
+                )
+                target = STAGING_TABLE
+            with write_cursor.copy(f"COPY {target} ({SUMMARY_COLUMNS}) FROM STDIN") as out:
+                buffer = bytearray()
+                header_skipped = False
+                carry = np.empty(0, dtype=ROW_DTYPE)
+
+                def process(rows, final):
+                    """Handles the whole ways in carry + rows; keeps the last (maybe incomplete) way."""
+                    nonlocal carry
+                    rows = np.concatenate((carry, rows)) if len(carry) else rows
+                    if len(rows) == 0:
+                        return
+                    if final:
+                        complete, carry = rows, np.empty(0, dtype=ROW_DTYPE)
+                    else:
+                        last_way_start = np.searchsorted(rows["way_id"], rows["way_id"][-1], side="left")
+                        if last_way_start == 0:
+                            carry = rows
+                            return
+                        complete, carry = rows[:last_way_start], rows[last_way_start:]
+                    stats["vertices"] += len(complete)
+                    stats["ways"] += int(np.count_nonzero(complete["way_id"][1:] != complete["way_id"][:-1])) + 1
+                    written, reused = write_summaries(out, complete, previous)
+                    stats["written"] += written
+                    stats["reused"] += reused
+
+                with read_cursor.copy(query) as copy:
+                    for data in copy:
+                        buffer += data
+                        if not header_skipped and len(buffer) >= COPY_HEADER_BYTES:
+                            del buffer[:COPY_HEADER_BYTES]
+                            header_skipped = True
+                        if header_skipped and len(buffer) >= batch_bytes:
+                            rows, consumed = parse_copy_rows(buffer)
+                            del buffer[:consumed]
+                            process(rows, final=False)
+
+                rows, consumed = parse_copy_rows(buffer)
+                del buffer[:consumed]
+                if bytes(buffer) not in (b"", b"\xff\xff"):
+                    raise ValueError(f"Truncated curvature COPY stream ({len(buffer)} trailing bytes)")
+                process(rows if rows is not None else np.empty(0, dtype=ROW_DTYPE), final=True)
+            if reuse:
+                write_cursor.execute(f"""
+                    DELETE FROM rs_curvature_way_summary AS s
+                    USING {STAGING_TABLE} AS t
+                    WHERE s.way_id = t.way_id;
+                """)
+                write_cursor.execute(f"INSERT INTO rs_curvature_way_summary SELECT * FROM {STAGING_TABLE};")
+        write_conn.commit()
+
+    stats["elapsed_s"] = round(time.time() - start_time, 2)
+    return stats
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def build_conflict_nodes(cursor):
+    """
+    rs_curvature_conflict_node_ids: tagged conflict nodes + nodes shared by >= 2 bikable
+    ways (rs_junction_index, sql/road_classification/09_build_junction_index.sql).
+    """
+    cursor.execute("SELECT to_regclass('rs_junction_index') IS NOT NULL;")
+    if not cursor.fetchone()[0]:
+        raise RuntimeError(
+            "rs_junction_index does not exist; run sql/road_classification/09_build_junction_index.sql first"
+        )
+    cursor.execute(f"DROP TABLE IF EXISTS {CONFLICT_NODES_TABLE};")
+    cursor.execute(f"""
+        CREATE UNLOGGED TABLE {CONFLICT_NODES_TABLE} AS
+        SELECT node_id FROM rs_junction_index
+        UNION
+        SELECT osm_id FROM rs_conflict_nodes;
+    """)
+    cursor.execute(f"ALTER TABLE {CONFLICT_NODES_TABLE} ADD PRIMARY KEY (node_id);")
+    cursor.execute(f"ANALYZE {CONFLICT_NODES_TABLE};")
+    cursor.execute(f"SELECT COUNT(*) FROM {CONFLICT_NODES_TABLE};")
+    return cursor.fetchone()[0]
+
+
+def plan_partitions(cursor, scope_params, workers):
+    """way_id bounds [min, max) splitting the eligible ways into equally sized partitions."""
+    cursor.execute(substitute_sql_params("""
+        SELECT COUNT(*), MIN(o.osm_id), MAX(o.osm_id)
+        FROM osm_all_roads AS o
+        WHERE o.bikable_road = TRUE
+          :osm_id_filter_clause_o;
+    """, scope_params))
+    way_count, way_id_min, way_id_max = cursor.fetchone()
+    if not way_count:
+        return 0, []
+    partitions = max(1, min(workers, way_count // CURVATURE_MIN_WAYS_PER_PARTITION))
+    bounds = [way_id_min]
+    if partitions > 1:
+        fractions = [k / partitions for k in range(1, partitions)]
+        cursor.execute(substitute_sql_params("""
+            SELECT percentile_disc(%s::float8[]) WITHIN GROUP (ORDER BY o.osm_id)
+            FROM osm_all_roads AS o
+            WHERE o.bikable_road = TRUE
+              :osm_id_filter_clause_o;
+        """, scope_params), (fractions,))
+        bounds.extend(bound for bound in cursor.fetchone()[0] if bound > bounds[-1])
+    bounds.append(way_id_max + 1)
+    return way_count, list(zip(bounds[:-1], bounds[1:]))
+
+
+def compute_curvature(db_config, scope_params=None, write_params=None, workers=CURVATURE_WORKERS,
+                      reuse=CURVATURE_REUSE_UNCHANGED):
+    """
+    Computes rs_curvature_way_summary for the eligible ways selected by
+    scope_params (incremental_scope_params in add_custom_tags; empty = every
+    bikable road). Only the ways selected by write_params (default: the same
+    scope) are replaced; the others are context for conflict points. With reuse,
+    rows whose input_hash still matches are kept.
+    Returns the run report entry.
+    """
+    write_params = scope_params if write_params is None else write_params
+    start_time = time.time()
+    log_print(
+        f"[curvature_engine] Computing curvature with NumPy ({workers} worker(s), "
+        f"{'reusing unchanged ways' if reuse else 'rewriting every way'})"
+    )
+
+    conn = connect(db_config)
+    cursor = conn.cursor()
+    conflict_nodes = build_conflict_nodes(cursor)
+    conn.commit()
+    log_print(f"[curvature_engine] {conflict_nodes:,} conflict nodes ({time.time() - start_time:.2f} seconds)")
+
+    way_count, partitions = plan_partitions(cursor, scope_params, workers)
+    removed = None
+    if reuse:
+        # Summaries of ways that lost their eligible vertices (deleted / no longer bikable)
+        cursor.execute(substitute_sql_params(f"""
+            DELETE FROM rs_curvature_way_summary AS s
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM rs_highway_way_coords AS w
+                JOIN osm_all_roads AS o ON o.osm_id = w.way_id
+                WHERE w.way_id = s.way_id
+                  AND o.bikable_road = TRUE
+                  AND cardinality(w.node_ids) > 0
+            )
+            :way_id_filter_clause;
+        """, write_params))
+        removed = cursor.rowcount
+    elif (write_params or {}).get("way_id_filter_clause"):
+        cursor.execute(substitute_sql_params(
+            "DELETE FROM rs_curvature_way_summary WHERE TRUE :way_id_filter_clause;", write_params
+        ))
+    else:
+        # Full run: no dead tuples to vacuum afterwards
+        cursor.execute("TRUNCATE rs_curvature_way_summary;")
+    conn.commit()
+    log_print(f"[curvature_engine] {way_count:,} eligible ways in {len(partitions)} partition(s)")
+
+    compute_start = time.time()
+    if len(partitions) <= 1:
+        results = [compute_partition(db_config, scope_params, write_params, *bounds, reuse) for bounds in partitions]
+    else:
+        # spawn: the pipeline process has threads (background raster imports)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(partitions), mp_context=context) as executor:
+            futures = [
+                executor.submit(compute_partition, db_config, scope_params, write_params, *bounds, reuse)
+                for bounds in partitions
+            ]
+            results = [future.result() for future in futures]
+    compute_elapsed = time.time() - compute_start
+
+    cursor.execute(f"DROP TABLE IF EXISTS {CONFLICT_NODES_TABLE};")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    vertices = sum(result["vertices"] for result in results)
+    written = sum(result["written"] for result in results)
+    reused = sum(result["reused"] for result in results)
+    elapsed = time.time() - start_time
+    log_print(
+        f"[curvature_engine] {vertices:,} vertices, {written:,} way summaries written, {reused:,} unchanged "
+        f"in {compute_elapsed:.2f} seconds ({elapsed:.2f} seconds total)"
+    )
+    if removed:
+        log_print(f"[curvature_engine] Removed {removed:,} summaries of vanished ways")
+    report = {
+        "workers": workers,
+        "reuse_unchanged": reuse,
+        "partitions": results,
+        "conflict_nodes": conflict_nodes,
+        "vertices": vertices,
+        "ways_written": written,
+        "ways_reused": reused,
+        "ways_removed": removed,
+        "compute_elapsed_s": round(compute_elapsed, 2),
+        "elapsed_s": round(elapsed, 2),
+    }
+    update_run_report("curvature_engine", report)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    setup_logging("curvature_engine")
+    parser = argparse.ArgumentParser(description="Compute rs_curvature_way_summary with the NumPy engine.")
+    parser.add_argument("--workers", type=int, default=CURVATURE_WORKERS, help="Worker processes.")
+    parser.add_argument("--full", action="store_true", help="Rewrite every summary (ignore input_hash).")
+    args = parser.parse_args()
+    db_config = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "name": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+    }
+    compute_curvature(db_config, workers=args.workers, reuse=CURVATURE_REUSE_UNCHANGED and not args.full)
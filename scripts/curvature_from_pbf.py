@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Curvature v2 computed straight from the PBF (no Postgres).
+
+The database engines (curvature_engine.py, the SQL steps) read
+rs_highway_way_coords / rs_highway_way_nodes, which only exist after a correct osm2pgsql import
+(00_validate_import.sql). This module reads the PBF once with pyosmium:
+
+- node locations go into a disk-backed node location index
+  (CURVATURE_PBF_NODE_INDEX: sparse_file_array for extracts, dense_file_array
+  for planet-sized id ranges), so RAM does not grow with the node count
+- conflict-tagged nodes and the vertices of eligible highway ways are
+  collected in the same pass; the vertex columns are spooled to files and
+  memory-mapped afterwards
+- shared nodes (>= 2 eligible ways) are found by sorting the spooled node ids,
+  and the per-way summaries come from curvature_engine.way_summaries
+
+The result is a tab-separated file (gzip when the name ends in .gz) with the
+columns of rs_curvature_way_summary (input_hash included, so a later
+curvature_engine run reuses the rows), keyed by way osm_id. load_curvature_file
+COPYs it into rs_curvature_way_summary (CURVATURE_ENGINE=pbf in add_custom_tags),
+so curvature can be recomputed or tuned without touching the database.
+<result>.state.json records what the file was made from (PBF size / mtime, the
+Lua script, the eligibility rules and the thresholds); result_is_current tells
+add_custom_tags whether the file can be reused.
+
+Eligibility and conflict tags mirror Lua3_RouteProcessing_with_curvature.lua
+(bikable_highways, process_node); keep them in sync.
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import shutil
+import logging
+import tempfile
+from array import array
+
+import numpy as np
+import osmium
+
+try:
+    from .utils import setup_logging, update_run_report
+    from .curvature_engine import (
+        CURVATURE_BATCH_ROWS, INVALID_COORDINATE, PARAMETERS_SEED, SUMMARY_COLUMNS,
+        connect, fixed_point_degrees, twistiness_class, way_input_hashes, way_summaries,
+    )
+except ImportError:
+    from utils import setup_logging, update_run_report
+    from curvature_engine import (
+        CURVATURE_BATCH_ROWS, INVALID_COORDINATE, PARAMETERS_SEED, SUMMARY_COLUMNS,
+        connect, fixed_point_degrees, twistiness_class, way_input_hashes, way_summaries,
+    )
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# PBF ENGINE CONFIG (env overrides allowed)
+# ============================================================================
+# pyosmium node location index; file-backed so it is memory-mapped, not held in RAM
+CURVATURE_PBF_NODE_INDEX = os.getenv("CURVATURE_PBF_NODE_INDEX", "sparse_file_array")
+# Result file of the PBF engine (CURVATURE_ENGINE=pbf)
+CURVATURE_PBF_RESULT = os.getenv("CURVATURE_PBF_RESULT", "./osm_pbf_inputs/curvature/rs_curvature_way_summary.tsv.gz")
+
+# Vertices buffered in Python before they are appended to the spool files
+SPOOL_FLUSH_VERTICES = 1_000_000
+# Bytes per COPY write when loading the result file
+LOAD_CHUNK_BYTES = 8 * 1024 * 1024
+# COPY text format NULL
+COPY_NULL = "\\N"
+
+# Lua3 bikable_highways (keep in sync)
+BIKABLE_HIGHWAYS = frozenset((
+    "motorway", "trunk", "primary", "secondary", "tertiary",
+    "residential", "unclassified", "service", "track", "path",
+    "living_street", "trunk_link", "primary_link", "secondary_link",
+    "motorway_link", "tertiary_link", "road",
+))
+
+# Lua3 process_way: these branches come before the highway branch, so such ways are no roads
+NON_ROAD_WAY_TAGS = (
+    ("natural", ("wood", "water", "coastline", "desert", "field",
+                 "fell", "grassland", "shrubbery", "scrub", "moor", "heath")),
+    ("landuse", ("forest", "wood", "farmland")),
+    ("water", ("reservoir", "lake")),
+    ("waterway", ("river",)),
+    ("leisure", ("nature_reserve",)),
+    ("boundary", ("national_park", "protected_area")),
+)
+
+# Lua3 process_node: rs_conflict_nodes
+CONFLICT_NODE_TAGS = (
+    ("highway", ("traffic_signals", "stop", "give_way", "crossing")),
+    ("railway", ("level_crossing",)),
+    ("junction", ("roundabout",)),
+)
+
+# Script whose eligibility / conflict rules the ones above mirror
+LUA_STYLE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Lua3_RouteProcessing_with_curvature.lua")
+
+# Spooled vertex columns: name -> dtype
+SPOOL_COLUMNS = {"way_id": np.int64, "node_id": np.int64, "x": np.int32, "y": np.int32}
+SPOOL_TYPECODES = {"way_id": "q", "node_id": "q", "x": "i", "y": "i"}
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def has_any_tag(tags, rules):
+    return any(tags.get(key) in values for key, values in rules)
+
+
+def is_curvature_way(tags):
+    """True for the ways that become bikable osm_all_roads rows in the Lua3 import."""
+    return tags.get("highway") in BIKABLE_HIGHWAYS and not has_any_tag(tags, NON_ROAD_WAY_TAGS)
+
+
+def open_text(path, mode):
+    """Plain or gzip text file (by extension)."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+def result_signature():
+    """
+    sha256 of what decides the result besides the PBF: the curvature thresholds
+    (PARAMETERS_SEED of curvature_engine), the eligibility / conflict rules above
+    and the Lua script they mirror. A result file made with another signature is stale.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((
+        int(PARAMETERS_SEED), sorted(BIKABLE_HIGHWAYS), NON_ROAD_WAY_TAGS, CONFLICT_NODE_TAGS,
+    )).encode("utf-8"))
+    if os.path.exists(LUA_STYLE_SCRIPT):
+        with open(LUA_STYLE_SCRIPT, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def input_state(pbf_path):
+    """What a result file is made from (kept in <result>.state.json)."""
+    stat = os.stat(pbf_path)
+    return {
+        "input_size": stat.st_size,
+        "input_mtime_ns": stat.st_mtime_ns,
+        "result_sha256": result_signature(),
+    }
+
+
+def read_result_state(output_path):
+    path = f"{output_path}.state.json"
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_result_state(output_path, state):
+    path = f"{output_path}.state.json"
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def result_is_current(pbf_path, output_path):
+    """True if output_path was computed from this PBF with the current script, rules and thresholds."""
+    return os.path.exists(output_path) and read_result_state(output_path) == input_state(pbf_path)
+
+
+# ============================================================================
+# PBF PASS
+# ============================================================================
+
+def flush_spool(buffers, files):
+    for name, buffer in buffers.items():
+        buffer.tofile(files[name])
+        del buffer[:]
+
+
+def scan_pbf(pbf_path, work_dir, node_index=CURVATURE_PBF_NODE_INDEX):
+    """
+    One pass over the PBF. Spools (way_id, node_id, x, y) of every eligible way
+    vertex plus the distinct node ids of every eligible way to work_dir.
+    Returns (tagged conflict node ids, vertex count, way count).
+    """
+    index_spec = f"{node_index},{os.path.join(work_dir, 'node_locations.idx')}"
+    processor = (
+        osmium.FileProcessor(pbf_path)
+        .with_locations(index_spec)
+        .with_filter(osmium.filter.KeyFilter("highway", "railway", "junction"))
+    )
+
+    files = {name: open(os.path.join(work_dir, f"{name}.bin"), "wb") for name in SPOOL_COLUMNS}
+    files["distinct_node_id"] = open(os.path.join(work_dir, "distinct_node_id.bin"), "wb")
+    buffers = {name: array(SPOOL_TYPECODES[name]) for name in SPOOL_COLUMNS}
+    buffers["distinct_node_id"] = array("q")
+    conflict_nodes = array("q")
+    vertices = ways = 0
+    try:
+        for obj in processor:
+            if obj.is_node():
+                if has_any_tag(obj.tags, CONFLICT_NODE_TAGS):
+                    conflict_nodes.append(obj.id)
+                continue
+            if not obj.is_way() or not is_curvature_way(obj.tags) or len(obj.nodes) == 0:
+                continue
+            refs = [node.ref for node in obj.nodes]
+            buffers["way_id"].extend([obj.id] * len(refs))
+            buffers["node_id"].extend(refs)
+            # Fixed-point coordinates (as in rs_highway_way_coords) never raise for a missing
+            # location (x = y = INVALID_COORDINATE)
+            buffers["x"].extend([node.x for node in obj.nodes])
+            buffers["y"].extend([node.y for node in obj.nodes])
+            # A way counts once per node for the shared-node test (closed ways repeat their first node)
+            buffers["distinct_node_id"].extend(refs if len(set(refs)) == len(refs) else dict.fromkeys(refs))
+            vertices += len(refs)
+            ways += 1
+            if len(buffers["way_id"]) >= SPOOL_FLUSH_VERTICES:
+                flush_spool(buffers, files)
+        flush_spool(buffers, files)
+    finally:
+        for f in files.values():
+            f.close()
+    return np.frombuffer(conflict_nodes, dtype=np.int64), vertices, ways
+
+
+def sorted_member(values, sorted_ids):
+    """np.isin for a sorted, unique id array (one binary search per value)."""
+    if len(sorted_ids) == 0:
+        return np.zeros(len(values), dtype=bool)
+    position = np.minimum(np.searchsorted(sorted_ids, values), len(sorted_ids) - 1)
+    return sorted_ids[position] == values
+
+
+def spooled_column(work_dir, name, dtype):
+    path = os.path.join(work_dir, f"{name}.bin")
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def shared_node_ids(work_dir):
+    """Node ids used by >= 2 eligible ways (sorted, unique)."""
+    nodes = np.sort(spooled_column(work_dir, "distinct_node_id", np.int64))
+    repeated = nodes[1:][nodes[1:] == nodes[:-1]]
+    return np.unique(repeated)
+
+
+# ============================================================================
+# SUMMARIES
+# ============================================================================
+
+def batch_bounds(way_ids, batch_rows):
+    """[start, end) vertex ranges of about batch_rows vertices that never split a way."""
+    bounds = []
+    start, n = 0, len(way_ids)
+    while start < n:
+        end = min(start + batch_rows, n)
+        if end < n:
+            # Move the cut back to the start of the way that straddles it
+            end = start + int(np.searchsorted(way_ids[start:end], way_ids[end], side="left"))
+            if end == start:
+                end = start + int(np.searchsorted(way_ids[start:], way_ids[start], side="right"))
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def coordinates(way_ids, x, y):
+    """
+    lon / lat as stored in rs_highway_way_nodes (float4, NaN = NULL). Like
+    00_populate_node_coordinates.sql, a way whose geometry would lose a point
+    (missing location, or a repeated node at the same location, which osm2pgsql
+    drops) gets NULL coordinates for all of its vertices.
+    Returns (lon, lat, null_ways) with null_ways counting those ways by cause
+    ("missing_location" wins when a way has both).
+    """
+    invalid = (x == INVALID_COORDINATE) | (y == INVALID_COORDINATE)
+    repeated = np.zeros(len(x), dtype=bool)
+    repeated[1:] = (x[1:] == x[:-1]) & (y[1:] == y[:-1]) & (way_ids[1:] == way_ids[:-1])
+    lon = fixed_point_degrees(x)
+    lat = fixed_point_degrees(y)
+    null_ways = {"missing_location": 0, "repeated_point": 0}
+    broken = invalid | repeated
+    if broken.any():
+        missing_ids = np.unique(way_ids[invalid])
+        broken_ids = np.unique(way_ids[broken])
+        null_ways["missing_location"] = int(len(missing_ids))
+        null_ways["repeated_point"] = int(len(broken_ids) - len(missing_ids))
+        null_way = np.isin(way_ids, broken_ids)
+        lon[null_way] = np.nan
+        lat[null_way] = np.nan
+    return lon, lat, null_ways
+
+
+def write_summary_rows(out, summary, input_hash):
+    """Writes summary rows in COPY text format (NULL = \\N). Returns the rows written."""
+    written = 0
+    bins = summary["histogram_bins"].tolist()
+    meters = summary["histogram_meters"].tolist()
+    bounds = summary["histogram_bounds"].tolist()
+    for way_id, total, sharp, broad, straight, score, way_hash in zip(
+        summary["way_id"].tolist(),
+        summary["total_length_m"].tolist(),
+        summary["meters_sharp"].tolist(),
+        summary["meters_broad"].tolist(),
+        summary["meters_straight"].tolist(),
+        summary["twistiness_score"].tolist(),
+        input_hash.tolist(),
+    ):
+        if score != score:  # NaN = NULL
+            score_text = class_text = COPY_NULL
+        else:
+            score_text, class_text = repr(score), twistiness_class(score)
+        start, end = bounds[written], bounds[written + 1]
+        bins_text = "{" + ",".join(map(str, bins[start:end])) + "}"
+        meters_text = "{" + ",".join(map(repr, meters[start:end])) + "}"
+        out.write(
+            f"{way_id}\t{total!r}\t{sharp!r}\t{broad!r}\t{straight!r}\t{score_text}\t{class_text}\t{way_hash}"
+            f"\t{bins_text}\t{meters_text}\n"
+        )
+        written += 1
+    return written
+
+
+def compute_curvature_from_pbf(pbf_path, output_path, node_index=CURVATURE_PBF_NODE_INDEX, work_dir=None):
+    """
+    Writes the rs_curvature_way_summary rows of every eligible way of pbf_path to
+    output_path (and its <output>.state.json). work_dir holds the node location index and the vertex spool
+    (default: a temporary folder next to output_path, removed afterwards).
+    Returns the run report entry.
+    """
+    if not os.path.exists(pbf_path):
+        raise FileNotFoundError(f"PBF file not found: {pbf_path}")
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    own_work_dir = work_dir is None
+    if own_work_dir:
+        work_dir = tempfile.mkdtemp(prefix="curvature_pbf_", dir=output_dir)
+    else:
+        os.makedirs(work_dir, exist_ok=True)
+
+    start_time = time.time()
+    # Taken before the read, so a PBF replaced meanwhile does not look current
+    state = input_state(pbf_path)
+    log_print(f"[curvature_from_pbf] Reading {pbf_path} (node index: {node_index})")
+    try:
+        tagged_conflicts, vertices, ways = scan_pbf(pbf_path, work_dir, node_index)
+        index_bytes = os.path.getsize(os.path.join(work_dir, "node_locations.idx"))
+        # The node location index is no longer needed; free the disk before sorting
+        os.remove(os.path.join(work_dir, "node_locations.idx"))
+        scan_elapsed = time.time() - start_time
+        log_print(
+            f"[curvature_from_pbf] {ways:,} eligible ways, {vertices:,} vertices, "
+            f"{len(tagged_conflicts):,} tagged conflict nodes in {scan_elapsed:.2f} seconds"
+        )
+
+        conflict_ids = np.union1d(shared_node_ids(work_dir), tagged_conflicts)
+        way_ids = spooled_column(work_dir, "way_id", np.int64)
+        node_ids = spooled_column(work_dir, "node_id", np.int64)
+        xs = spooled_column(work_dir, "x", np.int32)
+        ys = spooled_column(work_dir, "y", np.int32)
+
+        compute_start = time.time()
+        written = 0
+        null_ways = {"missing_location": 0, "repeated_point": 0}
+        # Keeps the extension (gzip or not) of the result file
+        tmp_path = os.path.join(output_dir, ".partial-" + os.path.basename(output_path))
+        with open_text(tmp_path, "w") as out:
+            for start, end in batch_bounds(way_ids, CURVATURE_BATCH_ROWS):
+                batch_way_ids = np.asarray(way_ids[start:end])
+                lon, lat, batch_null_ways = coordinates(
+                    batch_way_ids, np.asarray(xs[start:end]), np.asarray(ys[start:end])
+                )
+                for cause, count in batch_null_ways.items():
+                    null_ways[cause] += count
+                batch_node_ids = np.asarray(node_ids[start:end])
+                conflict = sorted_member(batch_node_ids, conflict_ids)
+                written += write_summary_rows(
+                    out,
+                    way_summaries(batch_way_ids, lon, lat, conflict),
+                    way_input_hashes(batch_way_ids, batch_node_ids, lon, lat, conflict),
+                )
+        os.replace(tmp_path, output_path)
+        write_result_state(output_path, state)
+        compute_elapsed = time.time() - compute_start
+    finally:
+        if own_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    elapsed = time.time() - start_time
+    log_print(
+        f"[curvature_from_pbf] {written:,} way summaries written to {output_path} in "
+        f"{compute_elapsed:.2f} seconds ({elapsed:.2f} seconds total)"
+    )
+    if any(null_ways.values()):
+        log_print(
+            f"[curvature_from_pbf] {sum(null_ways.values()):,} ways without coordinates (NULL summary): "
+            f"{null_ways['repeated_point']:,} with a repeated point, "
+            f"{null_ways['missing_location']:,} with a missing node location",
+            level='warning'
+        )
+    report = {
+        "pbf_path": pbf_path,
+        "output_path": output_path,
+        "node_index": node_index,
+        "node_index_mb": round(index_bytes / 1024 ** 2, 1),
+        "ways": ways,
+        "vertices": vertices,
+        "conflict_nodes": int(len(conflict_ids)),
+        "ways_written": written,
+        "ways_without_coordinates": null_ways,
+        "scan_elapsed_s": round(scan_elapsed, 2),
+        "compute_elapsed_s": round(compute_elapsed, 2),
+        "elapsed_s": round(elapsed, 2),
+    }
+    update_run_report("curvature_from_pbf", report)
+    return report
+
+
+def load_curvature_file(db_config, path):
+    """Replaces rs_curvature_way_summary with the rows of a result file. Returns the row count."""
+    start_time = time.time()
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("TRUNCATE rs_curvature_way_summary;")
+            with open_text(path, "r") as f, cursor.copy(f"COPY rs_curvature_way_summary ({SUMMARY_COLUMNS}) FROM STDIN") as copy:
+                for chunk in iter(lambda: f.read(LOAD_CHUNK_BYTES), ""):
+                    copy.write(chunk)
+            cursor.execute("SELECT COUNT(*) FROM rs_curvature_way_summary;")
+            rows = cursor.fetchone()[0]
+            cursor.execute("ANALYZE rs_curvature_way_summary;")
+    log_print(f"[curvature_from_pbf] Loaded {rows:,} way summaries from {path} in {time.time() - start_time:.2f} seconds")
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    setup_logging("curvature_from_pbf")
+    parser = argparse.ArgumentParser(description="Compute curvature v2 way summaries directly from a PBF.")
+    parser.add_argument("input_pbf", help="Input .osm.pbf file path.")
+    parser.add_argument("output", nargs="?", default=CURVATURE_PBF_RESULT,
+                        help="Result file (.tsv or .tsv.gz; default: CURVATURE_PBF_RESULT).")
+    parser.add_argument("--node-index", default=CURVATURE_PBF_NODE_INDEX,
+                        help="pyosmium node location index (sparse_file_array or dense_file_array).")
+    parser.add_argument("--work-dir", help="Folder for the node index and vertex spool (default: temporary).")
+    parser.add_argument("--load", action="store_true", help="COPY the result into rs_curvature_way_summary.")
+    args = parser.parse_args()
+    compute_curvature_from_pbf(args.input_pbf, args.output, node_index=args.node_index, work_dir=args.work_dir)
+    if args.load:
+        db_config = {
+            "host": os.getenv("DB_HOST", "localhost"),
+            "name": os.getenv("DB_NAME"),
+            "user": os.getenv("DB_USER"),
+            "password": os.getenv("DB_PASSWORD"),
+            "port": int(os.getenv("DB_PORT", "5432")),
+        }
+        load_curvature_file(db_config, args.output)
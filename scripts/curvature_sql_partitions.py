@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Curvature v2 SQL steps run per hash partition on a worker pool (CURVATURE_ENGINE=sql).
+
+00_schema.sql creates the three intermediates (rs_curvature_way_vertices,
+rs_curvature_vertex_metrics, rs_curvature_conflict_points) hash-partitioned by
+way_id; their partitions are created here (rs_curvature_create_partitions, only
+the missing ones), so the NumPy / PBF engines never pay for them. Run over the parent tables, steps 01-05 sort every vertex of the
+country in one backend and spill huge window sorts to temp. This driver runs
+them once per partition instead:
+
+- 00_conflict_candidates.sql first builds the conflict nodes over every eligible
+  way (a node shared with a way of another partition is still an intersection)
+- each worker runs 01-05 with :partition_suffix (e.g. "_p07", the partition
+  tables) and :way_partition_clause (the partition's ways), so a window sort
+  only sees its partition
+- a partition's tables are truncated as soon as its summaries are written, so
+  temp and heap usage stay bounded by the partitions in flight; the emptied
+  partitions are kept for the next run (the storage cleanup after Part 2 drops
+  them with their parents)
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psycopg
+
+try:
+    from .utils import setup_logging, substitute_sql_params, update_run_report, resolve_project_path
+except ImportError:
+    from utils import setup_logging, substitute_sql_params, update_run_report, resolve_project_path
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIG (env overrides allowed)
+# ============================================================================
+# Partitions processed concurrently (one backend each)
+CURVATURE_SQL_WORKERS = int(os.getenv("CURVATURE_SQL_WORKERS", min(8, os.cpu_count() or 1)))
+
+SQL_DIR = "sql/road_curvature_v2"
+CONFLICT_CANDIDATES_STEP = "00_conflict_candidates.sql"
+PARTITION_STEPS = [
+    "01_prepare_inputs.sql",
+    "02_compute_vertex_angles.sql",
+    "03_classify_radius_and_segment_meters.sql",
+    "04_conflict_zone_suppression.sql",
+    "05_aggregate_to_way.sql",
+]
+# Partitioned by HASH (way_id) in 00_schema.sql; partitions are <table>_pNN
+CURVATURE_SQL_PARTITIONS = 32
+INTERMEDIATE_TABLES = (
+    "rs_curvature_way_vertices",
+    "rs_curvature_vertex_metrics",
+    "rs_curvature_conflict_points",
+)
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def connect(db_config):
+    return psycopg.connect(
+        dbname=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        host=db_config['host'],
+        port=db_config['port']
+    )
+
+
+def execute_step(cursor, sql_dir, sql_file, params):
+    """Executes one SQL step with its placeholders substituted."""
+    with open(os.path.join(sql_dir, sql_file), 'r', encoding='utf-8') as f:
+        cursor.execute(substitute_sql_params(f.read(), params))
+
+
+def partition_count(cursor):
+    """Number of hash partitions of the intermediates (00_schema.sql)."""
+    cursor.execute(
+        "SELECT COUNT(*) FROM pg_inherits WHERE inhparent = %s::regclass;",
+        (INTERMEDIATE_TABLES[0],),
+    )
+    return cursor.fetchone()[0]
+
+
+def partition_params(remainder, modulus):
+    """Placeholders selecting one hash partition (tables and ways)."""
+    return {
+        "partition_suffix": f"_p{remainder:02d}",
+        # Same hash as the partition bounds, so the rows always fit the partition
+        "way_partition_clause": (
+            f"AND satisfies_hash_partition('{INTERMEDIATE_TABLES[0]}'::regclass, {modulus}, {remainder}, way_id)"
+        ),
+    }
+
+
+def run_partition(db_config, sql_dir, remainder, modulus, scope_params=None, write_params=None):
+    """
+    Runs steps 01-05 for one hash partition, then truncates its tables.
+    Returns the partition's counts.
+    """
+    start_time = time.time()
+    partition = partition_params(remainder, modulus)
+    suffix = partition["partition_suffix"]
+    stats = {"partition": suffix, "vertices": 0}
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            for sql_file in PARTITION_STEPS:
+                # 01 selects the ways (context scope), 05 replaces the summaries (write scope)
+                params = dict(partition)
+                if sql_file == "01_prepare_inputs.sql":
+                    params.update(scope_params or {})
+                elif sql_file == "05_aggregate_to_way.sql":
+                    params.update(write_params or {})
+                execute_step(cursor, sql_dir, sql_file, params)
+                if sql_file == "01_prepare_inputs.sql":
+                    cursor.execute(f"SELECT COUNT(*) FROM rs_curvature_way_vertices{suffix};")
+                    stats["vertices"] = cursor.fetchone()[0]
+                    if stats["vertices"] == 0:
+                        # Small (incremental) scopes leave partitions empty; 02-05 would fail validation
+                        conn.commit()
+                        break
+                conn.commit()
+            # Frees the partition's storage right away (locks only the partition)
+            tables = ", ".join(f"{table}{suffix}" for table in INTERMEDIATE_TABLES)
+            cursor.execute(f"TRUNCATE {tables};")
+        conn.commit()
+    stats["elapsed_s"] = round(time.time() - start_time, 2)
+    return stats
+
+
+def compute_curvature_sql(db_config, scope_params=None, write_params=None, workers=CURVATURE_SQL_WORKERS,
+                          sql_dir=None):
+    """
+    Runs curvature steps 01-05 partition by partition on a pool of workers (after
+    00_schema.sql). scope_params select the ways whose vertices are prepared
+    (incremental context), write_params the summaries that are replaced
+    (default: the same scope). Returns the run report entry.
+    """
+    write_params = scope_params if write_params is None else write_params
+    sql_dir = sql_dir or resolve_project_path(SQL_DIR)
+    start_time = time.time()
+
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT rs_curvature_create_partitions(%s);", (CURVATURE_SQL_PARTITIONS,))
+            created = cursor.fetchone()[0]
+            conn.commit()
+            if created:
+                log_print(f"[curvature_sql_partitions] Created {created} intermediate partitions")
+            modulus = partition_count(cursor)
+            execute_step(cursor, sql_dir, CONFLICT_CANDIDATES_STEP, scope_params)
+            conn.commit()
+            cursor.execute("SELECT COUNT(*) FROM rs_curvature_conflict_candidates;")
+            conflict_nodes = cursor.fetchone()[0]
+            # Summaries of the write scope are replaced; the partitions' own DELETEs then find nothing
+            if (write_params or {}).get("way_id_filter_clause"):
+                cursor.execute(substitute_sql_params(
+                    "DELETE FROM rs_curvature_way_summary WHERE TRUE :way_id_filter_clause;", write_params
+                ))
+            else:
+                cursor.execute("TRUNCATE rs_curvature_way_summary;")
+        conn.commit()
+    log_print(
+        f"[curvature_sql_partitions] {conflict_nodes:,} conflict nodes; running steps 01-05 over "
+        f"{modulus} partitions with {workers} worker(s) ({time.time() - start_time:.2f} seconds)"
+    )
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="curvature_sql") as executor:
+        futures = [
+            executor.submit(run_partition, db_config, sql_dir, remainder, modulus, scope_params, write_params)
+            for remainder in range(modulus)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            log_print(
+                f"[curvature_sql_partitions] Partition {result['partition']}: {result['vertices']:,} vertices "
+                f"in {result['elapsed_s']:.2f} seconds ({len(results)}/{modulus} done)"
+            )
+
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS rs_curvature_conflict_candidates;")
+            cursor.execute("ANALYZE rs_curvature_way_summary;")
+            cursor.execute("SELECT COUNT(*) FROM rs_curvature_way_summary;")
+            summary_rows = cursor.fetchone()[0]
+        conn.commit()
+
+    results.sort(key=lambda result: result["partition"])
+    vertices = sum(result["vertices"] for result in results)
+    elapsed = time.time() - start_time
+    log_print(
+        f"[curvature_sql_partitions] {vertices:,} vertices, {summary_rows:,} way summaries "
+        f"in {elapsed:.2f} seconds"
+    )
+    report = {
+        "workers": workers,
+        "partitions": results,
+        "conflict_nodes": conflict_nodes,
+        "vertices": vertices,
+        "summary_rows": summary_rows,
+        "elapsed_s": round(elapsed, 2),
+    }
+    update_run_report("curvature_sql_partitions", report)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    setup_logging("curvature_sql_partitions")
+    parser = argparse.ArgumentParser(description="Run curvature v2 SQL steps 01-05 per hash partition.")
+    parser.add_argument("--workers", type=int, default=CURVATURE_SQL_WORKERS, help="Concurrent partitions.")
+    args = parser.parse_args()
+    db_config = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "name": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+    }
+    compute_curvature_sql(db_config, workers=args.workers)
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Re-bucket curvature v2 for other thresholds without recomputing the geometry.
+
+Every rs_curvature_way_summary row carries a sparse histogram of the way's
+counted (not suppressed) meters by radius bin and turn-angle bin
+(histogram_bins / histogram_meters, written by curvature_engine.py,
+curvature_from_pbf.py and 05_aggregate_to_way.sql). meters_sharp, meters_broad,
+meters_straight, twistiness_score and twistiness_class for another
+sharp / broad radius, minimum turn angle or class cut-offs are sums over those
+bins:
+
+- threshold_sweep loads the histograms once (binary COPY) and scores a grid of
+  thresholds in NumPy; the class distribution of every combination goes to the
+  run report (and optionally a CSV) for tuning
+- apply_thresholds rewrites the summary rows for one set in SQL
+  (rs_curvature_rebucket / rs_twistiness_class, 00_schema.sql)
+
+Thresholds must fall on bin edges (curvature_engine.RADIUS_BIN_M,
+ANGLE_BIN_DEG): radii in multiples of 25 m up to 1000 m, whole turn angles up
+to 15 degrees.
+"""
+
+import os
+import csv
+import time
+import logging
+import itertools
+
+import numpy as np
+
+try:
+    from .utils import setup_logging, update_run_report, write_run_report
+    from .curvature_engine import (
+        ANGLE_BIN_DEG, ANGLE_BIN_SLOTS, ANGLE_BINS, RADIUS_BIN_M, RADIUS_BINS, COPY_HEADER_BYTES,
+        BROAD_RADIUS_M, CLASS_BROAD_SCORE, CLASS_SHARP_SCORE, MIN_TURN_ANGLE_RAD, SHARP_RADIUS_M,
+        connect,
+    )
+except ImportError:
+    from utils import setup_logging, update_run_report, write_run_report
+    from curvature_engine import (
+        ANGLE_BIN_DEG, ANGLE_BIN_SLOTS, ANGLE_BINS, RADIUS_BIN_M, RADIUS_BINS, COPY_HEADER_BYTES,
+        BROAD_RADIUS_M, CLASS_BROAD_SCORE, CLASS_SHARP_SCORE, MIN_TURN_ANGLE_RAD, SHARP_RADIUS_M,
+        connect,
+    )
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# SWEEP DEFAULTS (env overrides allowed, comma-separated)
+# ============================================================================
+CURVATURE_SWEEP_SHARP_RADII = os.getenv("CURVATURE_SWEEP_SHARP_RADII", "100,125,150,175,200")
+CURVATURE_SWEEP_BROAD_RADII = os.getenv("CURVATURE_SWEEP_BROAD_RADII", "400,500,600")
+CURVATURE_SWEEP_MIN_TURNS = os.getenv("CURVATURE_SWEEP_MIN_TURNS", "3,5,7")
+# broad/sharp score cut-off pairs, e.g. "0.03/0.08,0.04/0.10"
+CURVATURE_SWEEP_CLASS_CUTS = os.getenv(
+    "CURVATURE_SWEEP_CLASS_CUTS", f"{CLASS_BROAD_SCORE}/{CLASS_SHARP_SCORE}"
+)
+
+CLASSES = ("straight", "broad", "sharp")
+
+# Binary COPY layouts (see curvature_engine.ROW_DTYPE)
+HISTOGRAM_ROW_DTYPE = np.dtype([
+    ("fields", ">i2"),
+    ("way_id_len", ">i4"), ("way_id", ">i8"),
+    ("bin_len", ">i4"), ("bin", ">i2"),
+    ("meters_len", ">i4"), ("meters", ">f8"),
+])
+LENGTH_ROW_DTYPE = np.dtype([
+    ("fields", ">i2"),
+    ("way_id_len", ">i4"), ("way_id", ">i8"),
+    ("length_len", ">i4"), ("total_length_m", ">f8"),
+])
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def parse_list(text, cast=float):
+    return [cast(value) for value in text.split(",") if value.strip()]
+
+
+def parse_class_cuts(text):
+    """"0.03/0.08,0.04/0.10" -> [(0.03, 0.08), (0.04, 0.10)]"""
+    return [tuple(float(value) for value in pair.split("/")) for pair in text.split(",") if pair.strip()]
+
+
+def validate_thresholds(sharp_radius_m, broad_radius_m, min_turn_deg):
+    """Raises ValueError unless the thresholds fall on histogram bin edges."""
+    if not (0 < sharp_radius_m <= broad_radius_m <= RADIUS_BINS * RADIUS_BIN_M):
+        raise ValueError(
+            f"Need 0 < sharp_radius_m <= broad_radius_m <= {RADIUS_BINS * RADIUS_BIN_M:g} "
+            f"(got {sharp_radius_m:g}, {broad_radius_m:g})"
+        )
+    for radius in (sharp_radius_m, broad_radius_m):
+        if radius % RADIUS_BIN_M:
+            raise ValueError(f"Radius {radius:g} m is not a multiple of the {RADIUS_BIN_M:g} m histogram bins")
+    if not (0 <= min_turn_deg <= ANGLE_BINS * ANGLE_BIN_DEG) or min_turn_deg % ANGLE_BIN_DEG:
+        raise ValueError(
+            f"Minimum turn angle {min_turn_deg:g} must be a multiple of {ANGLE_BIN_DEG:g} degrees "
+            f"up to {ANGLE_BINS * ANGLE_BIN_DEG:g}"
+        )
+
+
+# ============================================================================
+# HISTOGRAMS
+# ============================================================================
+
+def copy_rows(cursor, query, dtype):
+    """Fixed-width rows of a binary COPY query as a structured array."""
+    buffer = bytearray()
+    with cursor.copy(query) as copy:
+        for data in copy:
+            buffer += data
+    body = bytes(buffer[COPY_HEADER_BYTES:])
+    if body.endswith(b"\xff\xff"):
+        body = body[:-2]
+    if len(body) % dtype.itemsize:
+        raise ValueError(f"Unexpected row layout in the COPY stream ({len(body)} bytes)")
+    rows = np.frombuffer(body, dtype=dtype)
+    if len(rows) and (rows["fields"] != len(dtype.names) // 2).any():
+        raise ValueError("Unexpected row layout in the COPY stream")
+    return rows
+
+
+def load_histograms(db_config):
+    """
+    Histograms of every summary row that has one. Returns a dict with the per-way
+    total_length_m and, per histogram entry, the way position, the upper radius
+    edge of the bin (RADIUS_BIN_M past the last edge for the overflow bin), the
+    lower turn-angle edge in degrees and the meters.
+    """
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            ways = copy_rows(cursor, """
+                COPY (
+                    SELECT way_id, COALESCE(total_length_m, 0.0)
+                    FROM rs_curvature_way_summary
+                    WHERE histogram_bins IS NOT NULL
+                    ORDER BY way_id
+                ) TO STDOUT (FORMAT BINARY)
+            """, LENGTH_ROW_DTYPE)
+            entries = copy_rows(cursor, """
+                COPY (
+                    SELECT s.way_id, h.bin, h.meters
+                    FROM rs_curvature_way_summary AS s
+                    CROSS JOIN LATERAL unnest(s.histogram_bins, s.histogram_meters) AS h(bin, meters)
+                    ORDER BY s.way_id
+                ) TO STDOUT (FORMAT BINARY)
+            """, HISTOGRAM_ROW_DTYPE)
+
+    way_ids = ways["way_id"].astype(np.int64)
+    bins = entries["bin"].astype(np.int64)
+    return {
+        "way_id": way_ids,
+        "total_length_m": ways["total_length_m"].astype(np.float64),
+        "way_position": np.searchsorted(way_ids, entries["way_id"].astype(np.int64)),
+        "radius_edge_m": (bins // ANGLE_BIN_SLOTS + 1) * RADIUS_BIN_M,
+        "angle_edge_deg": (bins % ANGLE_BIN_SLOTS) * ANGLE_BIN_DEG,
+        "meters": entries["meters"].astype(np.float64),
+    }
+
+
+def rebucket(histograms, sharp_radius_m, broad_radius_m, min_turn_deg):
+    """
+    meters_sharp / meters_broad / meters_straight / twistiness_score per way
+    (05_aggregate_to_way.sql rules) for the given thresholds.
+    """
+    ways = len(histograms["way_id"])
+    position = histograms["way_position"]
+    radius_edge = histograms["radius_edge_m"]
+    meters = histograms["meters"]
+    turning = histograms["angle_edge_deg"] >= min_turn_deg
+    sharp_entries = turning & (radius_edge <= sharp_radius_m)
+    broad_entries = turning & (radius_edge > sharp_radius_m) & (radius_edge <= broad_radius_m)
+
+    sharp = np.bincount(position, weights=np.where(sharp_entries, meters, 0.0), minlength=ways)
+    broad = np.bincount(position, weights=np.where(broad_entries, meters, 0.0), minlength=ways)
+    straight = np.bincount(position, weights=meters, minlength=ways) - sharp - broad
+    total = histograms["total_length_m"]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = np.where(total > 0, (sharp + 0.5 * broad) / total, np.nan)
+    return {
+        "meters_sharp": sharp,
+        "meters_broad": broad,
+        "meters_straight": straight,
+        "twistiness_score": score,
+    }
+
+
+def class_distribution(score, total_length_m, broad_score, sharp_score):
+    """Ways and km per twistiness_class (NULL scores are left out)."""
+    scored = ~np.isnan(score)
+    class_index = np.searchsorted([broad_score, sharp_score], score[scored], side="right")
+    ways = np.bincount(class_index, minlength=len(CLASSES))
+    km = np.bincount(class_index, weights=total_length_m[scored], minlength=len(CLASSES)) / 1000.0
+    return {
+        "ways": {name: int(count) for name, count in zip(CLASSES, ways)},
+        "km": {name: round(float(value), 1) for name, value in zip(CLASSES, km)},
+    }
+
+
+# ============================================================================
+# SWEEP / APPLY
+# ============================================================================
+
+def threshold_sweep(db_config, sharp_radii, broad_radii, min_turns, class_cuts, csv_path=None):
+    """
+    Scores every combination of the given thresholds from the stored histograms.
+    Returns the run report entry (one row per combination and class cut-off pair).
+    """
+    start_time = time.time()
+    combinations = [
+        (sharp, broad, turn)
+        for sharp, broad, turn in itertools.product(sharp_radii, broad_radii, min_turns)
+        if sharp <= broad
+    ]
+    for thresholds in combinations:
+        validate_thresholds(*thresholds)
+
+    histograms = load_histograms(db_config)
+    ways = len(histograms["way_id"])
+    load_elapsed = time.time() - start_time
+    log_print(
+        f"[curvature_thresholds] Loaded {ways:,} way histograms ({len(histograms['meters']):,} bins) "
+        f"in {load_elapsed:.2f} seconds"
+    )
+    if ways == 0:
+        log_print("[curvature_thresholds] No histograms in rs_curvature_way_summary; run the curvature step first",
+                  level='warning')
+
+    total = histograms["total_length_m"]
+    current = (SHARP_RADIUS_M, BROAD_RADIUS_M, round(float(np.degrees(MIN_TURN_ANGLE_RAD)), 6), CLASS_BROAD_SCORE, CLASS_SHARP_SCORE)
+    results = []
+    for sharp_radius_m, broad_radius_m, min_turn_deg in combinations:
+        scores = rebucket(histograms, sharp_radius_m, broad_radius_m, min_turn_deg)
+        score = scores["twistiness_score"]
+        scored = score[~np.isnan(score)]
+        percentiles = np.percentile(scored, [50, 90, 99]) if len(scored) else [None] * 3
+        for broad_score, sharp_score in class_cuts:
+            row = {
+                "sharp_radius_m": sharp_radius_m,
+                "broad_radius_m": broad_radius_m,
+                "min_turn_deg": min_turn_deg,
+                "broad_score": broad_score,
+                "sharp_score": sharp_score,
+                "current": (sharp_radius_m, broad_radius_m, min_turn_deg, broad_score, sharp_score) == current,
+                "km_sharp_meters": round(float(scores["meters_sharp"].sum()) / 1000.0, 1),
+                "km_broad_meters": round(float(scores["meters_broad"].sum()) / 1000.0, 1),
+                "score_p50": None if percentiles[0] is None else round(float(percentiles[0]), 4),
+                "score_p90": None if percentiles[1] is None else round(float(percentiles[1]), 4),
+                "score_p99": None if percentiles[2] is None else round(float(percentiles[2]), 4),
+            }
+            row.update(class_distribution(score, total, broad_score, sharp_score))
+            results.append(row)
+
+    log_print(
+        f"[curvature_thresholds] {'sharp_m':>7} {'broad_m':>7} {'turn':>5} {'cuts':>11} "
+        f"{'straight':>10} {'broad':>10} {'sharp':>10}  (ways)"
+    )
+    for row in results:
+        marker = " *" if row["current"] else ""
+        log_print(
+            f"[curvature_thresholds] {row['sharp_radius_m']:>7g} {row['broad_radius_m']:>7g} "
+            f"{row['min_turn_deg']:>5g} {row['broad_score']:>5g}/{row['sharp_score']:<5g} "
+            f"{row['ways']['straight']:>10,} {row['ways']['broad']:>10,} {row['ways']['sharp']:>10,}{marker}"
+        )
+
+    if csv_path:
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow([
+                "sharp_radius_m", "broad_radius_m", "min_turn_deg", "broad_score", "sharp_score",
+                *(f"ways_{name}" for name in CLASSES), *(f"km_{name}" for name in CLASSES),
+                "score_p50", "score_p90", "score_p99",
+            ])
+            for row in results:
+                writer.writerow([
+                    row["sharp_radius_m"], row["broad_radius_m"], row["min_turn_deg"],
+                    row["broad_score"], row["sharp_score"],
+                    *(row["ways"][name] for name in CLASSES), *(row["km"][name] for name in CLASSES),
+                    row["score_p50"], row["score_p90"], row["score_p99"],
+                ])
+        log_print(f"[curvature_thresholds] Sweep written to {csv_path}")
+
+    elapsed = time.time() - start_time
+    log_print(f"[curvature_thresholds] Scored {len(combinations)} threshold set(s) in {elapsed:.2f} seconds")
+    report = {
+        "ways": ways,
+        "combinations": results,
+        "load_elapsed_s": round(load_elapsed, 2),
+        "elapsed_s": round(elapsed, 2),
+    }
+    update_run_report("curvature_threshold_sweep", report)
+    return report
+
+
+def apply_thresholds(db_config, sharp_radius_m, broad_radius_m, min_turn_deg,
+                     broad_score=CLASS_BROAD_SCORE, sharp_score=CLASS_SHARP_SCORE):
+    """
+    Rewrites meters_* / twistiness_score / twistiness_class of every summary row
+    with a histogram for the given thresholds. input_hash is cleared: the stored
+    hashes are seeded with the engine's thresholds, so the next curvature_engine
+    run recomputes these rows with whatever thresholds it has then.
+    Returns the rows updated.
+    """
+    validate_thresholds(sharp_radius_m, broad_radius_m, min_turn_deg)
+    start_time = time.time()
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                WITH rebucketed AS (
+                    SELECT s.way_id, s.total_length_m, r.meters_sharp, r.meters_broad, r.meters_straight,
+                           (r.meters_sharp + 0.5 * r.meters_broad) / NULLIF(s.total_length_m, 0.0) AS twistiness_score
+                    FROM rs_curvature_way_summary AS s
+                    CROSS JOIN LATERAL rs_curvature_rebucket(
+                        s.histogram_bins, s.histogram_meters, %(sharp)s, %(broad)s, %(turn)s
+                    ) AS r
+                    WHERE s.histogram_bins IS NOT NULL
+                )
+                UPDATE rs_curvature_way_summary AS s
+                SET meters_sharp = r.meters_sharp,
+                    meters_broad = r.meters_broad,
+                    meters_straight = r.meters_straight,
+                    twistiness_score = r.twistiness_score,
+                    twistiness_class = rs_twistiness_class(r.twistiness_score, %(broad_score)s, %(sharp_score)s),
+                    input_hash = NULL
+                FROM rebucketed AS r
+                WHERE r.way_id = s.way_id;
+                """,
+                {
+                    "sharp": float(sharp_radius_m),
+                    "broad": float(broad_radius_m),
+                    "turn": float(min_turn_deg),
+                    "broad_score": float(broad_score),
+                    "sharp_score": float(sharp_score),
+                },
+            )
+            updated = cursor.rowcount
+    log_print(
+        f"[curvature_thresholds] Re-scored {updated:,} way summaries (sharp <= {sharp_radius_m:g} m, "
+        f"broad <= {broad_radius_m:g} m, turn >= {min_turn_deg:g} deg, cuts {broad_score:g}/{sharp_score:g}) "
+        f"in {time.time() - start_time:.2f} seconds; re-run 06_optional_update_osm_all_roads.sql to copy them"
+    )
+    update_run_report("curvature_thresholds_applied", {
+        "sharp_radius_m": sharp_radius_m,
+        "broad_radius_m": broad_radius_m,
+        "min_turn_deg": min_turn_deg,
+        "broad_score": broad_score,
+        "sharp_score": sharp_score,
+        "ways_updated": updated,
+    })
+    return updated
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    log_file = setup_logging("curvature_thresholds")
+    parser = argparse.ArgumentParser(description="Sweep or apply curvature thresholds from the stored histograms.")
+    parser.add_argument("--sharp-radii", default=CURVATURE_SWEEP_SHARP_RADII, help="Sharp radii to sweep (m).")
+    parser.add_argument("--broad-radii", default=CURVATURE_SWEEP_BROAD_RADII, help="Broad radii to sweep (m).")
+    parser.add_argument("--min-turns", default=CURVATURE_SWEEP_MIN_TURNS, help="Minimum turn angles to sweep (deg).")
+    parser.add_argument("--class-cuts", default=CURVATURE_SWEEP_CLASS_CUTS,
+                        help="broad/sharp score cut-off pairs, e.g. 0.03/0.08,0.04/0.10.")
+    parser.add_argument("--csv", help="Also write the sweep to this CSV file.")
+    parser.add_argument("--apply", metavar="SHARP,BROAD,TURN[,BROAD_SCORE,SHARP_SCORE]",
+                        help="Re-score rs_curvature_way_summary with one threshold set instead of sweeping.")
+    args = parser.parse_args()
+    db_config = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "name": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+    }
+    if args.apply:
+        apply_thresholds(db_config, *parse_list(args.apply))
+    else:
+        threshold_sweep(
+            db_config,
+            parse_list(args.sharp_radii),
+            parse_list(args.broad_radii),
+            parse_list(args.min_turns),
+            parse_class_cuts(args.class_cuts),
+            csv_path=args.csv,
+        )
+    write_run_report(log_file)
@@ -218,6 +218,7 @@ def main():
 
             # Build the UPDATE query
             # Logic: fourlane = 'yes' if oneway AND lanes >= 2, else 'no'
+            # The Lua3 import already writes fourlane; only rows from older imports (NULL) are updated
             update_query = """
 UPDATE osm_all_roads o
 SET fourlane = 
@@ -242,6 +243,7 @@ SET fourlane =
     ELSE 'no'
   END
 WHERE o.osm_id >= %s AND o.osm_id <= %s
+  AND o.fourlane IS NULL
             """
 
             # Add bbox filter if needed
@@ -243,6 +243,7 @@ def main():
                                 params={
                                     "grid_id_min": start_id,
                                     "grid_id_max": end_id,
+                                    "osm_id_filter_clause_r": "",  # all roads in the chunk
                                     **base_params,
                                 },
                             )
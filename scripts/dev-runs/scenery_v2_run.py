@@ -117,7 +117,7 @@ def import_raster(table_name, raster_path, db_config):
 
     # -d flag drops table if exists
     cmd = (
-        f'raster2pgsql -s 3857 -d -I -C -M -t {RASTER_TILE_SIZE}x{RASTER_TILE_SIZE} '
+        f'raster2pgsql -s 3857 -Y -d -I -C -M -t {RASTER_TILE_SIZE}x{RASTER_TILE_SIZE} '
         f'"{raster_path}" {table_name} | '
         f'psql -d {db_config["name"]} -U {db_config["user"]} '
         f'-h {db_config["host"]} -p {db_config["port"]}'
@@ -235,16 +235,10 @@ def create_roads_grid_mapping(conn, base_params):
                     r.osm_id,
                     g.grid_id
                 FROM osm_all_roads r
-                JOIN LATERAL (
-                    SELECT g.grid_id
-                    FROM public.india_grids_54009 g
-                    WHERE ST_Covers(
-                        g.geom_54009,
-                        ST_Transform(ST_PointOnSurface(r.geometry), 54009)
-                    )
-                    ORDER BY g.grid_id
-                    LIMIT 1
-                ) g ON TRUE
+                -- Cell by lattice arithmetic (01_create_india_grids.sql), no point-in-polygon lookup
+                CROSS JOIN LATERAL ST_PointOnSurface(r.geometry) AS p(geom)
+                JOIN public.india_grids_54009 g
+                  ON g.grid_id = rs_grid_id(ST_X(p.geom), ST_Y(p.geom))
                 WHERE r.bikable_road = TRUE
                   AND r.geometry IS NOT NULL
                   AND r.geometry && ST_MakeEnvelope(%(lon_min)s, %(lat_min)s, %(lon_max)s, %(lat_max)s, 4326)
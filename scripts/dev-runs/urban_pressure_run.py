@@ -123,7 +123,7 @@ def import_raster(table_name, raster_path, db_config):
         raise FileNotFoundError(f"Raster file not found: {raster_path}")
 
     cmd = (
-        f'raster2pgsql -s 54009 -I -C -M -t {RASTER_TILE_SIZE}x{RASTER_TILE_SIZE} '
+        f'raster2pgsql -s 54009 -Y -I -C -M -t {RASTER_TILE_SIZE}x{RASTER_TILE_SIZE} '
         f'"{raster_path}" {table_name} | '
         f'psql -d {db_config["name"]} -U {db_config["user"]} '
         f'-h {db_config["host"]} -p {db_config["port"]}'
@@ -95,6 +95,12 @@ def parse_args():
         default=None,
         help="Optional full output .osm.pbf path. If set, overrides --output-dir.",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Sample Python stacks (flamegraph .folded file next to the log) and trace "
+             "allocations while loading extra tags.",
+    )
     return parser.parse_args()
 
 
@@ -125,8 +131,9 @@ def main():
 
     try:
         import write_tags_to_pbf_2  # type: ignore
+        import profiling  # type: ignore
     except Exception as e:
-        logger.error("Failed to import write_tags_to_pbf_2 from %s: %s", scripts_dir, e)
+        logger.error("Failed to import write_tags_to_pbf_2 / profiling from %s: %s", scripts_dir, e)
         raise
 
     db_config = {
@@ -148,7 +155,12 @@ def main():
     if not os.path.exists(args.input_pbf):
         raise FileNotFoundError(f"Input PBF not found: {args.input_pbf}")
 
-    write_tags_to_pbf_2.write_tags_to_pbf(db_config=db_config, output_pbf_path=out_pbf)
+    if args.profile:
+        profiling.start_profiling(log_file)
+    try:
+        write_tags_to_pbf_2.write_tags_to_pbf(db_config=db_config, output_pbf_path=out_pbf)
+    finally:
+        profiling.stop_profiling()
 
     logger.info("Done. Output written to: %s", out_pbf)
     logger.info("Full log saved to: %s", log_file)
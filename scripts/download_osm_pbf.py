@@ -1,43 +1,513 @@
 #!/usr/bin/env python3
+"""
+Resumable, parallel, verified download of an OSM PBF (e.g. from Geofabrik).
+
+- Conditional fetch: the ETag / Last-Modified of the last download are kept in
+  <output>.meta.json and sent as If-None-Match / If-Modified-Since. The download
+  is skipped if the server reports the same ETag (an ETag decides alone), else
+  a 304 or the same Last-Modified, else (no validators at all) the same
+  replication timestamp in the remote PBF header as in the local file.
+- Ranged parallel download: when the server accepts byte ranges the file is
+  fetched in DOWNLOAD_PARALLEL_PARTS ranges written into <output>.part.
+- Resume: the bytes done per range are kept in <output>.part.json, so an
+  interrupted download continues where it stopped (as long as the ETag /
+  Last-Modified / size did not change in between). Range requests carry
+  If-Range, so a file replaced after the HEAD is answered with a full 200
+  and the download stops instead of splicing two versions.
+- Verification: the .part file is checked against the published <url>.md5
+  before it replaces <output>.
+
+Streaming mode (stream_download_prefilter): the file is fetched in order over a
+single connection and piped into the pre-filter (prefilter_pbf.py reading stdin,
+in a child process) while it arrives, so decoding and selecting the objects the
+import uses overlaps the network transfer. The stream is also written to disk,
+because the pre-filter reads the referenced nodes / ways from the complete file
+once the stream has ended; that copy is kept as <output> (DOWNLOAD_STREAM_KEEP_RAW)
+or deleted afterwards. A streamed download is not resumable.
+"""
 
 import os
+import json
+import time
+import hashlib
+import sys
+import logging
+import tempfile
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
-def download_osm_pbf(url: str, output_path: str, overwrite: bool = False) -> None:
+try:
+    from .utils import setup_logging, update_run_report
+except ImportError:
+    from utils import setup_logging, update_run_report
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# DOWNLOAD CONFIG (env overrides allowed)
+# ============================================================================
+DOWNLOAD_PARALLEL_PARTS = int(os.getenv("DOWNLOAD_PARALLEL_PARTS", 4))
+# Files smaller than this are fetched in one range
+DOWNLOAD_MIN_PART_MB = float(os.getenv("DOWNLOAD_MIN_PART_MB", 64))
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+# How often (bytes per range) the resume state is written
+DOWNLOAD_STATE_EVERY_BYTES = 32 * 1024 * 1024
+DOWNLOAD_TIMEOUT_S = float(os.getenv("DOWNLOAD_TIMEOUT_S", 60))
+# Bytes fetched to read the remote PBF header (the header block is the first blob)
+PBF_HEADER_PROBE_BYTES = 64 * 1024
+# Streaming mode: pipe the download into the pre-filter, and keep the raw PBF on disk afterwards
+DOWNLOAD_STREAM_PREFILTER = os.getenv("DOWNLOAD_STREAM_PREFILTER", "false").strip().lower() in ("1", "true", "yes", "y", "on")
+DOWNLOAD_STREAM_KEEP_RAW = os.getenv("DOWNLOAD_STREAM_KEEP_RAW", "true").strip().lower() in ("1", "true", "yes", "y", "on")
+
+PREFILTER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prefilter_pbf.py")
+
+
+class RemoteFileChanged(RuntimeError):
+    """The server answered a range request with the whole (changed) file (If-Range)."""
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def read_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def pbf_replication_timestamp(path):
+    """osmosis_replication_timestamp from a PBF header (None if missing / unreadable)."""
+    import osmium
+
+    try:
+        reader = osmium.io.Reader(path, osmium.osm.osm_entity_bits.NOTHING)
+        try:
+            return reader.header().get("osmosis_replication_timestamp") or None
+        finally:
+            reader.close()
+    except Exception:
+        return None
+
+
+def remote_replication_timestamp(session, url):
+    """Replication timestamp of the remote PBF, read from its first bytes."""
+    response = session.get(
+        url, headers={"Range": f"bytes=0-{PBF_HEADER_PROBE_BYTES - 1}"}, stream=True, timeout=DOWNLOAD_TIMEOUT_S
+    )
+    if response.status_code != 206:
+        response.close()
+        return None
+    with tempfile.NamedTemporaryFile(suffix=".osm.pbf", delete=False) as probe:
+        probe.write(response.raw.read(PBF_HEADER_PROBE_BYTES))
+        probe_path = probe.name
+    try:
+        return pbf_replication_timestamp(probe_path)
+    finally:
+        os.remove(probe_path)
+
+
+def remote_md5(session, url):
+    """Hex digest published next to the file (<url>.md5), or None."""
+    response = session.get(f"{url}.md5", timeout=DOWNLOAD_TIMEOUT_S)
+    if response.status_code != 200:
+        return None
+    text = response.text.strip()
+    return text.split()[0].lower() if text else None
+
+
+def file_md5(path):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_BYTES * 8), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remote_headers(session, url, meta=None):
+    """
+    Validators, size and range support the server reports for url (HEAD). With the
+    meta json of the local copy the request is conditional (If-None-Match, or
+    If-Modified-Since when no ETag was stored); not_modified is True on a 304.
+    """
+    meta = meta or {}
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    elif meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    head = session.head(url, headers=headers, allow_redirects=True, timeout=DOWNLOAD_TIMEOUT_S)
+    head.raise_for_status()
+    return {
+        "url": head.url,
+        "etag": head.headers.get("ETag"),
+        "last_modified": head.headers.get("Last-Modified"),
+        "size": int(head.headers["Content-Length"]) if head.headers.get("Content-Length") else None,
+        "accept_ranges": head.headers.get("Accept-Ranges", "").lower() == "bytes",
+        "not_modified": head.status_code == 304,
+    }
+
+
+def local_meta(output_path):
+    """Meta json of the last download into output_path ({} if there is none)."""
+    if not os.path.exists(output_path):
+        return {}
+    return read_json(f"{output_path}.meta.json") or {}
+
+
+def is_unchanged(session, url, output_path, remote):
+    """True if output_path already holds the file the server currently publishes."""
+    meta = local_meta(output_path)
+    # An ETag decides alone: a new ETag with the same Last-Modified is still a new file
+    if remote["etag"]:
+        if meta.get("etag") == remote["etag"]:
+            log_print(f"[download_osm_pbf] ETag unchanged ({remote['etag']})")
+            return True
+        return False
+    if remote["not_modified"]:
+        log_print("[download_osm_pbf] Server reports 304 Not Modified")
+        return True
+    if remote["last_modified"]:
+        if meta.get("last_modified") == remote["last_modified"]:
+            log_print(f"[download_osm_pbf] Last-Modified unchanged ({remote['last_modified']})")
+            return True
+        return False
+    local_ts = pbf_replication_timestamp(output_path)
+    if local_ts and local_ts == remote_replication_timestamp(session, url):
+        log_print(f"[download_osm_pbf] Replication timestamp unchanged ({local_ts})")
+        return True
+    return False
+
+
+def plan_ranges(size, accept_ranges):
+    """[start, end] byte ranges (inclusive) for the parallel download."""
+    if not accept_ranges or not size:
+        return [[0, (size or 0) - 1]]
+    min_part_bytes = max(1, int(DOWNLOAD_MIN_PART_MB * 1024 * 1024))
+    parts = max(1, min(DOWNLOAD_PARALLEL_PARTS, size // min_part_bytes))
+    part_size = -(-size // parts)
+    return [[start, min(start + part_size, size) - 1] for start in range(0, size, part_size)]
+
+
+def download_range(url, part_path, state, index, state_path, state_lock, progress):
+    """Fetches one byte range into its slot of the .part file, resuming from state['done'][index]."""
+    start, end = state["ranges"][index]
+    offset = start + state["done"][index]
+    if end >= 0 and offset > end:
+        return
+    headers = {}
+    if state["accept_ranges"]:
+        headers["Range"] = f"bytes={offset}-{end}"
+        # Only this version of the file: a changed one comes back whole (200)
+        validator = state.get("etag") or state.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+    # One connection per range (requests sessions are not thread-safe)
+    response = requests.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT_S)
+    response.raise_for_status()
+    if state["accept_ranges"] and response.status_code != 206:
+        response.close()
+        if response.status_code == 200 and "If-Range" in headers:
+            raise RemoteFileChanged(f"{url} changed during the download (If-Range {headers['If-Range']})")
+        raise RuntimeError(f"Server ignored the range request for {url} (status {response.status_code})")
+
+    since_state = 0
+    with open(part_path, "r+b") as part_file:
+        part_file.seek(offset)
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+            if not chunk:
+                continue
+            part_file.write(chunk)
+            with state_lock:
+                state["done"][index] += len(chunk)
+                progress["bytes"] += len(chunk)
+            since_state += len(chunk)
+            if since_state >= DOWNLOAD_STATE_EVERY_BYTES:
+                part_file.flush()
+                with state_lock:
+                    write_json(state_path, state)
+                since_state = 0
+        part_file.flush()
+    with state_lock:
+        write_json(state_path, state)
+
+
+def download_osm_pbf(url: str, output_path: str, overwrite: bool = False) -> bool:
     """
     Download an OSM PBF file from the given URL and save it to 'output_path'.
+    Returns True if a new file was downloaded, False if the local file is current.
 
     :param url: The URL of the OSM PBF file (e.g. a Geofabrik link).
     :param output_path: Local file path where the PBF should be saved.
-    :param overwrite: If True, overwrite existing file at output_path.
+    :param overwrite: If True, download even if the server reports the same file.
     """
-    # 1. Check if file already exists
-    if os.path.exists(output_path):
-        if not overwrite:
-            print(f"[download_osm_pbf] File already exists at {output_path}. Skipping download.")
-            return
-        else:
-            print(f"[download_osm_pbf] Overwriting existing file at {output_path}...")
+    start_time = time.time()
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    part_path = f"{output_path}.part"
+    state_path = f"{output_path}.part.json"
+
+    session = requests.Session()
+    remote = remote_headers(session, url, None if overwrite else local_meta(output_path))
+
+    # 1. Conditional fetch
+    if os.path.exists(output_path) and not overwrite and is_unchanged(session, url, output_path, remote):
+        log_print(f"[download_osm_pbf] {output_path} is up to date. Skipping download.")
+        update_run_report("download", {"url": url, "status": "unchanged", **remote})
+        return False
+
+    # 2. Resume a previous attempt of the same remote file, or start over
+    state = read_json(state_path)
+    if (
+        not os.path.exists(part_path)
+        or not state
+        or state.get("etag") != remote["etag"]
+        or state.get("last_modified") != remote["last_modified"]
+        or state.get("size") != remote["size"]
+        or not remote["accept_ranges"]
+    ):
+        ranges = plan_ranges(remote["size"], remote["accept_ranges"])
+        state = {
+            "etag": remote["etag"],
+            "last_modified": remote["last_modified"],
+            "size": remote["size"],
+            "accept_ranges": remote["accept_ranges"],
+            "ranges": ranges,
+            "done": [0] * len(ranges),
+        }
+        with open(part_path, "wb") as part_file:
+            if remote["size"]:
+                part_file.truncate(remote["size"])
+        write_json(state_path, state)
+    else:
+        log_print(f"[download_osm_pbf] Resuming: {sum(state['done']):,} of {remote['size']:,} bytes already downloaded")
 
-    print(f"[download_osm_pbf] Downloading from {url}...")
-    response = requests.get(url, stream=True)
-    response.raise_for_status()  # Raises an HTTPError if the response is not 200 OK
+    # 3. Ranged parallel download
+    log_print(f"[download_osm_pbf] Downloading from {url} in {len(state['ranges'])} range(s)...")
+    state_lock = threading.Lock()
+    progress = {"bytes": 0}
+    with ThreadPoolExecutor(max_workers=len(state["ranges"]), thread_name_prefix="download") as executor:
+        futures = [
+            executor.submit(download_range, url, part_path, state, index, state_path, state_lock, progress)
+            for index in range(len(state["ranges"]))
+        ]
+        changed = None
+        try:
+            for future in futures:
+                future.result()
+        except RemoteFileChanged as e:
+            changed = e
+    if changed:
+        # The ranges done so far belong to the old version; the next run starts over
+        for path in (part_path, state_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise changed
+    download_elapsed = time.time() - start_time
 
-    # 2. Stream download in chunks
-    with open(output_path, 'wb') as file_out:
-        chunk_size = 1024 * 1024  # 1 MB chunks
-        for chunk in response.iter_content(chunk_size=chunk_size):
-            if chunk:  # filter out keep-alive new chunks
-                file_out.write(chunk)
+    # 4. Verify against the published md5
+    expected_md5 = remote_md5(session, url)
+    if expected_md5:
+        actual_md5 = file_md5(part_path)
+        if actual_md5 != expected_md5:
+            os.remove(part_path)
+            os.remove(state_path)
+            raise RuntimeError(f"MD5 mismatch for {url}: expected {expected_md5}, got {actual_md5}")
+        log_print(f"[download_osm_pbf] MD5 verified ({actual_md5})")
+    else:
+        log_print(f"[download_osm_pbf] No {url}.md5 published; download not verified", level='warning')
 
-    print(f"[download_osm_pbf] Download complete. File saved to {output_path}")
+    os.replace(part_path, output_path)
+    os.remove(state_path)
+    write_json(f"{output_path}.meta.json", {
+        "url": url,
+        "etag": remote["etag"],
+        "last_modified": remote["last_modified"],
+        "size": os.path.getsize(output_path),
+        "md5": expected_md5,
+        "replication_timestamp": pbf_replication_timestamp(output_path),
+    })
+
+    size_mb = os.path.getsize(output_path) / (1024 * 1024)
+    log_print(
+        f"[download_osm_pbf] Download complete ({size_mb:,.0f} MB, {progress['bytes'] / (1024 * 1024):,.0f} MB this run, "
+        f"{download_elapsed:.2f} s). File saved to {output_path}"
+    )
+    update_run_report("download", {
+        "url": url,
+        "status": "downloaded",
+        **remote,
+        "ranges": len(state["ranges"]),
+        "bytes_this_run": progress["bytes"],
+        "md5_verified": bool(expected_md5),
+        "elapsed_s": round(time.time() - start_time, 2),
+    })
+    return True
+
+
+def partial_path(path):
+    """Hidden in-progress name next to path that keeps the .osm.pbf suffix (osmium detects the format from it)."""
+    return os.path.join(os.path.dirname(path), f".partial-{os.path.basename(path)}")
+
+
+def stream_download_prefilter(url: str, raw_path: str, filtered_path: str, keep_raw: bool = DOWNLOAD_STREAM_KEEP_RAW,
+                              overwrite: bool = False) -> bool:
+    """
+    Downloads url and pre-filters it in one pass: the bytes go to the pre-filter's
+    stdin and to disk as they arrive. Writes filtered_path (and raw_path if keep_raw).
+    Returns True if a new file was downloaded, False if the local files are current.
+    """
+    start_time = time.time()
+    for path in (raw_path, filtered_path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Without the raw file the filtered one carries the meta json for the conditional fetch
+    local_path = raw_path if keep_raw else filtered_path
+
+    session = requests.Session()
+    remote = remote_headers(
+        session, url, None if overwrite or not os.path.exists(filtered_path) else local_meta(local_path)
+    )
+    if (
+        os.path.exists(local_path)
+        and os.path.exists(filtered_path)
+        and not overwrite
+        and is_unchanged(session, url, local_path, remote)
+    ):
+        log_print(f"[download_osm_pbf] {filtered_path} is up to date. Skipping download.")
+        update_run_report("download", {"url": url, "status": "unchanged", "mode": "stream", **remote})
+        return False
+
+    spool_path = partial_path(raw_path)
+    filtered_tmp_path = partial_path(filtered_path)
+    cmd = [
+        sys.executable, PREFILTER_SCRIPT, "-",
+        "--output-pbf", filtered_tmp_path,
+        "--ref-src", spool_path,
+        "--force",
+    ]
+    log_print(f"[download_osm_pbf] Streaming {url} into the pre-filter: {' '.join(cmd)}")
+    prefilter = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    digest = hashlib.md5()
+    received = 0
+    try:
+        response = session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT_S)
+        response.raise_for_status()
+        with open(spool_path, "wb") as spool:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                if not chunk:
+                    continue
+                digest.update(chunk)
+                spool.write(chunk)
+                received += len(chunk)
+                try:
+                    prefilter.stdin.write(chunk)
+                except BrokenPipeError:
+                    # The pre-filter stopped reading; its exit code says why
+                    break
+        stream_elapsed = time.time() - start_time
+        # EOF for the pre-filter; the spool is complete for its back-reference pass
+        try:
+            prefilter.stdin.close()
+        except BrokenPipeError:
+            pass
+        if prefilter.wait() != 0:
+            raise subprocess.CalledProcessError(prefilter.returncode, cmd)
+        if remote["size"] and received != remote["size"]:
+            raise RuntimeError(f"Incomplete download of {url}: {received:,} of {remote['size']:,} bytes")
+
+        expected_md5 = remote_md5(session, url)
+        actual_md5 = digest.hexdigest()
+        if expected_md5 and actual_md5 != expected_md5:
+            raise RuntimeError(f"MD5 mismatch for {url}: expected {expected_md5}, got {actual_md5}")
+        if expected_md5:
+            log_print(f"[download_osm_pbf] MD5 verified ({actual_md5})")
+        else:
+            log_print(f"[download_osm_pbf] No {url}.md5 published; download not verified", level='warning')
+    except BaseException:
+        if prefilter.poll() is None:
+            prefilter.kill()
+            prefilter.wait()
+        for path in (spool_path, filtered_tmp_path, f"{filtered_tmp_path}.filter.json"):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    replication_timestamp = pbf_replication_timestamp(spool_path)
+    # The pre-filter recorded the spool's size / mtime next to its output (<output>.filter.json);
+    # os.replace keeps both, so prefilter_pbf reuses the filtered file for the kept raw file
+    if keep_raw:
+        os.replace(spool_path, raw_path)
+    else:
+        os.remove(spool_path)
+    os.replace(filtered_tmp_path, filtered_path)
+    os.replace(f"{filtered_tmp_path}.filter.json", f"{filtered_path}.filter.json")
+    write_json(f"{local_path}.meta.json", {
+        "url": url,
+        "etag": remote["etag"],
+        "last_modified": remote["last_modified"],
+        "size": received,
+        "md5": expected_md5,
+        "replication_timestamp": replication_timestamp,
+    })
+
+    elapsed = time.time() - start_time
+    log_print(
+        f"[download_osm_pbf] Streamed {received / (1024 * 1024):,.0f} MB in {stream_elapsed:.2f} s; "
+        f"filtered PBF ready {elapsed - stream_elapsed:.2f} s later ({filtered_path})"
+    )
+    update_run_report("download", {
+        "url": url,
+        "status": "downloaded",
+        "mode": "stream",
+        **remote,
+        "raw_kept": keep_raw,
+        "filtered_path": filtered_path,
+        "md5_verified": bool(expected_md5),
+        "stream_elapsed_s": round(stream_elapsed, 2),
+        "prefilter_tail_s": round(elapsed - stream_elapsed, 2),
+        "elapsed_s": round(elapsed, 2),
+    })
+    return True
 
 
-# Example standalone usage:
 if __name__ == "__main__":
-    # Just a demo call:
-    # download_osm_pbf(
-    #     url="https://download.geofabrik.de/asia/india-latest.osm.pbf",
-    #     output_path="./india-latest.osm.pbf"
-    # )
-    pass
+    import argparse
+
+    setup_logging("download_osm_pbf")
+    parser = argparse.ArgumentParser(description="Download an OSM PBF (resumable, parallel, md5-verified).")
+    parser.add_argument("url", help="PBF URL, e.g. https://download.geofabrik.de/asia/india-latest.osm.pbf")
+    parser.add_argument("output_path", help="Local output path.")
+    parser.add_argument("--overwrite", action="store_true", help="Download even if the file is unchanged.")
+    parser.add_argument("--stream-prefilter", metavar="FILTERED_PBF", default=None,
+                        help="Pipe the download into the pre-filter and write the filtered PBF here.")
+    parser.add_argument("--no-keep-raw", action="store_true", help="With --stream-prefilter: delete the raw PBF afterwards.")
+    args = parser.parse_args()
+    if args.stream_prefilter:
+        stream_download_prefilter(
+            args.url, args.output_path, args.stream_prefilter, keep_raw=not args.no_keep_raw, overwrite=args.overwrite
+        )
+    else:
+        download_osm_pbf(args.url, args.output_path, overwrite=args.overwrite)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+india_grids cell addressing by lattice arithmetic.
+
+01_create_india_grids.sql lays india_grids out on a regular lattice and stores its
+origin in rs_grid_lattice; grid_id = grid_row * n_cols + grid_col, where grid_col /
+grid_row count cell_deg steps from the origin. grid_id() below is the Python side
+of the SQL function rs_grid_id(lon, lat): same formula, same float64 arithmetic,
+so both agree on every point (cells dropped as invalid simply have no india_grids row).
+"""
+
+import logging
+
+import numpy as np
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# grid_id() for points outside the lattice (rs_grid_id returns NULL)
+GRID_ID_NONE = -1
+
+
+def load_grid_lattice(cursor):
+    """Reads rs_grid_lattice. Returns a dict of lon_origin, lat_origin, cell_deg, n_cols, n_rows."""
+    cursor.execute("SELECT to_regclass('rs_grid_lattice') IS NOT NULL;")
+    if not cursor.fetchone()[0]:
+        raise RuntimeError("rs_grid_lattice not found; run sql/road_classification/01_create_india_grids.sql first")
+    cursor.execute("SELECT lon_origin, lat_origin, cell_deg, n_cols, n_rows FROM rs_grid_lattice;")
+    row = cursor.fetchone()
+    if row is None:
+        raise RuntimeError("rs_grid_lattice is empty; run sql/road_classification/01_create_india_grids.sql first")
+    lon_origin, lat_origin, cell_deg, n_cols, n_rows = row
+    return {
+        "lon_origin": float(lon_origin),
+        "lat_origin": float(lat_origin),
+        "cell_deg": float(cell_deg),
+        "n_cols": int(n_cols),
+        "n_rows": int(n_rows),
+    }
+
+
+def grid_id(lon, lat, lattice):
+    """
+    grid_id of the cell containing (lon, lat), like rs_grid_id(lon, lat).
+    Scalars or arrays (broadcast); GRID_ID_NONE outside the lattice.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        col = np.floor((lon - lattice["lon_origin"]) / lattice["cell_deg"])
+        row = np.floor((lat - lattice["lat_origin"]) / lattice["cell_deg"])
+        inside = (col >= 0) & (col < lattice["n_cols"]) & (row >= 0) & (row < lattice["n_rows"])
+    ids = np.where(inside, row * lattice["n_cols"] + col, GRID_ID_NONE).astype(np.int64)
+    return int(ids) if ids.ndim == 0 else ids
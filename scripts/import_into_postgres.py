@@ -2,18 +2,35 @@
 
 import os
 import sys
+import time
 import subprocess
 from datetime import datetime
 import logging
 
 try:
-    from .utils import setup_logging
+    from .utils import setup_logging, update_run_report
+    from .prefilter_pbf import prefilter_pbf
+    from .import_planner import plan_import, parse_phase_timing
+    from .regional_import import regional_import
 except ImportError:
-    from utils import setup_logging
+    from utils import setup_logging, update_run_report
+    from prefilter_pbf import prefilter_pbf
+    from import_planner import plan_import, parse_phase_timing
+    from regional_import import regional_import
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
+# Pre-filter the PBF (pyosmium) to the objects the Lua script uses before osm2pgsql
+IMPORT_PREFILTER_PBF = os.getenv("IMPORT_PREFILTER_PBF", "true").strip().lower() in ("1", "true", "yes", "y", "on")
+# Optional output path for the filtered PBF (default: <input>-filtered.osm.pbf)
+IMPORT_FILTERED_PBF_PATH = os.getenv("IMPORT_FILTERED_PBF_PATH") or None
+# osm2pgsql --cache / --flat-nodes / --number-processes / indexing are planned from the
+# hardware and the (filtered) PBF size in import_planner.py (OSM2PGSQL_* env overrides)
+# > 1: split the PBF into this many longitude bands and import them concurrently
+# (regional_import.py); the middle tables are dropped, so no --append updates afterwards
+IMPORT_REGIONS = int(os.getenv("IMPORT_REGIONS", 1))
+
 def log_print(message, level='info'):
     """Print to console and log to file."""
     print(message)
@@ -50,10 +67,11 @@ def table_exists(db_name, db_user, db_host, db_port, db_password, table_name):
     return result.stdout.strip() == table_name
 
 
-def import_into_postgres(pbf_file, db_config, style_lua_script):
+def import_into_postgres(pbf_file, db_config, style_lua_script, prefiltered=False):
     """
     Imports an OSM PBF file into Postgres using osm2pgsql flex mode.
     Before that, it creates the postgis, postgis_raster and hstore extensions if they don't exist.
+    prefiltered=True: pbf_file is already the pre-filtered PBF (streamed download).
     """
 
     db_name = db_config.get("name", "ridesense_db")
@@ -105,7 +123,29 @@ def import_into_postgres(pbf_file, db_config, style_lua_script):
 
     log_print("[import_into_postgres] PostGIS, PostGIS Raster, and HSTORE extensions are set up.")
 
-    # 2. Run osm2pgsql to import the PBF
+    # 2. Pre-filter the PBF to the objects the Lua script actually uses
+    if IMPORT_PREFILTER_PBF and not prefiltered:
+        log_print("[import_into_postgres] Pre-filtering PBF before import...")
+        pbf_file = prefilter_pbf(pbf_file, IMPORT_FILTERED_PBF_PATH)
+
+    # 3. Plan cache / flat-nodes / processes / indexing for this machine and input
+    import_plan = plan_import(pbf_file)
+
+    # 4. Run osm2pgsql to import the PBF
+    if IMPORT_REGIONS > 1:
+        log_print(f"[import_into_postgres] Starting regional osm2pgsql import ({IMPORT_REGIONS} regions)...")
+        start_time = time.time()
+        regional_report = regional_import(pbf_file, db_config, style_lua_script, IMPORT_REGIONS, import_plan)
+        elapsed = time.time() - start_time
+        update_run_report("osm2pgsql_import", {
+            "plan": {k: v for k, v in import_plan.items() if k != "args"},
+            "regional": regional_report,
+            "elapsed_s": round(elapsed, 2),
+        })
+        log_print(f"[import_into_postgres] Regional import completed successfully in {elapsed:.2f} seconds!")
+        validate_import(db_config, env)
+        return
+
     log_print("[import_into_postgres] Starting osm2pgsql import...")
     cmd_osm2pgsql = [
         "osm2pgsql",
@@ -116,7 +156,7 @@ def import_into_postgres(pbf_file, db_config, style_lua_script):
         "-P", db_port,
         "--slim",
         # --hstore is not used with flex output, so it's removed.
-        "--cache", "16384",  # Add cache for better performance, in MB. Adjust based on your system's RAM.
+        *import_plan["args"],  # --cache, --number-processes, [--flat-nodes], [--disable-parallel-indexing], [--drop]
         #"--verbose",  # Add verbose for more detailed output
         "--output=flex",
         f"--style={style_lua_script}",
@@ -124,8 +164,22 @@ def import_into_postgres(pbf_file, db_config, style_lua_script):
     ]
 
     log_print(f"[import_into_postgres] Running command: {' '.join(cmd_osm2pgsql)}")
-    process = subprocess.Popen(cmd_osm2pgsql, env=env)
+    phase_timings = {}
+    start_time = time.time()
+    # osm2pgsql logs to stderr; stream it through log_print and pick out the phase timings
+    process = subprocess.Popen(
+        cmd_osm2pgsql, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
+    )
     try:
+        for line in process.stdout:
+            line = line.rstrip()
+            if not line:
+                continue
+            log_print(f"[osm2pgsql] {line}")
+            timing = parse_phase_timing(line)
+            if timing:
+                phase, seconds = timing
+                phase_timings[phase] = seconds
         process.wait()
     except KeyboardInterrupt:
         log_print("\n[import_into_postgres] Keyboard interrupt received, terminating osm2pgsql...", level='warning')
@@ -139,13 +193,32 @@ def import_into_postgres(pbf_file, db_config, style_lua_script):
         # Re-raise the exception to ensure the script exits
         raise
 
+    elapsed = time.time() - start_time
+    update_run_report("osm2pgsql_import", {
+        "plan": {k: v for k, v in import_plan.items() if k != "args"},
+        "command": cmd_osm2pgsql,
+        "returncode": process.returncode,
+        "elapsed_s": round(elapsed, 2),
+        "phase_timings_s": phase_timings,
+    })
+
     if process.returncode != 0:
         log_print(f"[import_into_postgres] Import failed with return code {process.returncode}", level='error')
         raise subprocess.CalledProcessError(process.returncode, cmd_osm2pgsql)
 
-    log_print("[import_into_postgres] Import completed successfully!")
+    log_print(f"[import_into_postgres] Import completed successfully in {elapsed:.2f} seconds!")
     
-    # 3. Validate that import created required tables (CRITICAL CHECK)
+    # 5. Validate that import created required tables (CRITICAL CHECK)
+    validate_import(db_config, env)
+
+
+def validate_import(db_config, env):
+    """Runs 00_validate_import.sql; raises if the import cannot be used for curvature."""
+    db_name = db_config.get("name", "ridesense_db")
+    db_user = db_config.get("user", "postgres")
+    db_host = db_config.get("host", "localhost")
+    db_port = str(db_config.get("port", 5432))
+
     log_print("[import_into_postgres] Validating import - checking required tables exist...")
     validation_script = os.path.join(
         os.path.dirname(os.path.dirname(__file__)),  # Go up from scripts/ to root
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Hardware-aware planning for the osm2pgsql import.
+
+Sizes --cache, --flat-nodes, --number-processes and the post-import index
+strategy from detected RAM, cores, free disk and the input PBF size, instead
+of a hardcoded --cache 16384. Every choice can be pinned with an env var.
+
+Also parses osm2pgsql's log output into phase timings for the run report.
+"""
+
+import os
+import re
+import shutil
+import logging
+
+import psutil
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# PLANNER CONFIGURATION (env overrides allowed)
+# ============================================================================
+# Pin values (unset = planned)
+OSM2PGSQL_CACHE_MB = os.getenv("OSM2PGSQL_CACHE_MB") or None
+OSM2PGSQL_NUMBER_PROCESSES = os.getenv("OSM2PGSQL_NUMBER_PROCESSES") or None
+# auto | true | false
+OSM2PGSQL_FLAT_NODES = os.getenv("OSM2PGSQL_FLAT_NODES", "auto").strip().lower()
+# Directory for the flat-nodes file (local disk; default: next to the PBF)
+OSM2PGSQL_FLAT_NODES_DIR = os.getenv("OSM2PGSQL_FLAT_NODES_DIR") or None
+# Drop the slim middle tables after import (smaller DB, but no --append updates afterwards)
+OSM2PGSQL_DROP_MIDDLE = os.getenv("OSM2PGSQL_DROP_MIDDLE", "false").strip().lower() in ("1", "true", "yes", "y", "on")
+
+# Node cache needed ~ PBF size (locations of the nodes the file references)
+CACHE_TO_PBF_RATIO = float(os.getenv("OSM2PGSQL_CACHE_TO_PBF_RATIO", 1.1))
+# Share of available RAM osm2pgsql may use for its cache (rest: Postgres, OS page cache)
+CACHE_RAM_FRACTION = float(os.getenv("OSM2PGSQL_CACHE_RAM_FRACTION", 0.6))
+# Flat-nodes file is max_node_id * 8 bytes, independent of the extract size
+FLAT_NODES_FILE_GB = float(os.getenv("OSM2PGSQL_FLAT_NODES_FILE_GB", 110))
+# Below this much RAM left after the cache, build indexes one table at a time
+PARALLEL_INDEXING_MIN_FREE_GB = float(os.getenv("OSM2PGSQL_PARALLEL_INDEXING_MIN_FREE_GB", 8))
+# Rough memory per osm2pgsql worker process
+MEMORY_PER_PROCESS_GB = float(os.getenv("OSM2PGSQL_MEMORY_PER_PROCESS_GB", 1.0))
+
+FLAT_NODES_FILENAME = "osm2pgsql-flat-nodes.bin"
+
+# osm2pgsql log lines -> phase timings (1.x and 2.x wording)
+PHASE_PATTERNS = [
+    (re.compile(r"Reading input files done in (\d+)s"), lambda m: ("reading_input_s", int(m.group(1)))),
+    (re.compile(r"Processed ([\d,]+) (nodes|ways|relations) in (\d+)s"), lambda m: (f"{m.group(2)}_s", int(m.group(3)))),
+    (re.compile(r"(Node|Way|Relation) stats: total\(\d+\), max\(\d+\) in (\d+)s"), lambda m: (f"{m.group(1).lower()}s_s", int(m.group(2)))),
+    (re.compile(r"Going over pending ways.*?done in (\d+)s"), lambda m: ("pending_ways_s", int(m.group(1)))),
+    (re.compile(r"Going over pending relations.*?done in (\d+)s"), lambda m: ("pending_relations_s", int(m.group(1)))),
+    (re.compile(r"All postprocessing on table '([^']+)' done in (\d+)s"), lambda m: (f"postprocessing/{m.group(1)}_s", int(m.group(2)))),
+    (re.compile(r"All indexes on '([^']+)' created in (\d+)s"), lambda m: (f"indexes/{m.group(1)}_s", int(m.group(2)))),
+    (re.compile(r"osm2pgsql took (\d+)s"), lambda m: ("osm2pgsql_total_s", int(m.group(1)))),
+]
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def detect_hardware(pbf_file, flat_nodes_dir):
+    """Returns the resources the plan is based on (GB / MB / counts)."""
+    memory = psutil.virtual_memory()
+    disk_dir = flat_nodes_dir if os.path.isdir(flat_nodes_dir) else os.path.dirname(os.path.abspath(pbf_file))
+    return {
+        "ram_total_gb": round(memory.total / 1024 ** 3, 1),
+        "ram_available_gb": round(memory.available / 1024 ** 3, 1),
+        "cpu_cores": os.cpu_count() or 1,
+        "flat_nodes_dir": disk_dir,
+        "disk_free_gb": round(shutil.disk_usage(disk_dir).free / 1024 ** 3, 1),
+        "pbf_size_mb": round(os.path.getsize(pbf_file) / 1024 ** 2, 1),
+    }
+
+
+def flat_nodes_path(pbf_file):
+    """Location of the flat-nodes file for this PBF (also reused by --append updates)."""
+    flat_nodes_dir = OSM2PGSQL_FLAT_NODES_DIR or os.path.dirname(os.path.abspath(pbf_file))
+    return os.path.join(flat_nodes_dir, FLAT_NODES_FILENAME)
+
+
+def plan_import(pbf_file):
+    """
+    Decides the osm2pgsql resource options for this machine and input.
+    Returns a dict with the chosen values, the detected hardware and the
+    reasons, plus 'args' (the extra osm2pgsql command line arguments).
+    """
+    flat_nodes_dir = OSM2PGSQL_FLAT_NODES_DIR or os.path.dirname(os.path.abspath(pbf_file))
+    hw = detect_hardware(pbf_file, flat_nodes_dir)
+    reasons = []
+
+    cache_needed_mb = int(hw["pbf_size_mb"] * CACHE_TO_PBF_RATIO)
+    cache_budget_mb = int(hw["ram_available_gb"] * 1024 * CACHE_RAM_FRACTION)
+    flat_nodes_fits = hw["disk_free_gb"] >= FLAT_NODES_FILE_GB * 1.1
+
+    # Node store: RAM cache if it fits, otherwise a memory-mapped flat-nodes file on local disk
+    if OSM2PGSQL_FLAT_NODES in ("true", "yes", "1"):
+        use_flat_nodes = True
+        reasons.append("flat-nodes forced by OSM2PGSQL_FLAT_NODES")
+    elif OSM2PGSQL_FLAT_NODES in ("false", "no", "0"):
+        use_flat_nodes = False
+        reasons.append("flat-nodes disabled by OSM2PGSQL_FLAT_NODES")
+    elif cache_needed_mb <= cache_budget_mb:
+        use_flat_nodes = False
+        reasons.append(f"node cache ({cache_needed_mb} MB) fits in {cache_budget_mb} MB RAM budget")
+    elif flat_nodes_fits:
+        use_flat_nodes = True
+        reasons.append(
+            f"node cache ({cache_needed_mb} MB) exceeds RAM budget ({cache_budget_mb} MB); "
+            f"using flat-nodes ({FLAT_NODES_FILE_GB:.0f} GB file, {hw['disk_free_gb']} GB free)"
+        )
+    else:
+        use_flat_nodes = False
+        reasons.append(
+            f"node cache ({cache_needed_mb} MB) exceeds RAM budget ({cache_budget_mb} MB) and there is "
+            f"not enough disk for flat-nodes; cache capped, osm2pgsql will fall back to the database"
+        )
+
+    if OSM2PGSQL_CACHE_MB is not None:
+        cache_mb = int(OSM2PGSQL_CACHE_MB)
+        reasons.append("cache pinned by OSM2PGSQL_CACHE_MB")
+    elif use_flat_nodes:
+        # Flat-nodes holds the locations; the cache would only duplicate them
+        cache_mb = 0
+    else:
+        cache_mb = max(256, min(cache_needed_mb, cache_budget_mb))
+
+    ram_left_gb = max(0.0, hw["ram_available_gb"] - cache_mb / 1024)
+    if OSM2PGSQL_NUMBER_PROCESSES is not None:
+        number_processes = int(OSM2PGSQL_NUMBER_PROCESSES)
+        reasons.append("processes pinned by OSM2PGSQL_NUMBER_PROCESSES")
+    else:
+        number_processes = max(1, min(hw["cpu_cores"], int(ram_left_gb / MEMORY_PER_PROCESS_GB)))
+
+    # Index strategy: parallel index builds each take maintenance_work_mem
+    parallel_indexing = ram_left_gb >= PARALLEL_INDEXING_MIN_FREE_GB
+    reasons.append(
+        f"{'parallel' if parallel_indexing else 'sequential'} index builds "
+        f"({ram_left_gb:.1f} GB RAM left after cache)"
+    )
+
+    args = ["--cache", str(cache_mb), "--number-processes", str(number_processes)]
+    flat_nodes_file = None
+    if use_flat_nodes:
+        flat_nodes_file = flat_nodes_path(pbf_file)
+        args.append(f"--flat-nodes={flat_nodes_file}")
+    if not parallel_indexing:
+        args.append("--disable-parallel-indexing")
+    if OSM2PGSQL_DROP_MIDDLE:
+        args.append("--drop")
+        reasons.append("slim middle tables dropped after import (OSM2PGSQL_DROP_MIDDLE)")
+
+    plan = {
+        "hardware": hw,
+        "cache_mb": cache_mb,
+        "flat_nodes": flat_nodes_file,
+        "number_processes": number_processes,
+        "parallel_indexing": parallel_indexing,
+        "drop_middle": OSM2PGSQL_DROP_MIDDLE,
+        "reasons": reasons,
+        "args": args,
+    }
+
+    log_print(
+        f"[import_planner] RAM {hw['ram_available_gb']}/{hw['ram_total_gb']} GB available, "
+        f"{hw['cpu_cores']} cores, {hw['disk_free_gb']} GB free in {hw['flat_nodes_dir']}, "
+        f"PBF {hw['pbf_size_mb']} MB"
+    )
+    log_print(f"[import_planner] Plan: {' '.join(args)}")
+    for reason in reasons:
+        log_print(f"[import_planner]   - {reason}")
+    return plan
+
+
+def parse_phase_timing(line):
+    """Returns (phase, seconds) if the osm2pgsql log line reports a phase timing, else None."""
+    for pattern, extract in PHASE_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            return extract(match)
+    return None
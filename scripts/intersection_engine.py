@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Intersection speed degradation v2 computed in NumPy instead of SQL.
+
+The SQL steps 01-04 of sql/road_intersection_density categorize the junctions
+into session TEMP tables, map them onto the ways and compute the per-way
+degradation with correlated subqueries per way. This engine instead loads
+
+    (node_id, way_id, mid_count, road_type_count, top_1, top_2)   one row per junction / way, ordered by node_id
+    (way_id, setting, lanes, oneway, length_m)   one row per bikable way
+
+with binary COPY from rs_junction_index (sql/road_classification/09_build_junction_index.sql)
+and osm_all_roads, builds the junction -> way adjacency as CSR arrays (indptr per
+junction, way positions per edge) and computes vectorised:
+
+- intersection categories (major / middling / minor from the 2 highest-hierarchy road
+  types of the junction index, ranked over way occurrences like SQL step 01)
+- impact distance and speed reduction of every junction on each of its ways
+- base degradation per way (weighted average, or multiplicative stacking on ways
+  shorter than their largest impact distance)
+- setting-adjusted and final degradation (setting multiplier, rural lanes+oneway factor)
+
+The three intersection_speed_degradation_* columns are COPYed into a staging table
+and written with one UPDATE.
+
+Rules mirror 01_find_and_categorize_intersections_v2.sql - 04_calculate_final_degradation_v2.sql;
+keep them in sync.
+"""
+
+import os
+import time
+import logging
+
+import numpy as np
+import psycopg
+
+try:
+    from .utils import setup_logging, substitute_sql_params, update_run_report, write_run_report
+    from .curvature_thresholds import copy_rows
+except ImportError:
+    from utils import setup_logging, substitute_sql_params, update_run_report, write_run_report
+    from curvature_thresholds import copy_rows
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# RULES (mirror sql/road_intersection_density)
+# ============================================================================
+# rs_road_type_hierarchy: NH 8, SH 7, MDR 6, OH 5 (Set A), HAdj 4, WoH 3, Track 2, Path / Res 1 (Set B)
+SET_A_MIN_HIERARCHY = 5
+
+CATEGORY_NONE, CATEGORY_MAJOR, CATEGORY_MIDDLING, CATEGORY_MINOR = 0, 1, 2, 3
+CATEGORY_NAMES = ("none", "major", "middling", "minor")
+# (impact distance m, speed reduction) per category; minor only affects Urban ways
+IMPACT_DISTANCE_M = np.array([0.0, 50.0, 25.0, 10.0])
+SPEED_REDUCTION = np.array([0.0, 0.75, 0.5, 0.25])
+MIN_SURVIVING_SPEED = 0.0001  # LN guard of the multiplicative stacking
+
+# road_setting_i1 codes of the way query
+SETTING_OTHER, SETTING_URBAN, SETTING_SEMIURBAN, SETTING_RURAL = 0, 1, 2, 3
+SETTING_MULTIPLIER = np.array([1.0, 1.0, 0.75, 0.5])
+LANES_ONEWAY_FACTOR = 0.8  # Rural oneway ways with more than 2 lanes
+LANES_ONEWAY_MIN_LANES = 2
+MAX_DEGRADATION = 0.5
+
+STAGING_TABLE = "tmp_intersection_degradation"
+
+# Binary COPY layouts (see curvature_engine.ROW_DTYPE)
+EDGE_ROW_DTYPE = np.dtype([
+    ("fields", ">i2"),
+    ("node_id_len", ">i4"), ("node_id", ">i8"),
+    ("way_id_len", ">i4"), ("way_id", ">i8"),
+    ("mid_count_len", ">i4"), ("mid_count", ">i4"),
+    ("road_type_count_len", ">i4"), ("road_type_count", ">i4"),
+    ("top_1_len", ">i4"), ("top_1", ">i4"),
+    ("top_2_len", ">i4"), ("top_2", ">i4"),
+])
+WAY_ROW_DTYPE = np.dtype([
+    ("fields", ">i2"),
+    ("way_id_len", ">i4"), ("way_id", ">i8"),
+    ("setting_len", ">i4"), ("setting", ">i4"),
+    ("lanes_len", ">i4"), ("lanes", ">i4"),
+    ("oneway_len", ">i4"), ("oneway", "?"),
+    ("length_len", ">i4"), ("length_m", ">f8"),
+])
+RESULT_ROW_DTYPE = np.dtype([
+    ("fields", ">i2"),
+    ("way_id_len", ">i4"), ("way_id", ">i8"),
+    ("base_len", ">i4"), ("base", ">f8"),
+    ("adjusted_len", ">i4"), ("adjusted", ">f8"),
+    ("final_len", ">i4"), ("final", ">f8"),
+])
+COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + b"\x00" * 8  # + int32 flags + int32 header extension length
+COPY_TRAILER = b"\xff\xff"
+COPY_WRITE_ROWS = 1_000_000
+
+WAY_COLUMNS = """
+    o.osm_id,
+    CASE o.road_setting_i1
+        WHEN 'Urban' THEN 1
+        WHEN 'SemiUrban' THEN 2
+        WHEN 'Rural' THEN 3
+        ELSE 0
+    END,
+    COALESCE(o.lanes_count, 0),
+    COALESCE(o.is_oneway, FALSE)
+"""
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def connect(db_config):
+    return psycopg.connect(
+        dbname=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        host=db_config['host'],
+        port=db_config['port']
+    )
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def junction_filter(scope_params):
+    """WHERE clause keeping the junctions on a scope way ("" = every junction)."""
+    if not (scope_params or {}).get("osm_id_filter_clause_o"):
+        return ""
+    return substitute_sql_params("""
+        WHERE j.way_ids && (
+            SELECT array_agg(o.osm_id)
+            FROM osm_all_roads AS o
+            WHERE o.bikable_road = TRUE
+              :osm_id_filter_clause_o
+        )
+    """, scope_params)
+
+
+def load_edges(cursor, scope_params):
+    """
+    Junction / way rows of rs_junction_index ordered by node_id. Scoped runs only
+    load the junctions on a scope way (with all of their ways).
+    """
+    return copy_rows(cursor, f"""
+        COPY (
+            SELECT
+                j.node_id, w.way_id, j.mid_count, j.road_type_count,
+                rs_road_type_hierarchy(j.top_road_type_1), rs_road_type_hierarchy(j.top_road_type_2)
+            FROM rs_junction_index AS j
+            CROSS JOIN LATERAL unnest(j.way_ids) AS w(way_id)
+            {junction_filter(scope_params)}
+            ORDER BY j.node_id
+        ) TO STDOUT (FORMAT BINARY)
+    """, EDGE_ROW_DTYPE)
+
+
+def load_ways(cursor, scope_params):
+    """
+    Bikable ways as arrays sorted by way_id: the scope ways (with their length,
+    in_scope) and, in scoped runs, the other ways of the loaded junctions (road
+    type / setting only).
+    """
+    rows = copy_rows(cursor, substitute_sql_params(f"""
+        COPY (
+            SELECT {WAY_COLUMNS}, COALESCE(ST_Length(o.geometry::geography), 'NaN'::float8)
+            FROM osm_all_roads AS o
+            WHERE o.bikable_road = TRUE
+              :osm_id_filter_clause_o
+        ) TO STDOUT (FORMAT BINARY)
+    """, scope_params), WAY_ROW_DTYPE)
+    in_scope = np.ones(len(rows), dtype=bool)
+    if junction_filter(scope_params):
+        neighbours = copy_rows(cursor, f"""
+            COPY (
+                SELECT {WAY_COLUMNS}, 'NaN'::float8
+                FROM osm_all_roads AS o
+                WHERE o.bikable_road = TRUE
+                  AND o.osm_id IN (
+                      SELECT w.way_id
+                      FROM rs_junction_index AS j
+                      CROSS JOIN LATERAL unnest(j.way_ids) AS w(way_id)
+                      {junction_filter(scope_params)}
+                  )
+            ) TO STDOUT (FORMAT BINARY)
+        """, WAY_ROW_DTYPE)
+        neighbours = neighbours[~np.isin(neighbours["way_id"], rows["way_id"])]
+        rows = np.concatenate((rows, neighbours))
+        in_scope = np.concatenate((in_scope, np.zeros(len(neighbours), dtype=bool)))
+
+    order = np.argsort(rows["way_id"], kind="stable")
+    rows, in_scope = rows[order], in_scope[order]
+    return {
+        "way_id": rows["way_id"].astype(np.int64),
+        "setting": rows["setting"].astype(np.int64),
+        "lanes": rows["lanes"].astype(np.int64),
+        "oneway": rows["oneway"].astype(bool),
+        "length_m": rows["length_m"].astype(np.float64),
+        "in_scope": in_scope,
+    }
+
+
+def build_graph(edges, way_ids):
+    """
+    CSR adjacency junction -> ways: indptr (junctions + 1), way position per edge
+    (into way_ids), plus each junction's node_id / mid_count / road_type_count and
+    the hierarchies of its top 2 road types (0 = none).
+    Edges of ways that are not loaded (no longer bikable) are dropped.
+    """
+    node_ids = edges["node_id"].astype(np.int64)
+    edge_way_ids = edges["way_id"].astype(np.int64)
+    position = np.minimum(np.searchsorted(way_ids, edge_way_ids), max(len(way_ids) - 1, 0))
+    known = (way_ids[position] == edge_way_ids) if len(way_ids) else np.zeros(len(edges), dtype=bool)
+    node_ids, position, edges = node_ids[known], position[known], edges[known]
+
+    new_junction = np.ones(len(node_ids), dtype=bool)
+    new_junction[1:] = node_ids[1:] != node_ids[:-1]
+    starts = np.flatnonzero(new_junction)
+    return {
+        "indptr": np.append(starts, len(node_ids)),
+        "way_index": position,
+        "node_id": node_ids[starts],
+        "mid_count": edges["mid_count"][starts].astype(np.int64),
+        "road_type_count": edges["road_type_count"][starts].astype(np.int64),
+        "top_1": edges["top_1"][starts].astype(np.int64),
+        "top_2": edges["top_2"][starts].astype(np.int64),
+    }
+
+
+# ============================================================================
+# KERNELS
+# ============================================================================
+
+def junction_categories(graph):
+    """
+    Category per junction (01_find_and_categorize_intersections_v2.sql). The top 2
+    road types come from rs_junction_index, which ranks them over the (way, position)
+    occurrences at the node (a way passing through twice counts twice), so both
+    engines categorize every junction the same way.
+    """
+    degree = np.diff(graph["indptr"])
+    junctions = len(degree)
+
+    # Way splits are not intersections: need 3+ ways, 2+ road types or a mid-node
+    candidate = (degree >= 3) | (graph["road_type_count"] >= 2) | (graph["mid_count"] >= 1)
+
+    top_1, top_2 = graph["top_1"], graph["top_2"]
+    has_2 = top_2 > 0
+    category = np.full(junctions, CATEGORY_NONE, dtype=np.int8)
+    major_1 = top_1 >= SET_A_MIN_HIERARCHY
+    major_2 = top_2 >= SET_A_MIN_HIERARCHY
+    category[has_2 & major_1 & major_2] = CATEGORY_MAJOR
+    category[has_2 & major_1 & ~major_2] = CATEGORY_MIDDLING
+    category[has_2 & ~major_1] = CATEGORY_MINOR
+    category[~candidate] = CATEGORY_NONE
+    return category
+
+
+def edge_impacts(graph, category, setting):
+    """
+    (edge mask, impact distance, speed reduction) of every junction on each of its
+    ways (02_map_intersections_to_ways_v2.sql); minor junctions only slow Urban ways.
+    """
+    edge_category = np.repeat(category, np.diff(graph["indptr"]))
+    mapped = edge_category != CATEGORY_NONE
+    impact_distance = IMPACT_DISTANCE_M[edge_category]
+    speed_reduction = SPEED_REDUCTION[edge_category]
+    rural_minor = (edge_category == CATEGORY_MINOR) & (setting[graph["way_index"]] != SETTING_URBAN)
+    impact_distance[rural_minor] = 0.0
+    speed_reduction[rural_minor] = 0.0
+    return mapped, impact_distance, speed_reduction
+
+
+def base_degradation(way_index, impact_distance, speed_reduction, length_m):
+    """
+    Base degradation per way (03_calculate_base_degradation_v2.sql): weighted average
+    of the impacts over the way length, or multiplicative stacking (capped at
+    MAX_DEGRADATION) when the way is shorter than its largest impact distance.
+    """
+    ways = len(length_m)
+    count = np.bincount(way_index, minlength=ways)
+    max_distance = np.zeros(ways)
+    np.maximum.at(max_distance, way_index, impact_distance)
+    weighted = np.bincount(way_index, weights=impact_distance * speed_reduction, minlength=ways)
+    weighted /= np.maximum(length_m, 1.0)
+    slowed = speed_reduction > 0
+    log_surviving = np.bincount(
+        way_index[slowed],
+        weights=np.log(np.maximum(MIN_SURVIVING_SPEED, 1.0 - speed_reduction[slowed])),
+        minlength=ways,
+    )
+    multiplicative = np.clip(1.0 - np.exp(log_surviving), 0.0, MAX_DEGRADATION)
+    # A NULL (NaN) length falls through to multiplicative stacking, as in SQL
+    with np.errstate(invalid="ignore"):
+        long_enough = length_m >= max_distance
+    return np.where(count == 0, 0.0, np.where(long_enough, weighted, multiplicative))
+
+
+def final_degradation(base, setting, lanes, oneway):
+    """
+    (setting-adjusted degradation, final multiplier) per way
+    (04_calculate_final_degradation_v2.sql). The final value is stored as
+    1.0 - degradation for GraphHopper multiply_by.
+    """
+    adjusted = base * SETTING_MULTIPLIER[setting]
+    lanes_oneway = (setting == SETTING_RURAL) & oneway & (lanes > LANES_ONEWAY_MIN_LANES)
+    degradation = np.clip(np.where(lanes_oneway, adjusted * LANES_ONEWAY_FACTOR, adjusted), 0.0, MAX_DEGRADATION)
+    return adjusted, 1.0 - degradation
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def write_degradation(cursor, way_ids, base, adjusted, final):
+    """COPYs the per-way values (binary) into a staging table and UPDATEs osm_all_roads."""
+    rows = np.empty(len(way_ids), dtype=RESULT_ROW_DTYPE)
+    rows["fields"] = 4
+    rows["way_id_len"] = 8
+    rows["base_len"] = 8
+    rows["adjusted_len"] = 8
+    rows["final_len"] = 8
+    rows["way_id"] = way_ids
+    rows["base"] = base
+    rows["adjusted"] = adjusted
+    rows["final"] = final
+
+    cursor.execute(f"""
+        CREATE TEMP TABLE {STAGING_TABLE} (
+            way_id BIGINT,
+            base DOUBLE PRECISION,
+            adjusted DOUBLE PRECISION,
+            final DOUBLE PRECISION
+        ) ON COMMIT DROP;
+    """)
+    with cursor.copy(f"COPY {STAGING_TABLE} FROM STDIN (FORMAT BINARY)") as copy:
+        copy.write(COPY_SIGNATURE)
+        for start in range(0, len(rows), COPY_WRITE_ROWS):
+            copy.write(rows[start:start + COPY_WRITE_ROWS].tobytes())
+        copy.write(COPY_TRAILER)
+    cursor.execute(f"ANALYZE {STAGING_TABLE};")
+    cursor.execute(f"""
+        UPDATE osm_all_roads AS o
+        SET intersection_speed_degradation_base = t.base,
+            intersection_speed_degradation_setting_adjusted = t.adjusted,
+            intersection_speed_degradation_final = t.final
+        FROM {STAGING_TABLE} AS t
+        WHERE o.osm_id = t.way_id;
+    """)
+    return cursor.rowcount
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def compute_intersection_degradation(db_config, scope_params=None):
+    """
+    Computes the intersection_speed_degradation_* columns of the bikable ways
+    selected by scope_params (incremental_scope_params in add_custom_tags; empty =
+    every bikable road) from rs_junction_index. Returns the run report entry.
+    """
+    start_time = time.time()
+    log_print("[intersection_engine] Computing intersection speed degradation with NumPy")
+
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('rs_junction_index') IS NOT NULL;")
+            if not cursor.fetchone()[0]:
+                raise RuntimeError(
+                    "rs_junction_index does not exist; run sql/road_classification/09_build_junction_index.sql first"
+                )
+            edges = load_edges(cursor, scope_params)
+            ways = load_ways(cursor, scope_params)
+            load_elapsed = time.time() - start_time
+            log_print(
+                f"[intersection_engine] Loaded {len(edges):,} junction ways and {len(ways['way_id']):,} ways "
+                f"({load_elapsed:.2f} seconds)"
+            )
+
+            compute_start = time.time()
+            graph = build_graph(edges, ways["way_id"])
+            category = junction_categories(graph)
+            mapped, impact_distance, speed_reduction = edge_impacts(graph, category, ways["setting"])
+            mapped &= ways["in_scope"][graph["way_index"]]
+            base = base_degradation(
+                graph["way_index"][mapped], impact_distance[mapped], speed_reduction[mapped], ways["length_m"]
+            )
+            adjusted, final = final_degradation(base, ways["setting"], ways["lanes"], ways["oneway"])
+            compute_elapsed = time.time() - compute_start
+
+            in_scope = ways["in_scope"]
+            written = write_degradation(
+                cursor, ways["way_id"][in_scope], base[in_scope], adjusted[in_scope], final[in_scope]
+            )
+        conn.commit()
+
+    categories = np.bincount(category, minlength=len(CATEGORY_NAMES))
+    elapsed = time.time() - start_time
+    log_print(
+        f"[intersection_engine] {int(categories[1:].sum()):,} intersections "
+        f"({', '.join(f'{categories[c]:,} {CATEGORY_NAMES[c]}' for c in range(1, len(CATEGORY_NAMES)))}), "
+        f"{written:,} ways written in {elapsed:.2f} seconds"
+    )
+    report = {
+        "junctions": len(category),
+        "intersections": {CATEGORY_NAMES[c]: int(categories[c]) for c in range(1, len(CATEGORY_NAMES))},
+        "way_impacts": int(np.count_nonzero(mapped)),
+        "ways_degraded": int(np.count_nonzero(base[in_scope] > 0)),
+        "ways_written": written,
+        "load_s": round(load_elapsed, 2),
+        "compute_s": round(compute_elapsed, 2),
+        "elapsed_s": round(elapsed, 2),
+    }
+    update_run_report("intersection_engine", report)
+    return report
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    log_file = setup_logging("intersection_engine")
+    db_config = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "name": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+    }
+    compute_intersection_degradation(db_config)
+    write_run_report(log_file)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Intersection speed degradation v2 SQL steps run per spatial tile on a worker pool
+(INTERSECTION_ENGINE=sql).
+
+Steps 01-04 of sql/road_intersection_density keep their state in session TEMP
+tables, so one session used to compute all of India serially. This driver runs
+them once per tile instead, each tile on its own connection (its own TEMP tables):
+
+- 00_assign_tiles_v2.sql gives every bikable way in scope exactly one owning tile
+  (INTERSECTION_TILE_DEG cells; optionally only the ways in INTERSECTION_REGION_BBOX)
+- each worker runs 01-04 with the tile's ways as scope: 01 categorizes the junctions
+  on those ways, 02-04 map, degrade and write only the ways the tile owns
+- the halo (ways of neighbouring tiles sharing a junction with the tile) needs no
+  copy: rs_junction_index rows already carry every way of the node, so a border
+  junction gets the same category in both tiles, and each way is written once by
+  its owner
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psycopg
+
+try:
+    from .utils import setup_logging, substitute_sql_params, update_run_report, resolve_project_path, write_run_report
+except ImportError:
+    from utils import setup_logging, substitute_sql_params, update_run_report, resolve_project_path, write_run_report
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIG (env overrides allowed)
+# ============================================================================
+# Tiles processed concurrently (one backend each)
+INTERSECTION_SQL_WORKERS = int(os.getenv("INTERSECTION_SQL_WORKERS", min(8, os.cpu_count() or 1)))
+# Tile edge in degrees (~110 km at 1.0)
+INTERSECTION_TILE_DEG = float(os.getenv("INTERSECTION_TILE_DEG", "1.0"))
+# Region-scoped runs: "lon_min,lat_min,lon_max,lat_max" (empty = every way in scope)
+INTERSECTION_REGION_BBOX = os.getenv("INTERSECTION_REGION_BBOX", "").strip()
+
+SQL_DIR = "sql/road_intersection_density"
+ASSIGN_TILES_STEP = "00_assign_tiles_v2.sql"
+TILE_STEPS = [
+    "01_find_and_categorize_intersections_v2.sql",
+    "02_map_intersections_to_ways_v2.sql",
+    "03_calculate_base_degradation_v2.sql",
+    "04_calculate_final_degradation_v2.sql",
+]
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def connect(db_config):
+    return psycopg.connect(
+        dbname=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        host=db_config['host'],
+        port=db_config['port']
+    )
+
+
+def execute_step(cursor, sql_dir, sql_file, params):
+    """Executes one SQL step with its placeholders substituted."""
+    with open(os.path.join(sql_dir, sql_file), 'r', encoding='utf-8') as f:
+        cursor.execute(substitute_sql_params(f.read(), params))
+
+
+def parse_bbox(text):
+    """"lon_min,lat_min,lon_max,lat_max" -> tuple of floats (None if empty)."""
+    if not text:
+        return None
+    bbox = tuple(float(value) for value in text.split(","))
+    if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+        raise ValueError(f"Region bbox must be lon_min,lat_min,lon_max,lat_max (got {text!r})")
+    return bbox
+
+
+def region_filter_clause(bbox):
+    """Placeholder value keeping the ways whose tile point lies in bbox."""
+    if bbox is None:
+        return ""
+    lon_min, lat_min, lon_max, lat_max = bbox
+    return f"AND ST_Intersects(geom, ST_MakeEnvelope({lon_min}, {lat_min}, {lon_max}, {lat_max}, 4326))"
+
+
+def tile_params(tile_id):
+    """Scope placeholders selecting the ways one tile owns (and the junctions on them)."""
+    ids = f"(SELECT way_id FROM rs_intersection_tiles WHERE tile_id = {tile_id})"
+    return {
+        "osm_id_filter_clause": f"AND osm_id IN {ids}",
+        "osm_id_filter_clause_o": f"AND o.osm_id IN {ids}",
+        "way_id_filter_clause_w": f"AND w.way_id IN {ids}",
+        "junction_filter_clause": f"AND way_ids && ARRAY{ids}",
+    }
+
+
+def run_tile(db_config, sql_dir, tile_id, ways):
+    """Runs steps 01-04 for one tile on its own connection. Returns the tile's counts."""
+    start_time = time.time()
+    params = tile_params(tile_id)
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            for sql_file in TILE_STEPS:
+                execute_step(cursor, sql_dir, sql_file, params)
+                if sql_file == "01_find_and_categorize_intersections_v2.sql":
+                    cursor.execute("SELECT COUNT(*) FROM temp_intersection_nodes_v2;")
+                    intersections = cursor.fetchone()[0]
+                conn.commit()
+    return {
+        "tile_id": tile_id,
+        "ways": ways,
+        "intersections": intersections,
+        "elapsed_s": round(time.time() - start_time, 2),
+    }
+
+
+def compute_intersection_degradation_tiles(db_config, scope_params=None, workers=INTERSECTION_SQL_WORKERS,
+                                           tile_size_deg=INTERSECTION_TILE_DEG, region_bbox=INTERSECTION_REGION_BBOX,
+                                           sql_dir=None):
+    """
+    Runs intersection degradation steps 01-04 tile by tile on a pool of workers.
+    scope_params select the ways to recompute (incremental runs; empty = every
+    bikable road), region_bbox ("lon_min,lat_min,lon_max,lat_max") limits them
+    to a region. Returns the run report entry.
+    """
+    sql_dir = sql_dir or resolve_project_path(SQL_DIR)
+    bbox = parse_bbox(region_bbox)
+    start_time = time.time()
+
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            execute_step(cursor, sql_dir, ASSIGN_TILES_STEP, dict(
+                scope_params or {},
+                tile_size_deg=tile_size_deg,
+                region_filter_clause=region_filter_clause(bbox),
+            ))
+            conn.commit()
+            cursor.execute("""
+                SELECT tile_id, COUNT(*)
+                FROM rs_intersection_tiles
+                GROUP BY tile_id
+                ORDER BY COUNT(*) DESC;
+            """)
+            # Largest tiles first so the pool does not end on a long tail
+            tiles = cursor.fetchall()
+    log_print(
+        f"[intersection_tiles] {sum(ways for _, ways in tiles):,} ways in {len(tiles)} tiles of "
+        f"{tile_size_deg:g} deg{' (region ' + region_bbox + ')' if bbox else ''}; running steps 01-04 "
+        f"with {workers} worker(s) ({time.time() - start_time:.2f} seconds)"
+    )
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="intersection_tiles") as executor:
+        futures = [
+            executor.submit(run_tile, db_config, sql_dir, tile_id, ways)
+            for tile_id, ways in tiles
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            log_print(
+                f"[intersection_tiles] Tile {result['tile_id']}: {result['ways']:,} ways, "
+                f"{result['intersections']:,} intersections in {result['elapsed_s']:.2f} seconds "
+                f"({len(results)}/{len(tiles)} done)"
+            )
+
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS rs_intersection_tiles;")
+        conn.commit()
+
+    results.sort(key=lambda result: result["tile_id"])
+    elapsed = time.time() - start_time
+    ways = sum(result["ways"] for result in results)
+    log_print(f"[intersection_tiles] {ways:,} ways in {len(results)} tiles in {elapsed:.2f} seconds")
+    report = {
+        "workers": workers,
+        "tile_size_deg": tile_size_deg,
+        "region_bbox": list(bbox) if bbox else None,
+        "tiles": results,
+        "ways": ways,
+        "elapsed_s": round(elapsed, 2),
+    }
+    update_run_report("intersection_tiles", report)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    log_file = setup_logging("intersection_tiles")
+    parser = argparse.ArgumentParser(description="Run intersection degradation v2 SQL steps 01-04 per spatial tile.")
+    parser.add_argument("--workers", type=int, default=INTERSECTION_SQL_WORKERS, help="Concurrent tiles.")
+    parser.add_argument("--tile-deg", type=float, default=INTERSECTION_TILE_DEG, help="Tile edge in degrees.")
+    parser.add_argument(
+        "--region", default=INTERSECTION_REGION_BBOX,
+        help="Only recompute ways in lon_min,lat_min,lon_max,lat_max.",
+    )
+    args = parser.parse_args()
+    db_config = {
+        "host": os.getenv("DB_HOST", "localhost"),
+        "name": os.getenv("DB_NAME"),
+        "user": os.getenv("DB_USER"),
+        "password": os.getenv("DB_PASSWORD"),
+        "port": int(os.getenv("DB_PORT", "5432")),
+    }
+    compute_intersection_degradation_tiles(
+        db_config, workers=args.workers, tile_size_deg=args.tile_deg, region_bbox=args.region
+    )
+    write_run_report(log_file)
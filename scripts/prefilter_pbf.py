@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Pre-filter the input PBF before the osm2pgsql import.
+
+Keeps only what Lua3_RouteProcessing_with_curvature.lua actually uses:
+- highway ways and the scenery way classes (forest, lakes, coastline, rivers,
+  desert, fields, reserves, protected areas, shrub)
+- conflict / peak / mountain pass nodes
+- admin boundary, hill, nature reserve and road route relations
+- plus every node and way these objects reference (tags stripped), so the
+  geometries osm2pgsql builds are complete.
+
+Everything else (buildings, POIs, untagged noise) is dropped, so osm2pgsql
+evaluates far fewer objects and needs a much smaller node cache.
+
+Keep the rules below in sync with the Lua script.
+
+The input can also be "-" (a PBF streamed on stdin, see
+download_osm_pbf.stream_download_prefilter): the selection then runs while the
+file is still arriving, and the referenced objects are read from ref_src (the
+copy of the stream on disk) once the stream has ended.
+"""
+
+import os
+import json
+import time
+import hashlib
+import inspect
+import logging
+
+import osmium
+
+try:
+    from .utils import setup_logging
+except ImportError:
+    from utils import setup_logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# FILTER RULES (mirror of the Lua3 process_node / process_way / process_relation)
+# ============================================================================
+
+# Only objects with at least one of these keys reach the Python predicates.
+# "type" lets the named hill multipolygons of rs_hills_relations through (they may
+# carry no other key above); keep_relation only keeps its multipolygon / boundary cases.
+FILTER_KEYS = (
+    "highway", "natural", "landuse", "water", "waterway", "leisure", "boundary",
+    "mountain pass", "railway", "junction", "route", "ref", "type",
+)
+
+# The import style these rules mirror (part of the filter signature)
+LUA_STYLE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Lua3_RouteProcessing_with_curvature.lua")
+
+CONFLICT_NODE_HIGHWAY = {"traffic_signals", "stop", "give_way", "crossing"}
+
+WAY_NATURAL = {
+    "wood", "water", "coastline", "desert", "field",
+    "fell", "grassland", "shrubbery", "scrub", "moor", "heath",
+}
+WAY_LANDUSE = {"forest", "wood", "farmland"}
+WAY_WATER = {"reservoir", "lake"}
+WAY_BOUNDARY = {"national_park", "protected_area"}
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def keep_node(tags):
+    return (
+        tags.get("natural") == "peak"
+        or tags.get("mountain pass") == "yes"
+        or tags.get("highway") in CONFLICT_NODE_HIGHWAY
+        or tags.get("railway") == "level_crossing"
+        or tags.get("junction") == "roundabout"
+    )
+
+
+def keep_way(tags):
+    return (
+        "highway" in tags
+        or tags.get("natural") in WAY_NATURAL
+        or tags.get("landuse") in WAY_LANDUSE
+        or tags.get("water") in WAY_WATER
+        or tags.get("waterway") == "river"
+        or tags.get("leisure") == "nature_reserve"
+        or tags.get("boundary") in WAY_BOUNDARY
+    )
+
+
+def keep_relation(tags):
+    ref = tags.get("ref") or ""
+    name = tags.get("name") or ""
+    rel_type = tags.get("type")
+    return (
+        # osm_relation_ways
+        tags.get("route") == "road"
+        or "highway" in tags
+        or "NH" in ref
+        or "SH" in ref
+        # rs_india_bounds
+        or (tags.get("boundary") == "administrative" and rel_type in ("multipolygon", "boundary"))
+        # rs_hills_relations
+        or tags.get("natural") == "peak"
+        or (rel_type == "multipolygon" and ("Hill" in name or "hill" in name))
+        # rs_reserve_forest_relations
+        or tags.get("leisure") == "nature_reserve"
+        or tags.get("boundary") == "national_park"
+    )
+
+
+def filter_signature():
+    """
+    sha256 of the filter definition: the rules above (keys, tag sets, predicate
+    source) and the Lua script they mirror. A filtered PBF made with another
+    signature is stale.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr((
+        FILTER_KEYS, sorted(CONFLICT_NODE_HIGHWAY), sorted(WAY_NATURAL),
+        sorted(WAY_LANDUSE), sorted(WAY_WATER), sorted(WAY_BOUNDARY),
+    )).encode("utf-8"))
+    for predicate in (keep_node, keep_way, keep_relation):
+        digest.update(inspect.getsource(predicate).encode("utf-8"))
+    if os.path.exists(LUA_STYLE_SCRIPT):
+        with open(LUA_STYLE_SCRIPT, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def input_state(input_pbf):
+    """What the filtered PBF was made from (kept in <output>.filter.json)."""
+    stat = os.stat(input_pbf)
+    return {
+        "input_size": stat.st_size,
+        "input_mtime_ns": stat.st_mtime_ns,
+        "filter_sha256": filter_signature(),
+    }
+
+
+def read_filter_state(output_pbf):
+    path = f"{output_pbf}.filter.json"
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_filter_state(output_pbf, state):
+    path = f"{output_pbf}.filter.json"
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def default_filtered_path(input_pbf):
+    """india-latest.osm.pbf -> india-latest-filtered.osm.pbf (same folder)."""
+    base = input_pbf[: -len(".osm.pbf")] if input_pbf.endswith(".osm.pbf") else os.path.splitext(input_pbf)[0]
+    return f"{base}-filtered.osm.pbf"
+
+
+def prefilter_pbf(input_pbf, output_pbf=None, force=False, ref_src=None):
+    """
+    Writes a slim PBF with only the objects the import uses (plus their
+    referenced nodes/ways). Skips the work if output_pbf was made from the same
+    input (size / mtime) with the same filter definition (<output>.filter.json),
+    unless force=True. Returns the output path.
+
+    input_pbf "-" reads the PBF from stdin; ref_src (the complete file on disk)
+    is then required for the referenced objects.
+    """
+    streamed = input_pbf == "-"
+    if streamed and not (ref_src and output_pbf):
+        raise ValueError("Reading from stdin needs output_pbf and ref_src")
+    ref_src = ref_src or input_pbf
+    output_pbf = output_pbf or default_filtered_path(input_pbf)
+
+    if (
+        not force
+        and not streamed
+        and os.path.exists(output_pbf)
+        and read_filter_state(output_pbf) == input_state(input_pbf)
+    ):
+        log_print(f"[prefilter_pbf] Filtered PBF is up to date, reusing: {output_pbf}")
+        return output_pbf
+
+    output_dir = os.path.dirname(output_pbf)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    log_print(f"[prefilter_pbf] Input PBF: {input_pbf}")
+    log_print(f"[prefilter_pbf] Output PBF: {output_pbf}")
+    start_time = time.time()
+
+    counts = {"n": 0, "w": 0, "r": 0}
+    predicates = {"n": keep_node, "w": keep_way, "r": keep_relation}
+
+    # BackReferenceWriter adds the nodes/ways referenced by everything written
+    # (e.g. untagged boundary member ways and all way nodes) in a second read
+    # of ref_src when the writer closes.
+    source = osmium.io.File("-", "pbf") if streamed else input_pbf
+    with osmium.BackReferenceWriter(output_pbf, ref_src=ref_src, overwrite=True) as writer:
+        processor = (
+            osmium.FileProcessor(source)
+            .with_filter(osmium.filter.EmptyTagFilter())
+            .with_filter(osmium.filter.KeyFilter(*FILTER_KEYS))
+        )
+        for obj in processor:
+            kind = obj.type_str()
+            if predicates[kind](obj.tags):
+                writer.add(obj)
+                counts[kind] += 1
+        log_print(
+            f"[prefilter_pbf] Selected {counts['n']:,} nodes, {counts['w']:,} ways, "
+            f"{counts['r']:,} relations in {time.time() - start_time:.2f} seconds. "
+            "Adding referenced objects..."
+        )
+
+    # ref_src is the complete input in both modes (a streamed copy stays on disk until here)
+    write_filter_state(output_pbf, input_state(ref_src))
+
+    input_size = os.path.getsize(ref_src) / (1024 * 1024)
+    output_size = os.path.getsize(output_pbf) / (1024 * 1024)
+    log_print(
+        f"[prefilter_pbf] Completed in {time.time() - start_time:.2f} seconds: "
+        f"{input_size:,.0f} MB -> {output_size:,.0f} MB ({output_size / max(input_size, 1e-9) * 100:.1f}%)"
+    )
+    return output_pbf
+
+
+if __name__ == "__main__":
+    import argparse
+
+    setup_logging("prefilter_pbf")
+    parser = argparse.ArgumentParser(description="Pre-filter an OSM PBF for the osm2pgsql import.")
+    parser.add_argument("input_pbf", help="Input .osm.pbf file path ('-' for stdin, needs --ref-src).")
+    parser.add_argument("--output-pbf", default=None, help="Output path (default: <input>-filtered.osm.pbf).")
+    parser.add_argument("--ref-src", default=None, help="Complete PBF to take referenced objects from (default: input).")
+    parser.add_argument("--force", action="store_true", help="Re-filter even if the output is up to date.")
+    args = parser.parse_args()
+    prefilter_pbf(args.input_pbf, args.output_pbf, force=args.force, ref_src=args.ref_src)
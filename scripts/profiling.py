@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Low-overhead profiling for the Python-side stages (enabled with --profile).
+
+- Statistical sampling: a daemon thread samples the profiled thread's stack
+  every PROFILE_SAMPLE_INTERVAL_MS and aggregates identical stacks. Output is
+  in "collapsed stack" format (`frame;frame;frame count` per line), which
+  flamegraph.pl, inferno and speedscope read directly.
+- Allocations: tracemalloc snapshots around selected phases (e.g. loading
+  extra tags for the PBF writer), written as a top-N report.
+
+All output goes next to the run log:
+    logs/<run>_profile.folded
+    logs/<run>_alloc_<label>.txt
+
+When profiling is not enabled every hook here is a no-op.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# CONFIGURATION (env overrides allowed)
+# ============================================================================
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 10))
+PROFILE_MAX_STACK_DEPTH = int(os.getenv("PROFILE_MAX_STACK_DEPTH", 128))
+PROFILE_ALLOC_TOP_N = int(os.getenv("PROFILE_ALLOC_TOP_N", 25))
+# Frames kept per allocation traceback (1 = allocation site only, cheaper)
+PROFILE_ALLOC_TRACEBACK_DEPTH = int(os.getenv("PROFILE_ALLOC_TRACEBACK_DEPTH", 1))
+
+# Active profiler (set by start_profiling)
+_active_profiler = None
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def _frame_label(frame):
+    """Function-level frame label: 'func (file.py:first_line)'. ';' is the folded-format separator."""
+    code = frame.f_code
+    label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(";", ":")
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack at a fixed interval from a background
+    thread. Overhead is one stack walk per interval; nothing is hooked into
+    the profiled code itself.
+
+    Note: while a C extension holds the GIL (e.g. parts of pyosmium's
+    apply_file) the sampler cannot run, so that time is attributed to the
+    next sample of the calling Python frame.
+    """
+
+    def __init__(self, output_base, interval_ms=PROFILE_SAMPLE_INTERVAL_MS, thread_id=None):
+        self.output_base = output_base
+        self.interval = interval_ms / 1000.0
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks = Counter()
+        self.sample_count = 0
+        self.allocations = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_time = None
+        self._elapsed = 0.0
+
+    @property
+    def folded_path(self):
+        return f"{self.output_base}_profile.folded"
+
+    def alloc_report_path(self, label):
+        safe_label = "".join(c if c.isalnum() or c in "-_" else "_" for c in label)
+        return f"{self.output_base}_alloc_{safe_label}.txt"
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < PROFILE_MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            # Folded format is root-first
+            self.stacks[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def start(self):
+        self._start_time = time.time()
+        self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._elapsed = time.time() - self._start_time
+
+    def write_folded(self):
+        """Writes aggregated stacks in collapsed format. Returns the output path."""
+        with open(self.folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return self.folded_path
+
+    def top_functions(self, top_n=10):
+        """Leaf-frame (self time) sample counts, descending."""
+        leaf_counts = Counter()
+        for stack, count in self.stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        return leaf_counts.most_common(top_n)
+
+    def summary(self):
+        return {
+            "folded_stacks": self.folded_path,
+            "interval_ms": self.interval * 1000.0,
+            "samples": self.sample_count,
+            "elapsed_s": round(self._elapsed, 2),
+            "top_self_samples": [{"frame": frame, "samples": count} for frame, count in self.top_functions()],
+            "allocations": self.allocations,
+        }
+
+
+def start_profiling(log_file):
+    """
+    Starts the sampling profiler for the calling thread. Output files are
+    written next to log_file (same base name). Returns the profiler.
+    """
+    global _active_profiler
+    if _active_profiler is not None:
+        return _active_profiler
+    output_base = os.path.splitext(log_file)[0]
+    _active_profiler = SamplingProfiler(output_base)
+    _active_profiler.start()
+    log_print(
+        f"[PROFILE] Sampling profiler started (interval {PROFILE_SAMPLE_INTERVAL_MS:g} ms), "
+        f"output: {_active_profiler.folded_path}"
+    )
+    return _active_profiler
+
+
+def stop_profiling():
+    """
+    Stops the profiler, writes the folded stacks and returns a summary dict
+    (for the run report), or None if profiling was not enabled.
+    """
+    global _active_profiler
+    profiler = _active_profiler
+    if profiler is None:
+        return None
+    _active_profiler = None
+    profiler.stop()
+    path = profiler.write_folded()
+    log_print(f"[PROFILE] {profiler.sample_count:,} samples written to {path}")
+    for frame, count in profiler.top_functions(top_n=5):
+        pct = (count / profiler.sample_count * 100) if profiler.sample_count else 0
+        log_print(f"[PROFILE]   {pct:5.1f}%  {frame}")
+    return profiler.summary()
+
+
+def is_profiling():
+    return _active_profiler is not None
+
+
+@contextmanager
+def allocation_snapshot(label):
+    """
+    Traces allocations made inside the block with tracemalloc and writes the
+    top allocation sites (by size) to <run>_alloc_<label>.txt.
+    No-op unless profiling was started.
+    """
+    profiler = _active_profiler
+    if profiler is None:
+        yield
+        return
+
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(PROFILE_ALLOC_TRACEBACK_DEPTH)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    try:
+        yield
+    finally:
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if not already_tracing:
+            tracemalloc.stop()
+
+        stats = after.compare_to(before, "lineno")
+        top_stats = stats[:PROFILE_ALLOC_TOP_N]
+        net_bytes = sum(stat.size_diff for stat in stats)
+        report_path = profiler.alloc_report_path(label)
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(f"# tracemalloc: {label}\n")
+            f.write(f"# net allocated: {net_bytes / (1024 * 1024):.1f} MB, peak traced: {peak / (1024 * 1024):.1f} MB\n")
+            for stat in top_stats:
+                f.write(f"{stat}\n")
+
+        profiler.allocations[label] = {
+            "report": report_path,
+            "net_allocated_bytes": net_bytes,
+            "peak_traced_bytes": peak,
+            "top": [
+                {"site": str(stat.traceback[0]), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in top_stats[:10]
+            ],
+        }
+        log_print(
+            f"[PROFILE] Allocations for '{label}': net {net_bytes / (1024 * 1024):.1f} MB, "
+            f"peak {peak / (1024 * 1024):.1f} MB -> {report_path}"
+        )
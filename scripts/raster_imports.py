@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Background raster imports.
+
+Raster ingestion (raster2pgsql | psql) does not depend on the OSM data, so
+main.py starts it as background jobs before the osm2pgsql import and the
+stages that read a raster table wait on a readiness barrier
+(wait_for_rasters) instead of importing it serially themselves.
+
+A job is a dict:
+    table      - target table (schema-qualified)
+    path       - raster file
+    srid       - raster2pgsql -s
+    tile_size  - raster2pgsql -t <n>x<n>
+    options    - extra raster2pgsql flags (e.g. ["-F"], ["-N", "-9999"])
+    clip_bbox  - optional (lon_min, lat_min, lon_max, lat_max) in EPSG:4326; the raster
+                 is clipped to it (gdal_translate VRT, no copy) before loading
+    required   - raise on a missing file / failed import (else only log it)
+
+Imports are content-addressed: rs_raster_import_cache records the file's sha256,
+SRID, tile size, options and clip bbox of every imported table. A table is reused
+only if that key still matches; otherwise it is re-imported (raster2pgsql -d).
+Tiles that are entirely NODATA are skipped by raster2pgsql (PostGIS 3+), which
+together with the clip keeps global rasters down to the tiles that cover India.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg
+
+try:
+    from .utils import update_run_report
+except ImportError:
+    from utils import update_run_report
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Concurrent raster2pgsql | psql pipelines (each is one COPY stream into Postgres)
+RASTER_IMPORT_WORKERS = int(os.getenv("RASTER_IMPORT_WORKERS", 3))
+
+# Read size for the sha256 of raster files
+CHECKSUM_CHUNK_BYTES = 8 * 1024 * 1024
+
+# table -> Future of the running / finished import, and the job that started it
+_executor = None
+_imports = {}
+_jobs = {}
+_results = {}
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def connect(db_config):
+    return psycopg.connect(
+        dbname=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        host=db_config['host'],
+        port=db_config['port']
+    )
+
+
+def ensure_cache_table(db_config):
+    """Creates rs_raster_import_cache (the import key of every raster table)."""
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS rs_raster_import_cache (
+                    table_name TEXT PRIMARY KEY,
+                    source_path TEXT NOT NULL,
+                    source_size BIGINT NOT NULL,
+                    source_mtime DOUBLE PRECISION NOT NULL,
+                    checksum TEXT NOT NULL,
+                    import_key TEXT NOT NULL,
+                    imported_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+            """)
+
+
+def file_checksum(path):
+    """sha256 of a (large) raster file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHECKSUM_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def import_key(job):
+    """Everything besides the file content that decides what ends up in the table."""
+    return json.dumps({
+        "srid": job["srid"],
+        "tile_size": job.get("tile_size", 256),
+        "options": job.get("options", []),
+        "clip_bbox": list(job["clip_bbox"]) if job.get("clip_bbox") else None,
+    }, sort_keys=True)
+
+
+def cached_import_is_valid(cursor, job, stat):
+    """
+    True if the table exists and was imported from the same content with the same key.
+    Returns (valid, checksum); the checksum is only computed when size / mtime changed.
+    """
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (job["table"],))
+    if not cursor.fetchone()[0]:
+        return False, None
+    cursor.execute(
+        "SELECT source_size, source_mtime, checksum, import_key FROM rs_raster_import_cache WHERE table_name = %s;",
+        (job["table"],),
+    )
+    row = cursor.fetchone()
+    if row is None or row[3] != import_key(job):
+        return False, None
+    source_size, source_mtime, checksum, _ = row
+    if source_size == stat.st_size and source_mtime == stat.st_mtime:
+        return True, checksum
+    # Touched or replaced file: only the content decides
+    current = file_checksum(job["path"])
+    return current == checksum, current
+
+
+def clipped_source(job, work_dir):
+    """Path raster2pgsql should read: a VRT window of the raster over clip_bbox, or the raster itself."""
+    if not job.get("clip_bbox"):
+        return job["path"]
+    lon_min, lat_min, lon_max, lat_max = job["clip_bbox"]
+    vrt_path = os.path.join(work_dir, os.path.splitext(os.path.basename(job["path"]))[0] + "_clip.vrt")
+    cmd = [
+        "gdal_translate", "-q", "-of", "VRT",
+        "-projwin_srs", "EPSG:4326",
+        "-projwin", str(lon_min), str(lat_max), str(lon_max), str(lat_min),
+        os.path.abspath(job["path"]), vrt_path,
+    ]
+    subprocess.run(cmd, check=True)
+    return vrt_path
+
+
+def raster2pgsql_command(job, source_path, db_config):
+    """
+    raster2pgsql | psql pipeline for a job; -d replaces a stale table, -Y loads the
+    tiles with COPY instead of INSERTs.
+    """
+    tile = job.get("tile_size", 256)
+    options = " ".join(job.get("options", []))
+    return (
+        f'raster2pgsql -s {job["srid"]} -d -I -C -M -Y {options} -t {tile}x{tile} '
+        f'"{source_path}" {job["table"]} | '
+        f'psql -q -v ON_ERROR_STOP=1 -d {db_config["name"]} -U {db_config["user"]} '
+        f'-h {db_config["host"]} -p {db_config["port"]}'
+    )
+
+
+def import_raster(job, db_config):
+    """Imports one raster unless a valid cached table exists. Returns a result dict for the run report."""
+    table_name = job["table"]
+    if not os.path.exists(job["path"]):
+        raise FileNotFoundError(f"Raster file not found: {job['path']}")
+    stat = os.stat(job["path"])
+
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            valid, checksum = cached_import_is_valid(cursor, job, stat)
+            if valid:
+                # Same content: remember the new size / mtime so the next run skips the checksum
+                cursor.execute(
+                    "UPDATE rs_raster_import_cache SET source_size = %s, source_mtime = %s WHERE table_name = %s;",
+                    (stat.st_size, stat.st_mtime, table_name),
+                )
+    if valid:
+        log_print(f"[raster_imports] Raster table is up to date: {table_name} (skipping import)")
+        return {"status": "cached"}
+
+    env = os.environ.copy()
+    if db_config.get("password"):
+        env["PGPASSWORD"] = db_config["password"]
+
+    start_time = time.time()
+    checksum = checksum or file_checksum(job["path"])
+    log_print(f"[raster_imports] Importing {os.path.basename(job['path'])} into {table_name}...")
+    with tempfile.TemporaryDirectory(prefix="raster_import_") as work_dir:
+        source_path = clipped_source(job, work_dir)
+        subprocess.run(raster2pgsql_command(job, source_path, db_config), shell=True, check=True, env=env)
+
+    with connect(db_config) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO rs_raster_import_cache
+                    (table_name, source_path, source_size, source_mtime, checksum, import_key, imported_at)
+                VALUES (%s, %s, %s, %s, %s, %s, now())
+                ON CONFLICT (table_name) DO UPDATE SET
+                    source_path = EXCLUDED.source_path,
+                    source_size = EXCLUDED.source_size,
+                    source_mtime = EXCLUDED.source_mtime,
+                    checksum = EXCLUDED.checksum,
+                    import_key = EXCLUDED.import_key,
+                    imported_at = now();
+                """,
+                (table_name, job["path"], stat.st_size, stat.st_mtime, checksum, import_key(job)),
+            )
+            cursor.execute("SELECT pg_total_relation_size(%s);", (table_name,))
+            table_bytes = cursor.fetchone()[0]
+
+    elapsed = time.time() - start_time
+    log_print(f"[raster_imports] Imported {table_name} in {elapsed:.2f} seconds ({table_bytes / 1024 ** 2:,.0f} MB)")
+    return {"status": "imported", "elapsed_s": round(elapsed, 2), "table_mb": round(table_bytes / 1024 ** 2, 1)}
+
+
+def start_raster_imports(jobs, db_config):
+    """Starts the jobs in background threads (jobs already started are left alone)."""
+    global _executor
+    if _executor is None:
+        ensure_cache_table(db_config)
+        _executor = ThreadPoolExecutor(max_workers=RASTER_IMPORT_WORKERS, thread_name_prefix="raster_import")
+    for job in jobs:
+        if job["table"] in _imports:
+            continue
+        _jobs[job["table"]] = job
+        _imports[job["table"]] = _executor.submit(import_raster, job, db_config)
+        log_print(f"[raster_imports] Started background import of {job['table']}")
+
+
+def wait_for_rasters(tables=None):
+    """
+    Readiness barrier: blocks until the given tables (default: every started job)
+    are imported. Failures of required jobs are raised, others only logged.
+    """
+    tables = list(_imports) if tables is None else tables
+    for table_name in tables:
+        future = _imports.get(table_name)
+        if future is None:
+            continue
+        if table_name not in _results:
+            wait_start = time.time()
+            if not future.done():
+                log_print(f"[raster_imports] Waiting for {table_name}...")
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"status": "failed", "error": str(e)}
+            result["waited_s"] = round(time.time() - wait_start, 2)
+            _results[table_name] = result
+            update_run_report("raster_imports", _results)
+
+        result = _results[table_name]
+        if result["status"] == "failed":
+            if _jobs[table_name].get("required", True):
+                raise RuntimeError(f"Raster import failed for {table_name}: {result['error']}")
+            log_print(f"[raster_imports] Raster import failed for {table_name}: {result['error']}", level='warning')
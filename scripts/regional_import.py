@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Parallel regional osm2pgsql import.
+
+Splits the input PBF into longitude bands with pyosmium and imports the
+regional extracts concurrently, each into its own schema (rs_import_r<k>)
+with the same Lua style, then unifies them into the public tables the
+pipeline expects.
+
+Every tagged object is written to exactly one region, so no row is
+imported twice:
+- nodes by their own location
+- ways by the location of their first node (boundary-crossing ways go
+  whole to one region)
+- relations by id (relation id % regions)
+Objects another region needs for its geometries (way nodes, relation member
+ways) are added to that region's extract with their tags removed, so the Lua
+script does not turn them into rows.
+
+Regional imports drop their middle tables (--drop), so a database imported
+this way cannot take --append updates (apply_osm_changes).
+"""
+
+import os
+import time
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import osmium
+import psycopg
+
+try:
+    from .utils import setup_logging
+    from .import_planner import parse_phase_timing
+except ImportError:
+    from utils import setup_logging
+    from import_planner import parse_phase_timing
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# REGIONAL SPLIT CONFIG (env overrides allowed)
+# ============================================================================
+# Longitude range the bands cover (objects outside go to the first / last band)
+IMPORT_REGION_LON_MIN = float(os.getenv("IMPORT_REGION_LON_MIN", 68.0))
+IMPORT_REGION_LON_MAX = float(os.getenv("IMPORT_REGION_LON_MAX", 97.5))
+# Optional explicit inner band edges, e.g. "75.5,78.5,82" (default: equal-width bands);
+# use the per-region counts in the log / run report to balance them
+IMPORT_REGION_LON_EDGES = os.getenv("IMPORT_REGION_LON_EDGES") or None
+
+REGION_SCHEMA_PREFIX = "rs_import_r"
+# osm2pgsql's own bookkeeping tables are not unified
+SKIPPED_TABLE_PREFIXES = ("planet_osm_", "osm2pgsql_")
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def region_edges(regions):
+    """Inner longitude edges between the regions (len = regions - 1)."""
+    if IMPORT_REGION_LON_EDGES:
+        edges = sorted(float(edge) for edge in IMPORT_REGION_LON_EDGES.split(","))
+        if len(edges) != regions - 1:
+            raise ValueError(f"IMPORT_REGION_LON_EDGES needs {regions - 1} edges for {regions} regions")
+        return edges
+    width = (IMPORT_REGION_LON_MAX - IMPORT_REGION_LON_MIN) / regions
+    return [IMPORT_REGION_LON_MIN + width * k for k in range(1, regions)]
+
+
+def region_of(lon, edges):
+    """Index of the band containing lon."""
+    for index, edge in enumerate(edges):
+        if lon < edge:
+            return index
+    return len(edges)
+
+
+def regional_pbf_path(input_pbf, region):
+    """india-latest.osm.pbf -> india-latest-r0.osm.pbf (same folder)."""
+    base = input_pbf[: -len(".osm.pbf")] if input_pbf.endswith(".osm.pbf") else os.path.splitext(input_pbf)[0]
+    return f"{base}-r{region}.osm.pbf"
+
+
+def split_pbf_regions(input_pbf, regions):
+    """
+    Writes one extract per region. Returns (paths, counts) where counts[k] is the
+    number of nodes / ways / relations region k owns.
+    """
+    edges = region_edges(regions)
+    paths = [regional_pbf_path(input_pbf, region) for region in range(regions)]
+    counts = [{"n": 0, "w": 0, "r": 0} for _ in range(regions)]
+    log_print(f"[regional_import] Splitting {input_pbf} into {regions} regions at lon {edges}")
+    start_time = time.time()
+
+    writers = [osmium.BackReferenceWriter(path, ref_src=input_pbf, overwrite=True) for path in paths]
+    try:
+        # Untagged objects are only written as back-references of the objects that use them
+        processor = (
+            osmium.FileProcessor(input_pbf)
+            .with_locations()
+            .with_filter(osmium.filter.EmptyTagFilter())
+        )
+        for obj in processor:
+            kind = obj.type_str()
+            if kind == "n":
+                region = region_of(obj.location.lon, edges)
+            elif kind == "w":
+                first = obj.nodes[0].location if len(obj.nodes) else None
+                region = region_of(first.lon, edges) if first is not None and first.valid() else 0
+            else:
+                region = obj.id % regions
+            writers[region].add(obj)
+            counts[region][kind] += 1
+        log_print(
+            f"[regional_import] Assigned objects in {time.time() - start_time:.2f} seconds. "
+            "Adding referenced objects..."
+        )
+    finally:
+        # Each writer reads ref_src again for its back-references on close
+        for writer in writers:
+            writer.close()
+
+    for region, path in enumerate(paths):
+        log_print(
+            f"[regional_import] r{region}: {counts[region]['n']:,} nodes, {counts[region]['w']:,} ways, "
+            f"{counts[region]['r']:,} relations, {os.path.getsize(path) / (1024 * 1024):,.0f} MB"
+        )
+    log_print(f"[regional_import] Split completed in {time.time() - start_time:.2f} seconds")
+    return paths, counts
+
+
+def run_regional_osm2pgsql(region, pbf_file, db_config, style_lua_script, cache_mb, number_processes, env):
+    """Imports one regional extract into its own schema. Returns its report entry."""
+    schema = f"{REGION_SCHEMA_PREFIX}{region}"
+    cmd = [
+        "osm2pgsql",
+        "-c",
+        "-d", db_config["name"],
+        "-U", db_config["user"],
+        "-H", db_config["host"],
+        "-P", str(db_config["port"]),
+        "--slim",
+        "--drop",  # middle tables are per region and useless after the unify step
+        f"--schema={schema}",
+        "--cache", str(cache_mb),
+        "--number-processes", str(number_processes),
+        "--output=flex",
+        f"--style={style_lua_script}",
+        pbf_file,
+    ]
+    log_print(f"[regional_import] r{region}: {' '.join(cmd)}")
+    phase_timings = {}
+    start_time = time.time()
+    process = subprocess.Popen(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    for line in process.stdout:
+        line = line.rstrip()
+        if not line:
+            continue
+        log_print(f"[osm2pgsql r{region}] {line}")
+        timing = parse_phase_timing(line)
+        if timing:
+            phase, seconds = timing
+            phase_timings[phase] = seconds
+    process.wait()
+    if process.returncode != 0:
+        log_print(f"[regional_import] r{region} failed with return code {process.returncode}", level='error')
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+    return {
+        "schema": schema,
+        "command": cmd,
+        "elapsed_s": round(time.time() - start_time, 2),
+        "phase_timings_s": phase_timings,
+    }
+
+
+def unify_regional_tables(db_config, regions):
+    """
+    Moves region 0's tables into public (replacing the previous import) and appends
+    the other regions' rows, then drops the regional schemas. The middle tables and
+    osm2pgsql_properties a previous non-regional import left in public are dropped:
+    they no longer match the data, and apply_osm_changes.py must not --append to them.
+    """
+    schemas = [f"{REGION_SCHEMA_PREFIX}{region}" for region in range(regions)]
+    conn = psycopg.connect(
+        dbname=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        host=db_config['host'],
+        port=db_config['port']
+    )
+    cursor = conn.cursor()
+    cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s ORDER BY tablename;", (schemas[0],))
+    tables = [row[0] for row in cursor.fetchall() if not row[0].startswith(SKIPPED_TABLE_PREFIXES)]
+
+    cursor.execute(
+        "SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename LIKE ANY(%s) ORDER BY tablename;",
+        ([f"{prefix}%" for prefix in SKIPPED_TABLE_PREFIXES],),
+    )
+    stale_tables = [row[0] for row in cursor.fetchall()]
+    for table in stale_tables:
+        cursor.execute(f'DROP TABLE IF EXISTS public."{table}" CASCADE;')
+    conn.commit()
+    if stale_tables:
+        log_print(f"[regional_import] Dropped middle / properties tables of the previous import: {', '.join(stale_tables)}")
+
+    for table in tables:
+        start_time = time.time()
+        cursor.execute(f'DROP TABLE IF EXISTS public."{table}" CASCADE;')
+        cursor.execute(f'ALTER TABLE {schemas[0]}."{table}" SET SCHEMA public;')
+        for schema in schemas[1:]:
+            cursor.execute(f'INSERT INTO public."{table}" SELECT * FROM {schema}."{table}";')
+        cursor.execute(f'ANALYZE public."{table}";')
+        conn.commit()
+        log_print(f"[regional_import] Unified {table} in {time.time() - start_time:.2f} seconds")
+
+    for schema in schemas:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return tables
+
+
+def regional_import(pbf_file, db_config, style_lua_script, regions, import_plan):
+    """
+    Split, concurrent per-region osm2pgsql imports, unify. import_plan is the
+    whole-file plan from import_planner; its cache and processes are shared out
+    across the regions (flat-nodes is not used: the extracts are small).
+    Returns the report entry for the run report.
+    """
+    paths, counts = split_pbf_regions(pbf_file, regions)
+
+    env = os.environ.copy()
+    if db_config.get("password"):
+        env["PGPASSWORD"] = db_config["password"]
+
+    cores = import_plan["hardware"]["cpu_cores"]
+    cache_budget_mb = max(import_plan["cache_mb"], int(import_plan["hardware"]["ram_available_gb"] * 1024 * 0.5))
+    cache_mb = max(256, cache_budget_mb // regions)
+    number_processes = max(1, cores // regions)
+
+    conn = psycopg.connect(
+        dbname=db_config['name'],
+        user=db_config['user'],
+        password=db_config['password'],
+        host=db_config['host'],
+        port=db_config['port']
+    )
+    with conn.cursor() as cursor:
+        for region in range(regions):
+            schema = f"{REGION_SCHEMA_PREFIX}{region}"
+            cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE;")
+            cursor.execute(f"CREATE SCHEMA {schema};")
+    conn.commit()
+    conn.close()
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=regions, thread_name_prefix="regional_import") as executor:
+        futures = [
+            executor.submit(
+                run_regional_osm2pgsql, region, path, db_config, style_lua_script, cache_mb, number_processes, env
+            )
+            for region, path in enumerate(paths)
+        ]
+        region_reports = [future.result() for future in futures]
+    import_elapsed = time.time() - start_time
+    log_print(f"[regional_import] {regions} regional imports completed in {import_elapsed:.2f} seconds")
+
+    unify_start = time.time()
+    tables = unify_regional_tables(db_config, regions)
+    unify_elapsed = time.time() - unify_start
+    log_print(f"[regional_import] Unified {len(tables)} tables in {unify_elapsed:.2f} seconds")
+
+    for path in paths:
+        os.remove(path)
+
+    return {
+        "regions": regions,
+        "lon_edges": region_edges(regions),
+        "objects_per_region": counts,
+        "cache_mb_per_region": cache_mb,
+        "processes_per_region": number_processes,
+        "region_imports": region_reports,
+        "imports_elapsed_s": round(import_elapsed, 2),
+        "unify_elapsed_s": round(unify_elapsed, 2),
+        "tables": tables,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    setup_logging("regional_import")
+    parser = argparse.ArgumentParser(description="Split a PBF into regional extracts (longitude bands).")
+    parser.add_argument("input_pbf", help="Input .osm.pbf file path.")
+    parser.add_argument("--regions", type=int, default=4, help="Number of regions (default: 4).")
+    args = parser.parse_args()
+    split_pbf_regions(args.input_pbf, args.regions)
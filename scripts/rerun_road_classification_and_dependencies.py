@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Standalone script to re-run road classification and all dependent processes:
-1. Road Classification (07_assign_final_road_classification.sql)
+1. Road Classification (07_assign_final_road_classification.sql, then the junction index:
+   09_build_junction_index.sql)
 2. Intersection Density v2 (speed degradation)
 3. Persona Scoring
 4. Write augmented PBF
@@ -23,6 +24,11 @@ import time
 import psycopg
 from dotenv import load_dotenv
 
+try:
+    from .utils import substitute_sql_params
+except ImportError:
+    from utils import substitute_sql_params
+
 def get_script_base_dir():
     """Get the base directory (osm-file-processing-v2) where the script is located."""
     # Get the directory where this script is located
@@ -71,7 +77,8 @@ def log_print(message, level='info'):
 # ============================================================================
 PIPELINE_SECTIONS = {
     'road_classification': False,      # Step 1: Road Classification
-                                       # SQL: 07_assign_final_road_classification.sql
+                                       # SQL: 07_assign_final_road_classification.sql,
+                                       #      09_build_junction_index.sql
     'intersection_density': False,     # Step 2: Intersection Density v2 (Speed Degradation)
                                        # SQL: 00_schema_v2.sql, 01_find_and_categorize_intersections_v2.sql,
                                        #      02_map_intersections_to_ways_v2.sql, 03_calculate_base_degradation_v2.sql,
@@ -125,6 +132,8 @@ def execute_sql_file(cursor, sql_file_path):
     
     with open(sql_file_path, 'r', encoding='utf-8') as f:
         sql_content = f.read()
+    # Scope placeholders (:osm_id_filter_clause etc.) -> "" (all roads)
+    sql_content = substitute_sql_params(sql_content)
     
     try:
         # Execute SQL content (may contain multiple statements)
@@ -149,6 +158,8 @@ def run_road_classification(db_config):
     # Only run the final classification script (07_assign_final_road_classification.sql)
     # This assumes all prerequisite steps (grids, etc.) are already done
     road_classification_script = os.path.join(sql_dir, "07_assign_final_road_classification.sql")
+    # Junction top road types depend on road_type_i1 (read by intersection density v2)
+    junction_index_script = os.path.join(sql_dir, "09_build_junction_index.sql")
     
     conn = psycopg.connect(
         dbname=db_config['name'],
@@ -162,6 +173,8 @@ def run_road_classification(db_config):
     try:
         execute_sql_file(cursor, road_classification_script)
         conn.commit()
+        execute_sql_file(cursor, junction_index_script)
+        conn.commit()
         log_print("[SUCCESS] Road classification completed")
     except Exception as e:
         conn.rollback()
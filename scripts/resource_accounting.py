@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Per-stage resource accounting for the pipeline.
+
+For every stage (and chunk) we record deltas of:
+- WAL bytes generated        (pg_current_wal_lsn before/after)
+- temp files / temp bytes    (pg_stat_database)
+- shared buffer reads / hits (pg_stat_database; pg_stat_io on PG16+)
+- backend CPU time           (/proc/<backend_pid>/stat, only when Postgres runs locally)
+- client (Python) CPU time   (psutil)
+
+pg_stat_database / pg_stat_io / WAL counters are cluster- or database-wide, so
+they also include concurrent activity (autovacuum, other sessions). Backend CPU
+is only available for stages that pass their own connection.
+
+Results go into the run report with a per-metric stage ranking.
+"""
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+import psutil
+import psycopg
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# Metrics that get a per-stage ranking in the run report
+RANKED_METRICS = [
+    "wal_bytes",
+    "temp_bytes",
+    "blks_read",
+    "io_read_bytes",
+    "io_write_bytes",
+    "backend_cpu_s",
+    "client_cpu_s",
+    "elapsed_s",
+]
+
+# pg_stat_io byte totals: PostgreSQL 18 has read_bytes / write_bytes / extend_bytes,
+# PostgreSQL 16-17 only op_bytes (bytes per counted operation)
+PG_STAT_IO_BYTES_QUERY = """
+    SELECT
+        COALESCE(SUM(read_bytes), 0)::bigint,
+        COALESCE(SUM(write_bytes), 0)::bigint,
+        COALESCE(SUM(extend_bytes), 0)::bigint
+    FROM pg_stat_io;
+"""
+PG_STAT_IO_OP_BYTES_QUERY = """
+    SELECT
+        COALESCE(SUM(reads * op_bytes), 0)::bigint,
+        COALESCE(SUM(writes * op_bytes), 0)::bigint,
+        COALESCE(SUM(extends * op_bytes), 0)::bigint
+    FROM pg_stat_io;
+"""
+
+try:
+    CLK_TCK = os.sysconf("SC_CLK_TCK")
+except (ValueError, OSError, AttributeError):
+    CLK_TCK = 100
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def lsn_to_int(lsn):
+    """Converts a pg_lsn text value ('16/B374D848') to a byte position."""
+    if not lsn:
+        return None
+    hi, lo = str(lsn).split("/")
+    return (int(hi, 16) << 32) + int(lo, 16)
+
+
+def read_proc_cpu_seconds(pid):
+    """
+    Returns utime + stime (seconds) for a local process from /proc/<pid>/stat,
+    or None if the process is not visible (remote server, non-Linux, exited).
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # comm (field 2) may contain spaces; fields after the closing paren are fixed
+    fields = stat[stat.rfind(")") + 2:].split()
+    # utime / stime are fields 14 / 15 of the full line -> index 11 / 12 here
+    utime, stime = int(fields[11]), int(fields[12])
+    return (utime + stime) / CLK_TCK
+
+
+def format_bytes(num_bytes):
+    """Human readable byte count for log lines."""
+    if num_bytes is None:
+        return "n/a"
+    value = float(num_bytes)
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if abs(value) < 1024.0:
+            return f"{value:.1f} {unit}"
+        value /= 1024.0
+    return f"{value:.1f} PB"
+
+
+class ResourceTracker:
+    """
+    Records resource deltas per stage. Uses its own autocommit monitoring
+    connection so snapshots never interfere with the stage's transaction.
+
+    Usage:
+        tracker = ResourceTracker(db_config)
+        tracker.start_stage("Part 1", conn=conn)
+        ...
+        tracker.end_stage("Part 1")
+
+        with tracker.stage("urban_pressure/03 chunk 1/10", conn=conn, chunk=True):
+            ...
+    """
+
+    def __init__(self, db_config):
+        self.db_config = db_config
+        self.records = []
+        self._open_stages = {}
+        self._monitor_conn = None
+        self._pg_stat_io_query = None
+        self._db_metrics_available = True
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+    def _get_monitor_conn(self):
+        if not self._db_metrics_available:
+            return None
+        if self._monitor_conn is None or self._monitor_conn.closed:
+            try:
+                self._monitor_conn = psycopg.connect(
+                    dbname=self.db_config['name'],
+                    user=self.db_config['user'],
+                    password=self.db_config['password'],
+                    host=self.db_config['host'],
+                    port=self.db_config['port'],
+                    autocommit=True,
+                )
+                with self._monitor_conn.cursor() as cursor:
+                    cursor.execute(
+                        """
+                        SELECT attname
+                        FROM pg_attribute
+                        WHERE attrelid = to_regclass('pg_catalog.pg_stat_io')
+                          AND attname IN ('read_bytes', 'op_bytes')
+                          AND NOT attisdropped;
+                        """
+                    )
+                    columns = {row[0] for row in cursor.fetchall()}
+                    if "read_bytes" in columns:
+                        self._pg_stat_io_query = PG_STAT_IO_BYTES_QUERY
+                    elif "op_bytes" in columns:
+                        self._pg_stat_io_query = PG_STAT_IO_OP_BYTES_QUERY
+            except Exception as e:
+                log_print(f"[RESOURCES] Database metrics unavailable: {e}", level='warning')
+                self._db_metrics_available = False
+                self._monitor_conn = None
+        return self._monitor_conn
+
+    def _db_snapshot(self):
+        conn = self._get_monitor_conn()
+        if conn is None:
+            return {}
+        snap = {}
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_stat_clear_snapshot();")
+                cursor.execute("SELECT pg_current_wal_lsn()::text;")
+                snap["wal_pos"] = lsn_to_int(cursor.fetchone()[0])
+
+                cursor.execute(
+                    """
+                    SELECT temp_files, temp_bytes, blks_read, blks_hit
+                    FROM pg_stat_database
+                    WHERE datname = current_database();
+                    """
+                )
+                row = cursor.fetchone()
+                if row:
+                    snap["temp_files"], snap["temp_bytes"], snap["blks_read"], snap["blks_hit"] = row
+
+                if self._pg_stat_io_query:
+                    cursor.execute(self._pg_stat_io_query)
+                    snap["io_read_bytes"], snap["io_write_bytes"], snap["io_extend_bytes"] = cursor.fetchone()
+        except Exception as e:
+            log_print(f"[RESOURCES] Could not take database snapshot: {e}", level='warning')
+        return snap
+
+    def _snapshot(self, backend_pid=None):
+        snap = self._db_snapshot()
+        snap["time"] = time.time()
+        cpu = psutil.Process(os.getpid()).cpu_times()
+        snap["client_cpu_s"] = cpu.user + cpu.system
+        if backend_pid is not None:
+            snap["backend_cpu_s"] = read_proc_cpu_seconds(backend_pid)
+        return snap
+
+    @staticmethod
+    def _backend_pid(conn):
+        if conn is None:
+            return None
+        try:
+            return conn.info.backend_pid
+        except Exception:
+            return None
+
+    # ------------------------------------------------------------------
+    # Stage API
+    # ------------------------------------------------------------------
+    def start_stage(self, name, conn=None, chunk=False):
+        """Takes the 'before' snapshot for a stage. conn = the connection doing the work."""
+        backend_pid = self._backend_pid(conn)
+        self._open_stages[name] = (self._snapshot(backend_pid), backend_pid, chunk)
+
+    def end_stage(self, name):
+        """
+        Takes the 'after' snapshot and records the deltas.
+        Call before closing the stage's connection (backend CPU is read from /proc).
+        """
+        if name not in self._open_stages:
+            log_print(f"[RESOURCES] end_stage called for unknown stage '{name}'", level='warning')
+            return None
+        before, backend_pid, chunk = self._open_stages.pop(name)
+        after = self._snapshot(backend_pid)
+
+        def delta(key):
+            if before.get(key) is None or after.get(key) is None:
+                return None
+            return after[key] - before[key]
+
+        record = {
+            "stage": name,
+            "chunk": chunk,
+            "elapsed_s": round(after["time"] - before["time"], 3),
+            "wal_bytes": delta("wal_pos"),
+            "temp_files": delta("temp_files"),
+            "temp_bytes": delta("temp_bytes"),
+            "blks_read": delta("blks_read"),
+            "blks_hit": delta("blks_hit"),
+            "io_read_bytes": delta("io_read_bytes"),
+            "io_write_bytes": delta("io_write_bytes"),
+            "io_extend_bytes": delta("io_extend_bytes"),
+            "client_cpu_s": delta("client_cpu_s"),
+            "backend_cpu_s": delta("backend_cpu_s"),
+            "backend_pid": backend_pid,
+        }
+        for key in ("client_cpu_s", "backend_cpu_s"):
+            if record[key] is not None:
+                record[key] = round(record[key], 3)
+        if record["blks_read"] is not None and record["blks_hit"] is not None:
+            total = record["blks_read"] + record["blks_hit"]
+            record["buffer_hit_ratio"] = round(record["blks_hit"] / total, 4) if total else None
+        self.records.append(record)
+
+        if not chunk:
+            log_print(
+                f"[RESOURCES] {name}: elapsed={record['elapsed_s']:.1f}s "
+                f"wal={format_bytes(record['wal_bytes'])} temp={format_bytes(record['temp_bytes'])} "
+                f"blks_read={record['blks_read']} blks_hit={record['blks_hit']} "
+                f"backend_cpu={record['backend_cpu_s']} client_cpu={record['client_cpu_s']}"
+            )
+        return record
+
+    @contextmanager
+    def stage(self, name, conn=None, chunk=False):
+        """Context manager form of start_stage/end_stage."""
+        self.start_stage(name, conn=conn, chunk=chunk)
+        try:
+            yield
+        finally:
+            self.end_stage(name)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+    def ranking(self, include_chunks=False):
+        """Returns {metric: [(stage, value), ...]} sorted descending, per metric."""
+        rows = [r for r in self.records if include_chunks or not r["chunk"]]
+        result = {}
+        for metric in RANKED_METRICS:
+            ranked = [(r["stage"], r[metric]) for r in rows if r.get(metric) is not None]
+            ranked.sort(key=lambda item: item[1], reverse=True)
+            result[metric] = ranked
+        return result
+
+    def summary(self):
+        """Report payload: all stage/chunk records plus per-metric stage ranking."""
+        return {
+            "stages": [r for r in self.records if not r["chunk"]],
+            "chunks": [r for r in self.records if r["chunk"]],
+            "ranking": {
+                metric: [{"stage": stage, "value": value} for stage, value in ranked]
+                for metric, ranked in self.ranking().items()
+            },
+        }
+
+    def log_ranking(self, top_n=5):
+        """Logs the top stages per metric."""
+        log_print("[RESOURCES] Per-stage ranking:")
+        for metric, ranked in self.ranking().items():
+            if not ranked:
+                continue
+            top = ", ".join(
+                f"{stage}={format_bytes(value) if metric.endswith('bytes') else value}"
+                for stage, value in ranked[:top_n]
+            )
+            log_print(f"[RESOURCES]   {metric}: {top}")
+
+    def close(self):
+        if self._monitor_conn is not None and not self._monitor_conn.closed:
+            self._monitor_conn.close()
+        self._monitor_conn = None
@@ -1,8 +1,15 @@
 import os
 import sys
+import json
 import logging
 from datetime import datetime
 
+# Log file of the current run (set by setup_logging); the run report is written next to it
+_current_log_file = None
+
+# Run report: sections/stages add their metrics here, written once at the end of a run
+RUN_REPORT = {}
+
 def get_project_root():
     """
     Finds the project root directory.
@@ -77,4 +84,62 @@ def setup_logging(script_name=None):
     )
     
     logging.info(f"Logging initialized. Log file: {log_file}")
+
+    global _current_log_file
+    _current_log_file = log_file
     return log_file
+
+def get_run_report_path(log_file=None):
+    """
+    Path of the JSON run report for the current run: same name as the log file
+    with a _report.json suffix (e.g. logs/main_pipeline_20260101_120000_report.json).
+    """
+    log_file = log_file or _current_log_file
+    if not log_file:
+        return None
+    return os.path.splitext(log_file)[0] + "_report.json"
+
+def update_run_report(key, value):
+    """Adds (or replaces) a top-level entry in the run report."""
+    RUN_REPORT[key] = value
+
+def write_run_report(log_file=None):
+    """Writes RUN_REPORT as JSON next to the log file. Returns the report path."""
+    report_path = get_run_report_path(log_file)
+    if not report_path:
+        logging.warning("No log file set up; skipping run report")
+        return None
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(RUN_REPORT, f, indent=2, default=str)
+    logging.info(f"Run report saved to: {report_path}")
+    return report_path
+
+# Optional row-scope placeholders in SQL files (e.g. ":osm_id_filter_clause_r").
+# They default to "" (whole table); incremental runs pass "AND r.osm_id IN (...)",
+# partitioned curvature runs a table suffix and a hash partition filter, tile-parallel
+# intersection runs a junction filter.
+SQL_SCOPE_PLACEHOLDERS = (
+    "osm_id_filter_clause",
+    "osm_id_filter_clause_r",
+    "osm_id_filter_clause_o",
+    "way_id_filter_clause",
+    "way_id_filter_clause_w",
+    "way_partition_clause",
+    "partition_suffix",
+    "junction_filter_clause",
+)
+
+def substitute_sql_params(sql_query, params=None):
+    """
+    Replaces :name placeholders in an SQL file's text. Longer names are replaced
+    first (so :osm_id_filter_clause does not clobber :osm_id_filter_clause_r),
+    csv_path is quoted, and unset scope placeholders become empty.
+    """
+    params = dict(params or {})
+    for key in SQL_SCOPE_PLACEHOLDERS:
+        params.setdefault(key, "")
+    for key in sorted(params, key=len, reverse=True):
+        value = params[key]
+        replacement = f"'{value}'" if key == "csv_path" else str(value)
+        sql_query = sql_query.replace(f":{key}", replacement)
+    return sql_query
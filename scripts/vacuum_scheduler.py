@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Targeted VACUUM / ANALYZE scheduling between pipeline stages.
+
+Instead of blindly running VACUUM ANALYZE on a fixed list of tables after every
+Part, this looks at pg_stat_user_tables (dead tuples + rows modified since the
+last ANALYZE) and only maintains tables that crossed a threshold. ANALYZE is
+restricted to the columns the *next* stage filters/joins on, so statistics stay
+fresh mid-pipeline without paying for full-table passes.
+
+Thresholds follow the same shape as autovacuum (base + scale_factor * live rows)
+and can be overridden via env vars.
+
+A column-list ANALYZE does not reset n_mod_since_analyze (only a full ANALYZE
+does), so the scheduler remembers the counter value at which it analyzed each
+column in this run and only counts the modifications made after that.
+"""
+
+import os
+import time
+import logging
+
+# Initialize logger
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# THRESHOLDS (env overrides allowed)
+# ============================================================================
+VACUUM_BASE_THRESHOLD = int(os.getenv("MAINTENANCE_VACUUM_BASE_THRESHOLD", 10000))
+VACUUM_SCALE_FACTOR = float(os.getenv("MAINTENANCE_VACUUM_SCALE_FACTOR", 0.10))
+ANALYZE_BASE_THRESHOLD = int(os.getenv("MAINTENANCE_ANALYZE_BASE_THRESHOLD", 10000))
+ANALYZE_SCALE_FACTOR = float(os.getenv("MAINTENANCE_ANALYZE_SCALE_FACTOR", 0.05))
+# VACUUM FULL rewrites the whole table under an exclusive lock; only worth it
+# when a large share of the heap is dead (e.g. after a large UPDATE pass).
+VACUUM_FULL_DEAD_RATIO = float(os.getenv("MAINTENANCE_VACUUM_FULL_DEAD_RATIO", 0.50))
+
+# Columns each stage filters / joins on. ANALYZE is limited to these columns
+# for the tables the next stage reads. None = all columns.
+STAGE_FILTER_COLUMNS = {
+    "curvature": {
+        "osm_all_roads": ["osm_id", "bikable_road"],
+        "rs_highway_way_nodes": ["way_id", "seq", "node_id", "lon", "lat"],
+    },
+    "scenery": {
+        "osm_all_roads": [
+            "osm_id",
+            "bikable_road",
+            "geometry",
+            "final_road_classification_from_grid_overlap",
+            "road_scenery_urban",
+            "road_scenery_semiurban",
+        ],
+    },
+    "road_access": {
+        "osm_all_roads": ["osm_id"],
+    },
+    "intersection_degradation": {
+        "osm_all_roads": ["osm_id", "bikable_road", "road_type_i1", "road_setting_i1", "lanes_count", "is_oneway"],
+        "rs_highway_way_nodes": ["way_id", "node_id", "seq"],
+    },
+    "persona": {
+        "osm_all_roads": ["osm_id", "bikable_road", "road_type_i1", "road_setting_i1", "lanes_count"],
+        "rs_curvature_way_summary": ["way_id"],
+    },
+}
+
+# Tables checked at the end of the pipeline (no next stage). These are the
+# tables QGIS and ad-hoc queries hit, so they get a full-column ANALYZE if stale.
+FINAL_MAINTENANCE_TABLES = [
+    "osm_all_roads",
+    "india_grids",
+    "pop_density",
+    "built_up_area",
+    "rs_curvature_way_summary",
+]
+
+
+# {table: {column: n_mod_since_analyze when this run analyzed the column}}
+ANALYZED_COLUMNS = {}
+
+
+def log_print(message, level='info'):
+    """Print to console and log to file."""
+    print(message)
+    if level == 'info':
+        logger.info(message)
+    elif level == 'warning':
+        logger.warning(message)
+    elif level == 'error':
+        logger.error(message)
+    elif level == 'debug':
+        logger.debug(message)
+
+
+def get_table_stats(cursor, tables):
+    """
+    Returns {table: (n_live_tup, n_dead_tup, n_mod_since_analyze)} for the given
+    public tables. Tables that do not exist are omitted.
+    """
+    # Stats are cached per transaction; make sure we see the latest counters
+    cursor.execute("SELECT pg_stat_clear_snapshot();")
+    cursor.execute(
+        """
+        SELECT relname, n_live_tup, n_dead_tup, n_mod_since_analyze
+        FROM pg_stat_user_tables
+        WHERE schemaname = 'public'
+          AND relname = ANY(%s);
+        """,
+        (list(tables),),
+    )
+    return {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+
+def existing_columns(cursor, table, columns):
+    """Filters a column list down to the columns that currently exist on the table."""
+    cursor.execute(
+        """
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+          AND table_name = %s
+          AND column_name = ANY(%s);
+        """,
+        (table, list(columns)),
+    )
+    found = {row[0] for row in cursor.fetchall()}
+    return [col for col in columns if col in found]
+
+
+def decide_action(n_live, n_dead, n_mod, allow_full_vacuum=False):
+    """
+    Decides which maintenance (if any) a table needs based on its counters.
+    Returns one of: 'vacuum_full', 'vacuum_analyze', 'analyze', None.
+    """
+    n_live = n_live or 0
+    n_dead = n_dead or 0
+    n_mod = n_mod or 0
+
+    if allow_full_vacuum and n_dead > 0 and n_dead >= VACUUM_FULL_DEAD_RATIO * (n_live + n_dead):
+        return "vacuum_full"
+    if n_dead > VACUUM_BASE_THRESHOLD + VACUUM_SCALE_FACTOR * n_live:
+        return "vacuum_analyze"
+    if n_mod > ANALYZE_BASE_THRESHOLD + ANALYZE_SCALE_FACTOR * n_live:
+        return "analyze"
+    return None
+
+
+def mods_since_analyzed(table, n_mod, columns=None):
+    """
+    Rows modified since this run last analyzed the given columns (None = all
+    columns). Falls back to n_mod for columns not analyzed yet, and forgets the
+    table once the counter dropped below a remembered value (a full ANALYZE,
+    e.g. by autovacuum, reset it).
+    """
+    n_mod = n_mod or 0
+    analyzed = ANALYZED_COLUMNS.get(table)
+    if not analyzed:
+        return n_mod
+    if n_mod < max(analyzed.values()):
+        ANALYZED_COLUMNS.pop(table)
+        return n_mod
+    if not columns:
+        return n_mod
+    return n_mod - min(analyzed.get(column, 0) for column in columns)
+
+
+def remember_analyze(table, n_mod, columns):
+    """Records an ANALYZE of columns (None / empty = full ANALYZE, which resets the counter)."""
+    if not columns:
+        ANALYZED_COLUMNS.pop(table, None)
+        return
+    analyzed = ANALYZED_COLUMNS.setdefault(table, {})
+    for column in columns:
+        analyzed[column] = n_mod or 0
+
+
+def maintain_table(cursor, table, columns=None, allow_full_vacuum=False, stats=None):
+    """
+    Runs the maintenance a single table needs (if any).
+    `columns` restricts the ANALYZE part to those columns (None = all columns).
+    Cursor must be on an autocommit connection (VACUUM cannot run in a transaction).
+    Returns the action taken (or None).
+    """
+    if stats is None:
+        stats = get_table_stats(cursor, [table])
+    if table not in stats:
+        return None
+
+    n_live, n_dead, n_mod = stats[table]
+    if columns:
+        columns = existing_columns(cursor, table, columns)
+    n_mod_new = mods_since_analyzed(table, n_mod, columns)
+    action = decide_action(n_live, n_dead, n_mod_new, allow_full_vacuum=allow_full_vacuum)
+    if action is None:
+        log_print(
+            f"[MAINTENANCE] {table}: live={n_live or 0:,} dead={n_dead or 0:,} "
+            f"mod_since_analyze={n_mod_new:,} - below thresholds, skipping"
+        )
+        return None
+
+    column_list = " (" + ", ".join(columns) + ")" if columns else ""
+
+    if action == "vacuum_full":
+        # VACUUM FULL cannot take a column list; follow up with a targeted ANALYZE
+        statements = [f"VACUUM FULL {table};", f"ANALYZE {table}{column_list};"]
+    elif action == "vacuum_analyze":
+        statements = [f"VACUUM (ANALYZE) {table}{column_list};"]
+    else:
+        statements = [f"ANALYZE {table}{column_list};"]
+
+    log_print(
+        f"[MAINTENANCE] {table}: live={n_live or 0:,} dead={n_dead or 0:,} mod_since_analyze={n_mod_new:,} "
+        f"-> {action}{column_list}"
+    )
+    start_time = time.time()
+    for statement in statements:
+        cursor.execute(statement)
+    remember_analyze(table, n_mod, columns)
+    log_print(f"[MAINTENANCE] {table}: {action} completed in {time.time() - start_time:.2f} seconds")
+    return action
+
+
+def schedule_maintenance(cursor, next_stage=None):
+    """
+    Maintains only the tables the next stage reads, and only if their
+    dead-tuple / modification counters crossed the thresholds.
+    With next_stage=None (end of pipeline), checks FINAL_MAINTENANCE_TABLES
+    with full-column ANALYZE.
+    Returns {table: action} for the tables that were maintained.
+    """
+    if next_stage is None:
+        table_columns = {table: None for table in FINAL_MAINTENANCE_TABLES}
+    else:
+        table_columns = STAGE_FILTER_COLUMNS.get(next_stage)
+        if table_columns is None:
+            log_print(f"[MAINTENANCE] Unknown next stage '{next_stage}', nothing scheduled", level='warning')
+            return {}
+
+    log_print(f"[MAINTENANCE] Checking {', '.join(table_columns)} before stage: {next_stage or 'end of pipeline'}")
+    stats = get_table_stats(cursor, table_columns.keys())
+
+    actions = {}
+    for table, columns in table_columns.items():
+        try:
+            action = maintain_table(cursor, table, columns, stats=stats)
+            if action:
+                actions[table] = action
+        except Exception as e:
+            log_print(f"[MAINTENANCE] Could not maintain {table}: {e}", level='warning')
+    return actions
@@ -10,8 +10,10 @@ import osmium as osm
 
 try:
     from .utils import setup_logging
+    from .profiling import allocation_snapshot
 except ImportError:
     from utils import setup_logging
+    from profiling import allocation_snapshot
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -226,8 +228,9 @@ def write_tags_to_pbf(db_config, output_pbf_path):
     if os.path.exists(output_pbf_path):
         os.remove(output_pbf_path)
 
-    # Step 1: Load extra tags from PostGIS
-    extra_tags = _load_extra_tags(db_config)
+    # Step 1: Load extra tags from PostGIS (allocation report when --profile is on)
+    with allocation_snapshot("load_extra_tags"):
+        extra_tags = _load_extra_tags(db_config)
     log_print(
         f"[write_tags_to_pbf] Extra tags loaded for {len(extra_tags):,} ways. "
         "Starting PBF augmentation..."
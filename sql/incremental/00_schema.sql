@@ -0,0 +1,43 @@
+-- Incremental updates: bookkeeping tables (idempotent, kept between runs)
+--
+-- rs_applied_change_files: .osc.gz files already applied with osm2pgsql --append
+-- rs_incremental_changes:  OSM ids touched by applied change files that have not been
+--                          recomputed yet (cleared after a successful add_custom_tags run)
+-- rs_incremental_geoms:    geometries of the changed roads / scenery features, captured
+--                          before and after the diff (so deletions still have a location)
+-- rs_incremental_roads:    roads to recompute, rebuilt by 03_build_affected_roads.sql
+
+CREATE TABLE IF NOT EXISTS rs_applied_change_files (
+    file_name TEXT PRIMARY KEY,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    node_count BIGINT,
+    way_count BIGINT,
+    relation_count BIGINT
+);
+
+CREATE TABLE IF NOT EXISTS rs_incremental_changes (
+    osm_type CHAR(1) NOT NULL,  -- 'n', 'w' or 'r'
+    osm_id BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_rs_incremental_changes_type_id
+ON rs_incremental_changes (osm_type, osm_id);
+
+CREATE TABLE IF NOT EXISTS rs_incremental_geoms (
+    source TEXT NOT NULL,
+    osm_id BIGINT NOT NULL,
+    geometry GEOMETRY(Geometry, 4326),
+    radius_deg DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_rs_incremental_geoms_geom
+ON rs_incremental_geoms USING GIST (geometry);
+
+-- ring 0: changed roads (way changed, or one of its nodes moved)
+-- ring 1: roads touching a changed road (shared node / crossing)
+-- ring 2: roads within the neighbourhood radius of a changed road or scenery feature
+-- ring 3: roads touching ring 1 (context for curvature conflict points only)
+CREATE TABLE IF NOT EXISTS rs_incremental_roads (
+    osm_id BIGINT PRIMARY KEY,
+    ring SMALLINT NOT NULL
+);
@@ -0,0 +1,55 @@
+-- Incremental updates: record where the changes are.
+-- Run once before and once after osm2pgsql --append, so both the old and the new
+-- geometry of every changed road / scenery feature end up in rs_incremental_geoms.
+-- radius_deg is how far a change reaches: :road_radius_deg for roads (HAdj neighbours),
+-- otherwise the distance used by the matching sql/road_scenery/ step.
+-- Params: :road_radius_deg
+
+-- Changed roads: touched ways, and ways holding a touched node (osm2pgsql re-builds those)
+DROP TABLE IF EXISTS tmp_incremental_changed_ways;
+CREATE TEMP TABLE tmp_incremental_changed_ways AS
+SELECT osm_id AS way_id
+FROM rs_incremental_changes
+WHERE osm_type = 'w'
+UNION
+SELECT h.way_id
+FROM rs_incremental_changes AS c
+JOIN rs_highway_way_nodes AS h ON h.node_id = c.osm_id
+WHERE c.osm_type = 'n';
+
+INSERT INTO rs_incremental_geoms (source, osm_id, geometry, radius_deg)
+SELECT 'osm_all_roads', o.osm_id, o.geometry, :road_radius_deg
+FROM osm_all_roads AS o
+JOIN tmp_incremental_changed_ways AS w ON w.way_id = o.osm_id;
+
+-- Scenery features (way features keyed by way id, hill relations by relation id, hill peaks by node id)
+INSERT INTO rs_incremental_geoms (source, osm_id, geometry, radius_deg)
+SELECT 'rs_forest', f.osm_id, f.geometry, 0.0
+FROM rs_forest AS f
+JOIN rs_incremental_changes AS c ON c.osm_type = 'w' AND c.osm_id = f.osm_id
+UNION ALL
+SELECT 'rs_lakes', l.osm_id, l.geometry, 0.00025
+FROM rs_lakes AS l
+JOIN rs_incremental_changes AS c ON c.osm_type = 'w' AND c.osm_id = l.osm_id
+UNION ALL
+SELECT 'rs_coastline', cl.osm_id, cl.geometry, 0.001
+FROM rs_coastline AS cl
+JOIN rs_incremental_changes AS c ON c.osm_type = 'w' AND c.osm_id = cl.osm_id
+UNION ALL
+SELECT 'rs_rivers', rv.osm_id, rv.geometry, 0.0005
+FROM rs_rivers AS rv
+JOIN rs_incremental_changes AS c ON c.osm_type = 'w' AND c.osm_id = rv.osm_id
+UNION ALL
+SELECT 'rs_fields', fd.osm_id, fd.geometry, 0.001
+FROM rs_fields AS fd
+JOIN rs_incremental_changes AS c ON c.osm_type = 'w' AND c.osm_id = fd.osm_id
+UNION ALL
+SELECT 'rs_hills_relations', hr.osm_id, hr.geometry, 0.0
+FROM rs_hills_relations AS hr
+JOIN rs_incremental_changes AS c ON c.osm_type = 'r' AND c.osm_id = hr.osm_id
+UNION ALL
+SELECT 'rs_hills_nodes', hn.osm_id, hn.geometry, 0.027
+FROM rs_hills_nodes AS hn
+JOIN rs_incremental_changes AS c ON c.osm_type = 'n' AND c.osm_id = hn.osm_id;
+
+DROP TABLE IF EXISTS tmp_incremental_changed_ways;
@@ -0,0 +1,88 @@
+-- Incremental updates: refresh rs_highway_way_nodes for the changed ways.
+-- Same zip of rs_highway_way_node_lists.node_ids with the way geometry points as
+-- sql/road_curvature_v2/00_populate_node_coordinates.sql, limited to the changed ways
+-- (deleted ways just lose their rows), and the packed rs_highway_way_coords rows of the
+-- same ways. Run after osm2pgsql --append.
+
+-- Uses the pre-diff node membership: a way that gained a node is itself a changed way
+DROP TABLE IF EXISTS tmp_incremental_changed_ways;
+CREATE TEMP TABLE tmp_incremental_changed_ways AS
+SELECT osm_id AS way_id
+FROM rs_incremental_changes
+WHERE osm_type = 'w'
+UNION
+SELECT h.way_id
+FROM rs_incremental_changes AS c
+JOIN rs_highway_way_nodes AS h ON h.node_id = c.osm_id
+WHERE c.osm_type = 'n';
+
+DELETE FROM rs_highway_way_nodes AS h
+USING tmp_incremental_changed_ways AS c
+WHERE h.way_id = c.way_id;
+
+INSERT INTO rs_highway_way_nodes (way_id, node_id, seq, lon, lat)
+WITH way_points AS (
+    SELECT
+        l.way_id,
+        l.node_ids,
+        CASE
+            WHEN ST_NPoints(ST_GeometryN(o.geometry, 1)) = cardinality(l.node_ids)
+            THEN ARRAY(
+                SELECT dp.geom
+                FROM ST_DumpPoints(ST_GeometryN(o.geometry, 1)) AS dp
+                ORDER BY dp.path[1]
+            )
+        END AS points
+    FROM rs_highway_way_node_lists AS l
+    JOIN tmp_incremental_changed_ways AS c ON c.way_id = l.way_id
+    LEFT JOIN osm_all_roads AS o ON o.osm_id = l.way_id
+)
+SELECT
+    wp.way_id,
+    n.node_id,
+    n.seq::int AS seq,
+    ST_X(n.point)::real AS lon,
+    ST_Y(n.point)::real AS lat
+FROM way_points AS wp
+CROSS JOIN LATERAL unnest(wp.node_ids, wp.points) WITH ORDINALITY AS n(node_id, point, seq);
+
+-- Packed per-way rows (sql/road_curvature_v2/00_populate_way_coords.sql), if built
+DO $$
+BEGIN
+    IF to_regclass('public.rs_highway_way_coords') IS NULL THEN
+        RETURN;
+    END IF;
+
+    DELETE FROM rs_highway_way_coords AS h
+    USING tmp_incremental_changed_ways AS c
+    WHERE h.way_id = c.way_id;
+
+    INSERT INTO rs_highway_way_coords (way_id, node_ids, lon_e7, lat_e7)
+    SELECT
+        l.way_id,
+        l.node_ids,
+        p.lon_e7,
+        p.lat_e7
+    FROM rs_highway_way_node_lists AS l
+    JOIN tmp_incremental_changed_ways AS c ON c.way_id = l.way_id
+    LEFT JOIN osm_all_roads AS o ON o.osm_id = l.way_id
+    LEFT JOIN LATERAL (
+        SELECT
+            array_agg(rs_coord_e7(ST_X(dp.geom)) ORDER BY dp.path[1]) AS lon_e7,
+            array_agg(rs_coord_e7(ST_Y(dp.geom)) ORDER BY dp.path[1]) AS lat_e7
+        FROM ST_DumpPoints(ST_GeometryN(o.geometry, 1)) AS dp
+    ) AS p ON ST_NPoints(ST_GeometryN(o.geometry, 1)) = cardinality(l.node_ids);
+END $$;
+
+-- Both tables match the node lists again: restamp their source keys
+-- (sql/road_curvature_v2/00_populate_node_coordinates.sql), so the next run keeps them
+DO $$
+BEGIN
+    IF to_regclass('public.rs_derived_table_sources') IS NOT NULL THEN
+        UPDATE rs_derived_table_sources
+        SET source_key = rs_way_node_lists_key(), built_at = now()
+        WHERE table_name IN ('rs_highway_way_nodes', 'rs_highway_way_coords');
+    END IF;
+END $$;
+
+DROP TABLE IF EXISTS tmp_incremental_changed_ways;
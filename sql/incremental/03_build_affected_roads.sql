@@ -0,0 +1,52 @@
+-- Incremental updates: roads to recompute (rs_incremental_roads, see 00_schema.sql for rings).
+-- Run after 02_refresh_way_nodes.sql. A road keeps the lowest ring it qualifies for.
+
+TRUNCATE rs_incremental_roads;
+
+-- Ring 0: changed roads that still exist (deleted ways have nothing left to tag)
+INSERT INTO rs_incremental_roads (osm_id, ring)
+SELECT DISTINCT o.osm_id, 0
+FROM osm_all_roads AS o
+JOIN (
+    SELECT osm_id AS way_id
+    FROM rs_incremental_changes
+    WHERE osm_type = 'w'
+    UNION
+    SELECT h.way_id
+    FROM rs_incremental_changes AS c
+    JOIN rs_highway_way_nodes AS h ON h.node_id = c.osm_id
+    WHERE c.osm_type = 'n'
+) AS w ON w.way_id = o.osm_id
+WHERE o.bikable_road = TRUE;
+
+-- Ring 1: roads touching an old or new changed road geometry (covers deleted ways too)
+INSERT INTO rs_incremental_roads (osm_id, ring)
+SELECT DISTINCT o.osm_id, 1
+FROM rs_incremental_geoms AS g
+JOIN osm_all_roads AS o
+  ON ST_Intersects(o.geometry, g.geometry)
+WHERE g.source = 'osm_all_roads'
+  AND o.bikable_road = TRUE
+ON CONFLICT (osm_id) DO NOTHING;
+
+-- Ring 2: neighbourhood of changed roads and scenery features
+INSERT INTO rs_incremental_roads (osm_id, ring)
+SELECT DISTINCT o.osm_id, 2
+FROM rs_incremental_geoms AS g
+JOIN osm_all_roads AS o
+  ON ST_DWithin(o.geometry, g.geometry, g.radius_deg)
+WHERE o.bikable_road = TRUE
+ON CONFLICT (osm_id) DO NOTHING;
+
+-- Ring 3: roads touching ring 1, so curvature sees every intersection of ring 0/1 ways
+INSERT INTO rs_incremental_roads (osm_id, ring)
+SELECT DISTINCT o.osm_id, 3
+FROM rs_incremental_roads AS r
+JOIN osm_all_roads AS n ON n.osm_id = r.osm_id
+JOIN osm_all_roads AS o
+  ON ST_Intersects(o.geometry, n.geometry)
+WHERE r.ring = 1
+  AND o.bikable_road = TRUE
+ON CONFLICT (osm_id) DO NOTHING;
+
+ANALYZE rs_incremental_roads;
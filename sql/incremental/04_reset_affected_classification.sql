@@ -0,0 +1,13 @@
+-- Incremental updates: clear road type on affected roads (ring <= 2) before
+-- road_classification/07 re-assigns it; 07 only fills rows with road_type_i1 IS NULL,
+-- and the HAdj upgrade depends on neighbouring roads.
+-- Roads re-written by osm2pgsql --append already come back with NULL stage columns.
+
+UPDATE osm_all_roads AS o
+SET
+    road_type_i1 = NULL,
+    road_classification_i1 = NULL
+FROM rs_incremental_roads AS r
+WHERE r.osm_id = o.osm_id
+  AND r.ring <= 2
+  AND o.road_type_i1 IS NOT NULL;
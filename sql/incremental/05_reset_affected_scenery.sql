@@ -0,0 +1,16 @@
+-- Incremental updates: scoped version of road_scenery/00_reset_all_scenery.sql.
+-- Resets the progressive scenery flags on affected roads (ring <= 2) only.
+
+UPDATE osm_all_roads AS o
+SET
+    road_scenery_forest = 0,
+    road_scenery_hill = 0,
+    road_scenery_lake = 0,
+    road_scenery_beach = 0,
+    road_scenery_river = 0,
+    road_scenery_field = 0
+FROM rs_incremental_roads AS r
+WHERE r.osm_id = o.osm_id
+  AND r.ring <= 2
+  AND o.road_scenery_urban = 0
+  AND o.road_scenery_semiurban = 0;
@@ -0,0 +1,80 @@
+-- Incremental updates: refresh the rs_junction_index rows (sql/road_classification/09_build_junction_index.sql)
+-- of every node on an affected road or on a changed / deleted way. Run instead of 09
+-- after 07_assign_final_road_classification.sql; :osm_id_filter_clause = the affected roads
+-- (ring <= 2, so road type changes of neighbouring roads are picked up too).
+
+DROP TABLE IF EXISTS tmp_junction_ways;
+CREATE TEMP TABLE tmp_junction_ways AS
+SELECT osm_id AS way_id
+FROM osm_all_roads
+WHERE bikable_road = TRUE
+  :osm_id_filter_clause
+UNION
+-- Changed ways (deleted ones included) may still be listed in a junction row
+SELECT osm_id
+FROM rs_incremental_changes
+WHERE osm_type = 'w';
+
+-- Nodes to recompute: on a way above (new node lists) or listing one of them (old rows)
+DROP TABLE IF EXISTS tmp_junction_nodes;
+CREATE TEMP TABLE tmp_junction_nodes AS
+SELECT v.node_id
+FROM rs_highway_way_node_lists AS l
+JOIN tmp_junction_ways AS t ON t.way_id = l.way_id
+CROSS JOIN LATERAL unnest(l.node_ids) AS v(node_id)
+UNION
+SELECT j.node_id
+FROM rs_junction_index AS j
+WHERE j.way_ids && (SELECT array_agg(way_id) FROM tmp_junction_ways);
+ALTER TABLE tmp_junction_nodes ADD PRIMARY KEY (node_id);
+
+-- Ways through those nodes: the ways above, plus the unchanged ways of their old rows
+-- (a way that newly reaches a node changed itself, so it is already listed)
+INSERT INTO tmp_junction_ways (way_id)
+SELECT DISTINCT w.way_id
+FROM rs_junction_index AS j
+JOIN tmp_junction_nodes AS n ON n.node_id = j.node_id
+CROSS JOIN LATERAL unnest(j.way_ids) AS w(way_id)
+WHERE NOT EXISTS (SELECT 1 FROM tmp_junction_ways AS t WHERE t.way_id = w.way_id);
+ANALYZE tmp_junction_ways;
+
+DELETE FROM rs_junction_index AS j
+USING tmp_junction_nodes AS n
+WHERE j.node_id = n.node_id;
+
+-- Same aggregate as 09_build_junction_index.sql, limited to the nodes to recompute
+INSERT INTO rs_junction_index (
+    node_id, way_ids, degree, endpoint_count, mid_count, road_type_count, top_road_type_1, top_road_type_2
+)
+SELECT
+    node_id,
+    way_ids,
+    cardinality(way_ids),
+    endpoint_count,
+    mid_count,
+    road_type_count,
+    ranked_types[1],
+    ranked_types[2]
+FROM (
+    SELECT
+        v.node_id,
+        array_agg(DISTINCT l.way_id ORDER BY l.way_id) AS way_ids,
+        COUNT(*) FILTER (WHERE v.seq = 1 OR v.seq = cardinality(l.node_ids)) AS endpoint_count,
+        COUNT(*) FILTER (WHERE v.seq > 1 AND v.seq < cardinality(l.node_ids)) AS mid_count,
+        COUNT(DISTINCT o.road_type_i1) AS road_type_count,
+        array_agg(o.road_type_i1 ORDER BY rs_road_type_hierarchy(o.road_type_i1) DESC)
+            FILTER (WHERE rs_road_type_hierarchy(o.road_type_i1) > 0) AS ranked_types
+    FROM rs_highway_way_node_lists AS l
+    JOIN tmp_junction_ways AS t ON t.way_id = l.way_id
+    JOIN osm_all_roads AS o ON o.osm_id = l.way_id
+    CROSS JOIN LATERAL unnest(l.node_ids) WITH ORDINALITY AS v(node_id, seq)
+    JOIN tmp_junction_nodes AS n ON n.node_id = v.node_id
+    WHERE o.bikable_road = TRUE
+    GROUP BY v.node_id
+    HAVING MIN(l.way_id) <> MAX(l.way_id)
+) AS j;
+
+ANALYZE rs_junction_index;
+
+DROP TABLE IF EXISTS tmp_junction_ways;
+DROP TABLE IF EXISTS tmp_junction_nodes;
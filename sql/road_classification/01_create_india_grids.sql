@@ -3,18 +3,33 @@
 -- OPTIMIZED: Use MIN/MAX instead of ST_Union to avoid expensive geometry union operation
 -- Last modified by: KJ
 
+-- Grid cells are addressed by lattice arithmetic: grid_id = grid_row * n_cols + grid_col, where
+-- grid_col / grid_row count 0.009 degree steps from the lattice origin (rs_grid_lattice). The origin
+-- is baked into the IMMUTABLE functions rs_grid_id(lon, lat) and rs_grid_cells(geometry)
+-- below (and read by scripts/grid_lattice.py), so road-to-grid lookups need no spatial join.
+
 -- Drop existing table if it exists
 DROP TABLE IF EXISTS india_grids;
 
+-- Lattice origin and size (one row)
+DROP TABLE IF EXISTS rs_grid_lattice;
+CREATE TABLE rs_grid_lattice (
+    lon_origin DOUBLE PRECISION NOT NULL,
+    lat_origin DOUBLE PRECISION NOT NULL,
+    cell_deg DOUBLE PRECISION NOT NULL,
+    n_cols INTEGER NOT NULL,
+    n_rows INTEGER NOT NULL
+);
+
 -- Creating india grid table that will store grids for 1km X 1km
 CREATE TABLE india_grids (
-    grid_id SERIAL PRIMARY KEY,
+    grid_id INTEGER PRIMARY KEY,  -- rs_grid_id() of any point inside the cell
     grid_geom GEOMETRY(Polygon, 4326),
     grid_area DOUBLE PRECISION,
     is_valid BOOLEAN DEFAULT FALSE  -- Flag to mark valid grids
 );
 
--- Step 1: Generate ALL grid cells in the bounding box (uniform 1km x 1km)
+-- Step 1: Lattice over the bounding box (uniform 1km x 1km)
 -- OPTIMIZATION: Use MIN/MAX on bounding box coordinates instead of ST_Union
 -- This is MUCH faster - avoids expensive geometry union operation
 WITH bounds AS (
@@ -25,22 +40,74 @@ WITH bounds AS (
         MAX(ST_YMax(geometry)) AS lat_max
     FROM rs_india_bounds
     WHERE admin_level = '4' AND geometry IS NOT NULL  -- ✅ Only using valid state-level boundaries
-),
-grid AS (
-    -- Running loop to generate all grids
-    SELECT
-        lon_min + (i * 0.009) AS lon_lower,  -- 1 km ≈ 0.009 degrees
-        lat_min + (j * 0.009) AS lat_lower,  
-        lon_min + ((i + 1) * 0.009) AS lon_upper,
-        lat_min + ((j + 1) * 0.009) AS lat_upper
-    FROM bounds,
-         generate_series(0, FLOOR((lon_max - lon_min) / 0.009)::integer) AS i,  
-         generate_series(0, FLOOR((lat_max - lat_min) / 0.009)::integer) AS j  
 )
+INSERT INTO rs_grid_lattice (lon_origin, lat_origin, cell_deg, n_cols, n_rows)
+SELECT
+    lon_min,
+    lat_min,
+    0.009,  -- 1 km ≈ 0.009 degrees
+    FLOOR((lon_max - lon_min) / 0.009)::integer + 1,
+    FLOOR((lat_max - lat_min) / 0.009)::integer + 1
+FROM bounds;
+
+-- Step 1a: Lattice functions with the origin as constants (IMMUTABLE: usable in indexes,
+-- inlined by the planner). NULL / no rows outside the lattice.
+DO $$
+DECLARE
+    lattice rs_grid_lattice%ROWTYPE;
+BEGIN
+    SELECT * INTO STRICT lattice FROM rs_grid_lattice;
+
+    EXECUTE format($function$
+        CREATE OR REPLACE FUNCTION rs_grid_id(lon double precision, lat double precision)
+        RETURNS integer
+        LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+        AS $body$
+            SELECT CASE
+                WHEN cell.grid_col >= 0 AND cell.grid_col < %4$s AND cell.grid_row >= 0 AND cell.grid_row < %5$s
+                THEN cell.grid_row * %4$s + cell.grid_col
+            END
+            FROM (
+                SELECT
+                    FLOOR((lon - %1$s) / %3$s)::integer AS grid_col,
+                    FLOOR((lat - %2$s) / %3$s)::integer AS grid_row
+            ) AS cell
+        $body$;
+    $function$, lattice.lon_origin, lattice.lat_origin, lattice.cell_deg, lattice.n_cols, lattice.n_rows);
+
+    -- Cells overlapping the bounding box of geom (the candidates a GiST lookup would return)
+    EXECUTE format($function$
+        CREATE OR REPLACE FUNCTION rs_grid_cells(geom geometry)
+        RETURNS SETOF integer
+        LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+        AS $body$
+            SELECT grid_row * %4$s + grid_col
+            FROM generate_series(
+                     GREATEST(FLOOR((ST_XMin(geom) - %1$s) / %3$s)::integer, 0),
+                     LEAST(FLOOR((ST_XMax(geom) - %1$s) / %3$s)::integer, %4$s - 1)
+                 ) AS grid_col,
+                 generate_series(
+                     GREATEST(FLOOR((ST_YMin(geom) - %2$s) / %3$s)::integer, 0),
+                     LEAST(FLOOR((ST_YMax(geom) - %2$s) / %3$s)::integer, %5$s - 1)
+                 ) AS grid_row
+        $body$;
+    $function$, lattice.lon_origin, lattice.lat_origin, lattice.cell_deg, lattice.n_cols, lattice.n_rows);
+END $$;
+
 -- Step 2: Insert ALL grid cells (no filtering yet - maintains uniform 1km x 1km size)
-INSERT INTO india_grids (grid_geom)
-SELECT ST_SetSRID(ST_MakeEnvelope(lon_lower, lat_lower, lon_upper, lat_upper, 4326), 4326) AS grid_geom
-FROM grid;
+INSERT INTO india_grids (grid_id, grid_geom)
+SELECT
+    grid_row * l.n_cols + grid_col AS grid_id,
+    ST_MakeEnvelope(
+        l.lon_origin + (grid_col * l.cell_deg),
+        l.lat_origin + (grid_row * l.cell_deg),
+        l.lon_origin + ((grid_col + 1) * l.cell_deg),
+        l.lat_origin + ((grid_row + 1) * l.cell_deg),
+        4326
+    ) AS grid_geom
+FROM rs_grid_lattice AS l,
+     generate_series(0, l.n_cols - 1) AS grid_col,
+     generate_series(0, l.n_rows - 1) AS grid_row;
 
 -- Step 3: Create spatial index on grid table for fast intersection checks
 CREATE INDEX idx_india_grids_geom ON india_grids USING GIST (grid_geom);
@@ -7,6 +7,12 @@
 -- We use a bikable_road column to mark eligible roads, which simplifies all subsequent queries
 -- and allows for efficient partial indexing.
 
+--
+-- bikable_road, road_type_base, lanes_count, is_oneway, fourlane, geom_3857 and
+-- length_geom_3857 are written at import time by Lua3_RouteProcessing_with_curvature.lua.
+-- The statements below only back-fill tables imported with an older Lua script;
+-- on a fresh import every WHERE clause matches nothing, so no rows are rewritten.
+
 -- Add bikable_road column to mark roads that should be processed
 ALTER TABLE osm_all_roads
 ADD COLUMN IF NOT EXISTS bikable_road BOOLEAN DEFAULT FALSE;
@@ -15,13 +21,76 @@ ADD COLUMN IF NOT EXISTS bikable_road BOOLEAN DEFAULT FALSE;
 -- All other roads remain FALSE (handled by DEFAULT)
 UPDATE osm_all_roads
 SET bikable_road = TRUE
-WHERE highway IN ('motorway', 'trunk', 'primary', 'secondary', 'tertiary', 'residential', 'unclassified', 'service', 'track', 'path', 'living_street', 'trunk_link', 'primary_link', 'secondary_link', 'motorway_link', 'tertiary_link', 'road');
+WHERE highway IN ('motorway', 'trunk', 'primary', 'secondary', 'tertiary', 'residential', 'unclassified', 'service', 'track', 'path', 'living_street', 'trunk_link', 'primary_link', 'secondary_link', 'motorway_link', 'tertiary_link', 'road')
+  AND bikable_road IS DISTINCT FROM TRUE;
 
 -- Ensure any existing NULL values are set to FALSE (for rows added before this column existed)
 UPDATE osm_all_roads
 SET bikable_road = FALSE
 WHERE bikable_road IS NULL;
 
+-- Lanes / oneway / fourlane (same rules as the Lua script and dev-runs/fourlane_run.py)
+ALTER TABLE osm_all_roads
+ADD COLUMN IF NOT EXISTS road_type_base TEXT,
+ADD COLUMN IF NOT EXISTS lanes_count INTEGER,
+ADD COLUMN IF NOT EXISTS is_oneway BOOLEAN,
+ADD COLUMN IF NOT EXISTS fourlane TEXT;
+
+UPDATE osm_all_roads o
+SET lanes_count = d.lanes_count,
+    is_oneway = d.is_oneway,
+    fourlane = CASE WHEN d.is_oneway AND COALESCE(d.lanes_count, 0) >= 2 THEN 'yes' ELSE 'no' END
+FROM (
+    SELECT
+        osm_id,
+        -- First integer of the tag ('2;3' -> 2), as parse_lanes in the Lua script
+        NULLIF((regexp_match(COALESCE(lanes, ''), '([0-9]+)'))[1], '')::INT AS lanes_count,
+        UPPER(COALESCE(tags->>'oneway', '')) IN ('YES', 'TRUE', '1', '-1') AS is_oneway
+    FROM osm_all_roads
+    WHERE is_oneway IS NULL
+) d
+WHERE o.osm_id = d.osm_id
+  AND o.is_oneway IS NULL;
+
+-- Promoted surface tag (imports older than the slim tag projection only have it in tags)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+          AND table_name = 'osm_all_roads'
+          AND column_name = 'surface'
+    ) THEN
+        ALTER TABLE osm_all_roads ADD COLUMN surface TEXT;
+
+        UPDATE osm_all_roads
+        SET surface = tags->>'surface'
+        WHERE tags ? 'surface';
+    END IF;
+END $$;
+
+-- Projected geometry + length (also used by road classification HAdj and hill scenery)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM information_schema.columns
+        WHERE table_schema = 'public'
+          AND table_name = 'osm_all_roads'
+          AND column_name = 'geom_3857'
+    ) THEN
+        ALTER TABLE osm_all_roads
+        ADD COLUMN geom_3857 geometry(LineString, 3857),
+        ADD COLUMN length_geom_3857 DOUBLE PRECISION;
+
+        UPDATE osm_all_roads
+        SET geom_3857 = ST_LineMerge(ST_CollectionExtract(ST_Transform(geometry, 3857), 2)),
+            length_geom_3857 = ST_Length(ST_LineMerge(ST_CollectionExtract(ST_Transform(geometry, 3857), 2)))
+        WHERE geometry IS NOT NULL;
+    END IF;
+END $$;
+
 -- Create a partial index on bikable_road = true for efficient filtering
 DO $$ 
 BEGIN 
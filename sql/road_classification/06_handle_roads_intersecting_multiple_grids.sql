@@ -1,36 +1,74 @@
 -- Handle roads that intersect with multiple grids
 -- Only process bikable roads (bikable_road = true)
 -- Chunk params: :grid_id_min, :grid_id_max
+-- Optional scope: :osm_id_filter_clause_r (incremental runs; empty = all roads)
+--
+-- Candidate cells come from lattice arithmetic (rs_grid_cells: cells overlapping the road's
+-- bounding box, see 01_create_india_grids.sql) joined to india_grids by grid_id instead of
+-- GiST lookups. A road whose bounding box lies in one cell is in that cell entirely, so it
+-- needs no ST_Intersects / ST_Intersection; only roads spanning several cells are clipped.
+-- Only roads overlapping the chunk's lattice rows (grid_id / n_cols between the chunk bounds)
+-- are expanded, each into all of its cells, so chunked runs stay linear.
+DROP TABLE IF EXISTS tmp_road_grid_cells;
+CREATE TEMP TABLE tmp_road_grid_cells AS
+SELECT
+    r.osm_id,
+    c.grid_id,
+    rs_grid_id(ST_XMin(r.geometry), ST_YMin(r.geometry))
+        = rs_grid_id(ST_XMax(r.geometry), ST_YMax(r.geometry)) AS single_cell
+FROM osm_all_roads r
+CROSS JOIN LATERAL rs_grid_cells(r.geometry) AS c(grid_id)
+WHERE r.bikable_road = TRUE
+  AND r.multi_grid IS NULL
+  AND r.geometry && ST_MakeEnvelope(:lon_min, :lat_min, :lon_max, :lat_max, 4326)
+  AND r.geometry && (
+      SELECT ST_MakeEnvelope(
+          l.lon_origin,
+          l.lat_origin + (:grid_id_min / l.n_cols) * l.cell_deg,
+          l.lon_origin + l.n_cols * l.cell_deg,
+          l.lat_origin + (:grid_id_max / l.n_cols + 1) * l.cell_deg,
+          4326
+      )
+      FROM rs_grid_lattice AS l
+  )
+  :osm_id_filter_clause_r;
+CREATE INDEX ON tmp_road_grid_cells (osm_id);
+ANALYZE tmp_road_grid_cells;
+
 DROP TABLE IF EXISTS tmp_osm_ids_in_chunk;
 CREATE TEMP TABLE tmp_osm_ids_in_chunk AS
-SELECT DISTINCT r.osm_id
-FROM india_grids g
+SELECT DISTINCT c.osm_id
+FROM tmp_road_grid_cells c
+JOIN india_grids g
+  ON g.grid_id = c.grid_id
 JOIN osm_all_roads r
-  ON ST_Intersects(r.geometry, g.grid_geom)
+  ON r.osm_id = c.osm_id
 WHERE g.grid_id BETWEEN :grid_id_min AND :grid_id_max
   AND g.grid_geom && ST_MakeEnvelope(:lon_min, :lat_min, :lon_max, :lat_max, 4326)
   AND ST_Intersects(g.grid_geom, ST_MakeEnvelope(:lon_min, :lat_min, :lon_max, :lat_max, 4326))
-  AND r.bikable_road = TRUE
-  AND r.multi_grid IS NULL;
+  AND (c.single_cell OR ST_Intersects(r.geometry, g.grid_geom));
 
 WITH road_intersections AS (
     SELECT
         r.osm_id,
         g.grid_id,
         g.grid_classification_l1,
-        ST_Length(ST_Intersection(r.geometry, g.grid_geom)::geography) AS road_length,
+        CASE
+            WHEN c.single_cell THEN ST_Length(r.geometry::geography)
+            ELSE ST_Length(ST_Intersection(r.geometry, g.grid_geom)::geography)
+        END AS road_length,
         g.built_up_fraction AS grid_build_perc,
         g.pop_density AS grid_population_density
     FROM
-        osm_all_roads r
+        tmp_road_grid_cells c
+    JOIN
+        osm_all_roads r ON r.osm_id = c.osm_id
     JOIN
-        india_grids g
-    ON
-        ST_Intersects(r.geometry, g.grid_geom) -- Only calculate intersections for intersecting pairs
+        india_grids g ON g.grid_id = c.grid_id
     WHERE
-        r.bikable_road = TRUE
-        AND r.multi_grid IS NULL
-        AND r.osm_id IN (SELECT osm_id FROM tmp_osm_ids_in_chunk)
+        c.osm_id IN (SELECT osm_id FROM tmp_osm_ids_in_chunk)
+        -- Only calculate intersections for intersecting pairs
+        AND (c.single_cell OR ST_Intersects(r.geometry, g.grid_geom))
 ),
 aggregated_data AS (
     SELECT
@@ -113,11 +151,13 @@ WITH road_grid AS (
         r.osm_id,
         g.urban_pressure,
         g.reinforced_pressure
-    FROM osm_all_roads r
+    FROM tmp_road_grid_cells c
+    JOIN osm_all_roads r
+      ON r.osm_id = c.osm_id
     JOIN india_grids g
-      ON ST_Intersects(r.geometry, g.grid_geom)
-    WHERE r.bikable_road = TRUE
-      AND r.osm_id IN (SELECT osm_id FROM tmp_osm_ids_in_chunk)
+      ON g.grid_id = c.grid_id
+    WHERE c.osm_id IN (SELECT osm_id FROM tmp_osm_ids_in_chunk)
+      AND (c.single_cell OR ST_Intersects(r.geometry, g.grid_geom))
 ),
 agg AS (
     SELECT
@@ -136,3 +176,4 @@ WHERE r.osm_id = agg.osm_id
   AND r.bikable_road = TRUE;
 
 DROP TABLE IF EXISTS tmp_osm_ids_in_chunk;
+DROP TABLE IF EXISTS tmp_road_grid_cells;
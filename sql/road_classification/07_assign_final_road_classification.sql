@@ -6,6 +6,8 @@
 --
 -- This fixes the conflation where '*WoH' (a grid/context label) previously overrode road type,
 -- leading to cases like road_classification_i1='RuralWoH' with highway='primary'.
+--
+-- Requires road_type_base (added by 04_prepare_osm_all_roads_table.sql or the Lua3 import).
 UPDATE osm_all_roads r
 SET
   road_setting_i1 = d.road_setting_i1,
@@ -14,7 +16,8 @@ FROM (
   SELECT
     osm_id,
     final_road_classification_from_grid_overlap AS road_setting_i1,
-    CASE
+    -- road_type_base is computed at import (Lua3); the CASE is the fallback for older imports
+    COALESCE(road_type_base, CASE
       WHEN COALESCE(ref,'') ILIKE '%NH%'
         OR (COALESCE(ref,'') NOT ILIKE '%SH%' AND COALESCE(ref,'') NOT ILIKE '%MDR%' AND highway IN ('trunk','trunk_link','motorway','motorway_link'))
         THEN 'NH'
@@ -38,7 +41,7 @@ FROM (
       WHEN highway = 'residential'
         THEN 'Res'
       ELSE 'WoH'
-    END AS road_type_i1
+    END) AS road_type_i1
   FROM osm_all_roads
   WHERE bikable_road = TRUE
     AND road_type_i1 IS NULL
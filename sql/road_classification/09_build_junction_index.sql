@@ -0,0 +1,91 @@
+-- Junction index: one row per node shared by >= 2 bikable ways
+-- Built once after 07_assign_final_road_classification.sql (needs final road_type_i1) and
+-- read by curvature (derived conflict points: curvature_engine.py,
+-- road_curvature_v2/00_conflict_candidates.sql) and intersection degradation
+-- (road_intersection_density/01, 02), which used to group the full way-node table each.
+--
+--   way_ids          distinct bikable ways through the node (ascending)
+--   degree           cardinality(way_ids)
+--   endpoint_count   (way, position) occurrences as first / last node of a way
+--   mid_count        occurrences as an inner node (a way looping through the node counts twice)
+--   road_type_count  distinct road_type_i1 of those ways
+--   top_road_type_1  highest road_type_i1 by rs_road_type_hierarchy over the occurrences,
+--   top_road_type_2  and the next one (NULL if fewer than 2 ranked occurrences)
+--
+-- Source: rs_highway_way_node_lists (ordered node ids per way, from the import).
+-- Incremental runs refresh the rows of the affected nodes (sql/incremental/06_refresh_junction_index.sql).
+
+-- Road type hierarchy for intersection categorization (0 = not ranked)
+CREATE OR REPLACE FUNCTION rs_road_type_hierarchy(road_type text)
+RETURNS integer
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT CASE road_type
+        WHEN 'NH' THEN 8
+        WHEN 'SH' THEN 7
+        WHEN 'MDR' THEN 6
+        WHEN 'OH' THEN 5
+        WHEN 'HAdj' THEN 4
+        WHEN 'WoH' THEN 3
+        WHEN 'Track' THEN 2
+        WHEN 'Path' THEN 1
+        WHEN 'Res' THEN 1
+        ELSE 0
+    END
+$$;
+
+DROP TABLE IF EXISTS rs_junction_index;
+CREATE TABLE rs_junction_index (
+    node_id BIGINT PRIMARY KEY,
+    way_ids BIGINT[] NOT NULL,
+    degree INTEGER NOT NULL,
+    endpoint_count INTEGER NOT NULL,
+    mid_count INTEGER NOT NULL,
+    road_type_count INTEGER NOT NULL,
+    top_road_type_1 TEXT,
+    top_road_type_2 TEXT
+);
+
+-- One pass over the node lists: every (node, way) occurrence, grouped by node
+INSERT INTO rs_junction_index (
+    node_id, way_ids, degree, endpoint_count, mid_count, road_type_count, top_road_type_1, top_road_type_2
+)
+SELECT
+    node_id,
+    way_ids,
+    cardinality(way_ids),
+    endpoint_count,
+    mid_count,
+    road_type_count,
+    ranked_types[1],
+    ranked_types[2]
+FROM (
+    SELECT
+        v.node_id,
+        array_agg(DISTINCT l.way_id ORDER BY l.way_id) AS way_ids,
+        COUNT(*) FILTER (WHERE v.seq = 1 OR v.seq = cardinality(l.node_ids)) AS endpoint_count,
+        COUNT(*) FILTER (WHERE v.seq > 1 AND v.seq < cardinality(l.node_ids)) AS mid_count,
+        COUNT(DISTINCT o.road_type_i1) AS road_type_count,
+        array_agg(o.road_type_i1 ORDER BY rs_road_type_hierarchy(o.road_type_i1) DESC)
+            FILTER (WHERE rs_road_type_hierarchy(o.road_type_i1) > 0) AS ranked_types
+    FROM rs_highway_way_node_lists AS l
+    JOIN osm_all_roads AS o ON o.osm_id = l.way_id
+    CROSS JOIN LATERAL unnest(l.node_ids) WITH ORDINALITY AS v(node_id, seq)
+    WHERE o.bikable_road = TRUE
+    GROUP BY v.node_id
+    -- Same test as COUNT(DISTINCT way_id) >= 2 without the per-group sort
+    HAVING MIN(l.way_id) <> MAX(l.way_id)
+) AS j;
+
+-- way_ids && ...: incremental refresh finds the junctions of changed / deleted ways
+CREATE INDEX idx_rs_junction_index_way_ids ON rs_junction_index USING GIN (way_ids);
+ANALYZE rs_junction_index;
+
+DO $$
+DECLARE
+    junctions BIGINT;
+BEGIN
+    SELECT COUNT(*) INTO junctions FROM rs_junction_index;
+    RAISE NOTICE 'rs_junction_index: % junction nodes, % MB',
+        junctions, pg_total_relation_size('rs_junction_index') / (1024 * 1024);
+END $$;
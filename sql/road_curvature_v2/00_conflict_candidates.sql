@@ -0,0 +1,37 @@
+-- Curvature v2: conflict node candidates for 04_conflict_zone_suppression.sql
+-- Tagged conflict nodes + nodes shared by >= 2 bikable ways, taken from the junction
+-- index (sql/road_classification/09_build_junction_index.sql, built over every bikable
+-- way). Step 04 only maps these onto the ways of its partition; a node shared with a
+-- way of another partition is still found.
+
+-- Source tables should be indexed (once here, not in every partition worker)
+CREATE INDEX IF NOT EXISTS idx_rs_highway_way_nodes_way_seq
+ON rs_highway_way_nodes (way_id, seq);
+
+CREATE INDEX IF NOT EXISTS idx_rs_highway_way_nodes_node_id
+ON rs_highway_way_nodes (node_id);
+
+CREATE INDEX IF NOT EXISTS idx_rs_conflict_nodes_geom
+ON rs_conflict_nodes USING GIST (geometry);
+
+DROP TABLE IF EXISTS rs_curvature_conflict_candidates;
+
+CREATE UNLOGGED TABLE rs_curvature_conflict_candidates AS
+-- Tagged conflict nodes from OSM (traffic controls, etc.)
+SELECT
+    c.osm_id AS node_id,
+    'tagged'::text AS conflict_source,
+    c.conflict_type AS conflict_type
+FROM rs_conflict_nodes AS c
+UNION
+-- Derived intersection nodes (topology-based: any node used by >= 2 distinct ways)
+SELECT
+    j.node_id,
+    'derived_intersection'::text AS conflict_source,
+    NULL::text AS conflict_type
+FROM rs_junction_index AS j;
+
+CREATE INDEX idx_rs_curvature_conflict_candidates_node_id
+ON rs_curvature_conflict_candidates (node_id);
+
+ANALYZE rs_curvature_conflict_candidates;
@@ -0,0 +1,121 @@
+-- Build rs_highway_way_coords (one row per highway way, packed vertices)
+-- Same zip of rs_highway_way_node_lists.node_ids with the way geometry points as
+-- 00_populate_node_coordinates.sql, but stored as three parallel arrays per way:
+--   node_ids  int8[]  ordered node ids
+--   lon_e7    int4[]  fixed-point longitudes (1e-7 degree, the PBF / osm2pgsql precision)
+--   lat_e7    int4[]  fixed-point latitudes
+-- ~16 bytes per vertex and one tuple header per way instead of a heap row (plus index
+-- entries) per vertex. lon_e7 / lat_e7 are NULL when the geometry lost a point (missing
+-- node location, repeated node at the same location), like the NULL lon/lat rows of
+-- rs_highway_way_nodes.
+--
+-- Readers: scripts/curvature_engine.py and sql/road_intersection_density (01, 02).
+-- Unpack with rs_way_vertices(node_ids, lon_e7, lat_e7) or unnest(...) WITH ORDINALITY.
+--
+-- IDEMPOTENT: skips while the source key stored at build time (rs_derived_table_sources)
+-- matches rs_way_node_lists_key(), i.e. the table was built from the current import (both
+-- defined in 00_populate_node_coordinates.sql, which runs first). Incremental runs keep it in
+-- sync and restamp the key in sql/incremental/02_refresh_way_nodes.sql.
+
+-- Degrees -> fixed point (lossless for coordinates that came from a PBF)
+CREATE OR REPLACE FUNCTION rs_coord_e7(value double precision)
+RETURNS integer
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS $$ SELECT round(value * 1e7)::integer $$;
+
+-- Fixed point -> the float4 degrees stored in rs_highway_way_nodes
+CREATE OR REPLACE FUNCTION rs_coord_from_e7(value integer)
+RETURNS real
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS $$ SELECT (value::double precision / 1e7)::real $$;
+
+-- Packed way -> one row per vertex (the rs_highway_way_nodes layout without way_id)
+CREATE OR REPLACE FUNCTION rs_way_vertices(node_ids bigint[], lon_e7 integer[], lat_e7 integer[])
+RETURNS TABLE (seq integer, node_id bigint, lon real, lat real)
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT v.seq::integer, v.node_id, rs_coord_from_e7(v.lon_e7), rs_coord_from_e7(v.lat_e7)
+    FROM unnest(node_ids, lon_e7, lat_e7) WITH ORDINALITY AS v(node_id, lon_e7, lat_e7, seq)
+$$;
+
+DO $$
+DECLARE
+    current_key TEXT;
+BEGIN
+    IF to_regclass('public.rs_highway_way_node_lists') IS NULL THEN
+        RAISE EXCEPTION 'ERROR: rs_highway_way_node_lists table does not exist. The OSM import may have used an older Lua script. Re-import using Lua3_RouteProcessing_with_curvature.lua.';
+    END IF;
+    IF to_regclass('public.rs_derived_table_sources') IS NULL THEN
+        RAISE EXCEPTION 'ERROR: rs_derived_table_sources does not exist. Run 00_populate_node_coordinates.sql first.';
+    END IF;
+
+    -- EARLY EXIT CHECK: skip if the table was built from the current node lists
+    current_key := rs_way_node_lists_key();
+    IF to_regclass('public.rs_highway_way_coords') IS NOT NULL AND EXISTS (
+        SELECT 1 FROM rs_derived_table_sources
+        WHERE table_name = 'rs_highway_way_coords'
+          AND source_key = current_key
+    ) THEN
+        RAISE NOTICE 'rs_highway_way_coords is current (source %). Skipping.', current_key;
+        RETURN;
+    END IF;
+
+    RAISE NOTICE 'Building rs_highway_way_coords from rs_highway_way_node_lists + way geometries...';
+
+    DROP TABLE IF EXISTS rs_highway_way_coords;
+
+    CREATE TABLE rs_highway_way_coords AS
+    SELECT
+        l.way_id,
+        l.node_ids,
+        p.lon_e7,
+        p.lat_e7
+    FROM rs_highway_way_node_lists AS l
+    LEFT JOIN osm_all_roads AS o ON o.osm_id = l.way_id
+    LEFT JOIN LATERAL (
+        SELECT
+            array_agg(rs_coord_e7(ST_X(dp.geom)) ORDER BY dp.path[1]) AS lon_e7,
+            array_agg(rs_coord_e7(ST_Y(dp.geom)) ORDER BY dp.path[1]) AS lat_e7
+        FROM ST_DumpPoints(ST_GeometryN(o.geometry, 1)) AS dp
+    ) AS p ON ST_NPoints(ST_GeometryN(o.geometry, 1)) = cardinality(l.node_ids);
+
+    ALTER TABLE rs_highway_way_coords ADD PRIMARY KEY (way_id);
+    ANALYZE rs_highway_way_coords;
+
+    INSERT INTO rs_derived_table_sources (table_name, source_key, built_at)
+    VALUES ('rs_highway_way_coords', current_key, now())
+    ON CONFLICT (table_name) DO UPDATE
+    SET source_key = EXCLUDED.source_key, built_at = EXCLUDED.built_at;
+END $$;
+
+-- Report results
+DO $$
+DECLARE
+    total_ways BIGINT;
+    ways_with_coords BIGINT;
+    ways_lost_points BIGINT;
+    ways_no_geometry BIGINT;
+BEGIN
+    SELECT COUNT(*), COUNT(*) FILTER (WHERE lon_e7 IS NOT NULL)
+    INTO total_ways, ways_with_coords
+    FROM rs_highway_way_coords;
+
+    -- Ways without coordinates by cause (also logged by add_custom_tags.log_ways_without_coordinates)
+    SELECT
+        COUNT(*) FILTER (WHERE o.geometry IS NOT NULL),
+        COUNT(*) FILTER (WHERE o.geometry IS NULL)
+    INTO ways_lost_points, ways_no_geometry
+    FROM rs_highway_way_coords AS c
+    LEFT JOIN osm_all_roads AS o ON o.osm_id = c.way_id
+    WHERE c.lon_e7 IS NULL;
+
+    RAISE NOTICE 'rs_highway_way_coords: % ways, % with coordinates, % MB',
+        total_ways, ways_with_coords, pg_total_relation_size('rs_highway_way_coords') / (1024 * 1024);
+
+    IF ways_with_coords = 0 THEN
+        RAISE EXCEPTION 'ERROR: No way has coordinates in rs_highway_way_coords. Check that osm_all_roads.geometry is populated for highway ways.';
+    ELSIF ways_lost_points + ways_no_geometry > 0 THEN
+        RAISE WARNING 'rs_highway_way_coords: % ways without coordinates (NULL curvature): % whose geometry lost points (repeated / unlocated nodes), % without geometry',
+            ways_lost_points + ways_no_geometry, ways_lost_points, ways_no_geometry;
+    END IF;
+END $$;
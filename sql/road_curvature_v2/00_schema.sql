@@ -2,13 +2,34 @@
 -- Creates intermediate + output tables used by the roadcurvature.com-style computation.
 --
 -- Assumes osm2pgsql flex import using scripts/Lua3_RouteProcessing_with_curvature.lua
--- has created:
+-- has created (rs_highway_way_nodes is built by 00_populate_node_coordinates.sql):
 --   - rs_highway_way_nodes(way_id, node_id, seq, lon, lat)
 --   - rs_conflict_nodes(osm_id, conflict_type, geometry, ...)
 --   - osm_all_roads(osm_id, highway, ...)
 
-DROP TABLE IF EXISTS rs_curvature_way_vertices;
-CREATE UNLOGGED TABLE rs_curvature_way_vertices (
+-- Intermediates of the SQL steps 01-05, hash-partitioned by way_id (32 partitions,
+-- <table>_p00 .. <table>_p31). scripts/curvature_sql_partitions.py runs 01-05 once per
+-- partition (placeholders partition_suffix = '_p07' and way_partition_clause) on a worker
+-- pool and truncates the partition's tables once its summaries are written, so each window
+-- sort only sees ~1/32 of the vertices. Without the placeholders the steps use the parent
+-- tables.
+-- Only the parents are created here: the NumPy / PBF engines never touch the intermediates,
+-- so the 96 partitions are created by rs_curvature_create_partitions() below, called by the
+-- SQL engines before step 01, and only where they are missing. Runs keep them (empty);
+-- the storage cleanup after Part 2 drops them with their parents.
+DO $$
+DECLARE
+    parent TEXT;
+BEGIN
+    -- Tables of a schema before the hash partitioning cannot take partitions
+    FOREACH parent IN ARRAY ARRAY['rs_curvature_way_vertices', 'rs_curvature_vertex_metrics', 'rs_curvature_conflict_points'] LOOP
+        IF EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass(parent) AND relkind <> 'p') THEN
+            EXECUTE format('DROP TABLE %I', parent);
+        END IF;
+    END LOOP;
+END $$;
+
+CREATE UNLOGGED TABLE IF NOT EXISTS rs_curvature_way_vertices (
     way_id BIGINT NOT NULL,
     node_id BIGINT NOT NULL,
     seq INTEGER NOT NULL,
@@ -16,10 +37,9 @@ CREATE UNLOGGED TABLE rs_curvature_way_vertices (
     lat REAL,
     geom GEOMETRY(POINT, 4326),
     geom_3857 GEOMETRY(POINT, 3857)
-);
+) PARTITION BY HASH (way_id);
 
-DROP TABLE IF EXISTS rs_curvature_vertex_metrics;
-CREATE UNLOGGED TABLE rs_curvature_vertex_metrics (
+CREATE UNLOGGED TABLE IF NOT EXISTS rs_curvature_vertex_metrics (
     way_id BIGINT NOT NULL,
     node_id BIGINT NOT NULL,
     seq INTEGER NOT NULL,
@@ -30,29 +50,125 @@ CREATE UNLOGGED TABLE rs_curvature_vertex_metrics (
     turn_angle_rad DOUBLE PRECISION,
     radius_m DOUBLE PRECISION,
     contrib_m DOUBLE PRECISION,
-    curvature_bucket TEXT,
-    suppressed BOOLEAN DEFAULT FALSE
-);
+    curvature_bucket TEXT
+) PARTITION BY HASH (way_id);
 
-DROP TABLE IF EXISTS rs_curvature_conflict_points;
-CREATE UNLOGGED TABLE rs_curvature_conflict_points (
+CREATE UNLOGGED TABLE IF NOT EXISTS rs_curvature_conflict_points (
     way_id BIGINT NOT NULL,
     node_id BIGINT NOT NULL,
     seq INTEGER,
     cum_m DOUBLE PRECISION,
     conflict_source TEXT,
     conflict_type TEXT
-);
+) PARTITION BY HASH (way_id);
 
-DROP TABLE IF EXISTS rs_curvature_way_summary;
-CREATE UNLOGGED TABLE rs_curvature_way_summary (
+-- Creates the missing hash partitions of the three intermediates; returns how many it created
+-- (0 when they all exist). Existing partitions are left alone, leftovers of an aborted run
+-- are emptied by the TRUNCATE at the top of each step.
+CREATE OR REPLACE FUNCTION rs_curvature_create_partitions(partitions integer DEFAULT 32)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    parent TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['rs_curvature_way_vertices', 'rs_curvature_vertex_metrics', 'rs_curvature_conflict_points'] LOOP
+        FOR remainder IN 0 .. partitions - 1 LOOP
+            IF to_regclass(parent || '_p' || lpad(remainder::text, 2, '0')) IS NULL THEN
+                EXECUTE format(
+                    'CREATE UNLOGGED TABLE %I PARTITION OF %I FOR VALUES WITH (MODULUS %s, REMAINDER %s)',
+                    parent || '_p' || lpad(remainder::text, 2, '0'), parent, partitions, remainder
+                );
+                created := created + 1;
+            END IF;
+        END LOOP;
+    END LOOP;
+    RETURN created;
+END
+$$;
+
+-- Output table: kept between runs; 05_aggregate_to_way.sql replaces the rows it recomputes
+-- (all ways on a full run, the affected ways on an incremental run)
+CREATE UNLOGGED TABLE IF NOT EXISTS rs_curvature_way_summary (
     way_id BIGINT PRIMARY KEY,
     total_length_m DOUBLE PRECISION,
     meters_sharp DOUBLE PRECISION,
     meters_broad DOUBLE PRECISION,
     meters_straight DOUBLE PRECISION,
     twistiness_score DOUBLE PRECISION,
-    twistiness_class TEXT
+    twistiness_class TEXT,
+    -- Hash of the way's ordered (node_id, lon, lat, is_conflict) vertices and the thresholds,
+    -- written by scripts/curvature_engine.py to skip unchanged ways (NULL = always recompute)
+    input_hash BIGINT,
+    -- Counted (not suppressed) meters by (radius bin, turn-angle bin), sparse and ascending;
+    -- see rs_curvature_histogram_bin below. Other thresholds are scored from these
+    -- (rs_curvature_rebucket, scripts/curvature_thresholds.py) without the geometry.
+    histogram_bins SMALLINT[],
+    histogram_meters DOUBLE PRECISION[]
 );
+ALTER TABLE rs_curvature_way_summary ADD COLUMN IF NOT EXISTS input_hash BIGINT;
+ALTER TABLE rs_curvature_way_summary ADD COLUMN IF NOT EXISTS histogram_bins SMALLINT[];
+ALTER TABLE rs_curvature_way_summary ADD COLUMN IF NOT EXISTS histogram_meters DOUBLE PRECISION[];
+
+-- Histogram bin of a bucketed vertex: radius_bin * 16 + angle_bin with
+--   radius_bin 0..40: (0, 25], (25, 50], ..., (975, 1000], > 1000 m
+--   angle_bin  0..15: [0, 1), [1, 2), ..., [14, 15), >= 15 degrees
+-- Same layout as scripts/curvature_engine.py (RADIUS_BIN_M, ANGLE_BIN_DEG, ...).
+CREATE OR REPLACE FUNCTION rs_curvature_histogram_bin(radius_m double precision, turn_angle_rad double precision)
+RETURNS smallint
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS $$
+    SELECT (
+        LEAST(GREATEST(ceil(radius_m / 25.0)::integer - 1, 0), 40) * 16
+        + LEAST(floor(degrees(turn_angle_rad))::integer, 15)
+    )::smallint
+$$;
+
+-- Re-bucket a histogram for other thresholds (same rules as 02_compute_vertex_angles.sql:
+-- sharp = turn >= min_turn_deg and radius <= sharp_radius_m, broad = turn >= min_turn_deg
+-- and radius <= broad_radius_m, straight = the rest). Exact for thresholds on bin edges:
+-- radii in multiples of 25 m up to 1000, whole turn angles up to 15 degrees.
+CREATE OR REPLACE FUNCTION rs_curvature_rebucket(
+    bins smallint[],
+    meters double precision[],
+    sharp_radius_m double precision DEFAULT 150.0,
+    broad_radius_m double precision DEFAULT 500.0,
+    min_turn_deg double precision DEFAULT 5.0
+)
+RETURNS TABLE (meters_sharp double precision, meters_broad double precision, meters_straight double precision)
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    WITH h AS (
+        SELECT
+            b.m,
+            -- Upper radius edge of the bin (1025 = above the last edge) and lower angle edge
+            (b.bin / 16 + 1) * 25.0 AS radius_edge_m,
+            b.bin % 16 >= min_turn_deg AS turning
+        FROM unnest(bins, meters) AS b(bin, m)
+    )
+    SELECT
+        COALESCE(SUM(m) FILTER (WHERE turning AND radius_edge_m <= sharp_radius_m), 0.0),
+        COALESCE(SUM(m) FILTER (WHERE turning AND radius_edge_m > sharp_radius_m AND radius_edge_m <= broad_radius_m), 0.0),
+        COALESCE(SUM(m) FILTER (WHERE NOT turning OR radius_edge_m > broad_radius_m), 0.0)
+    FROM h
+$$;
+
+-- twistiness_class of a score for the given cut-offs (05_aggregate_to_way.sql defaults)
+CREATE OR REPLACE FUNCTION rs_twistiness_class(
+    score double precision,
+    broad_score double precision DEFAULT 0.03,
+    sharp_score double precision DEFAULT 0.08
+)
+RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT CASE
+        WHEN score IS NULL THEN NULL
+        WHEN score < broad_score THEN 'straight'
+        WHEN score < sharp_score THEN 'broad'
+        ELSE 'sharp'
+    END
+$$;
 
 
@@ -1,96 +1,63 @@
 -- VALIDATION: Check that OSM import created required tables correctly
 -- This should be run IMMEDIATELY after the OSM import completes.
--- Validates that tables exist and have data. Coordinates may be NULL (populated later in curvature workflow).
+-- Validates that the way-node lists exist and line up with the highway geometries.
+-- Per-node coordinates are built later by 00_populate_node_coordinates.sql in the curvature workflow.
 
 DO $$
 DECLARE
-    total_rows BIGINT;
-    null_coords_count BIGINT;
-    non_null_coords_count BIGINT;
-    null_coords_pct NUMERIC;
-    distinct_ways BIGINT;
-    ways_with_all_null_coords BIGINT;
-    ways_with_some_coords BIGINT;
-    ways_with_all_coords BIGINT;
+    total_ways BIGINT;
+    total_way_nodes BIGINT;
+    ways_without_geometry BIGINT;
+    ways_point_mismatch BIGINT;
 BEGIN
     -- Check if table exists
     IF NOT EXISTS (
-        SELECT 1 FROM information_schema.tables 
-        WHERE table_schema = 'public' 
-        AND table_name = 'rs_highway_way_nodes'
+        SELECT 1 FROM information_schema.tables
+        WHERE table_schema = 'public'
+        AND table_name = 'rs_highway_way_node_lists'
     ) THEN
-        RAISE EXCEPTION 'ERROR: Table rs_highway_way_nodes does not exist. OSM import may have failed or used wrong Lua script. Expected Lua3_RouteProcessing_with_curvature.lua';
+        RAISE EXCEPTION 'ERROR: Table rs_highway_way_node_lists does not exist. OSM import may have failed or used wrong Lua script. Expected Lua3_RouteProcessing_with_curvature.lua';
     END IF;
-    
+
     -- Get basic counts
-    SELECT 
+    SELECT
         COUNT(*),
-        COUNT(*) FILTER (WHERE lon IS NULL OR lat IS NULL),
-        COUNT(*) FILTER (WHERE lon IS NOT NULL AND lat IS NOT NULL),
-        COUNT(DISTINCT way_id)
-    INTO 
-        total_rows,
-        null_coords_count,
-        non_null_coords_count,
-        distinct_ways
-    FROM rs_highway_way_nodes;
-    
+        COALESCE(SUM(cardinality(node_ids)), 0)
+    INTO
+        total_ways,
+        total_way_nodes
+    FROM rs_highway_way_node_lists;
+
     -- Check if table is empty
-    IF total_rows = 0 THEN
-        RAISE EXCEPTION 'ERROR: rs_highway_way_nodes table is empty. OSM import did not populate way nodes. Check that Lua script is correct and PBF file contains highway data.';
+    IF total_ways = 0 THEN
+        RAISE EXCEPTION 'ERROR: rs_highway_way_node_lists table is empty. OSM import did not populate way nodes. Check that Lua script is correct and PBF file contains highway data.';
     END IF;
-    
-    -- Calculate percentage
-    null_coords_pct := (null_coords_count::NUMERIC / NULLIF(total_rows, 0)::NUMERIC) * 100;
-    
-    -- Check per-way statistics
-    WITH way_stats AS (
-        SELECT 
-            way_id,
-            COUNT(*) AS total_nodes,
-            COUNT(*) FILTER (WHERE lon IS NULL OR lat IS NULL) AS null_nodes,
-            COUNT(*) FILTER (WHERE lon IS NOT NULL AND lat IS NOT NULL) AS valid_nodes
-        FROM rs_highway_way_nodes
-        GROUP BY way_id
-    )
-    SELECT 
-        COUNT(*) FILTER (WHERE null_nodes = total_nodes),
-        COUNT(*) FILTER (WHERE valid_nodes > 0 AND null_nodes > 0),
-        COUNT(*) FILTER (WHERE null_nodes = 0)
-    INTO 
-        ways_with_all_null_coords,
-        ways_with_some_coords,
-        ways_with_all_coords
-    FROM way_stats;
-    
-    -- NOTE: NULL coordinates are expected in slim mode (cache doesn't persist between passes)
-    -- Coordinates will be populated by 00_populate_node_coordinates.sql in the curvature workflow
-    -- So we don't fail on NULL coordinates, just report status
-    
-    -- WARN if all coordinates are NULL (unusual, but OK since we populate them later)
-    IF null_coords_count = total_rows THEN
-        RAISE WARNING 
-            'NOTE: All coordinates are NULL in rs_highway_way_nodes (% rows, % ways). '
-            'This is expected in slim mode. Coordinates will be populated by 00_populate_node_coordinates.sql in the curvature workflow.',
-            total_rows, distinct_ways;
-    ELSIF null_coords_pct > 50 THEN
-        RAISE WARNING 
-            'NOTE: %s%% of coordinates are NULL (%s of %s rows). '
-            'This is expected in slim mode. Coordinates will be populated by 00_populate_node_coordinates.sql in the curvature workflow.',
-            ROUND(null_coords_pct, 1)::TEXT, null_coords_count, total_rows;
+
+    -- Ways whose geometry is missing or does not have one point per node
+    -- (these get NULL coordinates in rs_highway_way_nodes)
+    SELECT
+        COUNT(*) FILTER (WHERE o.geometry IS NULL),
+        COUNT(*) FILTER (WHERE o.geometry IS NOT NULL AND ST_NPoints(ST_GeometryN(o.geometry, 1)) <> cardinality(l.node_ids))
+    INTO
+        ways_without_geometry,
+        ways_point_mismatch
+    FROM rs_highway_way_node_lists l
+    LEFT JOIN osm_all_roads o ON o.osm_id = l.way_id;
+
+    IF ways_without_geometry + ways_point_mismatch > total_ways * 0.05 THEN
+        RAISE WARNING
+            'NOTE: % of % ways have no geometry and % have a point count different from their node list. '
+            'Their way nodes will have NULL coordinates in the curvature workflow.',
+            ways_without_geometry, total_ways, ways_point_mismatch;
     END IF;
-    
+
     -- SUCCESS message
-    RAISE NOTICE 
+    RAISE NOTICE
         '✓ Import validation PASSED: '
-        '%s rows in rs_highway_way_nodes, '
-        '%s distinct ways, '
-        '%s%% have NULL coordinates (%s rows) - will be populated in curvature workflow, '
-        '%s ways have all valid coordinates, '
-        '%s ways have partial coordinates, '
-        '%s ways have all NULL coordinates. '
+        '%s ways in rs_highway_way_node_lists, '
+        '%s way nodes, '
+        '%s ways without geometry, '
+        '%s ways with point/node count mismatch. '
         'Table structure is correct. Proceeding with curvature pipeline is safe.',
-        total_rows, distinct_ways, ROUND(null_coords_pct, 1)::TEXT, null_coords_count,
-        ways_with_all_coords, ways_with_some_coords, ways_with_all_null_coords;
+        total_ways, total_way_nodes, ways_without_geometry, ways_point_mismatch;
 END $$;
-
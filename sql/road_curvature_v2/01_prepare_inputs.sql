@@ -57,17 +57,20 @@ BEGIN
     END IF;
 END $$;
 
-TRUNCATE rs_curvature_way_vertices;
+TRUNCATE rs_curvature_way_vertices:partition_suffix;
 
 -- Filter to bikable roads using the pre-computed flag (much faster than IN clause)
 -- The bikable_road flag is set in sql/road_classification/04_prepare_osm_all_roads_table.sql
 -- and has a partial index (idx_osm_all_roads_bikable_road) for efficient filtering
+-- :osm_id_filter_clause limits the ways in incremental runs (empty = all bikable roads),
+-- :way_partition_clause to the ways of one hash partition (see 00_schema.sql)
 WITH eligible_ways AS (
     SELECT osm_id
     FROM osm_all_roads
     WHERE bikable_road = TRUE
+    :osm_id_filter_clause
 )
-INSERT INTO rs_curvature_way_vertices (way_id, node_id, seq, lon, lat, geom, geom_3857)
+INSERT INTO rs_curvature_way_vertices:partition_suffix (way_id, node_id, seq, lon, lat, geom, geom_3857)
 SELECT
     w.way_id,
     w.node_id,
@@ -84,23 +87,14 @@ SELECT
     END AS geom_3857
 FROM rs_highway_way_nodes AS w
 JOIN eligible_ways AS e ON e.osm_id = w.way_id
-WHERE w.seq IS NOT NULL;
+WHERE w.seq IS NOT NULL
+:way_partition_clause;
 
--- Helpful indexes for windowing + joins
-CREATE INDEX IF NOT EXISTS idx_rs_curvature_way_vertices_way_seq
-ON rs_curvature_way_vertices (way_id, seq);
+-- Helpful indexes for windowing + joins (source table indexes: 00_conflict_candidates.sql)
+CREATE INDEX IF NOT EXISTS idx_rs_curvature_way_vertices_way_seq:partition_suffix
+ON rs_curvature_way_vertices:partition_suffix (way_id, seq);
 
-CREATE INDEX IF NOT EXISTS idx_rs_curvature_way_vertices_node_id
-ON rs_curvature_way_vertices (node_id);
-
--- Source tables should also be indexed
-CREATE INDEX IF NOT EXISTS idx_rs_highway_way_nodes_way_seq
-ON rs_highway_way_nodes (way_id, seq);
-
-CREATE INDEX IF NOT EXISTS idx_rs_highway_way_nodes_node_id
-ON rs_highway_way_nodes (node_id);
-
-CREATE INDEX IF NOT EXISTS idx_rs_conflict_nodes_geom
-ON rs_conflict_nodes USING GIST (geometry);
+CREATE INDEX IF NOT EXISTS idx_rs_curvature_way_vertices_node_id:partition_suffix
+ON rs_curvature_way_vertices:partition_suffix (node_id);
 
 
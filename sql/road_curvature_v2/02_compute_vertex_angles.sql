@@ -11,7 +11,7 @@ DECLARE
     sample_total BIGINT;
 BEGIN
     -- Quick existence check (uses index if available, very fast)
-    SELECT EXISTS(SELECT 1 FROM rs_curvature_way_vertices LIMIT 1) INTO has_data;
+    SELECT EXISTS(SELECT 1 FROM rs_curvature_way_vertices:partition_suffix LIMIT 1) INTO has_data;
     
     IF NOT has_data THEN
         RAISE EXCEPTION 'ERROR: rs_curvature_way_vertices table is empty. Run 01_prepare_inputs.sql first.';
@@ -19,7 +19,7 @@ BEGIN
     
     -- Quick check: do we have ANY non-null geometries? (uses index, very fast)
     SELECT EXISTS(
-        SELECT 1 FROM rs_curvature_way_vertices 
+        SELECT 1 FROM rs_curvature_way_vertices:partition_suffix 
         WHERE geom IS NOT NULL AND geom_3857 IS NOT NULL 
         LIMIT 1
     ) INTO has_geoms;
@@ -36,7 +36,7 @@ BEGIN
     INTO sample_total, sample_null_count
     FROM (
         SELECT geom, geom_3857 
-        FROM rs_curvature_way_vertices 
+        FROM rs_curvature_way_vertices:partition_suffix 
         TABLESAMPLE SYSTEM (0.1)  -- Sample 0.1% of rows
         LIMIT 10000  -- Cap at 10k rows for speed
     ) sample;
@@ -58,7 +58,7 @@ BEGIN
     END IF;
 END $$;
 
-TRUNCATE rs_curvature_vertex_metrics;
+TRUNCATE rs_curvature_vertex_metrics:partition_suffix;
 
 WITH params AS (
     SELECT
@@ -77,7 +77,7 @@ pts AS (
         LAG(geom_3857) OVER w AS prev_geom_3857,
         LEAD(geom) OVER w AS next_geom,
         LEAD(geom_3857) OVER w AS next_geom_3857
-    FROM rs_curvature_way_vertices
+    FROM rs_curvature_way_vertices:partition_suffix
     WINDOW w AS (PARTITION BY way_id ORDER BY seq)
 ),
 dists AS (
@@ -177,9 +177,9 @@ bucketed AS (
         END AS curvature_bucket
     FROM cum AS c
 )
-INSERT INTO rs_curvature_vertex_metrics (
+INSERT INTO rs_curvature_vertex_metrics:partition_suffix (
     way_id, node_id, seq, cum_m, dist_prev_m, dist_next_m, dist_prev_next_m,
-    turn_angle_rad, radius_m, contrib_m, curvature_bucket, suppressed
+    turn_angle_rad, radius_m, contrib_m, curvature_bucket
 )
 SELECT
     way_id, node_id, seq, cum_m, dist_prev_m, dist_next_m, dist_prev_next_m,
@@ -190,14 +190,10 @@ SELECT
         WHEN dist_prev_m IS NULL OR dist_next_m IS NULL THEN 0.0
         ELSE contrib_m
     END AS contrib_m,
-    curvature_bucket,
-    FALSE
+    curvature_bucket
 FROM bucketed;
 
-CREATE INDEX IF NOT EXISTS idx_rs_curvature_vertex_metrics_way_seq
-ON rs_curvature_vertex_metrics (way_id, seq);
-
-CREATE INDEX IF NOT EXISTS idx_rs_curvature_vertex_metrics_way_cum
-ON rs_curvature_vertex_metrics (way_id, cum_m);
+CREATE INDEX IF NOT EXISTS idx_rs_curvature_vertex_metrics_way_seq:partition_suffix
+ON rs_curvature_vertex_metrics:partition_suffix (way_id, seq);
 
 
@@ -2,10 +2,16 @@
 -- At the moment, bucketing and per-vertex contribution meters are computed in
 -- 02_compute_vertex_angles.sql.
 --
--- This file exists so it’s easy to iterate on bucketing thresholds / weighting
--- without rewriting the geometry + radius calculation step.
+-- To iterate on bucketing thresholds / class cut-offs without re-running the
+-- geometry + radius calculation, re-score the per-way histograms stored in
+-- rs_curvature_way_summary (05_aggregate_to_way.sql / scripts/curvature_engine.py):
+--
+--   SELECT s.way_id, r.meters_sharp, r.meters_broad,
+--          (r.meters_sharp + 0.5 * r.meters_broad) / NULLIF(s.total_length_m, 0) AS twistiness_score
+--   FROM rs_curvature_way_summary AS s
+--   CROSS JOIN LATERAL rs_curvature_rebucket(s.histogram_bins, s.histogram_meters, 200.0, 600.0, 4.0) AS r;
+--
+-- scripts/curvature_thresholds.py sweeps many thresholds at once and can apply one set.
 
 -- No-op for now.
 SELECT 1;
-
-
@@ -1,6 +1,10 @@
--- Curvature v2: suppress curvature contributions within 30m of conflict points.
+-- Curvature v2: conflict points for the 30m suppression of curvature contributions.
 -- Inspired by roadcurvature.com "Avoiding congestion and conflict zones" (30m both directions).
 -- https://roadcurvature.com/
+--
+-- This step only maps the conflict nodes onto the ways. The suppression itself is a sweep
+-- in 05_aggregate_to_way.sql (nearest conflict before / after each vertex from two running
+-- aggregates per way), so rs_curvature_vertex_metrics is never rewritten by an UPDATE.
 
 -- VALIDATION: Check that vertex_metrics has cumulative distance data
 DO $$
@@ -10,7 +14,7 @@ DECLARE
 BEGIN
     SELECT COUNT(*), COUNT(*) FILTER (WHERE cum_m IS NULL)
     INTO total_rows, null_cum_m_count
-    FROM rs_curvature_vertex_metrics;
+    FROM rs_curvature_vertex_metrics:partition_suffix;
     
     IF total_rows = 0 THEN
         RAISE EXCEPTION 'ERROR: rs_curvature_vertex_metrics table is empty. Run 02_compute_vertex_angles.sql first.';
@@ -23,63 +27,21 @@ BEGIN
     RAISE NOTICE 'Validation passed: %s rows in rs_curvature_vertex_metrics, %s have NULL cum_m', total_rows, null_cum_m_count;
 END $$;
 
-TRUNCATE rs_curvature_conflict_points;
-
-WITH derived_intersections AS (
-    -- Any node used by >=2 distinct ways is treated as an intersection conflict point.
-    SELECT
-        node_id
-    FROM rs_curvature_way_vertices
-    GROUP BY node_id
-    HAVING COUNT(DISTINCT way_id) >= 2
-),
-conflict_nodes_union AS (
-    -- Tagged conflict nodes from OSM (traffic controls, etc.)
-    SELECT
-        c.osm_id AS node_id,
-        'tagged'::text AS conflict_source,
-        c.conflict_type AS conflict_type
-    FROM rs_conflict_nodes AS c
-    UNION
-    -- Derived intersection nodes (topology-based)
-    SELECT
-        d.node_id,
-        'derived_intersection'::text AS conflict_source,
-        NULL::text AS conflict_type
-    FROM derived_intersections AS d
-),
-conflicts_on_ways AS (
-    -- Map conflict nodes onto each way (only if the way actually contains that node)
-    SELECT
-        v.way_id,
-        v.node_id,
-        v.seq,
-        m.cum_m,
-        u.conflict_source,
-        u.conflict_type
-    FROM conflict_nodes_union AS u
-    JOIN rs_curvature_way_vertices AS v ON v.node_id = u.node_id
-    JOIN rs_curvature_vertex_metrics AS m
-        ON m.way_id = v.way_id AND m.node_id = v.node_id AND m.seq = v.seq
-)
-INSERT INTO rs_curvature_conflict_points (way_id, node_id, seq, cum_m, conflict_source, conflict_type)
-SELECT way_id, node_id, seq, cum_m, conflict_source, conflict_type
-FROM conflicts_on_ways;
-
--- Index for suppression lookup
-CREATE INDEX IF NOT EXISTS idx_rs_curvature_conflict_points_way_cum
-ON rs_curvature_conflict_points (way_id, cum_m);
-
--- Mark vertices suppressed if within 30m along-the-way distance of any conflict point.
-UPDATE rs_curvature_vertex_metrics AS m
-SET suppressed = TRUE
-WHERE EXISTS (
-    SELECT 1
-    FROM rs_curvature_conflict_points AS c
-    WHERE c.way_id = m.way_id
-      AND c.cum_m IS NOT NULL
-      AND m.cum_m IS NOT NULL
-      AND abs(m.cum_m - c.cum_m) <= 30.0
-);
-
+TRUNCATE rs_curvature_conflict_points:partition_suffix;
 
+-- Conflict nodes (tagged + shared by >= 2 eligible ways) come from
+-- rs_curvature_conflict_candidates (00_conflict_candidates.sql), built over every eligible
+-- way: the vertex table may hold only one hash partition of the ways.
+INSERT INTO rs_curvature_conflict_points:partition_suffix (way_id, node_id, seq, cum_m, conflict_source, conflict_type)
+SELECT
+    v.way_id,
+    v.node_id,
+    v.seq,
+    m.cum_m,
+    u.conflict_source,
+    u.conflict_type
+-- Map conflict nodes onto each way (only if the way actually contains that node)
+FROM rs_curvature_conflict_candidates AS u
+JOIN rs_curvature_way_vertices:partition_suffix AS v ON v.node_id = u.node_id
+JOIN rs_curvature_vertex_metrics:partition_suffix AS m
+    ON m.way_id = v.way_id AND m.node_id = v.node_id AND m.seq = v.seq;
@@ -10,7 +10,7 @@ DECLARE
 BEGIN
     SELECT COUNT(*), COUNT(*) FILTER (WHERE dist_prev_m IS NULL)
     INTO total_rows, null_dist_count
-    FROM rs_curvature_vertex_metrics;
+    FROM rs_curvature_vertex_metrics:partition_suffix;
     
     IF total_rows = 0 THEN
         RAISE EXCEPTION 'ERROR: rs_curvature_vertex_metrics table is empty. Run 02_compute_vertex_angles.sql first.';
@@ -27,7 +27,7 @@ BEGIN
     -- Check if any ways will have non-zero length
     SELECT COUNT(DISTINCT way_id)
     INTO zero_length_ways
-    FROM rs_curvature_vertex_metrics
+    FROM rs_curvature_vertex_metrics:partition_suffix
     WHERE dist_prev_m IS NOT NULL AND dist_prev_m > 0;
     
     IF zero_length_ways = 0 THEN
@@ -37,40 +37,82 @@ BEGIN
     RAISE NOTICE 'Validation passed: %s rows in rs_curvature_vertex_metrics, %s%% have NULL dist_prev_m, %s ways have positive distances', total_rows, ROUND(null_dist_pct, 1)::TEXT, zero_length_ways;
 END $$;
 
-TRUNCATE rs_curvature_way_summary;
+-- Full run: replaces every summary row. Incremental run: :way_id_filter_clause limits
+-- the replaced rows to the recomputed ways; the vertex tables may hold extra context
+-- ways (their neighbours) that are not written back. Partitioned runs add the
+-- way_partition_clause placeholder (the ways of this hash partition).
+DELETE FROM rs_curvature_way_summary
+WHERE TRUE :way_id_filter_clause :way_partition_clause;
 
-WITH totals AS (
+WITH conflict_vertices AS (
+    -- A vertex can be a conflict point twice (tagged and derived intersection)
+    SELECT DISTINCT way_id, seq, cum_m
+    FROM rs_curvature_conflict_points:partition_suffix
+    WHERE cum_m IS NOT NULL
+),
+sweep AS (
+    -- Conflict-zone suppression (30m along the way, see 04_conflict_zone_suppression.sql).
+    -- cum_m grows with seq, so the nearest conflict points of a vertex are the last one
+    -- at / before it (forward running MAX) and the first one at / after it (backward
+    -- running MIN): two linear passes per way instead of a search per vertex.
     SELECT
-        way_id,
-        SUM(COALESCE(dist_prev_m, 0.0)) AS total_length_m
-    FROM rs_curvature_vertex_metrics
-    GROUP BY way_id
+        m.way_id,
+        m.cum_m,
+        m.dist_prev_m,
+        m.contrib_m,
+        m.curvature_bucket,
+        m.radius_m,
+        m.turn_angle_rad,
+        MAX(c.cum_m) OVER (PARTITION BY m.way_id ORDER BY m.seq) AS conflict_before_m,
+        MIN(c.cum_m) OVER (PARTITION BY m.way_id ORDER BY m.seq DESC) AS conflict_after_m
+    FROM rs_curvature_vertex_metrics:partition_suffix AS m
+    LEFT JOIN conflict_vertices AS c ON c.way_id = m.way_id AND c.seq = m.seq
+),
+flagged AS (
+    SELECT
+        s.*,
+        COALESCE(s.cum_m - s.conflict_before_m <= 30.0, FALSE)
+            OR COALESCE(s.conflict_after_m - s.cum_m <= 30.0, FALSE) AS suppressed
+    FROM sweep AS s
 ),
-bucket_sums AS (
+way_sums AS (
     SELECT
         way_id,
+        SUM(COALESCE(dist_prev_m, 0.0)) AS total_length_m,
         SUM(CASE WHEN suppressed THEN 0.0 WHEN curvature_bucket = 'sharp' THEN contrib_m ELSE 0.0 END) AS meters_sharp,
         SUM(CASE WHEN suppressed THEN 0.0 WHEN curvature_bucket = 'broad' THEN contrib_m ELSE 0.0 END) AS meters_broad,
         SUM(CASE WHEN suppressed THEN 0.0 WHEN curvature_bucket = 'straight' THEN contrib_m ELSE 0.0 END) AS meters_straight
-    FROM rs_curvature_vertex_metrics
+    FROM flagged
+    GROUP BY way_id
+),
+bin_sums AS (
+    -- Counted meters per histogram bin (rs_curvature_histogram_bin, 00_schema.sql)
+    SELECT way_id, rs_curvature_histogram_bin(radius_m, turn_angle_rad) AS bin, SUM(contrib_m) AS meters
+    FROM flagged
+    WHERE NOT suppressed AND curvature_bucket IS NOT NULL AND contrib_m > 0
+    GROUP BY 1, 2
+),
+histograms AS (
+    SELECT way_id, array_agg(bin ORDER BY bin) AS histogram_bins, array_agg(meters ORDER BY bin) AS histogram_meters
+    FROM bin_sums
     GROUP BY way_id
 ),
 scored AS (
     SELECT
-        t.way_id,
-        t.total_length_m,
-        COALESCE(b.meters_sharp, 0.0) AS meters_sharp,
-        COALESCE(b.meters_broad, 0.0) AS meters_broad,
-        COALESCE(b.meters_straight, 0.0) AS meters_straight,
+        w.way_id,
+        w.total_length_m,
+        COALESCE(w.meters_sharp, 0.0) AS meters_sharp,
+        COALESCE(w.meters_broad, 0.0) AS meters_broad,
+        COALESCE(w.meters_straight, 0.0) AS meters_straight,
         CASE
-            WHEN t.total_length_m IS NULL OR t.total_length_m = 0 THEN NULL
-            ELSE (COALESCE(b.meters_sharp, 0.0) + 0.5 * COALESCE(b.meters_broad, 0.0)) / t.total_length_m
+            WHEN w.total_length_m IS NULL OR w.total_length_m = 0 THEN NULL
+            ELSE (COALESCE(w.meters_sharp, 0.0) + 0.5 * COALESCE(w.meters_broad, 0.0)) / w.total_length_m
         END AS twistiness_score
-    FROM totals AS t
-    LEFT JOIN bucket_sums AS b USING (way_id)
+    FROM way_sums AS w
 )
 INSERT INTO rs_curvature_way_summary (
-    way_id, total_length_m, meters_sharp, meters_broad, meters_straight, twistiness_score, twistiness_class
+    way_id, total_length_m, meters_sharp, meters_broad, meters_straight, twistiness_score, twistiness_class,
+    histogram_bins, histogram_meters
 )
 SELECT
     way_id,
@@ -79,12 +121,12 @@ SELECT
     meters_broad,
     meters_straight,
     twistiness_score,
-    CASE
-        WHEN twistiness_score IS NULL THEN NULL
-        WHEN twistiness_score < 0.03 THEN 'straight'
-        WHEN twistiness_score < 0.08 THEN 'broad'
-        ELSE 'sharp'
-    END AS twistiness_class
-FROM scored;
+    rs_twistiness_class(twistiness_score, 0.03, 0.08) AS twistiness_class,
+    COALESCE(histogram_bins, '{}'),
+    COALESCE(histogram_meters, '{}')
+-- USING: the unqualified way_id of :way_id_filter_clause stays unambiguous
+FROM scored
+LEFT JOIN histograms USING (way_id)
+WHERE TRUE :way_id_filter_clause;
 
 
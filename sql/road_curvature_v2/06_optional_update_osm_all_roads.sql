@@ -48,6 +48,7 @@ SET
     meters_straight = s.meters_straight
 FROM rs_curvature_way_summary AS s
 WHERE o.osm_id = s.way_id
+  :osm_id_filter_clause_o
   -- Only update rows where values actually changed (avoids unnecessary writes)
   AND (
       o.twistiness_score IS DISTINCT FROM s.twistiness_score
@@ -0,0 +1,40 @@
+-- Road Intersection Speed Degradation: Assign ways to spatial tiles (v2, tile-parallel runs)
+--
+-- Used by scripts/intersection_tiles.py: every bikable way in scope is owned by exactly
+-- one tile (the :tile_size_deg x :tile_size_deg cell holding a point on the way), and
+-- steps 01-04 then run once per tile on their own connection, writing only the tile's
+-- ways. Ways of neighbouring tiles that share a junction with them (the halo) are seen
+-- through rs_junction_index, whose rows already hold every way of the node.
+--
+-- :osm_id_filter_clause_o limits the ways in incremental runs (empty = all bikable roads),
+-- :region_filter_clause to a region (empty = everywhere).
+
+DROP TABLE IF EXISTS rs_intersection_tiles;
+
+CREATE UNLOGGED TABLE rs_intersection_tiles AS
+WITH way_points AS (
+    SELECT
+        o.osm_id AS way_id,
+        ST_PointOnSurface(o.geometry) AS geom
+    FROM osm_all_roads o
+    WHERE o.bikable_road = TRUE
+      AND o.geometry IS NOT NULL
+      :osm_id_filter_clause_o
+),
+way_cells AS (
+    SELECT
+        way_id,
+        floor(ST_X(geom) / :tile_size_deg)::INTEGER AS cell_x,
+        floor(ST_Y(geom) / :tile_size_deg)::INTEGER AS cell_y
+    FROM way_points
+    WHERE TRUE
+      :region_filter_clause
+)
+SELECT
+    way_id,
+    (DENSE_RANK() OVER (ORDER BY cell_x, cell_y) - 1)::INTEGER AS tile_id
+FROM way_cells;
+
+ALTER TABLE rs_intersection_tiles ADD PRIMARY KEY (way_id);
+CREATE INDEX idx_rs_intersection_tiles_tile_id ON rs_intersection_tiles (tile_id);
+ANALYZE rs_intersection_tiles;
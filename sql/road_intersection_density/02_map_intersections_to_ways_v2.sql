@@ -34,11 +34,14 @@ SELECT DISTINCT ON (w.way_id, n.node_id)
         WHEN n.intersection_type = 'minor' AND o.road_setting_i1 = 'Urban' THEN 0.25
         ELSE 0.0
     END AS speed_reduction
+-- Ways of each intersection node straight from the junction index (no way vertex scan)
 FROM temp_intersection_nodes_v2 n
-JOIN rs_highway_way_nodes w ON n.node_id = w.node_id
+JOIN rs_junction_index j ON j.node_id = n.node_id
+CROSS JOIN LATERAL unnest(j.way_ids) AS w(way_id)
 JOIN osm_all_roads o ON w.way_id = o.osm_id
 WHERE o.bikable_road = TRUE
   AND n.intersection_type IN ('major', 'middling', 'minor')
+  :way_id_filter_clause_w  -- Incremental runs: affected ways only (empty = all ways)
   -- TEST BBOX FILTER: Commented out to process all of India
   -- AND ST_Intersects(o.geometry, ST_SetSRID(ST_MakeEnvelope(76.0, 12.0, 78.0, 14.0, 4326), 4326))
 ORDER BY w.way_id, n.node_id;
@@ -19,6 +19,7 @@ WITH way_lengths AS (
         ST_Length(o.geometry::geography) AS length_m
     FROM osm_all_roads o
     WHERE o.bikable_road = TRUE
+      :osm_id_filter_clause_o  -- Incremental runs: affected roads only (empty = all roads)
       -- TEST BBOX FILTER: Commented out to process all of India
       -- AND ST_Intersects(o.geometry, ST_SetSRID(ST_MakeEnvelope(76.0, 12.0, 78.0, 14.0, 4326), 4326))
 ),
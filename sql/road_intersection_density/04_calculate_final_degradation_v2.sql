@@ -27,7 +27,8 @@ SET intersection_speed_degradation_base = 0.0,
 WHERE bikable_road = TRUE
   AND (intersection_speed_degradation_base IS NULL 
        OR intersection_speed_degradation_setting_adjusted IS NULL
-       OR intersection_speed_degradation_final IS NULL);
+       OR intersection_speed_degradation_final IS NULL)
+  :osm_id_filter_clause;  -- Incremental runs: affected roads only (empty = all roads)
   -- TEST BBOX FILTER: Commented out to process all of India
   -- AND ST_Intersects(geometry, ST_SetSRID(ST_MakeEnvelope(76.0, 12.0, 78.0, 14.0, 4326), 4326));
 
@@ -38,21 +39,14 @@ WITH way_data AS (
         o.osm_id AS way_id,
         o.road_setting_i1,
         b.base_degradation,
-        -- Parse lanes
-        CASE 
-            WHEN o.lanes ~ '^[0-9]+$' THEN (o.lanes)::INTEGER
-            WHEN o.lanes ~ '^[0-9]+-[0-9]+$' THEN 
-                (SPLIT_PART(o.lanes, '-', 2))::INTEGER
-            ELSE NULL
-        END AS lanes_count,
-        -- Check if oneway
-        CASE 
-            WHEN UPPER(COALESCE(o.tags->>'oneway', '')) IN ('YES', 'TRUE', '1', '-1') THEN TRUE
-            ELSE FALSE
-        END AS is_oneway
+        -- Lanes / oneway are parsed at import (Lua3) or back-filled by
+        -- road_classification/04_prepare_osm_all_roads_table.sql
+        o.lanes_count,
+        COALESCE(o.is_oneway, FALSE) AS is_oneway
     FROM osm_all_roads o
     LEFT JOIN temp_way_base_degradation b ON o.osm_id = b.way_id
     WHERE o.bikable_road = TRUE
+      :osm_id_filter_clause_o
       -- TEST BBOX FILTER: Commented out to process all of India
       -- AND ST_Intersects(o.geometry, ST_SetSRID(ST_MakeEnvelope(76.0, 12.0, 78.0, 14.0, 4326), 4326))
 ),
@@ -11,15 +11,8 @@
 --
 -- IMPORTANT: Run 00_add_simplified_persona_columns.sql first if columns don't exist!
 
--- Helper function to parse lanes from text
-CREATE OR REPLACE FUNCTION parse_lanes(lanes_text TEXT) RETURNS INTEGER AS $$
-BEGIN
-    RETURN NULLIF(REGEXP_REPLACE(COALESCE(lanes_text, ''), '[^0-9]', '', 'g'), '')::INTEGER;
-EXCEPTION
-    WHEN OTHERS THEN
-        RETURN NULL;
-END;
-$$ LANGUAGE plpgsql IMMUTABLE;
+-- Lanes: osm_all_roads.lanes_count is parsed at import (Lua3) or back-filled by
+-- road_classification/04_prepare_osm_all_roads_table.sql (no per-row plpgsql parsing)
 
 WITH factors AS (
     SELECT
@@ -30,11 +23,11 @@ WITH factors AS (
         -- ============================================
         CASE
             WHEN o.road_type_i1 NOT IN ('NH', 'SH', 'MDR', 'OH') THEN 0.0  -- Hard gate: only highways
-            WHEN o.road_type_i1 = 'NH' AND parse_lanes(o.lanes) >= 2 THEN 1.0
+            WHEN o.road_type_i1 = 'NH' AND o.lanes_count >= 2 THEN 1.0
             WHEN o.road_type_i1 = 'NH' THEN 0.8
-            WHEN o.road_type_i1 = 'SH' AND parse_lanes(o.lanes) >= 2 THEN 0.7
+            WHEN o.road_type_i1 = 'SH' AND o.lanes_count >= 2 THEN 0.7
             WHEN o.road_type_i1 = 'SH' THEN 0.6
-            WHEN o.road_type_i1 IN ('MDR', 'OH') AND parse_lanes(o.lanes) >= 2 THEN 0.5
+            WHEN o.road_type_i1 IN ('MDR', 'OH') AND o.lanes_count >= 2 THEN 0.5
             WHEN o.road_type_i1 IN ('MDR', 'OH') THEN 0.4
             ELSE 0.0
         END AS road_quality,
@@ -70,12 +63,12 @@ WITH factors AS (
         -- ============================================
         -- Penalize unknown surface more, especially for short roads
         CASE
-            WHEN o.tags->>'surface' IS NULL AND (ST_Length(o.geometry::geography) / 1000.0) < 0.5 THEN 0.3  -- Short + unknown = penalize
-            WHEN o.tags->>'surface' IS NULL THEN 0.5  -- Unknown = moderate penalty
-            WHEN LOWER(o.tags->>'surface') IN ('asphalt', 'paved', 'concrete', 'concrete:lanes', 'concrete:plates') THEN 1.0
-            WHEN LOWER(o.tags->>'surface') IN ('paving_stones', 'sett', 'cobblestone') THEN 0.7
-            WHEN LOWER(o.tags->>'surface') IN ('compacted', 'fine_gravel', 'gravel') THEN 0.4
-            WHEN LOWER(o.tags->>'surface') IN ('dirt', 'earth', 'ground', 'mud', 'sand', 'unpaved') THEN 0.1
+            WHEN o.surface IS NULL AND (ST_Length(o.geometry::geography) / 1000.0) < 0.5 THEN 0.3  -- Short + unknown = penalize
+            WHEN o.surface IS NULL THEN 0.5  -- Unknown = moderate penalty
+            WHEN LOWER(o.surface) IN ('asphalt', 'paved', 'concrete', 'concrete:lanes', 'concrete:plates') THEN 1.0
+            WHEN LOWER(o.surface) IN ('paving_stones', 'sett', 'cobblestone') THEN 0.7
+            WHEN LOWER(o.surface) IN ('compacted', 'fine_gravel', 'gravel') THEN 0.4
+            WHEN LOWER(o.surface) IN ('dirt', 'earth', 'ground', 'mud', 'sand', 'unpaved') THEN 0.1
             ELSE 0.5  -- Unknown = moderate penalty
         END AS surface_quality,
         
@@ -140,6 +133,7 @@ WITH factors AS (
         
     FROM osm_all_roads AS o
     WHERE o.bikable_road = TRUE  -- Process all bikable roads in India
+      :osm_id_filter_clause_o  -- Incremental runs: affected roads only (empty = all roads)
 ),
 raw_scores AS (
     SELECT
@@ -83,7 +83,7 @@ SELECT
     ROUND((ST_Length(geometry::geography) / 1000.0)::numeric, 2) AS length_km,
     ROUND(persona_milemuncher_base_score::numeric, 2) AS score,
     ROUND(COALESCE(twistiness_score, 0)::numeric, 4) AS twistiness,
-    NULLIF(REGEXP_REPLACE(COALESCE(lanes, ''), '[^0-9]', '', 'g'), '')::INTEGER AS lanes_count
+    NULLIF((regexp_match(COALESCE(lanes, ''), '([0-9]+)'))[1], '')::INT AS lanes_count
 FROM osm_all_roads
 WHERE bikable_road = TRUE
   AND ST_Intersects(geometry, ST_MakeEnvelope(76, 12, 78, 14, 4326))
@@ -102,7 +102,7 @@ SELECT
     ROUND((ST_Length(geometry::geography) / 1000.0)::numeric, 2) AS length_km,
     ROUND(persona_cornercraver_base_score::numeric, 2) AS score,
     ROUND(COALESCE(twistiness_score, 0)::numeric, 4) AS twistiness,
-    tags->>'surface' AS surface
+    surface
 FROM osm_all_roads
 WHERE bikable_road = TRUE
   AND ST_Intersects(geometry, ST_MakeEnvelope(76, 12, 78, 14, 4326))
@@ -1,13 +1,17 @@
 -- Assign urban, semiurban and rural scenery
+-- :osm_id_filter_clause limits the rows in incremental runs (empty = all roads)
 
 UPDATE osm_all_roads
 SET road_scenery_urban = 1
-WHERE final_road_classification_from_grid_overlap IN ('UrbanWoH', 'UrbanH');
+WHERE final_road_classification_from_grid_overlap IN ('UrbanWoH', 'UrbanH')
+:osm_id_filter_clause;
 
 UPDATE osm_all_roads
 SET road_scenery_semiurban = 1
-WHERE final_road_classification_from_grid_overlap IN ('SemiUrbanH', 'SemiUrbanWoH');
+WHERE final_road_classification_from_grid_overlap IN ('SemiUrbanH', 'SemiUrbanWoH')
+:osm_id_filter_clause;
 
 UPDATE osm_all_roads
 SET road_scenery_rural = 1
-WHERE final_road_classification_from_grid_overlap IN ('RuralH', 'RuralWoH');
\ No newline at end of file
+WHERE final_road_classification_from_grid_overlap IN ('RuralH', 'RuralWoH')
+:osm_id_filter_clause;
\ No newline at end of file
@@ -10,4 +10,5 @@ FROM rs_forest f
 WHERE ST_Intersects(r.geometry, f.geometry)
 AND r.road_scenery_urban = 0 
 AND r.road_scenery_semiurban = 0
-AND r.road_scenery_forest = 0;  -- Progressive filter: exclude already-marked roads
\ No newline at end of file
+AND r.road_scenery_forest = 0  -- Progressive filter: exclude already-marked roads
+:osm_id_filter_clause_r;  -- Incremental runs: affected roads only (empty = all roads)
\ No newline at end of file
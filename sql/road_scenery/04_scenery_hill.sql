@@ -9,6 +9,7 @@ SET road_scenery_hill = 1
 WHERE r.road_scenery_urban = 0 
 AND r.road_scenery_semiurban = 0 
 AND r.road_scenery_hill = 0  -- Progressive filter: exclude already-marked roads
+:osm_id_filter_clause_r  -- Incremental runs: affected roads only (empty = all roads)
 AND (
     -- Feature-centric: iterate through hill nodes (distance-based)
     EXISTS (
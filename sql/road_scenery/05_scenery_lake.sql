@@ -17,4 +17,5 @@ WHERE ST_DWithin(r.geometry, l.geometry, 0.00025)  -- ~25 meters in degrees
 AND r.bikable_road IS TRUE
 AND lower(l."water") IN ('reservoir', 'lake', 'oxbow', 'pond')
 AND r.road_scenery_urban = 0 
-AND r.road_scenery_lake = 0;  -- Progressive filter: exclude already-marked roads
+AND r.road_scenery_lake = 0  -- Progressive filter: exclude already-marked roads
+:osm_id_filter_clause_r;  -- Incremental runs: affected roads only (empty = all roads)
@@ -11,4 +11,5 @@ FROM rs_coastline c
 WHERE ST_DWithin(r.geometry, c.geometry, 0.001)  -- ~100 meters in degrees
 AND r.road_scenery_urban = 0 
 AND r.road_scenery_semiurban = 0
-AND r.road_scenery_beach = 0;  -- Progressive filter: exclude already-marked roads
+AND r.road_scenery_beach = 0  -- Progressive filter: exclude already-marked roads
+:osm_id_filter_clause_r;  -- Incremental runs: affected roads only (empty = all roads)
@@ -11,4 +11,5 @@ FROM rs_rivers riv
 WHERE ST_DWithin(r.geometry, riv.geometry, 0.0005)  -- ~50 meters in degrees
 AND r.road_scenery_urban = 0 
 AND r.road_scenery_semiurban = 0
-AND r.road_scenery_river = 0;  -- Progressive filter: exclude already-marked roads
+AND r.road_scenery_river = 0  -- Progressive filter: exclude already-marked roads
+:osm_id_filter_clause_r;  -- Incremental runs: affected roads only (empty = all roads)
@@ -11,4 +11,5 @@ FROM rs_fields f
 WHERE ST_DWithin(r.geometry, f.geometry, 0.001)  -- ~100 meters in degrees
 AND r.road_scenery_urban = 0 
 AND r.road_scenery_semiurban = 0
-AND r.road_scenery_field = 0;  -- Progressive filter: exclude already-marked roads
+AND r.road_scenery_field = 0  -- Progressive filter: exclude already-marked roads
+:osm_id_filter_clause_r;  -- Incremental runs: affected roads only (empty = all roads)
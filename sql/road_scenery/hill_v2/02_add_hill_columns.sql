@@ -5,6 +5,8 @@ ALTER TABLE osm_all_roads
 ADD COLUMN IF NOT EXISTS hill_relief_1km FLOAT,
 ADD COLUMN IF NOT EXISTS road_scenery_hill INT;
 
+-- geom_3857 / length_geom_3857 are written by the Lua3 import (and back-filled by
+-- road_classification/04_prepare_osm_all_roads_table.sql); this only covers older tables.
 DO $$
 BEGIN
     IF NOT EXISTS (
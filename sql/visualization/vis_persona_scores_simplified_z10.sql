@@ -76,7 +76,7 @@ SELECT
     o.ref,
     o.name,
     o.twistiness_score,
-    NULLIF(REGEXP_REPLACE(COALESCE(o.lanes, ''), '[^0-9]', '', 'g'), '')::INTEGER AS lanes_count,
+    NULLIF((regexp_match(COALESCE(o.lanes, ''), '([0-9]+)'))[1], '')::INT AS lanes_count,
     CASE 
         WHEN o.persona_milemuncher_base_score IS NULL THEN 'No Data'
         WHEN o.persona_milemuncher_base_score >= 80 THEN 'Excellent'
@@ -115,7 +115,7 @@ SELECT
     o.ref,
     o.name,
     o.twistiness_score,
-    o.tags->>'surface' AS surface,
+    o.surface AS surface,
     CASE 
         WHEN o.persona_cornercraver_base_score IS NULL THEN 'No Data'
         WHEN o.persona_cornercraver_base_score >= 80 THEN 'Excellent'
@@ -81,7 +81,7 @@ SELECT
     o.road_setting_i1,
     o.road_classification_v2,
     o.twistiness_score,
-    o.tags->>'surface' AS surface,
+    o.surface AS surface,
     ST_Length(o.geometry::geography) / 1000.0 AS length_km,
     o.ref,
     o.name,
@@ -109,7 +109,7 @@ SELECT
     o.road_type_i1,
     o.road_setting_i1,
     o.road_classification_v2,
-    o.tags->>'surface' AS surface,
+    o.surface AS surface,
     ST_Length(o.geometry::geography) / 1000.0 AS length_km,
     o.ref,
     o.name,
@@ -106,7 +106,7 @@ SELECT
     o.road_type_i1,
     o.road_setting_i1,
     o.road_classification_v2,
-    o.tags->>'surface' AS surface,
+    o.surface AS surface,
     ST_Length(o.geometry::geography) / 1000.0 AS length_km,
     o.ref,
     o.name,
@@ -378,7 +378,7 @@ SELECT
     ST_Length(o.geometry::geography) / 1000.0 AS length_km,
     o.ref,
     o.name,
-    NULLIF(REGEXP_REPLACE(COALESCE(o.lanes, ''), '[^0-9]', '', 'g'), '')::INTEGER AS lanes_count,
+    NULLIF((regexp_match(COALESCE(o.lanes, ''), '([0-9]+)'))[1], '')::INT AS lanes_count,
     CASE 
         WHEN o.persona_milemuncher_score IS NULL THEN 'No Data'
         WHEN o.persona_milemuncher_score >= 0.8 THEN 'Excellent'
@@ -412,7 +412,7 @@ SELECT
     o.road_setting_i1,
     o.road_classification_v2,
     o.twistiness_score,
-    o.tags->>'surface' AS surface,
+    o.surface AS surface,
     ST_Length(o.geometry::geography) / 1000.0 AS length_km,
     o.ref,
     o.name,
@@ -449,7 +449,7 @@ SELECT
     o.road_type_i1,
     o.road_setting_i1,
     o.road_classification_v2,
-    o.tags->>'surface' AS surface,
+    o.surface AS surface,
     (
         COALESCE(o.road_scenery_hill, 0) +
         COALESCE(o.road_scenery_lake, 0) +
@@ -582,7 +582,7 @@ SELECT
     o.road_setting_i1,
     o.road_classification_v2,
     o.twistiness_score,
-    o.tags->>'surface' AS surface,
+    o.surface AS surface,
     ST_Length(o.geometry::geography) / 1000.0 AS length_km,
     o.ref,
     o.name,
@@ -619,7 +619,7 @@ SELECT
     o.road_type_i1,
     o.road_setting_i1,
     o.road_classification_v2,
-    o.tags->>'surface' AS surface,
+    o.surface AS surface,
     ST_Length(o.geometry::geography) / 1000.0 AS length_km,
     o.ref,
     o.name,
@@ -692,8 +692,8 @@ SELECT
     o.road_type_i1,
     o.road_setting_i1,
     o.road_classification_v2,
-    NULLIF(REGEXP_REPLACE(COALESCE(o.lanes, ''), '[^0-9]', '', 'g'), '')::INTEGER AS lanes_count,
-    UPPER(COALESCE(o.tags->>'oneway', '')) IN ('YES', 'TRUE', '1', '-1') AS is_oneway,
+    NULLIF((regexp_match(COALESCE(o.lanes, ''), '([0-9]+)'))[1], '')::INT AS lanes_count,
+    COALESCE(o.is_oneway, FALSE) AS is_oneway,
     ST_Length(o.geometry::geography) / 1000.0 AS length_km,
     o.ref,
     o.name,
@@ -715,7 +715,7 @@ SELECT
     o.road_setting_i1,
     o.road_classification_v2,
     o.fourlane,
-    NULLIF(REGEXP_REPLACE(COALESCE(o.lanes, ''), '[^0-9]', '', 'g'), '')::INTEGER AS lanes_count,
+    NULLIF((regexp_match(COALESCE(o.lanes, ''), '([0-9]+)'))[1], '')::INT AS lanes_count,
     o.twistiness_score,
     ST_Length(o.geometry::geography) / 1000.0 AS length_km,
     o.ref,
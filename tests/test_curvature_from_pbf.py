@@ -0,0 +1,69 @@
+"""
+curvature_from_pbf: the result file is current only for the same PBF, Lua script
+and curvature thresholds (<result>.state.json); ways that lose a point get NULL
+coordinates and are counted.
+
+Run: python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import curvature_from_pbf  # noqa: E402
+
+
+@pytest.fixture
+def computed_result(tmp_path, monkeypatch):
+    """A PBF, a Lua script and a result file with the state of a finished run."""
+    pbf_path = tmp_path / "india-latest.osm.pbf"
+    pbf_path.write_bytes(b"pbf")
+    lua_path = tmp_path / "Lua3_RouteProcessing_with_curvature.lua"
+    lua_path.write_text("-- v1\n", encoding="utf-8")
+    monkeypatch.setattr(curvature_from_pbf, "LUA_STYLE_SCRIPT", str(lua_path))
+    result_path = tmp_path / "rs_curvature_way_summary.tsv.gz"
+    result_path.write_bytes(b"")
+    curvature_from_pbf.write_result_state(str(result_path), curvature_from_pbf.input_state(str(pbf_path)))
+    return str(pbf_path), str(result_path), lua_path
+
+
+def test_same_inputs_reuse_the_result(computed_result):
+    pbf_path, result_path, _ = computed_result
+    assert curvature_from_pbf.result_is_current(pbf_path, result_path)
+
+
+def test_changed_lua_script_recomputes(computed_result):
+    pbf_path, result_path, lua_path = computed_result
+    lua_path.write_text("-- v2: other bikable highways\n", encoding="utf-8")
+    assert not curvature_from_pbf.result_is_current(pbf_path, result_path)
+
+
+def test_changed_thresholds_recompute(computed_result, monkeypatch):
+    pbf_path, result_path, _ = computed_result
+    monkeypatch.setattr(curvature_from_pbf, "PARAMETERS_SEED", curvature_from_pbf.PARAMETERS_SEED + np.uint64(1))
+    assert not curvature_from_pbf.result_is_current(pbf_path, result_path)
+
+
+def test_result_without_state_recomputes(computed_result):
+    pbf_path, result_path, _ = computed_result
+    os.remove(f"{result_path}.state.json")
+    # A result file newer than the PBF is no longer enough
+    assert not curvature_from_pbf.result_is_current(pbf_path, result_path)
+
+
+def test_ways_losing_points_get_null_coordinates_and_are_counted():
+    invalid = curvature_from_pbf.INVALID_COORDINATE
+    # way 1 intact, way 2 repeats a point, way 3 has a node without location
+    way_ids = np.array([1, 1, 2, 2, 2, 3, 3], dtype=np.int64)
+    x = np.array([10, 20, 10, 10, 30, 10, invalid], dtype=np.int32)
+    y = np.array([10, 20, 10, 10, 30, 10, invalid], dtype=np.int32)
+
+    lon, lat, null_ways = curvature_from_pbf.coordinates(way_ids, x, y)
+
+    assert not np.isnan(lon[:2]).any()
+    assert np.isnan(lon[2:]).all() and np.isnan(lat[2:]).all()
+    assert null_ways == {"missing_location": 1, "repeated_point": 1}
@@ -0,0 +1,237 @@
+"""
+download_osm_pbf against a local http.server: resume via Range (and If-Range),
+conditional fetch (304 / ETag) and md5 verification.
+
+Run: python -m pytest -q tests
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import download_osm_pbf  # noqa: E402
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MiB, not a PBF (no replication timestamp)
+PATH = "/india-latest.osm.pbf"
+
+
+class PbfHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with ETag (unless None) / Last-Modified, byte ranges, If-Range and <file>.md5."""
+
+    server_version = "TestPbf/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _file_headers(self):
+        if self.server.etag:
+            self.send_header("ETag", self.server.etag)
+        self.send_header("Last-Modified", self.server.last_modified)
+        self.send_header("Accept-Ranges", "bytes")
+
+    def _not_modified(self):
+        return bool(self.server.etag) and self.headers.get("If-None-Match") == self.server.etag
+
+    def _range_applies(self):
+        """If-Range: the range only applies to the version named (else the whole file, 200)."""
+        if_range = self.headers.get("If-Range")
+        return if_range is None or if_range in (self.server.etag, self.server.last_modified)
+
+    def do_HEAD(self):
+        self.server.requests.append(("HEAD", self.path, dict(self.headers)))
+        if self.path != PATH:
+            self.send_error(404)
+            return
+        if self._not_modified():
+            self.send_response(304)
+            self._file_headers()
+            self.end_headers()
+            return
+        self.send_response(200)
+        self._file_headers()
+        self.send_header("Content-Length", str(len(self.server.payload)))
+        self.end_headers()
+        if self.server.after_head:
+            self.server.after_head(self.server)
+            self.server.after_head = None
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path, dict(self.headers)))
+        if self.path == f"{PATH}.md5":
+            body = f"{self.server.md5}  india-latest.osm.pbf\n".encode("ascii")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path != PATH:
+            self.send_error(404)
+            return
+        payload = self.server.payload
+        byte_range = self.headers.get("Range")
+        if byte_range and self._range_applies():
+            start, end = byte_range.split("=", 1)[1].split("-")
+            start, end = int(start), min(int(end), len(payload) - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+            body = payload[start:end + 1]
+        else:
+            self.send_response(200)
+            body = payload
+        self._file_headers()
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), PbfHandler)
+    httpd.payload = PAYLOAD
+    httpd.etag = '"v1"'
+    httpd.last_modified = "Mon, 05 Oct 2026 20:00:00 GMT"
+    httpd.md5 = hashlib.md5(PAYLOAD).hexdigest()
+    httpd.requests = []
+    httpd.after_head = None
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}{PATH}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def small_parts(monkeypatch):
+    # 1 MiB payload in 4 ranges
+    monkeypatch.setattr(download_osm_pbf, "DOWNLOAD_MIN_PART_MB", 0.25)
+    monkeypatch.setattr(download_osm_pbf, "DOWNLOAD_PARALLEL_PARTS", 4)
+
+
+def range_requests(httpd):
+    return [
+        headers.get("Range") for method, path, headers in httpd.requests
+        if method == "GET" and path == PATH
+    ]
+
+
+def write_partial_download(output_path, etag, last_modified):
+    """
+    State of an interrupted run: the first range complete, the second half done,
+    the rest not started. Returns (ranges, done).
+    """
+    ranges = download_osm_pbf.plan_ranges(len(PAYLOAD), True)
+    assert len(ranges) == 4
+    done = [ranges[0][1] - ranges[0][0] + 1, (ranges[1][1] - ranges[1][0] + 1) // 2, 0, 0]
+    with open(f"{output_path}.part", "wb") as part_file:
+        part_file.truncate(len(PAYLOAD))
+        part_file.seek(0)
+        part_file.write(PAYLOAD[:done[0]])
+        part_file.seek(ranges[1][0])
+        part_file.write(PAYLOAD[ranges[1][0]:ranges[1][0] + done[1]])
+    with open(f"{output_path}.part.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "etag": etag, "last_modified": last_modified, "size": len(PAYLOAD),
+            "accept_ranges": True, "ranges": ranges, "done": done,
+        }, f)
+    return ranges, done
+
+
+def serve_new_version(httpd):
+    """Same size, new content and Last-Modified, no ETag."""
+    httpd.payload = PAYLOAD[::-1]
+    httpd.md5 = hashlib.md5(httpd.payload).hexdigest()
+    httpd.last_modified = "Tue, 06 Oct 2026 20:00:00 GMT"
+
+
+def test_resumes_interrupted_download_with_ranges(server, tmp_path):
+    output_path = str(tmp_path / "india-latest.osm.pbf")
+    ranges, done = write_partial_download(output_path, server.etag, server.last_modified)
+
+    assert download_osm_pbf.download_osm_pbf(server.url, output_path) is True
+
+    with open(output_path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert not os.path.exists(f"{output_path}.part.json")
+    # Only the missing bytes were requested
+    assert sorted(range_requests(server)) == sorted([
+        f"bytes={ranges[1][0] + done[1]}-{ranges[1][1]}",
+        f"bytes={ranges[2][0]}-{ranges[2][1]}",
+        f"bytes={ranges[3][0]}-{ranges[3][1]}",
+    ])
+
+
+def test_skips_download_on_304_and_same_etag(server, tmp_path):
+    output_path = str(tmp_path / "india-latest.osm.pbf")
+    assert download_osm_pbf.download_osm_pbf(server.url, output_path) is True
+    server.requests.clear()
+
+    assert download_osm_pbf.download_osm_pbf(server.url, output_path) is False
+
+    heads = [headers for method, _, headers in server.requests if method == "HEAD"]
+    assert heads[0].get("If-None-Match") == '"v1"'
+    assert range_requests(server) == []
+
+
+def test_new_etag_downloads_even_with_same_last_modified(server, tmp_path):
+    output_path = str(tmp_path / "india-latest.osm.pbf")
+    assert download_osm_pbf.download_osm_pbf(server.url, output_path) is True
+    server.payload = PAYLOAD[::-1]
+    server.md5 = hashlib.md5(server.payload).hexdigest()
+    server.etag = '"v2"'
+
+    assert download_osm_pbf.download_osm_pbf(server.url, output_path) is True
+
+    with open(output_path, "rb") as f:
+        assert f.read() == server.payload
+
+
+def test_md5_mismatch_raises_and_discards_part(server, tmp_path):
+    output_path = str(tmp_path / "india-latest.osm.pbf")
+    server.md5 = "0" * 32
+
+    with pytest.raises(RuntimeError, match="MD5 mismatch"):
+        download_osm_pbf.download_osm_pbf(server.url, output_path)
+
+    assert not os.path.exists(output_path)
+    assert not os.path.exists(f"{output_path}.part")
+    assert not os.path.exists(f"{output_path}.part.json")
+
+
+def test_changed_last_modified_restarts_instead_of_resuming(server, tmp_path):
+    output_path = str(tmp_path / "india-latest.osm.pbf")
+    server.etag = None
+    write_partial_download(output_path, None, server.last_modified)
+    serve_new_version(server)
+
+    assert download_osm_pbf.download_osm_pbf(server.url, output_path) is True
+
+    with open(output_path, "rb") as f:
+        assert f.read() == server.payload
+    # Every range fetched from its start, validated against the new version
+    ranges = download_osm_pbf.plan_ranges(len(PAYLOAD), True)
+    assert sorted(range_requests(server)) == sorted(f"bytes={start}-{end}" for start, end in ranges)
+    if_ranges = {headers.get("If-Range") for method, path, headers in server.requests if method == "GET" and path == PATH}
+    assert if_ranges == {server.last_modified}
+
+
+def test_file_replaced_after_head_is_not_spliced(server, tmp_path):
+    output_path = str(tmp_path / "india-latest.osm.pbf")
+    server.etag = None
+    write_partial_download(output_path, None, server.last_modified)
+    # HEAD still reports the old version; the range requests then see the new one
+    server.after_head = serve_new_version
+
+    with pytest.raises(download_osm_pbf.RemoteFileChanged):
+        download_osm_pbf.download_osm_pbf(server.url, output_path)
+
+    assert not os.path.exists(output_path)
+    assert not os.path.exists(f"{output_path}.part")
+    assert not os.path.exists(f"{output_path}.part.json")
@@ -0,0 +1,89 @@
+"""
+lanes_count rule: the first integer of the lanes tag ('2;3' -> 2, not 23 or 3).
+The rule lives in parse_lanes (Lua import) and in the SQL back-fill / persona
+queries; there is no Lua or PostgreSQL here, so each pattern is read from its
+file and applied with the equivalent Python regex.
+
+Run: python -m pytest -q tests
+"""
+
+import os
+import re
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LUA_SCRIPT = os.path.join(ROOT, "scripts", "Lua3_RouteProcessing_with_curvature.lua")
+SQL_FILES = [
+    "sql/road_classification/04_prepare_osm_all_roads_table.sql",
+    "sql/road_persona/validate_simplified_scores.sql",
+    "sql/visualization/vis_persona_scores_simplified_z10.sql",
+    "sql/visualization/vis_persona_v2_parameters_z10.sql",
+]
+
+CASES = [
+    ("2", 2),
+    ("2;3", 2),
+    ("3;2", 3),
+    ("2-4", 2),
+    ("4 lanes", 4),
+    ("10", 10),
+    ("", None),
+    ("yes", None),
+    (None, None),
+]
+
+
+def read(path):
+    with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+        return f.read()
+
+
+def lua_parse_lanes():
+    """parse_lanes from the Lua script: tonumber(string.match(lanes, <pattern>))."""
+    match = re.search(
+        r"local function parse_lanes\(lanes\).*?string\.match\(lanes, '([^']+)'\)", read(LUA_SCRIPT), re.S
+    )
+    assert match, "parse_lanes not found in the Lua script"
+    pattern = re.compile(match.group(1).replace("%d", r"\d"))
+
+    def parse(lanes):
+        if lanes is None:
+            return None
+        found = pattern.search(lanes)
+        return int(found.group(0)) if found else None
+    return parse
+
+
+def sql_lanes_count(path):
+    """NULLIF((regexp_match(COALESCE(<col>, ''), <pattern>))[1], '')::INT of one SQL file."""
+    expressions = re.findall(
+        r"NULLIF\(\(regexp_match\(COALESCE\((?:o\.)?lanes, ''\), '([^']+)'\)\)\[1\], ''\)::INT AS lanes_count", read(path)
+    )
+    assert expressions, f"no lanes_count expression in {path}"
+    assert len(set(expressions)) == 1
+    pattern = re.compile(expressions[0])
+
+    def parse(lanes):
+        found = pattern.search(lanes or "")
+        return int(found.group(1)) if found and found.group(1) else None
+    return parse
+
+
+@pytest.mark.parametrize("lanes, expected", CASES)
+def test_lua_takes_first_integer(lanes, expected):
+    assert lua_parse_lanes()(lanes) == expected
+
+
+@pytest.mark.parametrize("path", SQL_FILES)
+def test_sql_matches_lua(path):
+    parse = sql_lanes_count(path)
+    for lanes, expected in CASES:
+        assert parse(lanes) == expected, (path, lanes)
+
+
+def test_no_digit_concatenation_left():
+    # REGEXP_REPLACE(lanes, '[^0-9]', '', 'g') turned '2;3' into 23
+    for path in SQL_FILES:
+        assert "REGEXP_REPLACE(COALESCE(o.lanes" not in read(path)
+        assert "REGEXP_REPLACE(COALESCE(lanes" not in read(path)
@@ -0,0 +1,96 @@
+"""
+vacuum_scheduler decisions against a fake cursor: a column-list ANALYZE does not
+reset n_mod_since_analyze, so the scheduler has to remember what it analyzed.
+
+Run: python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import vacuum_scheduler  # noqa: E402
+
+
+class FakeCursor:
+    """Answers the scheduler's catalog queries from a dict and records maintenance statements."""
+
+    def __init__(self, stats, columns):
+        self.stats = stats  # {table: [n_live, n_dead, n_mod_since_analyze]}
+        self.columns = columns  # {table: [column, ...]}
+        self.statements = []
+        self._rows = []
+
+    def execute(self, query, params=None):
+        if "pg_stat_user_tables" in query:
+            tables = params[0]
+            self._rows = [(table, *self.stats[table]) for table in tables if table in self.stats]
+        elif "information_schema.columns" in query:
+            table, wanted = params
+            self._rows = [(column,) for column in self.columns.get(table, []) if column in wanted]
+        elif query.startswith(("ANALYZE", "VACUUM")):
+            self.statements.append(query)
+            if query.startswith("ANALYZE") and "(" not in query:
+                # Only a full ANALYZE resets the counter (analyze.c: resetcounter = va_cols == NIL)
+                self.stats[query.split()[1].rstrip(";")][2] = 0
+        else:
+            self._rows = []
+
+    def fetchall(self):
+        return self._rows
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    vacuum_scheduler.ANALYZED_COLUMNS.clear()
+    yield
+    vacuum_scheduler.ANALYZED_COLUMNS.clear()
+
+
+def curvature_cursor(n_mod):
+    return FakeCursor(
+        stats={"osm_all_roads": [1_000_000, 0, n_mod]},
+        columns={"osm_all_roads": ["osm_id", "bikable_road", "road_type_i1"]},
+    )
+
+
+def test_table_analyzed_once_is_skipped_at_next_stage():
+    cursor = curvature_cursor(500_000)
+
+    assert vacuum_scheduler.schedule_maintenance(cursor, "curvature") == {"osm_all_roads": "analyze"}
+    assert cursor.statements == ["ANALYZE osm_all_roads (osm_id, bikable_road);"]
+
+    # The counter is unchanged (column-list ANALYZE), so nothing to do now
+    assert vacuum_scheduler.schedule_maintenance(cursor, "road_access") == {}
+    assert len(cursor.statements) == 1
+
+
+def test_new_modifications_after_analyze_trigger_again():
+    cursor = curvature_cursor(500_000)
+    vacuum_scheduler.schedule_maintenance(cursor, "curvature")
+
+    cursor.stats["osm_all_roads"][2] += 200_000
+    assert vacuum_scheduler.schedule_maintenance(cursor, "curvature") == {"osm_all_roads": "analyze"}
+    assert len(cursor.statements) == 2
+
+
+def test_columns_not_analyzed_yet_still_count_all_modifications():
+    cursor = curvature_cursor(500_000)
+    vacuum_scheduler.schedule_maintenance(cursor, "curvature")
+
+    # road_type_i1 was not part of the curvature ANALYZE
+    assert vacuum_scheduler.schedule_maintenance(cursor, "persona") == {"osm_all_roads": "analyze"}
+    assert cursor.statements[-1] == "ANALYZE osm_all_roads (osm_id, bikable_road, road_type_i1);"
+
+
+def test_counter_reset_by_full_analyze_forgets_the_run_state():
+    cursor = curvature_cursor(500_000)
+    vacuum_scheduler.schedule_maintenance(cursor, "curvature")
+
+    # Autovacuum ran a full ANALYZE (counter reset), then fewer rows changed than before
+    cursor.stats["osm_all_roads"][2] = 100_000
+    assert vacuum_scheduler.schedule_maintenance(cursor, "curvature") == {"osm_all_roads": "analyze"}
+    assert "osm_all_roads" in vacuum_scheduler.ANALYZED_COLUMNS